@@ -1,15 +1,37 @@
 from .v2 import (
+    AcquireTimeoutError,
+    AdmissionError,
     AsMysql,
     AsyncEngine,
     AsyncResult,
+    CircuitOpenError,
     Engine,
+    Loader,
+    Pipeline,
+    PoolQueueFullError,
+    QueryTimeoutError,
     Result,
+    RoutingEngine,
+    Scanner,
+    StatementTrace,
+    Transaction,
 )
 
 __all__ = [
     "AsMysql",
     "Engine",
     "Result",
+    "Transaction",
+    "Pipeline",
+    "Loader",
+    "Scanner",
+    "RoutingEngine",
+    "StatementTrace",
+    "AdmissionError",
+    "PoolQueueFullError",
+    "AcquireTimeoutError",
+    "CircuitOpenError",
+    "QueryTimeoutError",
     "AsyncEngine",
     "AsyncResult",
 ]
@@ -0,0 +1,180 @@
+"""
+列式结果(v2 和 v3dev 共用)
+
+根据 cursor.description 中的列类型，把每批行数据直接转换为 NumPy 数组或 Arrow RecordBatch，
+不需要为每行创建 result_class 对象。numpy / pyarrow 是可选依赖，用到时才导入:
+    pip install asmysql[columnar]
+"""
+
+from typing import Optional, Sequence, Union
+
+from pymysql.constants import FIELD_TYPE
+
+# 默认每批转换的行数
+DEFAULT_BATCH_SIZE = 65536
+
+_INT_TYPES = frozenset(
+    (FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.INT24, FIELD_TYPE.LONG, FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR)
+)
+_FLOAT_TYPES = frozenset((FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE))
+_DATETIME_TYPES = frozenset((FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP))
+_DATE_TYPES = frozenset((FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE))
+_STRING_TYPES = frozenset(
+    (
+        FIELD_TYPE.VARCHAR,
+        FIELD_TYPE.VAR_STRING,
+        FIELD_TYPE.STRING,
+        FIELD_TYPE.ENUM,
+        FIELD_TYPE.SET,
+        FIELD_TYPE.JSON,
+        FIELD_TYPE.TINY_BLOB,
+        FIELD_TYPE.MEDIUM_BLOB,
+        FIELD_TYPE.LONG_BLOB,
+        FIELD_TYPE.BLOB,
+    )
+)
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("fetch_columns() requires numpy, install it with: pip install asmysql[columnar]") from None
+    return numpy
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("fetch_arrow() requires pyarrow, install it with: pip install asmysql[columnar]") from None
+    return pyarrow
+
+
+def column_names(description: Sequence[tuple]) -> list[str]:
+    return [column[0] for column in description]
+
+
+def transpose(description: Sequence[tuple], rows: Sequence[Union[tuple, dict]]) -> list[list]:
+    """把一批行(tuple 或 DictCursor 返回的 dict)转置为按列存放的列表"""
+    if not rows:
+        return [[] for _ in description]
+    if isinstance(rows[0], dict):
+        rows = [tuple(row.values()) for row in rows]
+    return [list(column) for column in zip(*rows)]
+
+
+def _numpy_column(numpy, type_code: int, values: list):
+    try:
+        if type_code in _INT_TYPES or type_code in _FLOAT_TYPES:
+            dtype = numpy.int64 if type_code in _INT_TYPES else numpy.float64
+            mask = [value is None for value in values]
+            if not any(mask):
+                try:
+                    return numpy.array(values, dtype=dtype)
+                except OverflowError:
+                    # BIGINT UNSIGNED 超出 int64 范围
+                    return numpy.array(values, dtype=numpy.uint64)
+            data = numpy.array([0 if value is None else value for value in values], dtype=dtype)
+            return numpy.ma.MaskedArray(data, mask=mask)
+        # NULL 会被转换为 NaT
+        if type_code in _DATETIME_TYPES:
+            return numpy.array(values, dtype="datetime64[us]")
+        if type_code in _DATE_TYPES:
+            return numpy.array(values, dtype="datetime64[D]")
+        if type_code == FIELD_TYPE.TIME:
+            return numpy.array(values, dtype="timedelta64[us]")
+    except (TypeError, ValueError, OverflowError):
+        # 无法转换的值(如零日期被解码为字符串)，回退到 object 数组
+        pass
+    column = numpy.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def to_numpy_columns(description: Sequence[tuple], rows: Sequence[Union[tuple, dict]]) -> dict:
+    """把一批行转换为 {列名: numpy 数组}，含 NULL 的数值列返回 numpy.ma.MaskedArray"""
+    numpy = _import_numpy()
+    return {
+        column[0]: _numpy_column(numpy, column[1], values)
+        for column, values in zip(description, transpose(description, rows))
+    }
+
+
+def concat_numpy_columns(description: Sequence[tuple], batches: list[dict]) -> dict:
+    """合并多批 numpy 列"""
+    numpy = _import_numpy()
+    if not batches:
+        return to_numpy_columns(description, [])
+    if len(batches) == 1:
+        return batches[0]
+    columns = {}
+    for name in batches[0]:
+        arrays = [batch[name] for batch in batches]
+        if any(isinstance(array, numpy.ma.MaskedArray) for array in arrays):
+            columns[name] = numpy.ma.concatenate(arrays)
+        else:
+            columns[name] = numpy.concatenate(arrays)
+    return columns
+
+
+def _arrow_type(pyarrow, type_code: int, values: list):
+    if type_code in _INT_TYPES:
+        return pyarrow.int64()
+    if type_code in _FLOAT_TYPES:
+        return pyarrow.float64()
+    if type_code in _DATETIME_TYPES:
+        return pyarrow.timestamp("us")
+    if type_code in _DATE_TYPES:
+        return pyarrow.date32()
+    if type_code == FIELD_TYPE.TIME:
+        return pyarrow.duration("us")
+    if type_code in _STRING_TYPES:
+        # 二进制排序规则的列会被解码为 bytes
+        sample = next((value for value in values if value is not None), None)
+        return pyarrow.binary() if isinstance(sample, (bytes, bytearray)) else pyarrow.string()
+    # DECIMAL、BIT 等由 pyarrow 推断类型
+    return None
+
+
+def _arrow_column(pyarrow, type_code: int, values: list, dictionary: bool):
+    arrow_type = _arrow_type(pyarrow, type_code, values)
+    try:
+        array = pyarrow.array(values, type=arrow_type)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, OverflowError):
+        if type_code in _INT_TYPES:
+            try:
+                # BIGINT UNSIGNED 超出 int64 范围
+                return pyarrow.array(values, type=pyarrow.uint64())
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, OverflowError):
+                pass
+        # 无法转换的值(如零日期被解码为字符串)，回退到字符串
+        array = pyarrow.array([None if value is None else str(value) for value in values], type=pyarrow.string())
+    if dictionary and pyarrow.types.is_string(array.type):
+        return array.dictionary_encode()
+    return array
+
+
+def to_arrow_batch(description: Sequence[tuple], rows: Sequence[Union[tuple, dict]], dictionary: bool = True):
+    """把一批行转换为 pyarrow.RecordBatch，dictionary=True 时字符串列使用字典编码"""
+    pyarrow = _import_pyarrow()
+    arrays = [
+        _arrow_column(pyarrow, column[1], values, dictionary)
+        for column, values in zip(description, transpose(description, rows))
+    ]
+    return pyarrow.RecordBatch.from_arrays(arrays, names=column_names(description))
+
+
+def concat_arrow_batches(description: Sequence[tuple], batches: list, dictionary: bool = True):
+    """合并多批 RecordBatch 为 pyarrow.Table，各批次推断出的类型不一致时自动提升(如全为 NULL 的批次)"""
+    pyarrow = _import_pyarrow()
+    if not batches:
+        return pyarrow.Table.from_batches([to_arrow_batch(description, [], dictionary)])
+    tables = [pyarrow.Table.from_batches([batch]) for batch in batches]
+    return pyarrow.concat_tables(tables, promote_options="permissive")
+
+
+def check_batch_size(batch_size: Optional[int]):
+    if batch_size is not None and batch_size <= 0:
+        raise ValueError("batch_size must be greater than 0")
+    return batch_size or DEFAULT_BATCH_SIZE
@@ -0,0 +1,103 @@
+"""
+行工厂(v2 和 v3dev 共用)
+
+根据结果集的列名为 result_class 编译专用的构造函数，直接从 tuple 行创建对象，
+不需要先为每行创建 dict 再调用 result_class(**data)。
+编译结果按 (result_class, 列名) 缓存，同一查询只在第一次获取数据时编译一次。
+"""
+
+import inspect
+import keyword
+from functools import lru_cache
+from typing import Any, Callable, Sequence
+
+# 同时缓存的行工厂数量
+_FACTORY_CACHE_SIZE = 512
+
+
+def column_keys(cursor) -> tuple[str, ...]:
+    """返回游标结果集的列名，重名的列与 DictCursor 一样使用 "表名.列名" 区分"""
+    # noinspection PyProtectedMember
+    fields = getattr(cursor._result, "fields", None) if getattr(cursor, "_result", None) else None
+    if not fields:
+        return tuple(column[0] for column in cursor.description or ())
+    return field_keys(fields)
+
+
+def field_keys(fields) -> tuple[str, ...]:
+    """返回字段定义对应的列名，重名的列使用 "表名.列名" 区分"""
+    keys = []
+    for field in fields:
+        name = field.name
+        if name in keys:
+            name = f"{field.table_name}.{name}"
+        keys.append(name)
+    return tuple(keys)
+
+
+def _is_pydantic_model(cls) -> bool:
+    return isinstance(cls, type) and hasattr(cls, "__pydantic_validator__") and hasattr(cls, "model_validate")
+
+
+def _is_namedtuple(cls) -> bool:
+    return isinstance(cls, type) and issubclass(cls, tuple) and hasattr(cls, "_fields") and hasattr(cls, "_make")
+
+
+def _accepts_positional(cls, keys: tuple[str, ...]) -> bool:
+    """构造函数的前几个参数是否正好按顺序对应各列(剩余参数都有默认值)，此时可以按位置传参"""
+    try:
+        parameters = list(inspect.signature(cls).parameters.values())
+    except (TypeError, ValueError):
+        return False
+    if len(parameters) < len(keys):
+        return False
+    for parameter, key in zip(parameters, keys):
+        if parameter.kind is not parameter.POSITIONAL_OR_KEYWORD or parameter.name != key:
+            return False
+    for parameter in parameters[len(keys) :]:
+        if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+            continue
+        if parameter.default is parameter.empty:
+            return False
+    return True
+
+
+def _compile_keywords(cls, keys: tuple[str, ...]) -> Callable[[Sequence], Any]:
+    """生成 lambda row: cls(a=row[0], b=row[1], ...)，与 cls(**dict(zip(keys, row))) 等价"""
+    arguments = ", ".join(f"{key}=row[{i}]" for i, key in enumerate(keys))
+    namespace = {"cls": cls}
+    exec(f"def factory(row):\n    return cls({arguments})\n", namespace)
+    return namespace["factory"]
+
+
+def _build_row_factory(cls, keys: tuple[str, ...]) -> Callable[[Sequence], Any]:
+    if _is_pydantic_model(cls):
+        # 保留 pydantic 的校验和类型转换(与 cls(**data) 行为一致)，跳过 __init__ 的额外开销
+        validate = cls.model_validate
+        return lambda row: validate(dict(zip(keys, row)))
+    if _is_namedtuple(cls) and tuple(cls._fields) == keys:
+        return cls._make
+    if _accepts_positional(cls, keys):
+        # dataclass、attrs、NamedTuple、显式 __init__ 的 __slots__ 类等，列顺序与参数顺序一致时按位置传参
+        return lambda row: cls(*row)
+    if keys and all(key.isidentifier() and not keyword.iskeyword(key) for key in keys) and len(set(keys)) == len(keys):
+        return _compile_keywords(cls, keys)
+    return lambda row: cls(**dict(zip(keys, row)))
+
+
+@lru_cache(maxsize=_FACTORY_CACHE_SIZE)
+def _cached_row_factory(cls, keys: tuple[str, ...]):
+    return _build_row_factory(cls, keys)
+
+
+def get_row_factory(cls, keys: tuple[str, ...]) -> Callable[[Sequence], Any]:
+    """返回从 tuple 行创建 cls 对象的函数
+
+    :param cls: result_class
+    :param keys: 列名，顺序与 tuple 行一致
+    """
+    try:
+        return _cached_row_factory(cls, keys)
+    except TypeError:
+        # result_class 不可哈希时不缓存
+        return _build_row_factory(cls, keys)
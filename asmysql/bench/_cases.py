@@ -0,0 +1,241 @@
+"""
+基准测试用例
+
+每个用例对异步的 v2 Engine 和同步的 v3dev Engine 各实现一次，SQL 相同:
+- acquire_release: 从连接池获取并归还连接
+- point_select: 按主键查询一行
+- fetch_all: 按 result_class 读取 N 行
+- execute_many: 批量写入(INSERT 改写为多行语句)
+- stream: 流式迭代 N 行
+"""
+
+import datetime
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from ._runner import BenchResult, measure_async, measure_sync, summarize
+
+CASES = ("acquire_release", "point_select", "fetch_all", "execute_many", "stream")
+
+
+@dataclass
+class BenchRow:
+    id: int
+    name: str
+    score: float
+    created: datetime.datetime
+
+
+RESULT_CLASSES = {"tuple": tuple, "dict": dict, "dataclass": BenchRow}
+
+
+@dataclass
+class BenchConfig:
+    """基准测试参数"""
+
+    table: str = "asmysql_bench"
+    cases: Sequence[str] = CASES
+    rows: Sequence[int] = (10_000, 1_000_000)
+    result_classes: Sequence[str] = ("tuple", "dict", "dataclass")
+    iterations: int = 2000
+    concurrency: int = 8
+    batch_size: int = 1000
+    warmup: int = 10
+
+    @property
+    def write_table(self):
+        return f"{self.table}_writes"
+
+    @property
+    def point_query(self):
+        return f"SELECT id, name, score, created FROM {self.table} WHERE id = %s"
+
+    def range_query(self, rows: int):
+        return f"SELECT id, name, score, created FROM {self.table} ORDER BY id LIMIT {rows}"
+
+    @property
+    def insert_query(self):
+        return f"INSERT INTO {self.write_table} (id, name, score, created) VALUES (%s, %s, %s, %s)"
+
+    def batch(self, start: int = 0):
+        created = datetime.datetime(2024, 1, 1)
+        return [(start + i, f"user{start + i:07d}", (start + i) * 0.5, created) for i in range(self.batch_size)]
+
+    def fetch_iterations(self, rows: int):
+        """读取大量行的用例按行数减少执行次数"""
+        return max(3, min(self.iterations, 100_000 // rows))
+
+
+def _check(result):
+    if result.error:
+        raise RuntimeError(f"benchmark query failed: {result.error_msg}")
+
+
+async def run_async(url: str, config: BenchConfig, log: Callable[[BenchResult], None]) -> list[BenchResult]:
+    """对 v2 的异步 Engine 执行基准测试"""
+    from ..v2 import Engine
+
+    engine = Engine(url, min_pool_size=1, max_pool_size=max(config.concurrency, 1))
+    await engine.connect()
+    results: list[BenchResult] = []
+
+    def record(case: str, params: dict, measured, concurrency: int, rows_per_op: int = None):
+        result = summarize("v2", case, params, measured[0], measured[1], concurrency, rows_per_op)
+        results.append(result)
+        log(result)
+
+    try:
+        if "acquire_release" in config.cases:
+            pool = engine.pool
+
+            async def acquire_release(_):
+                pool.release(await pool.acquire())
+
+            measured = await measure_async(acquire_release, config.iterations, config.concurrency, config.warmup)
+            record("acquire_release", {}, measured, config.concurrency)
+
+        if "point_select" in config.cases:
+
+            async def point_select(i):
+                result = await engine.execute(config.point_query, (i % 10_000 + 1,))
+                _check(result)
+                await result.fetch_all()
+
+            measured = await measure_async(point_select, config.iterations, config.concurrency, config.warmup)
+            record("point_select", {}, measured, config.concurrency)
+
+        if "fetch_all" in config.cases:
+            for rows in config.rows:
+                for name in config.result_classes:
+
+                    async def fetch_all(_, query=config.range_query(rows), result_class=RESULT_CLASSES[name]):
+                        result = await engine.execute(query, result_class=result_class)
+                        _check(result)
+                        await result.fetch_all()
+
+                    measured = await measure_async(fetch_all, config.fetch_iterations(rows), 1, 1)
+                    record("fetch_all", {"rows": rows, "result_class": name}, measured, 1, rows)
+
+        if "execute_many" in config.cases:
+
+            async def execute_many(i):
+                async with engine.execute_many(config.insert_query, config.batch(i * config.batch_size)) as result:
+                    _check(result)
+
+            iterations = max(3, config.iterations // 20)
+            measured = await measure_async(execute_many, iterations, 1, 1)
+            record("execute_many", {"batch_size": config.batch_size}, measured, 1, config.batch_size)
+
+        if "stream" in config.cases:
+            for rows in config.rows:
+
+                async def stream(_, query=config.range_query(rows)):
+                    async for _row in engine.execute(query, stream=True):
+                        pass
+
+                measured = await measure_async(stream, config.fetch_iterations(rows), 1, 1)
+                record("stream", {"rows": rows}, measured, 1, rows)
+    finally:
+        await engine.disconnect()
+    return results
+
+
+def run_sync(url: str, config: BenchConfig, log: Callable[[BenchResult], None]) -> Optional[list[BenchResult]]:
+    """对 v3dev 的同步 Engine 执行基准测试，v3dev 不可用(未随发行包安装)时返回 None"""
+    try:
+        from ..v3dev import SyncEngine
+    except ImportError:
+        return None
+
+    engine = SyncEngine(url, min_pool_size=1, max_pool_size=max(config.concurrency, 1))
+    engine.connect()
+    results: list[BenchResult] = []
+
+    def record(case: str, params: dict, measured, concurrency: int, rows_per_op: int = None):
+        result = summarize("v3dev", case, params, measured[0], measured[1], concurrency, rows_per_op)
+        results.append(result)
+        log(result)
+
+    try:
+        if "acquire_release" in config.cases:
+            pool = engine.pool
+
+            def acquire_release(_):
+                pool.release(pool.acquire())
+
+            measured = measure_sync(acquire_release, config.iterations, config.concurrency, config.warmup)
+            record("acquire_release", {}, measured, config.concurrency)
+
+        if "point_select" in config.cases:
+
+            def point_select(i):
+                with engine.execute(config.point_query, (i % 10_000 + 1,)) as result:
+                    _check(result)
+                    result.fetch_all()
+
+            measured = measure_sync(point_select, config.iterations, config.concurrency, config.warmup)
+            record("point_select", {}, measured, config.concurrency)
+
+        if "fetch_all" in config.cases:
+            for rows in config.rows:
+                for name in config.result_classes:
+
+                    def fetch_all(_, query=config.range_query(rows), result_class=RESULT_CLASSES[name]):
+                        with engine.execute(query, result_class=result_class) as result:
+                            _check(result)
+                            result.fetch_all()
+
+                    measured = measure_sync(fetch_all, config.fetch_iterations(rows), 1, 1)
+                    record("fetch_all", {"rows": rows, "result_class": name}, measured, 1, rows)
+
+        if "execute_many" in config.cases:
+
+            def execute_many(i):
+                with engine.execute_many(config.insert_query, config.batch(i * config.batch_size)) as result:
+                    _check(result)
+
+            iterations = max(3, config.iterations // 20)
+            measured = measure_sync(execute_many, iterations, 1, 1)
+            record("execute_many", {"batch_size": config.batch_size}, measured, 1, config.batch_size)
+
+        if "stream" in config.cases:
+            for rows in config.rows:
+
+                def stream(_, query=config.range_query(rows)):
+                    for _row in engine.execute(query, stream=True):
+                        pass
+
+                measured = measure_sync(stream, config.fetch_iterations(rows), 1, 1)
+                record("stream", {"rows": rows}, measured, 1, rows)
+    finally:
+        engine.disconnect()
+    return results
+
+
+async def prepare_tables(url: str, config: BenchConfig):
+    """在真实服务端上创建测试表并补齐数据(只补充缺少的行)"""
+    from ..v2 import Engine
+
+    engine = Engine(url, min_pool_size=1, max_pool_size=4)
+    await engine.connect()
+    try:
+        columns = "id BIGINT NOT NULL, name VARCHAR(32) NOT NULL, score DOUBLE NOT NULL, created DATETIME NOT NULL"
+        for query in (
+            f"CREATE TABLE IF NOT EXISTS {config.table} ({columns}, PRIMARY KEY (id))",
+            f"CREATE TABLE IF NOT EXISTS {config.write_table} ({columns})",
+            f"TRUNCATE TABLE {config.write_table}",
+        ):
+            async with engine.execute(query) as result:
+                _check(result)
+        result = await engine.execute(f"SELECT COUNT(*) FROM {config.table}")
+        _check(result)
+        (count,) = await result.fetch_one()
+        target = max((*config.rows, 10_000))
+        created = datetime.datetime(2024, 1, 1)
+        insert = f"INSERT INTO {config.table} (id, name, score, created) VALUES (%s, %s, %s, %s)"
+        for start in range(count + 1, target + 1, 10_000):
+            rows = [(i, f"user{i:07d}", i * 0.5, created) for i in range(start, min(start + 10_000, target + 1))]
+            async with engine.execute_many(insert, rows) as result:
+                _check(result)
+    finally:
+        await engine.disconnect()
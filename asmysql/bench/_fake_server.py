@@ -0,0 +1,39 @@
+"""
+基准测试使用的 FakeMySQLServer 规则
+
+结果集由 SQL 决定，不保存任何数据:
+- 包含 WHERE id = N 的 SELECT: 返回一行 id 为 N 的数据。
+- 包含 LIMIT N 的 SELECT: 返回 N 行数据。
+- 其他 SELECT 返回一行 1，写入语句返回 OK 包(多行 INSERT 的受影响行数为行数)。
+"""
+
+import datetime
+from typing import Iterator
+
+from pymysql.constants import FIELD_TYPE
+
+from ..testing import Column, FakeMySQLServer, ResultSet
+
+# 基准测试数据的列
+COLUMNS = (
+    Column("id", FIELD_TYPE.LONGLONG),
+    Column("name", FIELD_TYPE.VAR_STRING),
+    Column("score", FIELD_TYPE.DOUBLE),
+    Column("created", FIELD_TYPE.DATETIME),
+)
+_CREATED = datetime.datetime(2024, 1, 1)
+
+
+def bench_rows(count: int, start: int = 1) -> Iterator[tuple]:
+    """生成基准测试数据"""
+    for i in range(start, start + count):
+        yield i, f"user{i:07d}", i * 0.5, _CREATED
+
+
+def bench_server(host: str = "127.0.0.1", port: int = 0) -> FakeMySQLServer:
+    """返回注册了基准测试规则的服务端(未启动)"""
+    server = FakeMySQLServer(host, port)
+    server.on(r"\bWHERE\s+`?id`?\s*=\s*(\d+)", lambda match, params: ResultSet(COLUMNS, bench_rows(1, int(match[1]))))
+    server.on(r"\bLIMIT\s+(\d+)\s*;?\s*$", lambda match, params: ResultSet(COLUMNS, bench_rows(int(match[1]))))
+    server.on(r"^\s*SELECT\s+(?!@@)", ResultSet([Column("1", FIELD_TYPE.LONGLONG)], [(1,)]))
+    return server
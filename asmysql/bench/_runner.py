@@ -0,0 +1,118 @@
+"""
+计时与统计
+"""
+
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypedDict
+
+
+class BenchResult(TypedDict):
+    engine: str
+    case: str
+    params: dict
+    iterations: int
+    concurrency: int
+    seconds: float
+    ops_per_sec: float
+    rows_per_sec: Optional[float]
+    mean_ms: float
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def percentile(latencies: list[int], q: float) -> float:
+    """返回已排序的延迟(纳秒)的百分位数(毫秒)，使用最近秩方法"""
+    if not latencies:
+        return 0.0
+    rank = max(int(len(latencies) * q + 0.999999) - 1, 0)
+    return latencies[min(rank, len(latencies) - 1)] / 1e6
+
+
+def summarize(
+    engine: str,
+    case: str,
+    params: dict,
+    latencies: list[int],
+    seconds: float,
+    concurrency: int,
+    rows_per_op: int = None,
+) -> BenchResult:
+    """汇总一组操作的延迟(纳秒)和总耗时(秒)"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    ops_per_sec = count / seconds if seconds > 0 else 0.0
+    return {
+        "engine": engine,
+        "case": case,
+        "params": params,
+        "iterations": count,
+        "concurrency": concurrency,
+        "seconds": round(seconds, 6),
+        "ops_per_sec": round(ops_per_sec, 2),
+        "rows_per_sec": round(ops_per_sec * rows_per_op, 2) if rows_per_op else None,
+        "mean_ms": round(sum(latencies) / count / 1e6, 4) if count else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 4),
+        "p99_ms": round(percentile(latencies, 0.99), 4),
+        "max_ms": round(latencies[-1] / 1e6, 4) if count else 0.0,
+    }
+
+
+async def measure_async(
+    operation: Callable[[int], Awaitable], iterations: int, concurrency: int = 1, warmup: int = 0
+) -> tuple[list[int], float]:
+    """使用 concurrency 个协程共执行 iterations 次 operation(i)，返回每次的延迟(纳秒)和总耗时(秒)"""
+    for i in range(warmup):
+        await operation(i)
+    latencies: list[int] = []
+    counter = iter(range(iterations))
+    clock = time.perf_counter_ns
+
+    async def worker():
+        for i in counter:
+            started = clock()
+            await operation(i)
+            latencies.append(clock() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(min(concurrency, iterations), 1))))
+    return latencies, time.perf_counter() - started
+
+
+def measure_sync(
+    operation: Callable[[int], object], iterations: int, concurrency: int = 1, warmup: int = 0
+) -> tuple[list[int], float]:
+    """使用 concurrency 个线程共执行 iterations 次 operation(i)，返回每次的延迟(纳秒)和总耗时(秒)"""
+    for i in range(warmup):
+        operation(i)
+    latencies: list[int] = []
+    errors: list[BaseException] = []
+    counter = iter(range(iterations))
+    lock = threading.Lock()
+    clock = time.perf_counter_ns
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                started = clock()
+                operation(i)
+                latencies.append(clock() - started)
+        except BaseException as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=worker) for _ in range(max(min(concurrency, iterations), 1))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return latencies, seconds
@@ -0,0 +1,18 @@
+"""
+asmysql 测试工具
+
+FakeMySQLServer 是在本机运行的 MySQL 协议服务端，结果由注册的规则生成，
+用于在 CI 中不依赖 Docker/数据库、确定性地测试连接池、流式读取、预处理语句和批量写入。
+
+用法:
+    from asmysql.testing import FakeMySQLServer, ResultSet
+
+    with FakeMySQLServer() as server:
+        server.on(r"FROM users", ResultSet(["id", "name"], [(1, "alice"), (2, "bob")]))
+        engine = Engine(server.url)
+"""
+
+from ._protocol import Column
+from ._server import DisconnectResponse, ErrorResponse, FakeMySQLServer, OkResponse, ResultSet
+
+__all__ = ["Column", "DisconnectResponse", "ErrorResponse", "FakeMySQLServer", "OkResponse", "ResultSet"]
@@ -0,0 +1,297 @@
+"""
+MySQL 协议的编码与解码(服务端侧)
+
+包括 OK/ERR/EOF 包、列定义、文本协议和二进制协议的行数据，以及 COM_STMT_EXECUTE 参数的解码。
+"""
+
+import datetime
+import struct
+from decimal import Decimal
+from typing import Any, NamedTuple, Optional, Sequence
+
+from pymysql.constants import FIELD_TYPE, FLAG, SERVER_STATUS
+
+# 二进制协议中按定长整数传输的类型: (有符号格式, 无符号格式)
+INT_TYPES = {
+    FIELD_TYPE.TINY: ("<b", "<B"),
+    FIELD_TYPE.SHORT: ("<h", "<H"),
+    FIELD_TYPE.YEAR: ("<h", "<H"),
+    FIELD_TYPE.INT24: ("<i", "<I"),
+    FIELD_TYPE.LONG: ("<i", "<I"),
+    FIELD_TYPE.LONGLONG: ("<q", "<Q"),
+}
+DATE_TYPES = (FIELD_TYPE.DATE, FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP)
+# 二进制字符集(charset=63)的字符串类型，解码为 bytes
+BINARY_TYPES = (FIELD_TYPE.TINY_BLOB, FIELD_TYPE.MEDIUM_BLOB, FIELD_TYPE.LONG_BLOB, FIELD_TYPE.BLOB)
+BINARY_CHARSET = 63
+UTF8MB4_CHARSET = 255
+# 使用文本字符集的类型，其余类型的列定义使用 binary 字符集
+STRING_TYPES = (
+    FIELD_TYPE.VARCHAR,
+    FIELD_TYPE.VAR_STRING,
+    FIELD_TYPE.STRING,
+    FIELD_TYPE.ENUM,
+    FIELD_TYPE.SET,
+    FIELD_TYPE.JSON,
+)
+
+AUTOCOMMIT = SERVER_STATUS.SERVER_STATUS_AUTOCOMMIT
+
+
+class Column(NamedTuple):
+    """结果集的列定义"""
+
+    name: str
+    type: int = FIELD_TYPE.VAR_STRING
+    flags: int = 0  # 如 FLAG.UNSIGNED
+    charset: Optional[int] = None  # 为 None 时字符串类型使用 utf8mb4，其他类型使用 binary
+
+
+def infer_type(value: Any) -> int:
+    """按Python值推断列类型"""
+    if isinstance(value, bool):
+        return FIELD_TYPE.TINY
+    if isinstance(value, int):
+        return FIELD_TYPE.LONGLONG
+    if isinstance(value, float):
+        return FIELD_TYPE.DOUBLE
+    if isinstance(value, Decimal):
+        return FIELD_TYPE.NEWDECIMAL
+    if isinstance(value, datetime.datetime):
+        return FIELD_TYPE.DATETIME
+    if isinstance(value, datetime.date):
+        return FIELD_TYPE.DATE
+    if isinstance(value, (datetime.timedelta, datetime.time)):
+        return FIELD_TYPE.TIME
+    if isinstance(value, (bytes, bytearray)):
+        return FIELD_TYPE.BLOB
+    return FIELD_TYPE.VAR_STRING
+
+
+def lenenc_int(value: int) -> bytes:
+    if value < 251:
+        return bytes((value,))
+    if value < 1 << 16:
+        return b"\xfc" + struct.pack("<H", value)
+    if value < 1 << 24:
+        return b"\xfd" + struct.pack("<I", value)[:3]
+    return b"\xfe" + struct.pack("<Q", value)
+
+
+def lenenc_str(value: bytes) -> bytes:
+    return lenenc_int(len(value)) + value
+
+
+def ok_packet(affected_rows: int = 0, insert_id: int = 0, status: int = AUTOCOMMIT, warnings: int = 0) -> bytes:
+    return b"\x00" + lenenc_int(affected_rows) + lenenc_int(insert_id) + struct.pack("<HH", status, warnings)
+
+
+def err_packet(errno: int, message: str, sqlstate: str = "HY000") -> bytes:
+    return b"\xff" + struct.pack("<H", errno) + b"#" + sqlstate.encode()[:5].ljust(5, b"0") + message.encode()
+
+
+def eof_packet(status: int = AUTOCOMMIT, warnings: int = 0) -> bytes:
+    return b"\xfe" + struct.pack("<HH", warnings, status)
+
+
+def column_packet(column: Column) -> bytes:
+    charset = column.charset
+    if charset is None:
+        charset = UTF8MB4_CHARSET if column.type in STRING_TYPES else BINARY_CHARSET
+    flags = column.flags
+    if charset == BINARY_CHARSET:
+        flags |= FLAG.BINARY
+    name = column.name.encode()
+    return (
+        lenenc_str(b"def")
+        + lenenc_str(b"")
+        + lenenc_str(b"")
+        + lenenc_str(b"")
+        + lenenc_str(name)
+        + lenenc_str(name)
+        + b"\x0c"
+        + struct.pack("<HIBHB", charset, 1024, column.type, flags, 0)
+        + b"\x00\x00"
+    )
+
+
+def _format_timedelta(value: datetime.timedelta) -> str:
+    negative = value < datetime.timedelta(0)
+    value = abs(value)
+    hours, remainder = divmod(value.days * 86400 + value.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    text = f"{'-' if negative else ''}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if value.microseconds:
+        text += f".{value.microseconds:06d}"
+    return text
+
+
+def _text_bytes(value: Any) -> bytes:
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, bool):
+        return b"1" if value else b"0"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ").encode()
+    if isinstance(value, datetime.timedelta):
+        return _format_timedelta(value).encode()
+    return str(value).encode()
+
+
+def text_row(values: Sequence) -> bytes:
+    """文本协议的行数据，每列都是长度编码的字符串，NULL 为 0xfb"""
+    return b"".join(b"\xfb" if value is None else lenenc_str(_text_bytes(value)) for value in values)
+
+
+def _binary_date(value) -> bytes:
+    if isinstance(value, str):
+        return b"\x00"
+    data = struct.pack("<HBB", value.year, value.month, value.day)
+    if isinstance(value, datetime.datetime):
+        if value.hour or value.minute or value.second or value.microsecond:
+            data += struct.pack("<BBB", value.hour, value.minute, value.second)
+            if value.microsecond:
+                data += struct.pack("<I", value.microsecond)
+    return bytes((len(data),)) + data
+
+
+def _binary_time(value) -> bytes:
+    if isinstance(value, datetime.time):
+        value = datetime.timedelta(
+            hours=value.hour, minutes=value.minute, seconds=value.second, microseconds=value.microsecond
+        )
+    if not value:
+        return b"\x00"
+    negative = value < datetime.timedelta(0)
+    value = abs(value)
+    hours, remainder = divmod(value.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    data = struct.pack("<BIBBB", negative, value.days, hours, minutes, seconds)
+    if value.microseconds:
+        data += struct.pack("<I", value.microseconds)
+    return bytes((len(data),)) + data
+
+
+def binary_value(column: Column, value: Any) -> bytes:
+    """按列类型编码二进制协议的一个非NULL值"""
+    field_type = column.type
+    if field_type in INT_TYPES:
+        signed, unsigned = INT_TYPES[field_type]
+        return struct.pack(unsigned if column.flags & FLAG.UNSIGNED else signed, int(value))
+    if field_type == FIELD_TYPE.DOUBLE:
+        return struct.pack("<d", value)
+    if field_type == FIELD_TYPE.FLOAT:
+        return struct.pack("<f", value)
+    if field_type in DATE_TYPES:
+        return _binary_date(value)
+    if field_type == FIELD_TYPE.TIME:
+        return _binary_time(value)
+    return lenenc_str(_text_bytes(value))
+
+
+def binary_row(columns: Sequence[Column], values: Sequence) -> bytes:
+    """二进制协议的行数据: 0x00 头部 + NULL位图(偏移2位) + 非NULL列的值"""
+    null_bitmap = bytearray((len(columns) + 7 + 2) // 8)
+    data = bytearray()
+    for i, (column, value) in enumerate(zip(columns, values)):
+        if value is None:
+            bit = i + 2
+            null_bitmap[bit // 8] |= 1 << (bit % 8)
+        else:
+            data += binary_value(column, value)
+    return b"\x00" + bytes(null_bitmap) + bytes(data)
+
+
+class PacketReader:
+    """按顺序读取包内容"""
+
+    def __init__(self, data: bytes, position: int = 0):
+        self.data = data
+        self.position = position
+
+    def read(self, size: int) -> bytes:
+        data = self.data[self.position : self.position + size]
+        self.position += size
+        return data
+
+    def read_struct(self, fmt: str):
+        values = struct.unpack_from(fmt, self.data, self.position)
+        self.position += struct.calcsize(fmt)
+        return values
+
+    def read_lenenc_int(self) -> int:
+        first = self.data[self.position]
+        self.position += 1
+        if first < 251:
+            return first
+        size = {0xFC: 2, 0xFD: 3, 0xFE: 8}[first]
+        return int.from_bytes(self.read(size), "little")
+
+    def read_lenenc_str(self) -> bytes:
+        return self.read(self.read_lenenc_int())
+
+
+def _read_param_date(reader: PacketReader, field_type: int):
+    length = reader.read_struct("<B")[0]
+    if length == 0:
+        return None
+    year, month, day = reader.read_struct("<HBB")
+    hour = minute = second = microsecond = 0
+    if length >= 7:
+        hour, minute, second = reader.read_struct("<BBB")
+    if length >= 11:
+        microsecond = reader.read_struct("<I")[0]
+    if field_type == FIELD_TYPE.DATE:
+        return datetime.date(year, month, day)
+    return datetime.datetime(year, month, day, hour, minute, second, microsecond)
+
+
+def _read_param_time(reader: PacketReader):
+    length = reader.read_struct("<B")[0]
+    if length == 0:
+        return datetime.timedelta(0)
+    negative, days, hours, minutes, seconds = reader.read_struct("<BIBBB")
+    microseconds = reader.read_struct("<I")[0] if length >= 12 else 0
+    value = datetime.timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds, microseconds=microseconds)
+    return -value if negative else value
+
+
+def decode_execute_params(reader: PacketReader, param_count: int, types: Optional[list[tuple[int, int]]]):
+    """解码 COM_STMT_EXECUTE 的参数
+
+    :param reader: 位于 iteration_count 之后的读取器
+    :param param_count: 预处理语句的参数数量
+    :param types: 上次绑定的参数类型，new_params_bound_flag 为0时沿用
+    :return: (参数, 参数类型)
+    """
+    if not param_count:
+        return (), types
+    null_bitmap = reader.read((param_count + 7) // 8)
+    if reader.read_struct("<B")[0]:
+        types = [reader.read_struct("<BB") for _ in range(param_count)]
+    if types is None:
+        raise ValueError("COM_STMT_EXECUTE without parameter types")
+    params = []
+    for i, (field_type, flags) in enumerate(types):
+        if null_bitmap[i // 8] & (1 << (i % 8)) or field_type == FIELD_TYPE.NULL:
+            params.append(None)
+        elif field_type in INT_TYPES:
+            signed, unsigned = INT_TYPES[field_type]
+            params.append(reader.read_struct(unsigned if flags & 0x80 else signed)[0])
+        elif field_type == FIELD_TYPE.DOUBLE:
+            params.append(reader.read_struct("<d")[0])
+        elif field_type == FIELD_TYPE.FLOAT:
+            params.append(reader.read_struct("<f")[0])
+        elif field_type in DATE_TYPES:
+            params.append(_read_param_date(reader, field_type))
+        elif field_type == FIELD_TYPE.TIME:
+            params.append(_read_param_time(reader))
+        elif field_type in (FIELD_TYPE.NEWDECIMAL, FIELD_TYPE.DECIMAL):
+            params.append(Decimal(reader.read_lenenc_str().decode("ascii")))
+        elif field_type in BINARY_TYPES:
+            params.append(reader.read_lenenc_str())
+        else:
+            params.append(reader.read_lenenc_str().decode("utf8", "surrogateescape"))
+    return tuple(params), types
@@ -0,0 +1,551 @@
+"""
+在本机运行的 MySQL 协议服务端
+
+服务端不保存任何数据，查询的结果由注册的规则决定(正则匹配SQL)，没有规则匹配时:
+- SELECT @@变量: 返回 variables 中的值。
+- 其他读取语句(SELECT/SHOW/WITH...)返回 ERR 包(1146)，便于发现遗漏的规则。
+- 其他语句返回 OK 包(多行 INSERT/REPLACE 的受影响行数为 VALUES 的行数)。
+服务端运行在独立线程的事件循环中，可以同时用于异步和同步的 Engine。
+"""
+
+import asyncio
+import inspect
+import re
+import struct
+import threading
+from typing import Any, Callable, Iterable, NamedTuple, Optional, Sequence, Union
+
+from pymysql.constants import CLIENT, COMMAND, FIELD_TYPE, SERVER_STATUS
+
+from ._protocol import (
+    AUTOCOMMIT,
+    Column,
+    PacketReader,
+    binary_row,
+    column_packet,
+    decode_execute_params,
+    eof_packet,
+    err_packet,
+    infer_type,
+    lenenc_int,
+    ok_packet,
+    text_row,
+)
+
+_MAX_PACKET = 0xFFFFFF
+_CAPABILITIES = (
+    CLIENT.LONG_PASSWORD
+    | CLIENT.FOUND_ROWS
+    | CLIENT.LONG_FLAG
+    | CLIENT.CONNECT_WITH_DB
+    | CLIENT.PROTOCOL_41
+    | CLIENT.TRANSACTIONS
+    | CLIENT.SECURE_CONNECTION
+    | CLIENT.MULTI_RESULTS
+    | CLIENT.PS_MULTI_RESULTS
+    | CLIENT.PLUGIN_AUTH
+    | CLIENT.PLUGIN_AUTH_LENENC_CLIENT_DATA
+    | CLIENT.CONNECT_ATTRS
+)
+# 累计到该大小时写入socket
+_WRITE_CHUNK = 256 * 1024
+# ER_NO_SUCH_TABLE
+NO_SUCH_TABLE = 1146
+# ER_UNKNOWN_STMT_HANDLER
+UNKNOWN_STMT_HANDLER = 1243
+# ER_UNKNOWN_ERROR
+UNKNOWN_ERROR = 1105
+# ER_PARSE_ERROR
+PARSE_ERROR = 1064
+# ER_EMPTY_QUERY
+EMPTY_QUERY = 1065
+# ER_UNKNOWN_COM_ERROR
+UNKNOWN_COM_ERROR = 1047
+
+# COM_SET_OPTION 的参数
+MULTI_STATEMENTS_ON = 0
+
+_VARIABLE_RE = re.compile(r"^\s*SELECT\s+@@(?:session\.|global\.)?(\w+)\s*;?\s*$", re.I)
+_AUTOCOMMIT_RE = re.compile(r"^\s*SET\s+(?:@@(?:session\.)?)?autocommit\s*=\s*(\w+)", re.I)
+_READ_STATEMENTS = frozenset(("SELECT", "SHOW", "WITH", "DESC", "DESCRIBE", "EXPLAIN", "TABLE", "VALUES"))
+
+
+class ResultSet:
+    """结果集响应
+
+    :param columns: 列名或 Column，只给出列名时按第一行的值推断类型
+    :param rows: 行数据(Python值的序列)，可以是列表、生成器，或每次查询都重新调用的无参函数(如生成器函数)
+    """
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(
+        self, columns: Sequence[Union[str, Column]], rows: Union[Iterable[Sequence], Callable[[], Iterable]] = ()
+    ):
+        self.columns = tuple(columns)
+        self.rows = rows
+
+    def iter_rows(self) -> Iterable[Sequence]:
+        return self.rows() if callable(self.rows) else self.rows
+
+    def resolve_columns(self, first_row: Optional[Sequence]) -> tuple[Column, ...]:
+        columns = []
+        for i, column in enumerate(self.columns):
+            if isinstance(column, Column):
+                columns.append(column)
+                continue
+            value = first_row[i] if first_row is not None else None
+            columns.append(Column(column, infer_type(value) if value is not None else FIELD_TYPE.VAR_STRING))
+        return tuple(columns)
+
+
+class OkResponse(NamedTuple):
+    """OK 包响应"""
+
+    affected_rows: int = 0
+    insert_id: int = 0
+    warnings: int = 0
+
+
+class ErrorResponse(NamedTuple):
+    """ERR 包响应，客户端收到后抛出对应错误号的异常"""
+
+    errno: int
+    message: str
+    sqlstate: str = "HY000"
+
+
+class DisconnectResponse(NamedTuple):
+    """不返回响应，直接断开客户端连接，模拟执行语句时数据库宕机或故障切换"""
+
+    reason: str = "FakeMySQLServer disconnect"
+
+
+Response = Union[ResultSet, OkResponse, ErrorResponse, DisconnectResponse]
+# 动态响应: handler(match, params)，params 为预处理语句的参数(文本协议为 None)，可以返回协程
+Handler = Callable[[re.Match, Optional[tuple]], Any]
+
+
+class _Rule(NamedTuple):
+    pattern: re.Pattern
+    response: Union[Response, Handler]
+    latency: Optional[float]
+
+
+class _Statement:
+    __slots__ = ("sql", "param_count", "types")
+
+    def __init__(self, sql: str, param_count: int):
+        self.sql = sql
+        self.param_count = param_count
+        self.types: Optional[list[tuple[int, int]]] = None
+
+
+def _unquoted(sql: str):
+    """依次返回引号和行注释(# 或 -- )外的 (位置, 字符)"""
+    quote = None
+    escaped = False
+    comment = False
+    for i, char in enumerate(sql):
+        if comment:
+            comment = char != "\n"
+        elif escaped:
+            escaped = False
+        elif quote:
+            if char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "#" or (sql.startswith("--", i) and sql[i + 2 : i + 3].isspace()):
+            comment = True
+        else:
+            yield i, char
+
+
+def _count_placeholders(sql: str) -> int:
+    """统计引号外的 ? 占位符数量"""
+    return sum(1 for _, char in _unquoted(sql) if char == "?")
+
+
+def _split_statements(sql: str) -> list[str]:
+    """按引号外的 ; 拆分多语句，中间的空语句保留为空字符串(和 MySQL 一样执行时返回 1065 错误)"""
+    statements = []
+    start = 0
+    for i, char in _unquoted(sql):
+        if char == ";":
+            statements.append(sql[start:i].strip())
+            start = i + 1
+    last = sql[start:].strip()
+    if last:
+        statements.append(last)
+    return statements
+
+
+def _statement_head(sql: str) -> str:
+    words = sql.lstrip(" \t\r\n(").split(None, 1)
+    return words[0].upper().rstrip(";") if words else ""
+
+
+class _Connection:
+    def __init__(
+        self,
+        server: "FakeMySQLServer",
+        connection_id: int,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ):
+        self.server = server
+        self.connection_id = connection_id
+        self.reader = reader
+        self.writer = writer
+        self.seq = 0
+        self.buffer = bytearray()
+        self.status = AUTOCOMMIT
+        self.statements: dict[int, _Statement] = {}
+        self.next_stmt_id = 1
+        # COM_SET_OPTION 开启的多语句
+        self.multi_statements = False
+
+    def send(self, payload: bytes):
+        """写入缓冲区，超过 16MB 的包按协议拆分"""
+        while True:
+            chunk = payload[:_MAX_PACKET]
+            self.buffer += struct.pack("<I", len(chunk))[:3] + bytes((self.seq,)) + chunk
+            self.seq = (self.seq + 1) & 0xFF
+            if len(chunk) < _MAX_PACKET:
+                return
+            payload = payload[_MAX_PACKET:]
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        latency = self.server.latency
+        if latency:
+            # 模拟网络延迟: 响应延后发送，不阻塞后续命令的处理(连续写入的多个命令只增加一次延迟)
+            asyncio.get_running_loop().call_later(latency, self.write_later, data)
+            return
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def write_later(self, data: bytes):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    async def read(self) -> Optional[bytes]:
+        payload = b""
+        while True:
+            try:
+                header = await self.reader.readexactly(4)
+                length = int.from_bytes(header[:3], "little")
+                self.seq = (header[3] + 1) & 0xFF
+                payload += await self.reader.readexactly(length)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return None
+            if length < _MAX_PACKET:
+                return payload
+
+    async def handshake(self):
+        salt = b"asmysql-testing-salt"
+        version = str(self.server.variables.get("version", FakeMySQLServer.version))
+        self.seq = 0
+        self.send(
+            b"\x0a"
+            + version.encode()
+            + b"\x00"
+            + struct.pack("<I", self.connection_id)
+            + salt[:8]
+            + b"\x00"
+            + struct.pack("<HBHH", _CAPABILITIES & 0xFFFF, 255, self.status, _CAPABILITIES >> 16)
+            + bytes((len(salt) + 1,))
+            + b"\x00" * 10
+            + salt[8:]
+            + b"\x00"
+            + b"mysql_native_password\x00"
+        )
+        await self.flush()
+        # 接受任意账号密码
+        if await self.read() is None:
+            return False
+        self.send(ok_packet(status=self.status))
+        await self.flush()
+        return True
+
+    async def serve(self):
+        if not await self.handshake():
+            return
+        while True:
+            packet = await self.read()
+            if not packet:
+                return
+            command = packet[0]
+            if command == COMMAND.COM_QUIT:
+                return
+            if command == COMMAND.COM_QUERY:
+                await self.query(packet[1:].decode("utf8", "surrogateescape"))
+            elif command == COMMAND.COM_STMT_PREPARE:
+                self.prepare(packet[1:].decode("utf8", "surrogateescape"))
+            elif command == COMMAND.COM_STMT_EXECUTE:
+                await self.execute(packet)
+            elif command == COMMAND.COM_STMT_CLOSE:
+                # COM_STMT_CLOSE 没有响应
+                self.statements.pop(struct.unpack_from("<I", packet, 1)[0], None)
+                continue
+            elif command == COMMAND.COM_SET_OPTION:
+                self.multi_statements = struct.unpack_from("<H", packet, 1)[0] == MULTI_STATEMENTS_ON
+                self.send(eof_packet(self.status))
+            elif command == COMMAND.COM_STMT_RESET:
+                self.send(ok_packet(status=self.status))
+            elif command in (COMMAND.COM_PING, COMMAND.COM_INIT_DB):
+                self.send(ok_packet(status=self.status))
+            else:
+                self.send(err_packet(UNKNOWN_COM_ERROR, "Unknown command", "08S01"))
+            await self.flush()
+
+    def track_status(self, sql: str, head: str):
+        """根据事务语句维护服务端状态，客户端通过状态位判断连接是否处于事务中"""
+        if head in ("BEGIN", "START"):
+            self.status |= SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        elif head in ("COMMIT", "ROLLBACK"):
+            self.status &= ~SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        elif head == "SET":
+            match = _AUTOCOMMIT_RE.match(sql)
+            if match:
+                if match.group(1).upper() in ("1", "ON", "TRUE"):
+                    self.status |= AUTOCOMMIT
+                else:
+                    self.status &= ~AUTOCOMMIT
+
+    async def query(self, sql: str):
+        statements = _split_statements(sql)
+        if len(statements) <= 1:
+            await self.respond(sql, None, binary=False)
+        elif not self.multi_statements:
+            self.send(err_packet(PARSE_ERROR, "You have an error in your SQL syntax near ';'", "42000"))
+        else:
+            # 多语句依次执行，除最后一条外结果带 SERVER_MORE_RESULTS_EXISTS，出错时不再执行后面的语句
+            last = len(statements) - 1
+            for i, statement in enumerate(statements):
+                if not statement:
+                    self.send(err_packet(EMPTY_QUERY, "Query was empty", "42000"))
+                    return
+                if not await self.respond(statement, None, binary=False, more=i < last):
+                    return
+
+    def prepare(self, sql: str):
+        stmt = _Statement(sql, _count_placeholders(sql))
+        stmt_id = self.next_stmt_id
+        self.next_stmt_id += 1
+        self.statements[stmt_id] = stmt
+        # 列定义在执行时返回，这里的列数量为0
+        self.send(b"\x00" + struct.pack("<IHHxH", stmt_id, 0, stmt.param_count, 0))
+        if stmt.param_count:
+            for _ in range(stmt.param_count):
+                self.send(column_packet(Column("?", FIELD_TYPE.VAR_STRING)))
+            self.send(eof_packet(self.status))
+
+    async def execute(self, packet: bytes):
+        reader = PacketReader(packet, 1)
+        stmt_id, _flags, _iterations = reader.read_struct("<IBI")
+        stmt = self.statements.get(stmt_id)
+        if stmt is None:
+            self.send(err_packet(UNKNOWN_STMT_HANDLER, f"Unknown prepared statement handler ({stmt_id}) given"))
+            return
+        params, stmt.types = decode_execute_params(reader, stmt.param_count, stmt.types)
+        await self.respond(stmt.sql, params, binary=True)
+
+    async def respond(self, sql: str, params: Optional[tuple], binary: bool, more: bool = False) -> bool:
+        """发送一条语句的响应，返回是否成功"""
+        server = self.server
+        server.queries.append(sql)
+        head = _statement_head(sql)
+        self.track_status(sql, head)
+        response, latency = server.match(sql, params, head)
+        if inspect.isawaitable(response):
+            response = await response
+        if latency:
+            await asyncio.sleep(latency)
+        status = self.status | SERVER_STATUS.SERVER_MORE_RESULTS_EXISTS if more else self.status
+        if isinstance(response, ResultSet):
+            await self.result_set(response, binary, status)
+        elif isinstance(response, ErrorResponse):
+            self.send(err_packet(response.errno, response.message, response.sqlstate))
+            return False
+        elif isinstance(response, DisconnectResponse):
+            raise ConnectionResetError(response.reason)
+        else:
+            response = response or OkResponse()
+            self.send(ok_packet(response.affected_rows, response.insert_id, status, response.warnings))
+        return True
+
+    async def result_set(self, result: ResultSet, binary: bool, status: int):
+        rows = iter(result.iter_rows())
+        first_row = next(rows, None)
+        columns = result.resolve_columns(first_row)
+        self.send(lenenc_int(len(columns)))
+        for column in columns:
+            self.send(column_packet(column))
+        self.send(eof_packet(self.status))
+        if first_row is not None:
+            encode = (lambda values: binary_row(columns, values)) if binary else text_row
+            self.send(encode(first_row))
+            for row in rows:
+                self.send(encode(row))
+                if len(self.buffer) >= _WRITE_CHUNK:
+                    await self.flush()
+        self.send(eof_packet(status))
+
+
+class FakeMySQLServer:
+    """在后台线程中运行的 MySQL 协议服务端，用于在没有数据库的环境下测试连接池、流式读取和批量写入
+
+    支持握手(接受任意账号密码)、COM_QUERY(文本结果集，COM_SET_OPTION 开启后支持多语句)、
+    COM_STMT_PREPARE/EXECUTE/CLOSE(二进制结果集)、OK/ERR 包和 COM_PING。
+
+    用法:
+        server = FakeMySQLServer(latency=0.001)
+        server.on(r"FROM users WHERE id = (\\d+)", lambda m, params: ResultSet(["id"], [(int(m.group(1)),)]))
+        server.on(r"FROM users", ResultSet(["id", "name"], lambda: ((i, f"user{i}") for i in range(1000))))
+        server.on(r"^DELETE", ErrorResponse(1142, "DELETE command denied"))
+        with server:
+            engine = Engine(server.url)
+    """
+
+    version = "8.0.36-asmysql-fake"
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        latency: float = 0.0,
+        variables: dict = None,
+    ):
+        """
+        :param host: 监听地址
+        :param port: 监听端口，为0时使用随机端口(启动后可以从 port/url 获取)
+        :param latency: 响应的网络延迟(秒)，模拟客户端到服务端的往返时间
+        :param variables: SELECT @@变量 返回的值
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.variables = {"max_allowed_packet": 64 * 1024 * 1024, "version": self.version, "autocommit": 1}
+        self.variables.update(variables or {})
+        self.queries: list[str] = []  # 收到的SQL(COM_QUERY 和执行的预处理语句)
+        self.connections = 0  # 当前连接数
+        self.total_connections = 0  # 累计连接数
+        self.__rules: list[_Rule] = []
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__task: Optional[asyncio.Task] = None
+
+    @property
+    def url(self):
+        return f"mysql://fake:fake@{self.host}:{self.port}/"
+
+    def on(self, pattern: Union[str, re.Pattern], response: Union[Response, Handler], *, latency: float = None):
+        """注册规则，按注册顺序匹配(re.search)，先匹配的规则生效
+
+        :param pattern: 正则表达式，字符串忽略大小写
+        :param response: ResultSet / OkResponse / ErrorResponse / DisconnectResponse，
+                         或返回这些响应的 handler(match, params)
+        :param latency: 匹配的语句的执行时间(秒)，多语句中每条语句单独计算
+        """
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern, re.I | re.S)
+        self.__rules.append(_Rule(pattern, response, latency))
+        return self
+
+    def reset(self):
+        """清空规则和查询记录"""
+        self.__rules.clear()
+        self.queries.clear()
+
+    def match(self, sql: str, params: Optional[tuple], head: str):
+        """返回SQL对应的 (响应, 延迟)"""
+        for rule in self.__rules:
+            match = rule.pattern.search(sql)
+            if match:
+                response = rule.response
+                if callable(response):
+                    try:
+                        response = response(match, params)
+                    except Exception as err:
+                        response = ErrorResponse(UNKNOWN_ERROR, f"FakeMySQLServer handler failed: {err!r}")
+                return response, rule.latency
+        return self.__default_response(sql, head), None
+
+    def __default_response(self, sql: str, head: str) -> Response:
+        match = _VARIABLE_RE.match(sql)
+        if match:
+            name = match.group(1).lower()
+            return ResultSet([Column(f"@@{name}")], [(self.variables.get(name),)])
+        if head in _READ_STATEMENTS:
+            return ErrorResponse(NO_SUCH_TABLE, f"FakeMySQLServer has no rule for: {sql[:200]}", "42S02")
+        if head in ("INSERT", "REPLACE"):
+            return OkResponse(affected_rows=sql.count("),(") + 1)
+        return OkResponse()
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.total_connections += 1
+        self.connections += 1
+        try:
+            await _Connection(self, self.total_connections, reader, writer).serve()
+        except (ConnectionError, asyncio.CancelledError):
+            # 停止服务端时取消连接的处理任务
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def start(self):
+        """在后台线程中启动服务端"""
+        started = threading.Event()
+        errors: list[BaseException] = []
+
+        async def main():
+            server = await asyncio.start_server(self.__handle, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+            async with server:
+                await server.serve_forever()
+
+        def run():
+            loop = self.__loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self.__task = loop.create_task(main())
+            try:
+                loop.run_until_complete(self.__task)
+            except BaseException as err:
+                errors.append(err)
+                started.set()
+            finally:
+                # 关闭仍在处理的客户端连接
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.close()
+
+        self.__thread = threading.Thread(target=run, name="asmysql-fake-server", daemon=True)
+        self.__thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        if self.__thread and self.__thread.is_alive():
+            self.__loop.call_soon_threadsafe(self.__task.cancel)
+            self.__thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.stop()
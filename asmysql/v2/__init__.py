@@ -1,6 +1,13 @@
 from ._asmysql import AsMysql
 from ._engine import Engine
+from ._error import AcquireTimeoutError, AdmissionError, CircuitOpenError, PoolQueueFullError, QueryTimeoutError
+from ._hooks import StatementTrace
+from ._loader import Loader
+from ._pipeline import Pipeline
 from ._result import Result
+from ._routing import RoutingEngine
+from ._scan import Scanner
+from ._transaction import Transaction
 
 AsyncEngine = Engine
 AsyncResult = Result
@@ -9,6 +16,17 @@ __all__ = [
     "AsMysql",
     "Engine",
     "Result",
+    "Transaction",
+    "Pipeline",
+    "Loader",
+    "Scanner",
+    "RoutingEngine",
+    "StatementTrace",
+    "AdmissionError",
+    "PoolQueueFullError",
+    "AcquireTimeoutError",
+    "CircuitOpenError",
+    "QueryTimeoutError",
     "AsyncEngine",
     "AsyncResult",
 ]
@@ -0,0 +1,155 @@
+"""
+连接池准入控制
+
+数据库变慢时，所有协程都会堆积在 pool.acquire() 上无限等待，待处理的任务越来越多，最终内存和延迟一起失控。
+Engine 设置以下参数后，获取连接前先经过 AdmissionController，把过载变成快速失败:
+- max_queue: 等待连接的请求数量上限，超过时抛出 PoolQueueFullError
+- acquire_timeout: 获取连接的超时时间，超时抛出 AcquireTimeoutError
+- circuit_failures: 连续 circuit_failures 次获取连接失败(建立连接出错或超时)后熔断，
+  circuit_reset 秒内直接抛出 CircuitOpenError；之后进入半开状态，只放行一个探测请求，
+  探测成功则恢复，失败则继续熔断。
+
+以上异常都是 AdmissionError(ConnectionError 的子类)，不会被 Result 当作 SQL 错误保存到 error 中。
+"""
+
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, Final, Literal, Optional, TypeVar
+
+from aiomysql.log import logger
+from aiomysql.utils import _PoolAcquireContextManager
+from pymysql.err import MySQLError
+
+from ._error import AcquireTimeoutError, CircuitOpenError, PoolQueueFullError
+from ._health import ValidatingPool
+
+T = TypeVar("T")
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+class AdmissionController:
+    """获取连接的排队上限、超时和熔断器"""
+
+    def __init__(
+        self,
+        *,
+        max_queue: int = 0,
+        acquire_timeout: Optional[float] = None,
+        failure_threshold: int = 0,
+        reset_timeout: float = 5.0,
+    ):
+        """
+        :param max_queue: 等待连接的请求数量上限，0表示不限制
+        :param acquire_timeout: 获取连接的超时时间（秒），None表示一直等待
+        :param failure_threshold: 连续获取连接失败多少次后熔断，0表示不熔断
+        :param reset_timeout: 熔断后多少秒进入半开状态
+        """
+        self.max_queue: Final[int] = max(max_queue, 0)
+        self.acquire_timeout: Final[Optional[float]] = acquire_timeout or None
+        self.failure_threshold: Final[int] = max(failure_threshold, 0)
+        self.reset_timeout: Final[float] = reset_timeout
+        self.state: CircuitState = "closed"
+        # 正在等待连接的请求数量
+        self.waiting: int = 0
+        # 被拒绝的请求数量(排队已满或熔断)
+        self.rejected: int = 0
+        self.__failures: int = 0
+        self.__opened_at: float = 0.0
+        self.__probing: bool = False
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} state={self.state} waiting={self.waiting}>"
+
+    def __admit(self, now: float) -> bool:
+        """检查是否放行，返回是否为半开状态的探测请求"""
+        if self.state == "open":
+            if now - self.__opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit open after {self.failure_threshold} consecutive acquire failures")
+            self.state = "half_open"
+            self.__probing = False
+        if self.state == "half_open":
+            if self.__probing:
+                self.rejected += 1
+                raise CircuitOpenError("Circuit half-open, waiting for the probe request")
+            self.__probing = True
+            return True
+        if self.max_queue and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PoolQueueFullError(f"Too many requests waiting for a connection (max_queue={self.max_queue})")
+        return False
+
+    def __on_failure(self, probe: bool):
+        self.__failures += 1
+        if probe or (self.failure_threshold and self.__failures >= self.failure_threshold and self.state == "closed"):
+            if self.state != "open":
+                logger.warning("Circuit open after %d consecutive acquire failures", self.__failures)
+            self.state = "open"
+            self.__opened_at = time.monotonic()
+
+    def __on_success(self, probe: bool):
+        self.__failures = 0
+        if probe and self.state == "half_open":
+            logger.info("Circuit closed, connection acquired")
+            self.state = "closed"
+
+    async def run(self, acquire: Callable[[], Awaitable[T]], release: Callable[[T], Any] = None) -> T:
+        """按准入规则执行 acquire()
+
+        :param acquire: 获取连接
+        :param release: 超时或被取消时归还 acquire() 已经获取到的连接
+        """
+        probe = self.__admit(time.monotonic())
+        self.waiting += 1
+        try:
+            if self.acquire_timeout is None:
+                result = await acquire()
+            else:
+                result = await self.__acquire_with_timeout(acquire, release)
+        except asyncio.TimeoutError:
+            self.__on_failure(probe)
+            raise AcquireTimeoutError(f"Timed out waiting for a connection after {self.acquire_timeout}s") from None
+        except (MySQLError, OSError):
+            self.__on_failure(probe)
+            raise
+        except BaseException:
+            # 被取消时不影响熔断状态，半开状态下允许下一个请求探测
+            if probe and self.state == "half_open":
+                self.__probing = False
+            raise
+        finally:
+            self.waiting -= 1
+        self.__on_success(probe)
+        return result
+
+    async def __acquire_with_timeout(self, acquire: Callable[[], Awaitable[T]], release: Optional[Callable[[T], Any]]):
+        # wait_for 超时或被取消时 acquire() 可能恰好完成，获取到的连接会被丢弃(一直留在连接池的 _used 中)，
+        # 所以在单独的任务中获取，超时或被取消后由回调归还任务获取到的连接
+        task = asyncio.ensure_future(acquire())
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.acquire_timeout)
+        except BaseException:
+            task.cancel()
+            task.add_done_callback(functools.partial(_release_acquired, release))
+            raise
+
+
+def _release_acquired(release: Optional[Callable[[T], Any]], task: asyncio.Future):
+    if task.cancelled() or task.exception() is not None:
+        return
+    if release is not None:
+        release(task.result())
+
+
+class AdmissionPool(ValidatingPool):
+    """获取连接前经过 AdmissionController 的连接池"""
+
+    def __init__(self, minsize, maxsize, echo, pool_recycle, loop, *, admission: AdmissionController = None, **kwargs):
+        super().__init__(minsize, maxsize, echo, pool_recycle, loop, **kwargs)
+        self.admission: Final[Optional[AdmissionController]] = admission
+
+    def acquire(self):
+        if self.admission is None:
+            return super().acquire()
+        return _PoolAcquireContextManager(self.admission.run(self._acquire, self.release), self)
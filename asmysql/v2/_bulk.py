@@ -0,0 +1,239 @@
+"""
+批量写入计划
+
+把 INSERT / REPLACE / INSERT ... ON DUPLICATE KEY UPDATE 语句改写为多行 VALUES 语句，
+按服务端 max_allowed_packet 切分成多个语句执行，并可以分散到多个连接上并发执行。
+"""
+
+import asyncio
+import itertools
+import re
+from typing import Final, Iterable, Iterator, Optional, Union
+
+from aiomysql import Connection, Cursor, Pool
+
+# 默认的单条语句最大长度，与 aiomysql Cursor.max_stmt_length 一致
+DEFAULT_MAX_STMT_LENGTH = 1024000
+# 为包头等预留的空间
+_PACKET_RESERVED = 1024
+
+_STATEMENT_RE = re.compile(r"\s*(?:INSERT|REPLACE)\b", re.IGNORECASE)
+_VALUES_RE = re.compile(r"VALUES?\b\s*(?=\()", re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s")
+
+
+def max_stmt_length(max_allowed_packet: Optional[int]):
+    """根据服务端 max_allowed_packet 计算单条语句的最大长度"""
+    if not max_allowed_packet:
+        return DEFAULT_MAX_STMT_LENGTH
+    return max(max_allowed_packet - _PACKET_RESERVED, _PACKET_RESERVED)
+
+
+def _skip_quoted(query: str, i: int):
+    """跳过引号或注释，返回之后的位置；不是引号或注释则返回原位置"""
+    char = query[i]
+    if char in "'\"`":
+        i += 1
+        while i < len(query):
+            if query[i] == "\\" and char != "`":
+                i += 2
+                continue
+            if query[i] == char:
+                if query[i + 1 : i + 2] == char:
+                    i += 2
+                    continue
+                return i + 1
+            i += 1
+        return i
+    if query.startswith("--", i) or char == "#":
+        end = query.find("\n", i)
+        return len(query) if end < 0 else end + 1
+    if query.startswith("/*", i):
+        end = query.find("*/", i + 2)
+        return len(query) if end < 0 else end + 2
+    return i
+
+
+def _find_values(query: str):
+    """查找引号和注释之外的 VALUES 关键字，返回行模板的起始位置"""
+    i = 0
+    while i < len(query):
+        j = _skip_quoted(query, i)
+        if j != i:
+            i = j
+            continue
+        if (i == 0 or not (query[i - 1].isalnum() or query[i - 1] == "_")) and query[i] in "vV":
+            match = _VALUES_RE.match(query, i)
+            if match:
+                return match.end()
+        i += 1
+    return -1
+
+
+def _find_group_end(query: str, start: int):
+    """返回从 start 处的左括号开始、与之匹配的右括号之后的位置"""
+    depth = 0
+    i = start
+    while i < len(query):
+        j = _skip_quoted(query, i)
+        if j != i:
+            i = j
+            continue
+        if query[i] == "(":
+            depth += 1
+        elif query[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+class BulkPlan:
+    """多行写入计划: prefix + row, row, ... + postfix"""
+
+    __slots__ = ("prefix", "row", "postfix")
+
+    def __init__(self, prefix: str, row: str, postfix: str):
+        self.prefix: Final[str] = prefix
+        self.row: Final[str] = row
+        self.postfix: Final[str] = postfix
+
+    def statements(
+        self,
+        conn: Connection,
+        rows: Iterable[Union[tuple, list, dict]],
+        max_length: int = DEFAULT_MAX_STMT_LENGTH,
+    ) -> Iterator[bytes]:
+        """生成多行语句，每条语句不超过 max_length 字节(单行超长时单独成一条语句)"""
+        encoding = conn.encoding
+        prefix = self.prefix.encode(encoding)
+        postfix = self.postfix.encode(encoding)
+        sql = bytearray(prefix)
+        for row in rows:
+            if isinstance(row, dict):
+                escaped = {key: conn.escape(value) for key, value in row.items()}
+            elif isinstance(row, (tuple, list)):
+                escaped = tuple(conn.escape(value) for value in row)
+            else:
+                escaped = conn.escape(row)
+            value = (self.row % escaped).encode(encoding, "surrogateescape")
+            if len(sql) > len(prefix):
+                if len(sql) + len(value) + len(postfix) + 1 > max_length:
+                    yield bytes(sql + postfix)
+                    sql = bytearray(prefix)
+                else:
+                    sql += b","
+            sql += value
+        if len(sql) > len(prefix):
+            yield bytes(sql + postfix)
+
+
+def plan_bulk_write(query: str) -> Optional[BulkPlan]:
+    """解析批量写入语句，无法改写为多行 VALUES 时返回 None
+
+    支持 INSERT [IGNORE] / REPLACE ... VALUES (...) [AS alias] [ON DUPLICATE KEY UPDATE ...]，
+    行模板中可以包含表达式和常量(如 NOW()、'x')，但 VALUES 之后的部分不能再有参数占位符。
+    """
+    if not _STATEMENT_RE.match(query):
+        return None
+    start = _find_values(query)
+    if start < 0:
+        return None
+    end = _find_group_end(query, start)
+    if end < 0:
+        return None
+    row = query[start:end]
+    postfix = query[end:].rstrip().rstrip(";")
+    if postfix.lstrip().startswith(",") or _PLACEHOLDER_RE.search(postfix):
+        # 已经是多行模板，或者后缀中有参数
+        return None
+    if not _PLACEHOLDER_RE.search(row):
+        return None
+    try:
+        # 前后缀中的 %% 需要还原
+        prefix = query[:start] % ()
+        postfix = postfix % ()
+    except (TypeError, ValueError):
+        return None
+    return BulkPlan(prefix, row, postfix)
+
+
+async def _execute_statements(cursor: Cursor, statements: Iterator[bytes]):
+    rows = 0
+    for stmt in statements:
+        rows += await cursor.execute(stmt)
+    return rows
+
+
+async def _execute_on_new_connection(pool: Pool, statements: Iterator[bytes]):
+    """在新获取的连接上执行语句并提交，没有剩余语句时不获取连接"""
+    first = next(statements, None)
+    if first is None:
+        return 0
+    conn = await pool.acquire()
+    try:
+        cursor = await conn.cursor()
+        try:
+            rows = await _execute_statements(cursor, itertools.chain((first,), statements))
+        finally:
+            await cursor.close()
+        await conn.commit()
+        return rows
+    except BaseException:
+        # 被取消或出错时可能还没有读取响应，关闭连接，不能放回连接池
+        conn.close()
+        raise
+    finally:
+        pool.release(conn)
+
+
+async def execute_bulk(
+    cursor: Cursor,
+    query: str,
+    values: Iterable[Union[tuple, list, dict]],
+    *,
+    max_length: int = DEFAULT_MAX_STMT_LENGTH,
+    pool: Pool = None,
+    concurrency: int = 1,
+):
+    """批量执行写入语句
+
+    能改写的语句按 max_length 切分为多行语句执行，否则回退到 cursor.executemany()。
+    concurrency > 1 时，除 cursor 所在连接外，再从 pool 获取最多 concurrency-1 个连接并发执行，
+    这些连接各自提交，整体不是原子操作。
+
+    :return: 受影响的总行数
+    """
+    if not values:
+        return await cursor.executemany(query, values)
+    plan = plan_bulk_write(query)
+    if plan is None:
+        return await cursor.executemany(query, values)
+    statements = plan.statements(cursor.connection, values, max_length)
+    if concurrency <= 1 or pool is None:
+        rows = await _execute_statements(cursor, statements)
+    else:
+        # 所有协程共享同一个语句生成器，按需取下一条语句
+        main = asyncio.ensure_future(_execute_statements(cursor, statements))
+        tasks = [
+            main,
+            *(asyncio.ensure_future(_execute_on_new_connection(pool, statements)) for _ in range(concurrency - 1)),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            # 一个连接失败(或被取消)时取消其他连接，不再继续写入，已经提交的语句无法撤销
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks)
+            if main.cancelled():
+                # cursor 所在的连接可能还没有读取响应
+                cursor.connection.close()
+        errors = [task.exception() for task in tasks if not task.cancelled() and task.exception() is not None]
+        if errors:
+            raise errors[0]
+        rows = sum(task.result() for task in tasks)
+    # noinspection PyProtectedMember
+    cursor._rowcount = rows
+    return rows
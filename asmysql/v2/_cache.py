@@ -0,0 +1,274 @@
+"""
+查询结果缓存
+
+execute(..., cache_ttl=...) 时按规范化的SQL和参数缓存查询到的行:
+- 按估算的内存占用(字节)限制缓存大小，超出时淘汰最久未使用的结果(LRU)。
+- 同一个 key 并发未命中时只执行一次查询(single-flight)，其他请求等待同一个结果。
+- 缓存按表名打标签，通过同一个 Engine 执行的写语句会使相关表的缓存失效。
+"""
+
+import asyncio
+import re
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Final, Iterable, Optional, Sequence, Union
+
+# 表名: table, `table`, db.table, `db`.`table`
+_NAME = r"(?:`[^`]+`|[\w$]+)"
+_TABLE = rf"{_NAME}(?:\s*\.\s*{_NAME})?"
+_READ_TABLE_RE = re.compile(rf"\b(?:FROM|JOIN)\s+({_TABLE}(?:\s*,\s*{_TABLE})*)", re.I)
+_WRITE_TABLE_RE = re.compile(
+    rf"\b(?:FROM|JOIN|INTO|UPDATE(?:\s+LOW_PRIORITY)?(?:\s+IGNORE)?|TABLE|TABLES?)\s+({_TABLE}(?:\s*,\s*{_TABLE})*)",
+    re.I,
+)
+_LEADING_RE = re.compile(r"(?:\s+|/\*.*?\*/|(?:--|#)[^\n]*\n?|\()*(\w+)", re.S)
+# 不会修改数据的语句
+_NO_WRITE_KEYWORDS = frozenset(
+    (
+        "SELECT",
+        "SHOW",
+        "DESCRIBE",
+        "DESC",
+        "EXPLAIN",
+        "SET",
+        "USE",
+        "BEGIN",
+        "START",
+        "COMMIT",
+        "ROLLBACK",
+        "SAVEPOINT",
+        "RELEASE",
+        "DO",
+        "HANDLER",
+    )
+)
+_CTE_WRITE_RE = re.compile(r"\b(?:INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+_SPACE_RE = re.compile(r"\s+")
+_QUOTED_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|`[^`]*`", re.S)
+
+
+def normalize_query(query: str) -> str:
+    """合并引号之外的空白字符，去掉首尾空白和末尾分号"""
+    parts = []
+    last = 0
+    for match in _QUOTED_RE.finditer(query):
+        parts.append(_SPACE_RE.sub(" ", query[last : match.start()]))
+        parts.append(match.group())
+        last = match.end()
+    parts.append(_SPACE_RE.sub(" ", query[last:]))
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def _normalize_values(values):
+    if isinstance(values, dict):
+        return tuple(sorted((key, _normalize_values(value)) for key, value in values.items()))
+    if isinstance(values, (list, tuple)):
+        return tuple(_normalize_values(value) for value in values)
+    return values
+
+
+def cache_key(query: str, values: Union[Sequence, dict, None], row_kind: str) -> str:
+    """缓存的 key: 规范化的SQL + 参数 + 行类型(tuple/dict)"""
+    return f"{row_kind}\x00{normalize_query(query)}\x00{_normalize_values(values)!r}"
+
+
+def table_tag(table: str) -> str:
+    """表名对应的缓存标签: 小写，不含库名和反引号"""
+    return table.split(".")[-1].strip().strip("`").lower()
+
+
+def _table_tags(groups: Iterable[str]) -> set[str]:
+    return {tag for group in groups for tag in map(table_tag, group.split(",")) if tag}
+
+
+def read_tables(query: str) -> set[str]:
+    """查询语句中 FROM/JOIN 后面的表名(小写，不含库名)"""
+    return _table_tags(_READ_TABLE_RE.findall(query))
+
+
+def write_tables(query: str) -> Optional[set[str]]:
+    """写语句可能修改的表名(小写，不含库名)
+
+    不会修改数据的语句返回空集合，无法确定修改了哪些表(如 CALL)时返回 None，表示所有缓存都需要失效。
+    """
+    match = _LEADING_RE.match(query)
+    keyword = match.group(1).upper() if match else ""
+    if keyword in _NO_WRITE_KEYWORDS:
+        return set()
+    if keyword == "WITH" and not _CTE_WRITE_RE.search(query):
+        return set()
+    tables = _table_tags(_WRITE_TABLE_RE.findall(query))
+    return tables or None
+
+
+def estimate_size(rows: Sequence) -> int:
+    """估算行数据占用的内存(字节)"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        values = row.values() if isinstance(row, dict) else row
+        for value in values:
+            size += sys.getsizeof(value)
+    return size
+
+
+class CacheEntry:
+    """缓存的查询结果"""
+
+    __slots__ = ("rows", "description", "rowcount", "tags", "size", "expires")
+
+    def __init__(self, rows: Sequence, description: Optional[tuple], rowcount: int, tags: frozenset, ttl: float):
+        self.rows: Final[tuple] = tuple(rows)
+        self.description: Final[Optional[tuple]] = description
+        self.rowcount: Final[int] = rowcount
+        self.tags: Final[frozenset] = tags
+        self.size: Final[int] = estimate_size(self.rows)
+        self.expires: Final[float] = time.monotonic() + ttl
+
+
+class CachedCursor:
+    """读取已缓冲结果的游标(查询缓存和 pipeline 使用)，接口与 aiomysql 的游标保持一致，供 Result 使用"""
+
+    def __init__(self, rows: Sequence, description: Optional[tuple], rowcount: int, lastrowid: Optional[int] = None):
+        self.__rows: Final[Sequence] = rows
+        self.description: Final[Optional[tuple]] = description
+        self.rowcount: Final[int] = rowcount
+        self.rownumber: int = 0
+        self.lastrowid: Final[Optional[int]] = lastrowid
+        self.connection = None
+        self._result = None
+
+    async def fetchone(self):
+        if self.rownumber >= len(self.__rows):
+            return None
+        row = self.__rows[self.rownumber]
+        self.rownumber += 1
+        return row
+
+    async def fetchmany(self, size: int = None):
+        end = self.rownumber + (size or 1)
+        rows = self.__rows[self.rownumber : end]
+        self.rownumber = min(end, len(self.__rows))
+        return rows
+
+    async def fetchall(self):
+        rows = self.__rows[self.rownumber :]
+        self.rownumber = len(self.__rows)
+        return rows
+
+    async def nextset(self):
+        return None
+
+    async def close(self):
+        pass
+
+
+class QueryCache:
+    """按内存占用限制大小的查询结果缓存(LRU)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes: Final[int] = max_bytes
+        self.__entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.__loading: dict[str, asyncio.Task] = {}
+        # 表标签的版本号，写入时递增，用于丢弃写入前开始加载的结果
+        self.__generations: dict[str, int] = {}
+        self.__generation: int = 0
+        self.__size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __bool__(self):
+        # 有正在加载的查询时也需要处理失效，避免写入前开始的查询把旧数据写入缓存
+        return bool(self.__entries or self.__loading)
+
+    @property
+    def size(self):
+        """缓存占用的内存(估算，字节)"""
+        return self.__size
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            self.__remove(key)
+            return None
+        self.__entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        if key in self.__entries:
+            self.__remove(key)
+        self.__entries[key] = entry
+        self.__size += entry.size
+        while self.__size > self.max_bytes:
+            self.__remove(next(iter(self.__entries)))
+
+    def __remove(self, key: str):
+        entry = self.__entries.pop(key)
+        self.__size -= entry.size
+
+    def __version(self, tags: Iterable[str]):
+        return self.__generation, tuple(self.__generations.get(tag, 0) for tag in tags)
+
+    def invalidate(self, tags: Optional[Iterable[str]] = None):
+        """使包含指定表标签的缓存失效，tags 为 None 时清空所有缓存"""
+        if tags is None:
+            self.__generation += 1
+            self.__entries.clear()
+            self.__size = 0
+            return
+        tags = set(tags)
+        if not tags:
+            return
+        for tag in tags:
+            self.__generations[tag] = self.__generations.get(tag, 0) + 1
+        for key in [key for key, entry in self.__entries.items() if not tags.isdisjoint(entry.tags)]:
+            self.__remove(key)
+
+    async def get_or_load(
+        self,
+        key: str,
+        tags: Iterable[str],
+        ttl: float,
+        load: Callable[[], Awaitable[tuple[Sequence, Optional[tuple], int]]],
+    ) -> CacheEntry:
+        """读取缓存，未命中时调用 load() 查询并写入缓存
+
+        同一个 key 并发未命中时共用一次 load()，load() 在独立的任务中执行，调用方被取消不会影响其他等待者。
+        """
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        task = self.__loading.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self.__load(key, frozenset(tags), ttl, load))
+            self.__loading[key] = task
+            task.add_done_callback(self.__loaded)
+        else:
+            self.hits += 1
+        return await asyncio.shield(task)
+
+    def __loaded(self, task: asyncio.Task):
+        for key, loading in list(self.__loading.items()):
+            if loading is task:
+                del self.__loading[key]
+        if not task.cancelled():
+            # 避免所有等待者都被取消时出现 "exception was never retrieved"
+            task.exception()
+
+    async def __load(self, key: str, tags: frozenset, ttl: float, load: Callable[[], Awaitable[Any]]):
+        version = self.__version(tags)
+        rows, description, rowcount = await load()
+        entry = CacheEntry(rows, description, rowcount, tags, ttl)
+        if self.__version(tags) == version:
+            self.put(key, entry)
+        return entry
@@ -1,6 +1,28 @@
+from pymysql.err import OperationalError
+
 
 def err_msg(err: Exception):
     """处理报错消息，避免exception为空字符导致日志打印内容为空"""
-    err_str = err.__str__() or f'{err.__doc__!r}'
+    err_str = err.__str__() or f"{err.__doc__!r}"
     err_str = err_str.lstrip().rstrip()
     return f"{err.__class__} {err_str}"
+
+
+class AdmissionError(ConnectionError):
+    """获取连接被准入控制拒绝(过载保护)，不会访问数据库"""
+
+
+class PoolQueueFullError(AdmissionError):
+    """等待连接的请求数量超过 max_queue"""
+
+
+class AcquireTimeoutError(AdmissionError, TimeoutError):
+    """在 acquire_timeout 内没有获取到连接"""
+
+
+class CircuitOpenError(AdmissionError):
+    """连续获取连接失败后熔断，在恢复之前直接拒绝"""
+
+
+class QueryTimeoutError(OperationalError):
+    """语句执行超过 timeout，已经使用 KILL QUERY 中断(错误码为 3024 ER_QUERY_TIMEOUT)"""
@@ -0,0 +1,316 @@
+"""
+结果导出
+
+Result.export() 把结果集按批写入 CSV、JSON Lines 或 Parquet 文件:
+- 从游标读取下一批行的同时，在线程中编码(和压缩)并写入上一批，事件循环中不做编码和文件 IO。
+- 写入没有完成前不会继续读取，内存中最多只有两批行，配合 stream 执行时可以导出超大结果集。
+- 表头和 Parquet 的列类型来自 cursor.description，Parquet 需要安装 pyarrow:
+    pip install asmysql[columnar]
+
+CSV/JSON Lines 的值: NULL 在 CSV 中为空字段、在 JSON 中为 null，DECIMAL 输出为字符串(不丢失精度)，
+TIME 输出为 HH:MM:SS[.ffffff]，二进制值输出为 base64 字符串。
+"""
+
+import abc
+import asyncio
+import base64
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+from decimal import Decimal
+from pathlib import PurePath
+from typing import Awaitable, Callable, Final, Literal, Optional, Sequence, TypedDict, Union
+
+from .._columnar import _import_pyarrow, column_names, to_arrow_batch
+from ._load_data import _format_timedelta
+
+ExportFormat = Literal["csv", "jsonl", "parquet"]
+EXPORT_FORMATS: Final[tuple[str, ...]] = ("csv", "jsonl", "parquet")
+# 根据文件扩展名推断导出格式
+_SUFFIX_FORMATS: Final[dict[str, str]] = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+
+class ExportStats(TypedDict):
+    """导出结果"""
+
+    rows: int  # 写入的行数
+    bytes: int  # 写入目标的字节数(压缩后)
+
+
+class CountingWriter:
+    """写入二进制文件并统计字节数，路径打开的文件由它负责关闭"""
+
+    def __init__(self, target: Union[str, os.PathLike, io.RawIOBase, io.BufferedIOBase]):
+        if isinstance(target, (str, os.PathLike)):
+            self.__file = open(target, "wb")
+            self.__owned: Final[bool] = True
+        else:
+            if isinstance(target, io.TextIOBase) or not hasattr(target, "write"):
+                raise TypeError("export() requires a file path or a binary file object") from None
+            self.__file = target
+            self.__owned: Final[bool] = False
+        self.bytes: int = 0
+
+    @property
+    def closed(self):
+        return self.__file.closed
+
+    def write(self, data: bytes):
+        self.__file.write(data)
+        self.bytes += len(data)
+        return len(data)
+
+    def flush(self):
+        self.__file.flush()
+
+    def close(self):
+        if self.__owned:
+            self.__file.close()
+        else:
+            self.__file.flush()
+
+
+class Exporter(abc.ABC):
+    """把一批批行写入文件，write() 和 close() 在线程中调用"""
+
+    def __init__(self, out: CountingWriter, description: Sequence[tuple]):
+        self.out: Final[CountingWriter] = out
+        self.description: Final[Sequence[tuple]] = description
+        self.rows: int = 0
+
+    @property
+    def bytes(self):
+        return self.out.bytes
+
+    @abc.abstractmethod
+    def write(self, rows: Sequence[Union[tuple, dict]]):
+        """写入一批行"""
+
+    def close(self):
+        """写入文件尾并关闭文件"""
+        self.out.close()
+
+    def abort(self):
+        """出错或被取消时关闭文件，不保证文件内容完整"""
+        self.out.close()
+
+
+def _values(row: Union[tuple, dict]):
+    return row.values() if isinstance(row, dict) else row
+
+
+def _csv_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    if isinstance(value, datetime.timedelta):
+        return _format_timedelta(value)
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return _format_timedelta(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class TextExporter(Exporter):
+    """CSV/JSON Lines 导出，每批编码为一个 UTF-8 数据块后写入，compression="gzip" 时使用 gzip 压缩"""
+
+    def __init__(self, out: CountingWriter, description: Sequence[tuple], compression: Optional[str]):
+        super().__init__(out, description)
+        self.__gzip: Final[Optional[gzip.GzipFile]] = (
+            gzip.GzipFile(fileobj=out, mode="wb") if compression == "gzip" else None
+        )
+
+    @abc.abstractmethod
+    def encode(self, rows: Sequence[Union[tuple, dict]]) -> str:
+        """把一批行编码为文本"""
+
+    def write(self, rows: Sequence[Union[tuple, dict]]):
+        self.write_text(self.encode(rows))
+        self.rows += len(rows)
+
+    def write_text(self, text: str):
+        if text:
+            (self.__gzip or self.out).write(text.encode())
+
+    def close(self):
+        if self.__gzip is not None:
+            self.__gzip.close()
+        super().close()
+
+
+class CsvExporter(TextExporter):
+    def __init__(
+        self, out: CountingWriter, description: Sequence[tuple], compression: Optional[str], header: bool = True
+    ):
+        super().__init__(out, description, compression)
+        self.__header: bool = header
+
+    def __header_text(self) -> str:
+        if not self.__header:
+            return ""
+        self.__header = False
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerow(column_names(self.description))
+        return buffer.getvalue()
+
+    def encode(self, rows: Sequence[Union[tuple, dict]]) -> str:
+        buffer = io.StringIO()
+        buffer.write(self.__header_text())
+        csv.writer(buffer, lineterminator="\n").writerows([_csv_value(value) for value in _values(row)] for row in rows)
+        return buffer.getvalue()
+
+    def close(self):
+        # 没有数据时也写入表头
+        self.write_text(self.__header_text())
+        super().close()
+
+
+class JsonLinesExporter(TextExporter):
+    def encode(self, rows: Sequence[Union[tuple, dict]]) -> str:
+        names = column_names(self.description)
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default).encode
+        return "".join([dumps(row if isinstance(row, dict) else dict(zip(names, row))) + "\n" for row in rows])
+
+
+class ParquetExporter(Exporter):
+    """Parquet 导出，每批为一个 row group，列类型由第一批确定"""
+
+    def __init__(self, out: CountingWriter, description: Sequence[tuple], compression: Optional[str]):
+        super().__init__(out, description)
+        self.__pyarrow = _import_pyarrow()
+        import pyarrow.parquet
+
+        self.__parquet = pyarrow.parquet
+        self.__compression: Final[str] = compression or "snappy"
+        self.__writer = None
+
+    def __open(self, schema):
+        # DECIMAL 列的精度是按批推断的，统一使用最大精度(小数位数不变)，后面的批次才能转换为相同的类型
+        pyarrow = self.__pyarrow
+        fields = []
+        for field in schema:
+            if pyarrow.types.is_decimal128(field.type):
+                field = field.with_type(pyarrow.decimal128(38, field.type.scale))
+            elif pyarrow.types.is_decimal256(field.type):
+                field = field.with_type(pyarrow.decimal256(76, field.type.scale))
+            fields.append(field)
+        self.__writer = self.__parquet.ParquetWriter(self.out, pyarrow.schema(fields), compression=self.__compression)
+
+    def write(self, rows: Sequence[Union[tuple, dict]]):
+        # Parquet 本身按列做字典编码，不需要使用 Arrow 的字典类型
+        batch = to_arrow_batch(self.description, rows, dictionary=False)
+        if self.__writer is None:
+            self.__open(batch.schema)
+        if batch.schema != self.__writer.schema:
+            try:
+                batch = batch.cast(self.__writer.schema)
+            except (self.__pyarrow.ArrowInvalid, self.__pyarrow.ArrowNotImplementedError):
+                raise ValueError(
+                    f"Column types changed between batches: {batch.schema} != {self.__writer.schema}, "
+                    "use a larger batch_size"
+                ) from None
+        self.__writer.write_batch(batch)
+        self.rows += len(rows)
+
+    def close(self):
+        if self.__writer is None:
+            # 没有数据时写入只有表结构的文件
+            self.__open(to_arrow_batch(self.description, [], dictionary=False).schema)
+        self.__writer.close()
+        super().close()
+
+    def abort(self):
+        if self.__writer is not None:
+            try:
+                self.__writer.close()
+            except OSError:
+                pass
+        super().abort()
+
+
+def export_format(target, format: Optional[str], compression: Optional[str]) -> tuple[str, Optional[str]]:
+    """确定导出格式和压缩方式，没有指定时根据文件扩展名推断(如 .csv.gz 为 gzip 压缩的 CSV)"""
+    suffixes = (
+        [suffix.lower() for suffix in PurePath(target).suffixes] if isinstance(target, (str, os.PathLike)) else []
+    )
+    gzipped = bool(suffixes) and suffixes[-1] == ".gz"
+    if gzipped:
+        suffixes.pop()
+    if format is None:
+        format = _SUFFIX_FORMATS.get(suffixes[-1]) if suffixes else None
+        if format is None:
+            raise ValueError(f"Cannot infer export format from {target!r}, specify format=") from None
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid export format: {format}, must be one of {EXPORT_FORMATS}") from None
+    if compression is None and gzipped and format != "parquet":
+        compression = "gzip"
+    if format != "parquet" and compression not in (None, "gzip"):
+        raise ValueError(f"Invalid compression: {compression}, {format} only supports gzip") from None
+    return format, compression
+
+
+def open_exporter(
+    target,
+    description: Sequence[tuple],
+    format: Optional[str] = None,
+    *,
+    compression: Optional[str] = None,
+    header: bool = True,
+) -> Exporter:
+    format, compression = export_format(target, format, compression)
+    if format == "parquet":
+        # 先检查 pyarrow，没有安装时不创建文件
+        _import_pyarrow()
+    out = CountingWriter(target)
+    try:
+        if format == "csv":
+            return CsvExporter(out, description, compression, header)
+        if format == "jsonl":
+            return JsonLinesExporter(out, description, compression)
+        return ParquetExporter(out, description, compression)
+    except BaseException:
+        out.close()
+        raise
+
+
+async def export_rows(exporter: Exporter, fetch: Callable[[], Awaitable[Sequence]]) -> ExportStats:
+    """读取下一批行的同时在线程中写入上一批，fetch 返回空批次时结束
+
+    :param exporter: 写入文件的 Exporter
+    :param fetch: 读取下一批行的函数
+    """
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            rows = await fetch()
+            if pending is not None:
+                # 上一批写入完成后才继续读取(背压)，同时抛出写入的错误
+                await asyncio.shield(pending)
+                pending = None
+            if not rows:
+                break
+            pending = asyncio.ensure_future(asyncio.to_thread(exporter.write, rows))
+        pending = asyncio.ensure_future(asyncio.to_thread(exporter.close))
+        await asyncio.shield(pending)
+    except BaseException:
+        if pending is not None:
+            # 线程中的写入无法中断，等待写入结束后再关闭文件
+            await asyncio.wait((pending,))
+            if not pending.cancelled():
+                pending.exception()
+        exporter.abort()
+        raise
+    return ExportStats(rows=exporter.rows, bytes=exporter.bytes)
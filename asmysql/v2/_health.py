@@ -0,0 +1,157 @@
+"""
+连接健康检查
+
+MySQL 故障切换或者连接被服务端断开后，连接池中的空闲连接已经失效，但直到下一次使用时才会发现，
+每个失效连接上的第一条语句都会失败。Engine(validation=...) 配置交出连接之前的检查策略:
+- never: 不检查(默认)
+- idle: 取出空闲超过 validation_idle 秒的连接时先发送 COM_PING，失败时关闭连接并取下一个
+- background: 后台每 validation_idle 秒对空闲超过 validation_idle 秒的空闲连接发送 COM_PING，取出时不检查
+失效的连接(检查失败或归还时已断开)计入 ValidatingPool.evicted，即 Engine.status 中的 pool_evicted。
+
+Engine(retry_reads=True) 时，事务外的只读语句(SELECT/SHOW/DESCRIBE/EXPLAIN)因为连接断开而执行失败时，
+在新连接上透明地重试一次。
+"""
+
+import asyncio
+import re
+from functools import lru_cache
+from typing import Final, Literal, Optional, Sequence, get_args
+
+from aiomysql import Connection
+from pymysql.constants import CR
+from pymysql.err import InterfaceError, MySQLError, OperationalError
+
+from ._warmup import WarmupPool
+
+ValidationPolicy = Literal["never", "idle", "background"]
+VALIDATION_POLICIES: Final[tuple[str, ...]] = get_args(ValidationPolicy)
+# 表示连接已经断开的错误码
+CONNECTION_LOST_ERRORS: Final[frozenset[int]] = frozenset(
+    (CR.CR_SERVER_GONE_ERROR, CR.CR_SERVER_LOST, CR.CR_SERVER_LOST_EXTENDED)
+)
+_LEADING_RE = re.compile(r"(?:\s+|/\*.*?\*/|(?:--|#)[^\n]*\n?|\()*(\w+)", re.S)
+_READ_KEYWORDS = frozenset(("SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "WITH"))
+# 有副作用的只读语句: SELECT ... INTO、用户锁
+_SIDE_EFFECT_RE = re.compile(r"\b(?:INTO|GET_LOCK|RELEASE_LOCK|RELEASE_ALL_LOCKS|INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+
+
+@lru_cache(maxsize=1024)
+def is_idempotent_read(query: str) -> bool:
+    """语句是否为可以安全重试的只读语句"""
+    match = _LEADING_RE.match(query)
+    if not match or match.group(1).upper() not in _READ_KEYWORDS:
+        return False
+    return not _SIDE_EFFECT_RE.search(query)
+
+
+def is_connection_lost(err: Exception) -> bool:
+    """错误是否由连接断开引起(语句可能没有发送到服务端)"""
+    if isinstance(err, InterfaceError):
+        return True
+    return isinstance(err, OperationalError) and bool(err.args) and err.args[0] in CONNECTION_LOST_ERRORS
+
+
+async def ping(conn: Connection, timeout: Optional[float] = None) -> bool:
+    """发送 COM_PING 检查连接，不重连，超时或失败时关闭连接并返回 False
+
+    不更新连接的最后使用时间，pool_recycle 仍然按实际使用计算
+    """
+    last_usage = conn.last_usage
+    try:
+        await asyncio.wait_for(conn.ping(reconnect=False), timeout)
+    except (MySQLError, OSError, asyncio.TimeoutError):
+        conn.close()
+        return False
+    conn._last_usage = last_usage
+    return True
+
+
+class ValidatingPool(WarmupPool):
+    """交出连接之前按 validation 策略检查连接的连接池"""
+
+    def __init__(
+        self,
+        minsize,
+        maxsize,
+        echo,
+        pool_recycle,
+        loop,
+        *,
+        validation: ValidationPolicy = "never",
+        validation_idle: float = 30.0,
+        **kwargs,
+    ):
+        if validation not in VALIDATION_POLICIES:
+            raise ValueError(f"Invalid validation policy: {validation!r}, must be one of {VALIDATION_POLICIES}")
+        super().__init__(minsize, maxsize, echo, pool_recycle, loop, **kwargs)
+        self.validation: Final[ValidationPolicy] = validation
+        self.validation_idle: Final[float] = max(validation_idle, 0.0)
+        # 因为失效被移除的连接数量
+        self.evicted: int = 0
+        self.__task: Optional[asyncio.Task] = None
+
+    def start(self):
+        super().start()
+        if self.validation == "background" and self.__task is None:
+            self.__task = self._loop.create_task(self.__validate_loop())
+
+    def close(self):
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+        super().close()
+
+    def release(self, conn: Connection):
+        if conn.closed and conn in self._used:
+            self.evicted += 1
+        return super().release(conn)
+
+    async def _acquire(self):
+        while True:
+            conn = await super()._acquire()
+            if self.validation != "idle" or self._loop.time() - conn.last_usage < self.validation_idle:
+                return conn
+            try:
+                alive = await ping(conn, conn.connect_timeout)
+            except BaseException:
+                # 检查期间被取消(如获取连接超时)，连接可能停在 COM_PING 的中间状态，关闭后归还
+                conn.close()
+                self.release(conn)
+                raise
+            if alive:
+                return conn
+            # 连接已失效，release 时计入 evicted，继续取下一个(没有空闲连接时新建)
+            self.release(conn)
+
+    async def __validate_loop(self):
+        interval = max(self.validation_idle, 0.01)
+        while not self._closing:
+            await asyncio.sleep(interval)
+            await self.validate_idle()
+
+    async def validate_idle(self):
+        """检查空闲超过 validation_idle 秒的空闲连接，移除失效的连接"""
+        now = self._loop.time()
+        async with self._cond:
+            idle = [conn for conn in self._free if now - conn.last_usage >= self.validation_idle]
+            for conn in idle:
+                self._free.remove(conn)
+            # 检查期间计入正在建立的连接，连接池大小不变
+            self._acquiring += len(idle)
+        if not idle:
+            return
+        alive: Optional[Sequence[bool]] = None
+        try:
+            alive = await asyncio.gather(*(ping(conn, conn.connect_timeout) for conn in idle))
+        finally:
+            async with self._cond:
+                self._acquiring -= len(idle)
+                for i, conn in enumerate(idle):
+                    if alive is not None and alive[i] and not self._closing:
+                        self._free.append(conn)
+                        continue
+                    # 检查被取消时连接状态未知，直接关闭
+                    conn.close()
+                    if alive is not None and not alive[i]:
+                        self.evicted += 1
+                self._cond.notify_all()
@@ -0,0 +1,189 @@
+"""
+语句生命周期钩子
+
+Engine.add_hook(event, hook) 注册的钩子在语句执行的各个阶段调用，用于接入链路追踪、慢查询日志、采样分析等:
+- before_acquire: 从连接池获取连接之前(事务中的语句使用事务连接，不调用 acquire 相关钩子)
+- after_acquire: 获取到连接之后
+- before_execute: 发送语句之前
+- after_execute: 语句执行完成(包括提交)之后
+- after_fetch: 结果关闭(读取完毕，归还连接)时
+- on_error: 语句执行失败时
+
+钩子接收一个 StatementTrace 参数，可以是普通函数或异步函数，按注册顺序调用。
+钩子抛出的异常只记录日志，不影响语句执行。没有注册钩子(且未开启 collect_metrics)时不创建 StatementTrace，
+Result 的执行流程只多一次 None 判断。
+"""
+
+from inspect import isawaitable
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Final, Literal, Optional, Sequence, Union, get_args
+
+from aiomysql.log import logger
+
+from ._metrics import NS_PER_SECOND, StatementMetrics, fingerprint
+
+if TYPE_CHECKING:
+    from aiomysql import Connection
+
+HookEvent = Literal["before_acquire", "after_acquire", "before_execute", "after_execute", "after_fetch", "on_error"]
+HOOK_EVENTS: Final[tuple[str, ...]] = get_args(HookEvent)
+Hook = Callable[["StatementTrace"], Optional[Awaitable[Any]]]
+# 根据语句、参数和是否为批量执行创建 StatementTrace 的函数(不需要记录时返回 None)
+Tracer = Callable[[str, Union[Sequence, dict, None], bool], Optional["StatementTrace"]]
+
+
+class StatementHooks:
+    """按事件保存的钩子"""
+
+    def __init__(self):
+        self.__hooks: dict[str, tuple[Hook, ...]] = {}
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {sorted(self.__hooks)}>"
+
+    def __bool__(self):
+        return bool(self.__hooks)
+
+    def add(self, event: HookEvent, hook: Hook):
+        """注册钩子"""
+        if event not in HOOK_EVENTS:
+            raise ValueError(f"Invalid hook event: {event!r}, must be one of {HOOK_EVENTS}") from None
+        self.__hooks[event] = (*self.__hooks.get(event, ()), hook)
+        return hook
+
+    def remove(self, event: HookEvent, hook: Hook):
+        """移除钩子，未注册时忽略"""
+        hooks = tuple(h for h in self.__hooks.get(event, ()) if h is not hook)
+        if hooks:
+            self.__hooks[event] = hooks
+        else:
+            self.__hooks.pop(event, None)
+
+    async def run(self, event: HookEvent, trace: "StatementTrace"):
+        """按注册顺序调用钩子，钩子的异常只记录日志"""
+        for hook in self.__hooks.get(event, ()):
+            try:
+                result = hook(trace)
+                if isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("%s hook %r failed for %r", event, hook, trace)
+
+
+class StatementTrace:
+    """一条语句执行过程的记录，传给钩子并用于 collect_metrics 的统计
+
+    时间点使用 time.perf_counter_ns()，未到达的阶段为0，*_time 属性为秒(未到达时为 None)。
+    钩子可以在 state 中保存自己的数据(如 span)，在后续阶段取出。
+    """
+
+    __slots__ = (
+        "query",
+        "values",
+        "many",
+        "connection",
+        "error",
+        "row_count",
+        "rows",
+        "state",
+        "acquire_started",
+        "acquired",
+        "execute_started",
+        "executed",
+        "finished",
+        "__hooks",
+        "__metrics",
+    )
+
+    def __init__(
+        self,
+        query: str,
+        values: Union[Sequence, dict, None],
+        many: bool = False,
+        *,
+        hooks: Optional[StatementHooks] = None,
+        metrics: Optional[StatementMetrics] = None,
+    ):
+        self.query: Final[str] = query
+        self.values: Final[Union[Sequence, dict, None]] = values
+        # execute_many/load_rows 时为 True，values 为多行参数
+        self.many: Final[bool] = many
+        self.connection: Optional["Connection"] = None
+        self.error: Optional[Exception] = None
+        # 语句返回的行数或受影响的行数(stream 时为 None)，以及结果关闭时已读取的行数
+        self.row_count: Optional[int] = None
+        self.rows: Optional[int] = None
+        self.state: Final[dict] = {}
+        self.acquire_started: int = 0
+        self.acquired: int = 0
+        self.execute_started: int = 0
+        self.executed: int = 0
+        self.finished: int = 0
+        self.__hooks: Final[Optional[StatementHooks]] = hooks or None
+        self.__metrics: Final[Optional[StatementMetrics]] = metrics
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.query}>"
+
+    @property
+    def fingerprint(self):
+        """语句指纹(字面量和参数替换为 ?)"""
+        return fingerprint(self.query)
+
+    @property
+    def acquire_time(self) -> Optional[float]:
+        """从连接池获取连接的等待时间"""
+        return (self.acquired - self.acquire_started) / NS_PER_SECOND if self.acquired else None
+
+    @property
+    def execute_time(self) -> Optional[float]:
+        """语句执行时间"""
+        return (self.executed - self.execute_started) / NS_PER_SECOND if self.executed else None
+
+    @property
+    def fetch_time(self) -> Optional[float]:
+        """语句执行完成到结果关闭的时间"""
+        return (self.finished - self.executed) / NS_PER_SECOND if self.executed and self.finished else None
+
+    async def before_acquire(self):
+        self.acquire_started = perf_counter_ns()
+        if self.__hooks:
+            await self.__hooks.run("before_acquire", self)
+
+    async def after_acquire(self, conn: "Connection"):
+        self.acquired = perf_counter_ns()
+        self.connection = conn
+        if self.__metrics is not None:
+            self.__metrics.record_acquire(self.acquired - self.acquire_started)
+        if self.__hooks:
+            await self.__hooks.run("after_acquire", self)
+
+    async def before_execute(self, conn: "Connection"):
+        self.connection = conn
+        if self.__hooks:
+            await self.__hooks.run("before_execute", self)
+        self.execute_started = perf_counter_ns()
+
+    async def after_execute(self, row_count: Optional[int]):
+        self.executed = perf_counter_ns()
+        self.row_count = row_count
+        if self.__metrics is not None:
+            self.__metrics.record_execute(self.executed - self.execute_started)
+        if self.__hooks:
+            await self.__hooks.run("after_execute", self)
+
+    async def after_fetch(self, rows: int):
+        self.finished = perf_counter_ns()
+        self.rows = rows
+        if self.__metrics is not None:
+            self.__metrics.record_fetch(self.finished - self.executed, rows)
+        if self.__hooks:
+            await self.__hooks.run("after_fetch", self)
+
+    async def on_error(self, err: Exception):
+        self.finished = perf_counter_ns()
+        self.error = err
+        if self.__metrics is not None:
+            self.__metrics.record_error()
+        if self.__hooks:
+            await self.__hooks.run("on_error", self)
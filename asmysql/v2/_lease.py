@@ -0,0 +1,117 @@
+"""
+连接租约和泄漏检测
+
+Result 从连接池获取的连接由一个 ConnectionLease 持有，连接只通过租约归还，并且只归还一次:
+- 正常读取完毕或 close() 时归还到连接池，close() 可以重复调用。
+- 执行或读取过程中被取消(CancelledError)时，连接可能停在协议的中间状态，关闭连接后再归还(从连接池移除)。
+- Result 没有关闭就被垃圾回收时，通过 weakref.finalize 关闭并归还连接，不依赖 __del__ 的调用时机，
+  同时记录日志并计入 LeakDetector.leaked(Engine.status 中的 pool_leaked)。
+
+Engine(leak_trace_rate=0~1) 时按比例采样记录创建 Result 的调用栈，泄漏日志中输出创建位置，方便定位没有关闭的 Result。
+"""
+
+import random
+import traceback
+import weakref
+from typing import Final, Optional
+
+from aiomysql import Connection, Pool
+from aiomysql.log import logger
+
+# 采样记录的调用栈最多保留的层数
+STACK_LIMIT: Final[int] = 16
+
+
+class LeakDetector:
+    """统计没有关闭就被回收的 Result，按比例采样记录它们的创建位置"""
+
+    def __init__(self, sample_rate: float = 0.0):
+        """
+        :param sample_rate: 记录创建调用栈的比例(0~1)
+        """
+        self.sample_rate: Final[float] = min(max(sample_rate, 0.0), 1.0)
+        # 泄漏(被回收时仍然持有连接)的数量
+        self.leaked: int = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} leaked={self.leaked}>"
+
+    def capture(self) -> Optional[traceback.StackSummary]:
+        """按采样比例记录当前调用栈(不包括 Result 内部的调用)，没有采样时返回 None"""
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        return traceback.StackSummary.from_list(traceback.extract_stack(limit=STACK_LIMIT + 2)[:-2])
+
+
+def report_leak(owner: str, stack: Optional[traceback.StackSummary]):
+    """记录没有关闭就被回收的 Result"""
+    if stack is None:
+        logger.warning("%s was garbage collected without close(), its connection is discarded", owner)
+    else:
+        logger.warning(
+            "%s was garbage collected without close(), its connection is discarded, created at:\n%s",
+            owner,
+            "".join(stack.format()),
+        )
+
+
+class ConnectionLease:
+    """Result 持有的一个连接，保证只归还一次
+
+    pinned 为 True 时(事务中的连接)由其持有者负责归还，租约只负责标记释放。
+    """
+
+    __slots__ = ("pool", "connection", "pinned", "released", "__finalizer")
+
+    def __init__(
+        self,
+        pool: Pool,
+        conn: Connection,
+        *,
+        pinned: bool = False,
+        owner: object = None,
+        name: str = "",
+        detector: Optional[LeakDetector] = None,
+        stack: Optional[traceback.StackSummary] = None,
+    ):
+        self.pool: Final[Pool] = pool
+        self.connection: Final[Connection] = conn
+        self.pinned: Final[bool] = pinned
+        self.released: bool = False
+        # owner 被回收时仍然没有释放的连接由 finalizer 关闭并归还，finalizer 不能引用 owner
+        self.__finalizer: Optional[weakref.finalize] = (
+            weakref.finalize(owner, self.__leaked, name or type(owner).__name__, detector, stack)
+            if owner is not None and not pinned
+            else None
+        )
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.connection!r} released={self.released}>"
+
+    def release(self, discard: bool = False):
+        """归还连接，重复调用时忽略
+
+        :param discard: 连接状态未知(如被取消时)，关闭连接后再归还，连接池会移除关闭的连接
+        """
+        if self.released:
+            return
+        self.released = True
+        if self.__finalizer is not None:
+            self.__finalizer.detach()
+        if self.pinned:
+            return
+        if discard:
+            self.connection.close()
+        self.pool.release(self.connection)
+
+    def __leaked(self, owner: str, detector: Optional[LeakDetector], stack: Optional[traceback.StackSummary]):
+        if self.released:
+            return
+        if detector is not None:
+            detector.leaked += 1
+        report_leak(owner, stack)
+        try:
+            self.release(discard=True)
+        except RuntimeError:
+            # 事件循环已经关闭
+            pass
@@ -0,0 +1,178 @@
+"""
+LOAD DATA LOCAL INFILE 流式导入
+
+把 Python 可迭代对象(或异步可迭代对象)中的行逐步编码为 TSV 格式，
+通过 LOCAL INFILE 协议直接发送给服务端，不需要生成临时文件。
+"""
+
+import asyncio
+import datetime
+from decimal import Decimal
+from typing import AsyncIterable, AsyncIterator, Final, Iterable, Sequence, Union
+
+from aiomysql import Cursor
+from aiomysql.connection import MAX_PACKET_LEN, MySQLResult
+from pymysql.constants import COMMAND
+from pymysql.constants.CR import CR_COMMANDS_OUT_OF_SYNC
+from pymysql.constants.ER import WRONG_VALUE_COUNT_ON_ROW
+from pymysql.err import DataError, OperationalError
+
+# 每次发送的数据块大小
+CHUNK_SIZE = 64 * 1024
+# 服务端会回传该文件名，客户端不会真正打开文件
+_INFILE_NAME = "asmysql_rows.tsv"
+
+# FIELDS TERMINATED BY '\t' ESCAPED BY '\\' LINES TERMINATED BY '\n' 格式下需要转义的字符
+_STR_ESCAPE = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+_BYTES_ESCAPE = ((b"\\", b"\\\\"), (b"\t", b"\\t"), (b"\n", b"\\n"), (b"\r", b"\\r"), (b"\0", b"\\0"))
+_NULL = b"\\N"
+
+
+def quote_identifier(name: str):
+    """使用反引号引用表名或列名，支持 db.table 形式"""
+    return ".".join(f"`{part.replace('`', '``')}`" for part in name.split("."))
+
+
+class RowSource:
+    """LOAD DATA 的数据来源: 目标表、列以及行数据(可迭代对象或异步可迭代对象)"""
+
+    __slots__ = ("table", "columns", "rows")
+
+    def __init__(self, table: str, columns: Sequence[str], rows: Union[Iterable[Sequence], AsyncIterable[Sequence]]):
+        if not columns:
+            raise ValueError("columns must not be empty")
+        self.table: Final[str] = table
+        self.columns: Final[tuple[str, ...]] = tuple(columns)
+        self.rows: Final[Union[Iterable[Sequence], AsyncIterable[Sequence]]] = rows
+
+    def query(self, charset: str):
+        """生成 LOAD DATA LOCAL INFILE 语句"""
+        return (
+            f"LOAD DATA LOCAL INFILE '{_INFILE_NAME}' INTO TABLE {quote_identifier(self.table)} "
+            f"CHARACTER SET {charset} "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({', '.join(quote_identifier(column) for column in self.columns)})"
+        )
+
+
+def _format_timedelta(value: datetime.timedelta):
+    sign = "-" if value < datetime.timedelta(0) else ""
+    value = abs(value)
+    seconds = value.days * 86400 + value.seconds
+    text = f"{sign}{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{text}.{value.microseconds:06d}" if value.microseconds else text
+
+
+def encode_value(value, encoding: str) -> bytes:
+    """把单个值编码为 TSV 字段"""
+    if value is None:
+        return _NULL
+    if isinstance(value, str):
+        return value.translate(_STR_ESCAPE).encode(encoding, "surrogateescape")
+    if isinstance(value, bool):
+        return b"1" if value else b"0"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value).encode()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        for char, escaped in _BYTES_ESCAPE:
+            data = data.replace(char, escaped)
+        return data
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ").encode()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat().encode()
+    if isinstance(value, datetime.timedelta):
+        return _format_timedelta(value).encode()
+    return str(value).translate(_STR_ESCAPE).encode(encoding, "surrogateescape")
+
+
+def encode_row(row: Sequence, encoding: str) -> bytes:
+    """把一行编码为 TSV 行"""
+    return b"\t".join([encode_value(value, encoding) for value in row]) + b"\n"
+
+
+async def _iterate(rows: Union[Iterable[Sequence], AsyncIterable[Sequence]]):
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            yield row
+    else:
+        for row in rows:
+            yield row
+
+
+async def encode_rows(
+    rows: Union[Iterable[Sequence], AsyncIterable[Sequence]],
+    encoding: str,
+    column_count: int,
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """逐行编码并按 chunk_size 分块输出，不会一次性物化全部数据"""
+    buffer = bytearray()
+    number = 0
+    async for row in _iterate(rows):
+        number += 1
+        if len(row) != column_count:
+            raise DataError(WRONG_VALUE_COUNT_ON_ROW, f"Column count doesn't match value count at row {number}")
+        buffer += encode_row(row, encoding)
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+class LoadRowsResult(MySQLResult):
+    """服务端请求本地文件时发送行数据，而不是读取文件"""
+
+    def __init__(self, connection, chunks: AsyncIterator[bytes]):
+        super().__init__(connection)
+        self.__chunks = chunks
+
+    async def _read_load_local_packet(self, first_packet):
+        conn = self.connection
+        try:
+            async for chunk in self.__chunks:
+                for i in range(0, len(chunk), MAX_PACKET_LEN):
+                    conn.write_packet(chunk[i : i + MAX_PACKET_LEN])
+                # noinspection PyProtectedMember
+                await conn._writer.drain()
+        except asyncio.CancelledError:
+            # noinspection PyProtectedMember
+            conn._close_on_cancel()
+            raise
+        except Exception:
+            # 空包是正常的文件结束标志，服务端会导入(自动提交时还会提交)已经发送的数据，
+            # 所以直接关闭连接，服务端回滚整条语句，连接归还时从连接池移除
+            conn.close()
+            raise
+        conn.write_packet(b"")
+        # noinspection PyProtectedMember
+        ok_packet = await conn._read_packet()
+        if not ok_packet.is_ok_packet():
+            raise OperationalError(CR_COMMANDS_OUT_OF_SYNC, "Commands Out of Sync")
+        self._read_ok_packet(ok_packet)
+
+
+async def load_rows(cursor: Cursor, query: str, source: RowSource):
+    """在游标所在连接上执行 LOAD DATA LOCAL INFILE，流式发送 source 中的行
+
+    :return: 导入的行数
+    """
+    conn = cursor.connection
+    while await cursor.nextset():
+        pass
+    # noinspection PyProtectedMember
+    cursor._clear_result()
+    # noinspection PyProtectedMember
+    await conn._execute_command(COMMAND.COM_QUERY, query.encode(conn.encoding, "surrogateescape"))
+    result = LoadRowsResult(conn, encode_rows(source.rows, conn.encoding, len(source.columns)))
+    await result.read()
+    # 与文本协议一样把结果挂到连接上，由游标读取
+    conn._result = result
+    conn._affected_rows = result.affected_rows
+    if result.server_status is not None:
+        conn.server_status = result.server_status
+    # noinspection PyProtectedMember
+    await cursor._do_get_result()
+    return cursor.rowcount
@@ -0,0 +1,186 @@
+"""
+按主键批量查找(DataLoader 模式)
+
+同一轮事件循环(或 window 秒)内的 load(key) 合并为一条 WHERE key IN (...) 查询，
+查询结果按键值分发给各个等待者，同一 Loader 内相同的键只查询一次。
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable, Final, Generic, Hashable, Iterable, Optional, Sequence, TypeVar, Union
+
+from .._row_factory import get_row_factory
+from ._load_data import quote_identifier
+
+if TYPE_CHECKING:
+    from ._engine import Engine
+    from ._routing import RoutingEngine
+
+T = TypeVar("T")
+
+
+class Loader(Generic[T]):
+    """合并同一时间窗口内的按键查找
+
+    用法(每个请求创建一个 Loader，缓存只在该请求内有效):
+        loader = engine.loader("users", "id", result_class=User)
+        users = await asyncio.gather(*(loader.load(user_id) for user_id in ids))  # 只执行一条 IN 查询
+        user = await loader.load(1)  # 不存在时返回 None
+
+    - 键值需要与查询返回的列值类型一致(如 int 主键使用 int 查找)。
+    - many=True 时键列不唯一，load() 返回该键的所有行(list)。
+    - 查询出错时等待该批次的 load() 抛出对应的 MySQLError，出错的键不缓存。
+    """
+
+    def __init__(
+        self,
+        engine: Union["Engine", "RoutingEngine"],
+        table: str,
+        key_column: str,
+        *,
+        columns: Sequence[str] = None,
+        result_class: type[T] = tuple,
+        many: bool = False,
+        window: float = 0,
+        max_batch_size: int = 1000,
+        cache: bool = True,
+    ):
+        """
+        :param engine: 执行查询的 Engine 或 RoutingEngine
+        :param table: table name, can be "db.table"
+        :param key_column: 查找使用的列
+        :param columns: 查询的列，为 None 时查询所有列
+        :param result_class: the class to use for the result
+        :param many: 键列不唯一，每个键返回多行
+        :param window: 合并查找的时间窗口(秒)，为0时合并同一轮事件循环内的查找
+        :param max_batch_size: 单条 IN 查询的最大键数量
+        :param cache: 是否缓存已查找的键
+        """
+        if columns and key_column.rsplit(".", 1)[-1] not in {column.rsplit(".", 1)[-1] for column in columns}:
+            raise ValueError(f"columns must include the key column {key_column!r}")
+        self.engine: Final = engine
+        self.table: Final[str] = table
+        self.key_column: Final[str] = key_column
+        self.result_class: Final[type[T]] = result_class
+        self.many: Final[bool] = many
+        self.window: Final[float] = window
+        self.max_batch_size: Final[int] = max(1, max_batch_size)
+        self.cache: Final[bool] = cache
+        self.__key_name: Final[str] = key_column.rsplit(".", 1)[-1]
+        select = ", ".join(quote_identifier(column) for column in columns) if columns else "*"
+        self.__query_prefix: Final[str] = (
+            f"SELECT {select} FROM {quote_identifier(table)} WHERE {quote_identifier(key_column)} IN "
+        )
+        self.__futures: dict[Hashable, asyncio.Future] = {}
+        self.__pending: dict[Hashable, asyncio.Future] = {}
+        self.__scheduled: bool = False
+        self.__tasks: Final[set[asyncio.Task]] = set()
+        self.__row_factory: Optional[Callable[[tuple], T]] = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.table}.{self.key_column}>"
+
+    def load(self, key: Hashable) -> "asyncio.Future[Union[Optional[T], list[T]]]":
+        """查找一个键，返回行(many=True 时为行列表)，不存在时返回 None(many=True 时为空列表)
+
+        同一个键的查找共用一个 future，每个调用者拿到的是它的 shield，
+        一个调用者被取消(如 asyncio.wait_for 超时)不会影响其他等待者，也不会使缓存失效。
+        """
+        future = self.__futures.get(key) if self.cache else None
+        if future is not None and not self.__usable(future):
+            del self.__futures[key]
+            future = None
+        if future is None:
+            future = self.__pending.get(key)
+            if future is not None and not self.__usable(future):
+                del self.__pending[key]
+                future = None
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.__pending[key] = future
+            if self.cache:
+                self.__futures[key] = future
+            self.__schedule()
+        return asyncio.shield(future)
+
+    @staticmethod
+    def __usable(future: asyncio.Future):
+        """被取消或查询失败的 future 不再使用"""
+        return not future.done() or (not future.cancelled() and future.exception() is None)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> list[Union[Optional[T], list[T]]]:
+        """查找多个键，按顺序返回结果"""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def clear(self, *keys: Hashable):
+        """清除指定键的缓存，不传键时清空所有缓存"""
+        if not keys:
+            self.__futures.clear()
+            return
+        for key in keys:
+            self.__futures.pop(key, None)
+
+    def __schedule(self):
+        if self.__scheduled:
+            return
+        self.__scheduled = True
+        loop = asyncio.get_running_loop()
+        if self.window > 0:
+            loop.call_later(self.window, self.__dispatch)
+        else:
+            loop.call_soon(self.__dispatch)
+
+    def __dispatch(self):
+        self.__scheduled = False
+        pending, self.__pending = self.__pending, {}
+        # 不查询已经完成(被取消)的 future
+        keys = [key for key, future in pending.items() if not future.done()]
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start : start + self.max_batch_size]}
+            task = asyncio.ensure_future(self.__load_batch(batch))
+            self.__tasks.add(task)
+            task.add_done_callback(self.__tasks.discard)
+
+    async def __load_batch(self, batch: dict[Hashable, asyncio.Future]):
+        keys = tuple(batch)
+        query = self.__query_prefix + f"({', '.join(['%s'] * len(keys))})"
+        try:
+            result = await self.engine.execute(query, keys, result_class=tuple)
+            if result.error:
+                raise result.error
+            columns = result.columns
+            rows = await result.fetch_all()
+        except BaseException as err:
+            for key, future in batch.items():
+                if self.__futures.get(key) is future:
+                    del self.__futures[key]
+                if future.done():
+                    continue
+                if isinstance(err, Exception):
+                    future.set_exception(err)
+                else:
+                    future.cancel()
+            if not isinstance(err, Exception):
+                raise
+            return
+        found: dict[Any, Any] = {}
+        index = columns.index(self.__key_name)
+        convert = self.__converter(columns)
+        for row in rows:
+            key = row[index]
+            if self.many:
+                found.setdefault(key, []).append(convert(row))
+            elif key not in found:
+                found[key] = convert(row)
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(found.get(key, [] if self.many else None))
+
+    def __converter(self, columns: tuple[str, ...]) -> Callable[[tuple], Any]:
+        """返回把 tuple 行转换为 result_class 的函数"""
+        if self.result_class is dict:
+            return lambda row: dict(zip(columns, row))
+        if self.result_class is tuple:
+            return tuple
+        if self.__row_factory is None:
+            self.__row_factory = get_row_factory(self.result_class, columns)
+        return self.__row_factory
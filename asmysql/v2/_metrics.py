@@ -0,0 +1,298 @@
+"""
+按语句指纹统计的耗时直方图
+
+Engine(collect_metrics=True) 时，每条语句按指纹(去掉字面量和参数的规范化SQL)记录:
+- acquire: 从连接池获取连接的等待时间(事务中的语句不获取连接，不记录)
+- execute: 发送语句到收到响应(包括提交)的时间
+- fetch: 语句执行完成到结果关闭(归还连接)的时间，即读取结果占用连接的时间
+- rows: 读取的行数
+连接池的获取等待时间还会汇总到 pool 中。
+
+直方图使用 HDR 风格的对数线性分桶: 每个2的幂区间分为 2**SUB_BITS 个等宽的桶，
+相对误差不超过 1/2**(SUB_BITS-1)，记录一个值只需要几次整数运算，内存占用只与数值范围有关。
+统计结果可以导出为 dict(snapshot)或 Prometheus/OpenMetrics 文本(openmetrics)，不依赖第三方库。
+"""
+
+import re
+from functools import lru_cache
+from typing import Final, Optional
+
+from ._cache import normalize_query
+
+# 每个2的幂区间的分桶数量为 2**SUB_BITS(相对误差 < 6.25%)
+SUB_BITS: Final[int] = 5
+_SUB_COUNT: Final[int] = 1 << SUB_BITS
+NS_PER_SECOND: Final[int] = 1_000_000_000
+# 超过该数量的指纹统一记录到 OTHER_STATEMENTS
+DEFAULT_MAX_STATEMENTS: Final[int] = 1000
+OTHER_STATEMENTS: Final[str] = "<other>"
+# 导出 OpenMetrics 时使用的累计分桶上限
+TIME_BUCKETS: Final[tuple[float, ...]] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+ROW_BUCKETS: Final[tuple[float, ...]] = (0.0, 1.0, 10.0, 100.0, 1000.0, 10000.0, 100000.0, 1000000.0)
+# snapshot 中导出的分位数
+QUANTILES: Final[dict[str, float]] = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+
+# 字面量: 字符串、数字、十六进制、占位符(%s, %(name)s, ?)
+_LITERAL_RE = re.compile(
+    r"'(?:[^'\\]|\\.|'')*'"
+    r"|\"(?:[^\"\\]|\\.|\"\")*\""
+    r"|(`[^`]*`)"
+    r"|\b0x[0-9a-f]+\b"
+    r"|(?<![\w$.])-?\d+(?:\.\d*)?(?:e[+-]?\d+)?\b"
+    r"|%\(\w+\)s|%s|\?",
+    re.I | re.S,
+)
+# IN (?, ?, ...) 和 VALUES (?, ?), (?, ?) 合并为一个
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    """语句指纹: 规范化空白，字面量和参数替换为 ?，IN 列表和多行 VALUES 合并为 (...)"""
+    query = _LITERAL_RE.sub(lambda match: match[1] or "?", normalize_query(query))
+    return _LIST_RE.sub("(...)", query)
+
+
+def bucket_index(value: int) -> int:
+    """值所在的桶: 小于 2**SUB_BITS 的值每个值一个桶，更大的值保留最高的 SUB_BITS 个二进制位"""
+    if value < _SUB_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BITS
+    return (shift << SUB_BITS) + (value >> shift)
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """桶包含的值范围 [low, high]"""
+    shift, sub = divmod(index, _SUB_COUNT)
+    if shift == 0:
+        return index, index
+    return sub << shift, ((sub + 1) << shift) - 1
+
+
+class Histogram:
+    """对数线性分桶的直方图，记录非负整数(时间以纳秒记录)"""
+
+    __slots__ = ("scale", "count", "sum", "min", "max", "__buckets")
+
+    def __init__(self, scale: int = 1):
+        """
+        :param scale: 导出时数值除以的倍数(纳秒转为秒时为 1e9)
+        """
+        self.scale: Final[int] = scale
+        self.count: int = 0
+        self.sum: int = 0
+        self.min: int = 0
+        self.max: int = 0
+        self.__buckets: dict[int, int] = {}
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} count={self.count}>"
+
+    def record(self, value: int):
+        """记录一个值(负数按0记录)"""
+        if value < 0:
+            value = 0
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.sum += value
+        index = value if value < _SUB_COUNT else bucket_index(value)
+        self.__buckets[index] = self.__buckets.get(index, 0) + 1
+
+    def percentile(self, q: float) -> int:
+        """分位数(0~1)，返回所在桶的上界(不超过最大值)，没有记录时返回0"""
+        if not self.count:
+            return 0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index in sorted(self.__buckets):
+            seen += self.__buckets[index]
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def cumulative(self, bounds: tuple[float, ...]) -> list[int]:
+        """按导出单位的上限累计计数，用于 OpenMetrics 的 le 分桶(按桶上界比较，误差不超过桶宽)"""
+        buckets = sorted(
+            (min(bucket_bounds(index)[1], self.max) / self.scale, count) for index, count in self.__buckets.items()
+        )
+        counts = []
+        seen = 0
+        i = 0
+        for bound in bounds:
+            while i < len(buckets) and buckets[i][0] <= bound:
+                seen += buckets[i][1]
+                i += 1
+            counts.append(seen)
+        return counts
+
+    def snapshot(self) -> dict:
+        """导出统计值(已按 scale 换算)"""
+        scale = self.scale
+        return {
+            "count": self.count,
+            "sum": self.sum / scale,
+            "min": self.min / scale,
+            "max": self.max / scale,
+            "mean": self.sum / scale / self.count if self.count else 0.0,
+            **{name: self.percentile(q) / scale for name, q in QUANTILES.items()},
+        }
+
+
+class StatementMetrics:
+    """一类语句(同一指纹)的统计"""
+
+    __slots__ = ("fingerprint", "calls", "errors", "acquire", "execute", "fetch", "rows", "__pool_acquire")
+
+    def __init__(self, fingerprint_: str, pool_acquire: Histogram):
+        self.fingerprint: Final[str] = fingerprint_
+        self.calls: int = 0
+        self.errors: int = 0
+        self.acquire: Final[Histogram] = Histogram(NS_PER_SECOND)
+        self.execute: Final[Histogram] = Histogram(NS_PER_SECOND)
+        self.fetch: Final[Histogram] = Histogram(NS_PER_SECOND)
+        self.rows: Final[Histogram] = Histogram()
+        self.__pool_acquire: Final[Histogram] = pool_acquire
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.fingerprint}>"
+
+    def record_acquire(self, elapsed_ns: int):
+        self.acquire.record(elapsed_ns)
+        self.__pool_acquire.record(elapsed_ns)
+
+    def record_execute(self, elapsed_ns: int):
+        self.calls += 1
+        self.execute.record(elapsed_ns)
+
+    def record_error(self):
+        self.calls += 1
+        self.errors += 1
+
+    def record_fetch(self, elapsed_ns: int, rows: int):
+        self.fetch.record(elapsed_ns)
+        self.rows.record(rows)
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "acquire": self.acquire.snapshot(),
+            "execute": self.execute.snapshot(),
+            "fetch": self.fetch.snapshot(),
+            "rows": self.rows.snapshot(),
+        }
+
+
+class EngineMetrics:
+    """Engine 的语句统计
+
+    用法:
+        engine = Engine(url, collect_metrics=True)
+        engine.metrics.snapshot()  # {"pool": {...}, "statements": {指纹: {...}}}
+        engine.metrics.openmetrics()  # Prometheus/OpenMetrics 文本格式
+
+    - 缓存命中和 Pipeline 中的语句不经过连接池单独执行，不记录。
+    - 指纹数量超过 max_statements 后，新的指纹统一记录到 "<other>"。
+    """
+
+    def __init__(self, max_statements: int = DEFAULT_MAX_STATEMENTS):
+        self.max_statements: Final[int] = max_statements
+        self.pool_acquire: Histogram = Histogram(NS_PER_SECOND)
+        self.__statements: dict[str, StatementMetrics] = {}
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} statements={len(self.__statements)}>"
+
+    def __len__(self):
+        return len(self.__statements)
+
+    def statement(self, query: str) -> StatementMetrics:
+        """语句所属指纹的统计，不存在时创建"""
+        key = fingerprint(query)
+        metrics = self.__statements.get(key)
+        if metrics is None:
+            if len(self.__statements) >= self.max_statements:
+                key = OTHER_STATEMENTS
+                metrics = self.__statements.get(key)
+            if metrics is None:
+                metrics = self.__statements[key] = StatementMetrics(key, self.pool_acquire)
+        return metrics
+
+    def reset(self):
+        """清空所有统计"""
+        self.pool_acquire = Histogram(NS_PER_SECOND)
+        self.__statements = {}
+
+    def snapshot(self) -> dict:
+        """导出所有统计，时间单位为秒"""
+        return {
+            "pool": {"acquire": self.pool_acquire.snapshot()},
+            "statements": {key: metrics.snapshot() for key, metrics in self.__statements.items()},
+        }
+
+    def openmetrics(self, prefix: str = "asmysql") -> str:
+        """导出为 OpenMetrics 文本格式(兼容 Prometheus)，以 # EOF 结尾"""
+        statements = list(self.__statements.values())
+        lines: list[str] = []
+        _histogram(lines, f"{prefix}_pool_acquire_seconds", "seconds", TIME_BUCKETS, [("", self.pool_acquire)])
+        lines.append(f"# TYPE {prefix}_statement_calls counter")
+        lines += [f"{prefix}_statement_calls_total{_labels(m.fingerprint)} {m.calls}" for m in statements]
+        lines.append(f"# TYPE {prefix}_statement_errors counter")
+        lines += [f"{prefix}_statement_errors_total{_labels(m.fingerprint)} {m.errors}" for m in statements]
+        for name, unit, bounds in (
+            ("acquire", "seconds", TIME_BUCKETS),
+            ("execute", "seconds", TIME_BUCKETS),
+            ("fetch", "seconds", TIME_BUCKETS),
+            ("rows", "", ROW_BUCKETS),
+        ):
+            metric = f"{prefix}_statement_{name}_{unit}" if unit else f"{prefix}_statement_{name}"
+            _histogram(lines, metric, unit, bounds, [(m.fingerprint, getattr(m, name)) for m in statements])
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(statement: Optional[str], **extra: str) -> str:
+    labels = {"statement": statement, **extra} if statement else extra
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
+
+
+def _histogram(lines: list[str], metric: str, unit: str, bounds: tuple, series: list[tuple[str, Histogram]]):
+    lines.append(f"# TYPE {metric} histogram")
+    if unit:
+        lines.append(f"# UNIT {metric} {unit}")
+    for statement, histogram in series:
+        for bound, count in zip(bounds, histogram.cumulative(bounds)):
+            lines.append(f"{metric}_bucket{_labels(statement, le=_number(bound))} {count}")
+        lines.append(f"{metric}_bucket{_labels(statement, le='+Inf')} {histogram.count}")
+        lines.append(f"{metric}_count{_labels(statement)} {histogram.count}")
+        lines.append(f"{metric}_sum{_labels(statement)} {_number(histogram.sum / histogram.scale)}")
@@ -0,0 +1,228 @@
+"""
+在单个连接上批量执行多条语句
+
+排队的语句拼接为一条多语句 COM_QUERY，与开启/关闭多语句的 COM_SET_OPTION 一起连续写入后再读取响应，
+N 条语句只需要一次网络往返，各个结果集按顺序分发到对应的 Result(结果已全部读取，不占用连接)。
+多语句只在本次请求中开启，归还到连接池的连接不会保留该选项。
+"""
+
+import asyncio
+import string
+import struct
+from typing import Final, Optional, Sequence, TypeVar, Union
+
+from aiomysql import Connection, Pool
+from pymysql.constants import COMMAND
+from pymysql.err import MySQLError
+
+from .._row_factory import field_keys
+from ._bulk import DEFAULT_MAX_STMT_LENGTH
+from ._cache import QueryCache, write_tables
+from ._prepared import _send_command
+from ._result import Result
+
+# 定义类型变量
+T = TypeVar("T")
+
+# COM_SET_OPTION 的参数
+MULTI_STATEMENTS_ON = 0
+MULTI_STATEMENTS_OFF = 1
+
+# 语句执行的结果: (行, 列描述, 受影响行数, 最后插入ID)
+_Outcome = tuple[tuple, Optional[tuple], int, Optional[int]]
+
+
+class Pipeline:
+    """在单个连接上一次往返执行多条语句
+
+    用法:
+        async with engine.pipeline() as pipe:
+            pending = [pipe.execute("SELECT * FROM users WHERE id = %s", (i,)) for i in ids]
+        results = [await result for result in pending]
+        users = [await result.fetch_one() for result in results]
+
+    - execute() 只排队不发送，退出 async with、调用 run() 或 await 任意一个排队的 Result 时发送所有排队的语句，
+      与 engine.execute() 一样，Result 需要 await 后才能读取数据(已发送的语句 await 时不再访问网络)。
+    - 语句按顺序执行，某条语句出错时后面的语句不会执行，它们的 Result 返回同一个错误。
+    - 结果一次性读取到内存(不支持 stream)，适合大量小查询(如按主键的多次查找)。
+    - 语句总长度超过 max_stmt_length 时拆分为多次请求。
+    """
+
+    def __init__(
+        self,
+        *,
+        pool: Pool,
+        result_class: type = tuple,
+        commit: bool = True,
+        max_stmt_length: int = DEFAULT_MAX_STMT_LENGTH,
+        cache: QueryCache = None,
+    ):
+        self.pool: Final[Pool] = pool
+        self.result_class: Final[type] = result_class
+        self.commit: Final[bool] = commit
+        self.max_stmt_length: Final[int] = max_stmt_length
+        # 查询缓存，执行成功的写语句使相关表的缓存失效
+        self.cache: Final[Optional[QueryCache]] = cache
+        self.__pending: list[Result] = []
+        self.__outcomes: dict[Result, Union[_Outcome, MySQLError]] = {}
+        self.__lock: Final[asyncio.Lock] = asyncio.Lock()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} pending={len(self.__pending)}>"
+
+    def __len__(self):
+        """排队中的语句数量"""
+        return len(self.__pending)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_tb):
+        if exc_type is None:
+            await self.run()
+        else:
+            self.__pending.clear()
+
+    def execute(self, query: str, values: Union[Sequence, dict] = None, *, result_class: type[T] = None) -> Result[T]:
+        """排队一条语句，返回的 Result 在发送后可以读取
+
+        :param query: SQL语句
+        :param values: 参数
+        :param result_class: the class to use for the result
+        """
+        result = Result(
+            pool=self.pool,
+            query=query,
+            values=values,
+            commit=self.commit,
+            result_class=result_class if result_class is not None else self.result_class,
+            pipeline=self,
+        )
+        self.__pending.append(result)
+        return result
+
+    async def run(self):
+        """发送所有排队的语句并读取结果"""
+        async with self.__lock:
+            batch, self.__pending = self.__pending, []
+            if not batch:
+                return
+            conn = await self.pool.acquire()
+            try:
+                cursor = await conn.cursor()
+                # 去掉语句末尾的 ;，否则拼接后产生空语句(1065 Query was empty)
+                statements = [
+                    cursor.mogrify(result.query, result.values).rstrip(string.whitespace + ";") for result in batch
+                ]
+                await cursor.close()
+                for chunk in self.__chunks(statements):
+                    outcomes = await self.__execute(conn, [statements[i] for i in chunk])
+                    for i, outcome in zip(chunk, outcomes):
+                        self.__outcomes[batch[i]] = outcome
+                if self.commit and not conn.get_autocommit():
+                    await conn.commit()
+            except MySQLError as err:
+                # 连接状态不确定，关闭连接，未返回结果的语句使用该错误
+                conn.close()
+                for result in batch:
+                    self.__outcomes.setdefault(result, err)
+            except BaseException:
+                # 被取消或编码参数失败
+                conn.close()
+                raise
+            finally:
+                self.pool.release(conn)
+            self.__invalidate_cache(batch)
+
+    def __chunks(self, statements: list[str]):
+        """按 max_stmt_length 拆分，返回每次请求包含的语句下标"""
+        chunk: list[int] = []
+        length = 0
+        for i, statement in enumerate(statements):
+            if chunk and length + len(statement) + 3 > self.max_stmt_length:
+                yield chunk
+                chunk, length = [], 0
+            chunk.append(i)
+            length += len(statement) + 3
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    async def __execute(conn: Connection, statements: list[str]) -> list[Union[_Outcome, MySQLError]]:
+        """连续写入 开启多语句/多语句查询/关闭多语句 三个命令，再依次读取响应"""
+        await _send_command(conn, COMMAND.COM_SET_OPTION, struct.pack("<H", MULTI_STATEMENTS_ON))
+        # ; 前换行，语句末尾的 -- 或 # 注释不会注释掉分隔符
+        await _send_command(conn, COMMAND.COM_QUERY, "\n;\n".join(statements).encode(conn.encoding))
+        await _send_command(conn, COMMAND.COM_SET_OPTION, struct.pack("<H", MULTI_STATEMENTS_OFF))
+        outcomes: list[Union[_Outcome, MySQLError]] = []
+        error: Optional[MySQLError] = None
+        # 每个命令的响应序号都从1开始，连续写入后需要在读取每个响应前重置
+        # noinspection PyProtectedMember
+        conn._next_seq_id = 1
+        try:
+            # noinspection PyProtectedMember
+            await conn._read_packet()
+        except MySQLError as err:
+            error = err
+        # noinspection PyProtectedMember
+        conn._next_seq_id = 1
+        try:
+            # noinspection PyProtectedMember
+            await conn._read_query_result()
+            # noinspection PyProtectedMember
+            result = conn._result
+            while True:
+                outcomes.append(_outcome(result))
+                if not result.has_next:
+                    break
+                await conn.next_result()
+                # noinspection PyProtectedMember
+                result = conn._result
+        except MySQLError as err:
+            error = error or err
+        # noinspection PyProtectedMember
+        conn._next_seq_id = 1
+        # noinspection PyProtectedMember
+        await conn._read_packet()
+        if error is not None:
+            outcomes += [error] * (len(statements) - len(outcomes))
+        return outcomes
+
+    def __invalidate_cache(self, batch: list[Result]):
+        if not self.cache:
+            return
+        tags: set[str] = set()
+        for result in batch:
+            if isinstance(self.__outcomes.get(result), MySQLError):
+                continue
+            tables = write_tables(result.query)
+            if tables is None:
+                self.cache.invalidate()
+                return
+            tags |= tables
+        if tags:
+            self.cache.invalidate(tags)
+
+    async def outcome(self, result: Result) -> _Outcome:
+        """返回语句的执行结果，语句还在排队时先发送所有排队的语句
+
+        :raise MySQLError: 语句执行失败
+        """
+        if result not in self.__outcomes:
+            await self.run()
+        outcome = self.__outcomes.pop(result, None)
+        if outcome is None:
+            raise RuntimeError(f"{result!r} was not executed by the pipeline") from None
+        if isinstance(outcome, MySQLError):
+            raise outcome
+        return outcome
+
+
+def _outcome(result) -> _Outcome:
+    """从 aiomysql 的 MySQLResult 取出结果，列描述使用与 DictCursor 一致的列名"""
+    fields = getattr(result, "fields", None)
+    if not fields:
+        return (), None, result.affected_rows, result.insert_id
+    keys = field_keys(fields)
+    description = tuple((key, *column[1:]) for key, column in zip(keys, result.description))
+    return result.rows, description, result.affected_rows, result.insert_id
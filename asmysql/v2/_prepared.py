@@ -0,0 +1,529 @@
+"""
+服务端预处理语句(二进制协议)
+
+COM_STMT_PREPARE / COM_STMT_EXECUTE / COM_STMT_CLOSE 的实现，
+每个连接按SQL文本缓存预处理语句句柄(LRU)，参数以二进制格式发送，不需要在Python端转义。
+"""
+
+import datetime
+import re
+import struct
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Final, Optional, Sequence, Union
+
+from aiomysql import Connection, Cursor, DictCursor
+from aiomysql.log import logger
+from pymysql.connections import TEXT_TYPES, EOFPacketWrapper, FieldDescriptorPacket, OKPacketWrapper
+from pymysql.constants import COMMAND, FIELD_TYPE, FLAG
+from pymysql.constants.ER import UNKNOWN_STMT_HANDLER, UNSUPPORTED_PS
+from pymysql.converters import through
+from pymysql.err import OperationalError, ProgrammingError
+
+# ER_MAX_PREPARED_STMT_COUNT_REACHED: 超过服务端 max_prepared_stmt_count
+MAX_PREPARED_STMT_COUNT_REACHED = 1461
+
+# 匹配 pymysql 风格的参数占位符: %s, %(name)s, 以及转义的 %%
+_PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s|%s|%%")
+
+# 可以使用二进制协议发送的参数类型，其他类型(如用于 IN 语句的 tuple/list)回退到文本协议
+_BINARY_PARAM_TYPES = (
+    type(None),
+    bool,
+    int,
+    float,
+    Decimal,
+    str,
+    bytes,
+    bytearray,
+    datetime.datetime,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+)
+
+_INT_TYPES: Final = {
+    FIELD_TYPE.TINY: ("<b", "<B"),
+    FIELD_TYPE.SHORT: ("<h", "<H"),
+    FIELD_TYPE.YEAR: ("<h", "<H"),
+    FIELD_TYPE.INT24: ("<i", "<I"),
+    FIELD_TYPE.LONG: ("<i", "<I"),
+    FIELD_TYPE.LONGLONG: ("<q", "<Q"),
+}
+_DATE_TYPES: Final = (FIELD_TYPE.DATE, FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP)
+
+
+def _lenenc_int(i: int) -> bytes:
+    if i < 0xFB:
+        return bytes([i])
+    elif i < (1 << 16):
+        return b"\xfc" + struct.pack("<H", i)
+    elif i < (1 << 24):
+        return b"\xfd" + struct.pack("<I", i)[:3]
+    return b"\xfe" + struct.pack("<Q", i)
+
+
+def _lenenc_bytes(data: bytes) -> bytes:
+    return _lenenc_int(len(data)) + data
+
+
+def convert_query(query: str, values: Union[Sequence, dict, None]):
+    """把 pymysql 风格的SQL转换为预处理语句格式
+
+    :return: (预处理SQL, 按位置排列的参数)，无法转换时返回 None(回退到文本协议)
+    """
+    if values is None:
+        # 没有参数时 pymysql 不会做 % 格式化，SQL原样发送
+        return query, ()
+    names: list[Optional[str]] = []
+
+    def _replace(match: re.Match):
+        if match.group(0) == "%%":
+            return "%"
+        names.append(match.group(1))
+        return "?"
+
+    sql = _PLACEHOLDER_RE.sub(_replace, query)
+    if isinstance(values, dict):
+        if not all(names) or not all(name in values for name in names):
+            return None
+        params = tuple(values[name] for name in names)
+    elif isinstance(values, (tuple, list)):
+        if any(names) or len(names) != len(values):
+            return None
+        params = tuple(values)
+    else:
+        return None
+    if not all(isinstance(param, _BINARY_PARAM_TYPES) for param in params):
+        return None
+    return sql, params
+
+
+def _encode_param(value, encoding: str):
+    """编码一个参数，返回 (类型, 是否无符号, 数据)"""
+    if isinstance(value, bool):
+        return FIELD_TYPE.TINY, False, struct.pack("<b", int(value))
+    if isinstance(value, int):
+        if -(1 << 63) <= value < (1 << 63):
+            return FIELD_TYPE.LONGLONG, False, struct.pack("<q", value)
+        if 0 <= value < (1 << 64):
+            return FIELD_TYPE.LONGLONG, True, struct.pack("<Q", value)
+        return FIELD_TYPE.NEWDECIMAL, False, _lenenc_bytes(str(value).encode("ascii"))
+    if isinstance(value, float):
+        return FIELD_TYPE.DOUBLE, False, struct.pack("<d", value)
+    if isinstance(value, Decimal):
+        return FIELD_TYPE.NEWDECIMAL, False, _lenenc_bytes(str(value).encode("ascii"))
+    if isinstance(value, str):
+        return FIELD_TYPE.VAR_STRING, False, _lenenc_bytes(value.encode(encoding))
+    if isinstance(value, (bytes, bytearray)):
+        return FIELD_TYPE.BLOB, False, _lenenc_bytes(bytes(value))
+    if isinstance(value, datetime.datetime):
+        data = struct.pack("<HBBBBB", value.year, value.month, value.day, value.hour, value.minute, value.second)
+        if value.microsecond:
+            data += struct.pack("<I", value.microsecond)
+        return FIELD_TYPE.DATETIME, False, bytes([len(data)]) + data
+    if isinstance(value, datetime.date):
+        return FIELD_TYPE.DATE, False, b"\x04" + struct.pack("<HBB", value.year, value.month, value.day)
+    if isinstance(value, datetime.time):
+        value = datetime.timedelta(
+            hours=value.hour, minutes=value.minute, seconds=value.second, microseconds=value.microsecond
+        )
+    if isinstance(value, datetime.timedelta):
+        negative = value < datetime.timedelta(0)
+        value = abs(value)
+        hours, remainder = divmod(value.seconds, 3600)
+        minutes, seconds = divmod(remainder, 60)
+        data = struct.pack("<BIBBB", negative, value.days, hours, minutes, seconds)
+        if value.microseconds:
+            data += struct.pack("<I", value.microseconds)
+        return FIELD_TYPE.TIME, False, bytes([len(data)]) + data
+    raise ProgrammingError(f"Unsupported prepared statement parameter type: {type(value)}")
+
+
+def _encode_execute(stmt_id: int, params: Sequence, encoding: str) -> bytes:
+    """构造 COM_STMT_EXECUTE 的数据部分(不包含命令字节)"""
+    # flags=CURSOR_TYPE_NO_CURSOR, iteration_count=1
+    data = bytearray(struct.pack("<IBI", stmt_id, 0, 1))
+    if not params:
+        return bytes(data)
+    null_bitmap = bytearray((len(params) + 7) // 8)
+    types = bytearray()
+    values = bytearray()
+    for i, param in enumerate(params):
+        if param is None:
+            null_bitmap[i // 8] |= 1 << (i % 8)
+            types += struct.pack("<BB", FIELD_TYPE.NULL, 0)
+            continue
+        field_type, unsigned, value = _encode_param(param, encoding)
+        types += struct.pack("<BB", field_type, 0x80 if unsigned else 0)
+        values += value
+    # new_params_bound_flag=1，每次都发送参数类型
+    data += null_bitmap + b"\x01" + types + values
+    return bytes(data)
+
+
+def _zero_date(field_type: int):
+    """与文本协议保持一致，无效日期原样返回字符串"""
+    if field_type == FIELD_TYPE.DATE:
+        return "0000-00-00"
+    return "0000-00-00 00:00:00"
+
+
+def _read_date(packet, field_type: int):
+    length = packet.read_uint8()
+    if length == 0:
+        return _zero_date(field_type)
+    year, month, day = packet.read_struct("<HBB")
+    hour = minute = second = microsecond = 0
+    if length >= 7:
+        hour, minute, second = packet.read_struct("<BBB")
+    if length >= 11:
+        microsecond = packet.read_uint32()
+    try:
+        if field_type == FIELD_TYPE.DATE:
+            return datetime.date(year, month, day)
+        return datetime.datetime(year, month, day, hour, minute, second, microsecond)
+    except ValueError:
+        if field_type == FIELD_TYPE.DATE:
+            return f"{year:04d}-{month:02d}-{day:02d}"
+        return f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:{second:02d}"
+
+
+def _read_time(packet):
+    length = packet.read_uint8()
+    if length == 0:
+        return datetime.timedelta(0)
+    negative, days, hours, minutes, seconds = packet.read_struct("<BIBBB")
+    microseconds = packet.read_uint32() if length >= 12 else 0
+    value = datetime.timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds, microseconds=microseconds)
+    return -value if negative else value
+
+
+class _BinaryColumn:
+    """二进制结果集中单列的解码器"""
+
+    __slots__ = ("field", "encoding", "converter")
+
+    def __init__(self, field: FieldDescriptorPacket, conn: Connection):
+        self.field = field
+        self.encoding = None
+        self.converter = None
+        field_type = field.type_code
+        if field_type in _INT_TYPES or field_type in _DATE_TYPES:
+            return
+        if field_type in (FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.TIME):
+            return
+        # 其余类型以字符串形式传输，解码方式与文本协议保持一致
+        if conn.use_unicode:
+            if field_type == FIELD_TYPE.JSON:
+                self.encoding = conn.encoding
+            elif field_type in TEXT_TYPES:
+                self.encoding = None if field.charsetnr == 63 else conn.encoding
+            else:
+                self.encoding = "ascii"
+        converter = conn.decoders.get(field_type)
+        if converter is not through:
+            self.converter = converter
+
+    def read(self, packet):
+        field_type = self.field.type_code
+        if field_type in _INT_TYPES:
+            signed, unsigned = _INT_TYPES[field_type]
+            return packet.read_struct(unsigned if self.field.flags & FLAG.UNSIGNED else signed)[0]
+        if field_type == FIELD_TYPE.DOUBLE:
+            return packet.read_struct("<d")[0]
+        if field_type == FIELD_TYPE.FLOAT:
+            return packet.read_struct("<f")[0]
+        if field_type in _DATE_TYPES:
+            return _read_date(packet, field_type)
+        if field_type == FIELD_TYPE.TIME:
+            return _read_time(packet)
+        data = packet.read_length_coded_string()
+        if self.encoding is not None:
+            data = data.decode(self.encoding)
+        if self.converter is not None:
+            data = self.converter(data)
+        return data
+
+
+class PreparedStatement:
+    """服务端预处理语句句柄"""
+
+    __slots__ = ("stmt_id", "sql", "param_count", "column_count")
+
+    def __init__(self, stmt_id: int, sql: str, param_count: int, column_count: int):
+        self.stmt_id: Final[int] = stmt_id
+        self.sql: Final[str] = sql
+        self.param_count: Final[int] = param_count
+        self.column_count: Final[int] = column_count
+
+
+class PreparedResult:
+    """二进制协议的结果，属性与 aiomysql 的 MySQLResult 保持一致，供游标读取"""
+
+    def __init__(self):
+        self.affected_rows = None
+        self.insert_id = None
+        self.server_status = None
+        self.warning_count = 0
+        self.message = None
+        self.field_count = 0
+        self.fields = []
+        self.description = None
+        self.rows = None
+        self.has_next = False
+        self.unbuffered_active = False
+
+    def _read_ok_packet(self, packet):
+        ok_packet = OKPacketWrapper(packet)
+        self.affected_rows = ok_packet.affected_rows
+        self.insert_id = ok_packet.insert_id
+        self.server_status = ok_packet.server_status
+        self.warning_count = ok_packet.warning_count
+        self.message = ok_packet.message
+        self.has_next = ok_packet.has_next
+
+    def _read_eof_packet(self, packet):
+        eof_packet = EOFPacketWrapper(packet)
+        self.warning_count = eof_packet.warning_count
+        self.server_status = eof_packet.server_status
+        self.has_next = eof_packet.has_next
+
+    async def read(self, conn: Connection):
+        first_packet = await conn._read_packet()
+        if first_packet.is_ok_packet():
+            self._read_ok_packet(first_packet)
+            return
+        self.field_count = first_packet.read_length_encoded_integer()
+        columns = []
+        for _ in range(self.field_count):
+            field = await conn._read_packet(FieldDescriptorPacket)
+            self.fields.append(field)
+            columns.append(_BinaryColumn(field, conn))
+        eof_packet = await conn._read_packet()
+        assert eof_packet.is_eof_packet(), "Protocol error, expecting EOF"
+        self.description = tuple(field.description() for field in self.fields)
+
+        null_bitmap_size = (self.field_count + 7 + 2) // 8
+        rows = []
+        while True:
+            packet = await conn._read_packet()
+            if packet.is_eof_packet():
+                self._read_eof_packet(packet)
+                break
+            # 行数据: 0x00 头部 + NULL位图(偏移2位) + 非NULL列的值
+            packet.advance(1)
+            null_bitmap = packet.read(null_bitmap_size)
+            row = []
+            for i, column in enumerate(columns):
+                bit = i + 2
+                if null_bitmap[bit // 8] & (1 << (bit % 8)):
+                    row.append(None)
+                else:
+                    row.append(column.read(packet))
+            rows.append(tuple(row))
+        self.affected_rows = len(rows)
+        self.rows = tuple(rows)
+
+
+class StatementCache:
+    """单个连接上的预处理语句LRU缓存，按SQL文本索引
+
+    max_size 为0时不缓存: 每次执行都重新预处理，上一个语句句柄在下一次预处理前关闭
+    """
+
+    def __init__(self, max_size: int, thread_id: Optional[int]):
+        self.max_size: int = max(0, max_size)
+        self.thread_id: Final[Optional[int]] = thread_id
+        self.statements: OrderedDict[str, PreparedStatement] = OrderedDict()
+        # 服务端不支持预处理的语句，直接使用文本协议
+        self.unsupported: set[str] = set()
+
+    def __len__(self):
+        return len(self.statements)
+
+    @classmethod
+    def of(cls, conn: Connection, max_size: int):
+        """获取连接上的缓存，连接重连(服务端线程ID变化)后句柄失效，重新创建"""
+        thread_id = conn.server_thread_id[0] if conn.server_thread_id else None
+        cache: Optional[StatementCache] = getattr(conn, "_asmysql_stmt_cache", None)
+        if cache is None or cache.thread_id != thread_id:
+            cache = cls(max_size, thread_id)
+            conn._asmysql_stmt_cache = cache
+        cache.max_size = max(0, max_size)
+        return cache
+
+    def get(self, sql: str):
+        if not self.max_size:
+            return None
+        stmt = self.statements.get(sql)
+        if stmt is not None:
+            self.statements.move_to_end(sql)
+        return stmt
+
+    def put(self, stmt: PreparedStatement):
+        self.statements[stmt.sql] = stmt
+
+    def pop(self, sql: str):
+        return self.statements.pop(sql, None)
+
+    def evict(self, count: int = None):
+        """按LRU顺序淘汰语句句柄，返回被淘汰的句柄(需要发送 COM_STMT_CLOSE)
+
+        :param count: 淘汰数量，默认淘汰到不超过 max_size
+        """
+        if count is None:
+            count = len(self.statements) - self.max_size
+        evicted = []
+        while self.statements and count > 0:
+            _, stmt = self.statements.popitem(last=False)
+            evicted.append(stmt)
+            count -= 1
+        return evicted
+
+
+async def _send_command(conn: Connection, command: int, data: bytes):
+    # noinspection PyProtectedMember
+    await conn._execute_command(command, data)
+
+
+async def close_statement(conn: Connection, stmt: PreparedStatement):
+    """发送 COM_STMT_CLOSE，服务端不会返回响应"""
+    await _send_command(conn, COMMAND.COM_STMT_CLOSE, struct.pack("<I", stmt.stmt_id))
+
+
+async def prepare_statement(conn: Connection, sql: str):
+    """发送 COM_STMT_PREPARE 并读取语句句柄"""
+    await _send_command(conn, COMMAND.COM_STMT_PREPARE, sql.encode(conn.encoding))
+    # noinspection PyProtectedMember
+    packet = await conn._read_packet()
+    stmt_id, column_count, param_count = packet.read_struct("<xIHH")
+    # 参数和列的定义，这里不需要使用，执行时会重新返回列定义
+    for count in (param_count, column_count):
+        if count:
+            for _ in range(count):
+                await conn._read_packet()
+            await conn._read_packet()  # EOF
+    return PreparedStatement(stmt_id, sql, param_count, column_count)
+
+
+async def prime_statements(conn: Connection, queries: Sequence[str], *, cache_size: int = 128):
+    """预先在连接上预处理语句并放入缓存，之后使用 prepared 执行时不需要再 COM_STMT_PREPARE
+
+    :param queries: pymysql 风格的SQL(%s 或 %(name)s 占位符)
+    :param cache_size: 每个连接缓存的预处理语句数量
+    """
+    cache = StatementCache.of(conn, cache_size)
+    if not cache.max_size:
+        return
+    for query in queries:
+        sql = _PLACEHOLDER_RE.sub(lambda match: "%" if match.group(0) == "%%" else "?", query)
+        if cache.get(sql) is not None or sql in cache.unsupported:
+            continue
+        for stale in cache.evict(len(cache) - cache.max_size + 1):
+            await close_statement(conn, stale)
+        try:
+            cache.put(await prepare_statement(conn, sql))
+        except OperationalError as err:
+            if err.args[0] == UNSUPPORTED_PS:
+                cache.unsupported.add(sql)
+            elif err.args[0] == MAX_PREPARED_STMT_COUNT_REACHED:
+                logger.warning("Prime prepared statements stopped: %r", err)
+                return
+            else:
+                raise
+
+
+class _PreparedCursorMixin:
+    """使用服务端预处理语句执行SQL的游标"""
+
+    async def execute_prepared(self, query: str, args: Union[Sequence, dict] = None, *, cache_size: int = 128):
+        """使用二进制协议执行SQL，无法预处理的语句回退到文本协议 execute()
+
+        :param query: pymysql 风格的SQL(%s 或 %(name)s 占位符)
+        :param args: 参数
+        :param cache_size: 每个连接缓存的预处理语句数量
+        """
+        converted = convert_query(query, args)
+        conn: Connection = self._get_db()
+        cache = StatementCache.of(conn, cache_size)
+        if converted is None or converted[0] in cache.unsupported:
+            return await self.execute(query, args)
+        sql, params = converted
+
+        while await self.nextset():
+            pass
+
+        stmt = await self.__get_statement(conn, cache, sql)
+        if stmt is None:
+            return await self.execute(query, args)
+        if stmt.param_count != len(params):
+            raise ProgrammingError(f"Statement expects {stmt.param_count} parameters, got {len(params)}")
+        try:
+            await self.__execute_statement(conn, stmt, params)
+        except OperationalError as err:
+            if err.args[0] != UNKNOWN_STMT_HANDLER:
+                raise
+            # 句柄在服务端已失效，重新预处理一次
+            cache.pop(sql)
+            stmt = await self.__get_statement(conn, cache, sql)
+            if stmt is None:
+                return await self.execute(query, args)
+            await self.__execute_statement(conn, stmt, params)
+        self._executed = query
+        if self._echo:
+            logger.info(sql)
+            logger.info("%r", args)
+        return self._rowcount
+
+    async def __get_statement(self, conn: Connection, cache: StatementCache, sql: str):
+        stmt = cache.get(sql)
+        if stmt is not None:
+            return stmt
+        for stale in cache.evict(len(cache) - cache.max_size + 1):
+            await close_statement(conn, stale)
+        try:
+            stmt = await prepare_statement(conn, sql)
+        except OperationalError as err:
+            if err.args[0] == UNSUPPORTED_PS:
+                cache.unsupported.add(sql)
+                return None
+            if err.args[0] != MAX_PREPARED_STMT_COUNT_REACHED:
+                raise
+            # 服务端预处理语句总数达到 max_prepared_stmt_count，释放一半缓存后重试一次
+            for stale in cache.evict(max(1, len(cache) // 2)):
+                await close_statement(conn, stale)
+            try:
+                stmt = await prepare_statement(conn, sql)
+            except OperationalError as retry_err:
+                if retry_err.args[0] != MAX_PREPARED_STMT_COUNT_REACHED:
+                    raise
+                return None
+        cache.put(stmt)
+        return stmt
+
+    async def __execute_statement(self, conn: Connection, stmt: PreparedStatement, params: Sequence):
+        self._clear_result()
+        await _send_command(conn, COMMAND.COM_STMT_EXECUTE, _encode_execute(stmt.stmt_id, params, conn.encoding))
+        result = PreparedResult()
+        await result.read(conn)
+        while result.has_next:
+            # 存储过程等返回多个结果集时，丢弃后续的结果集
+            extra = PreparedResult()
+            await extra.read(conn)
+            result.has_next = extra.has_next
+            result.server_status = extra.server_status
+        # 与文本协议一样把结果挂到连接上，由游标读取(兼容 DictCursor 等)
+        conn._result = result
+        conn._affected_rows = result.affected_rows
+        if result.server_status is not None:
+            conn.server_status = result.server_status
+        await self._do_get_result()
+
+
+class PreparedCursor(_PreparedCursorMixin, Cursor):
+    """使用服务端预处理语句的游标，返回 tuple"""
+
+
+class PreparedDictCursor(_PreparedCursorMixin, DictCursor):
+    """使用服务端预处理语句的游标，返回 dict"""
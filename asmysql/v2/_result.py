@@ -1,20 +1,52 @@
+import asyncio
+from collections import deque
 from functools import lru_cache
-from typing import Final, Generic, Optional, Sequence, TypeVar, Union
+from typing import TYPE_CHECKING, Awaitable, Callable, Final, Generic, Iterable, Optional, Sequence, TypeVar, Union
 
-from aiomysql import Cursor, DictCursor, Pool, SSCursor, SSDictCursor
+from aiomysql import Connection, Cursor, DictCursor, Pool, SSCursor, SSDictCursor
 from pymysql.err import MySQLError
 
+from .._columnar import (
+    DEFAULT_BATCH_SIZE,
+    check_batch_size,
+    concat_arrow_batches,
+    concat_numpy_columns,
+    to_arrow_batch,
+    to_numpy_columns,
+)
+from .._row_factory import column_keys, get_row_factory
+from ._bulk import DEFAULT_MAX_STMT_LENGTH, execute_bulk
+from ._cache import CachedCursor, QueryCache, cache_key
+from ._export import ExportFormat, ExportStats, export_rows, open_exporter
+from ._health import is_connection_lost
+from ._hooks import StatementTrace
+from ._lease import ConnectionLease, LeakDetector
+from ._load_data import RowSource, load_rows
+from ._prepared import PreparedCursor, PreparedDictCursor
+from ._timeout import add_execution_time_hint, execute_with_timeout
+
+if TYPE_CHECKING:
+    from ._pipeline import Pipeline
+
 T = TypeVar("T")
 
+# 异步迭代(async for / iterate / iterate_batches)时每次从游标读取的行数
+DEFAULT_FETCH_BATCH_SIZE: Final[int] = 1000
+
 
-def _get_cursor_class(*, result_class: T, stream: bool):
-    if result_class is tuple:
+def _get_cursor_class(*, result_class: T, stream: bool, prepared: bool = False):
+    # 自定义的 result_class 也使用返回 tuple 的游标，由行工厂直接从 tuple 创建对象
+    if result_class is not dict:
         if stream:
             return SSCursor
+        if prepared:
+            return PreparedCursor
         return Cursor
     else:
         if stream:
             return SSDictCursor
+        if prepared:
+            return PreparedDictCursor
         return DictCursor
 
 
@@ -29,6 +61,22 @@ class Result(Generic[T]):
         stream: bool = False,
         commit: bool = True,
         result_class: T = tuple,
+        conn: Connection = None,
+        prepared: bool = False,
+        prepared_cache_size: int = 128,
+        max_stmt_length: int = DEFAULT_MAX_STMT_LENGTH,
+        concurrency: int = 1,
+        load_source: RowSource = None,
+        cache: QueryCache = None,
+        cache_ttl: float = None,
+        cache_tags: Optional[Iterable[str]] = None,
+        pipeline: "Pipeline" = None,
+        trace: StatementTrace = None,
+        retry: bool = False,
+        timeout: float = None,
+        timeout_hint: bool = False,
+        leak_detector: LeakDetector = None,
+        batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
     ):
         self.pool: Final[Pool] = pool
         self.query: Final[str] = query
@@ -41,6 +89,46 @@ class Result(Generic[T]):
         self.__executed: bool = False
         self.__error: Optional[MySQLError] = None
         self.__conn_autoclose: bool = True
+        # 绑定的连接(事务中使用)，不从连接池获取，也不归还到连接池
+        self.__pinned_conn: Final[Optional[Connection]] = conn
+        # 服务端预处理语句只用于非流式的 execute
+        self.prepared: Final[bool] = prepared and not stream and not execute_many
+        self.__prepared_cache_size: Final[int] = prepared_cache_size
+        # execute_many 改写为多行语句时单条语句的最大长度，以及并发执行的连接数(绑定连接时只能为1)
+        self.__max_stmt_length: Final[int] = max_stmt_length
+        self.__concurrency: Final[int] = 1 if conn else max(concurrency or 1, 1)
+        # LOAD DATA LOCAL INFILE 的数据来源
+        self.__load_source: Final[Optional[RowSource]] = load_source
+        # 从 tuple 行创建 result_class 对象的函数，第一次获取数据时根据列名编译
+        self.__row_factory: Optional[Callable[[tuple], T]] = None
+        # 查询缓存: 设置 cache_ttl 时从缓存读取(未命中时查询并写入缓存)，
+        # 否则执行成功后使 cache_tags 对应表的缓存失效(cache_tags 为 None 时清空缓存)
+        self.__cache: Final[Optional[QueryCache]] = cache
+        self.__cache_ttl: Final[Optional[float]] = cache_ttl if cache is not None and cache_ttl else None
+        self.__cache_tags: Final[Optional[frozenset]] = frozenset(cache_tags) if cache_tags is not None else None
+        # 由 Pipeline 批量发送，结果已读取到内存
+        self.__pipeline: Final[Optional["Pipeline"]] = pipeline
+        # 执行过程的记录(钩子和耗时统计)，为 None 时不记录；语句执行完成后在 close() 时记录读取阶段
+        self.__trace: Final[Optional[StatementTrace]] = trace
+        self.__fetching: bool = False
+        # 连接断开导致执行失败时是否在新连接上重试一次(只用于事务外的只读语句)
+        self.__retry: Final[bool] = retry and conn is None
+        # 语句执行超时（秒），超时时使用 KILL QUERY 中断，不用于 execute_many 和 load_rows
+        self.__timeout: Final[Optional[float]] = (
+            timeout if timeout and timeout > 0 and not execute_many and load_source is None else None
+        )
+        # 发送到服务端的语句，timeout_hint 时 SELECT 语句加上 MAX_EXECUTION_TIME 优化器提示
+        self.__statement: Final[str] = (
+            add_execution_time_hint(query, self.__timeout) if timeout_hint and self.__timeout else query
+        )
+        # 持有的连接，只通过租约归还(只归还一次)，没有关闭就被回收时由租约关闭连接并记录泄漏
+        self.__lease: Optional[ConnectionLease] = None
+        self.__leak_detector: Final[Optional[LeakDetector]] = leak_detector
+        # 采样记录的创建位置，泄漏时输出到日志
+        self.__stack = leak_detector.capture() if leak_detector is not None else None
+        # 异步迭代时按批读取并转换的行，逐行从缓冲返回，fetch_* 方法先返回缓冲中剩余的行
+        self.__batch_size: Final[int] = batch_size if batch_size and batch_size > 0 else DEFAULT_FETCH_BATCH_SIZE
+        self.__buffer: Final[deque[T]] = deque()
 
     # @property
     # def cursor(self):
@@ -54,19 +142,46 @@ class Result(Generic[T]):
     def __repr__(self):
         return f"<{self.__class__.__name__}: {self.query}>"
 
-    def __del__(self):
-        if self.error:
-            return
-        if self.__cursor:
-            conn = self.__cursor.connection
-            if conn:
-                self.pool.release(conn)
+    def __get_row_factory(self) -> Callable[[tuple], T]:
+        if self.__row_factory is None:
+            self.__row_factory = get_row_factory(self._result_class, column_keys(self.__cursor))
+        return self.__row_factory
+
+    def __lease_conn(self, conn: Connection) -> ConnectionLease:
+        """创建连接的租约，绑定的连接由其持有者负责释放"""
+        if conn is self.__pinned_conn:
+            return ConnectionLease(self.pool, conn, pinned=True)
+        return ConnectionLease(
+            self.pool,
+            conn,
+            owner=self,
+            name=f"<{self.__class__.__name__}: {self.query}>",
+            detector=self.__leak_detector,
+            stack=self.__stack,
+        )
+
+    def __discard(self):
+        """被取消时不再读取剩余的结果，连接可能停在协议的中间状态，关闭后归还"""
+        self.__fetching = False
+        if self.__lease is not None:
+            self.__lease.release(discard=True)
 
     async def close(self):
-        conn = self.__cursor.connection
-        await self.__cursor.close()
-        if conn:
-            self.pool.release(conn)
+        """关闭游标并归还连接，可以重复调用"""
+        self.__buffer.clear()
+        lease = self.__lease
+        if lease is None or lease.released:
+            return
+        try:
+            if self.__fetching:
+                self.__fetching = False
+                await self.__trace.after_fetch(self.__cursor.rownumber or 0)
+            await self.__cursor.close()
+        except BaseException:
+            # 读取剩余的结果时出错或被取消
+            lease.release(discard=True)
+            raise
+        lease.release()
 
     async def __aenter__(self):
         self.__conn_autoclose = False
@@ -74,7 +189,8 @@ class Result(Generic[T]):
         return self
 
     async def __aexit__(self, exc_type, exc_value, exc_tb):
-        if self.error:
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            self.__discard()
             return
         await self.close()
 
@@ -84,19 +200,22 @@ class Result(Generic[T]):
         return self
 
     async def __anext__(self):
+        """支持 async for item in result 语法
+
+        每次从游标读取 batch_size 行并批量转换为 result_class，之后的行直接从缓冲返回，不再等待游标
+        """
+        if self.__buffer:
+            return self.__buffer.popleft()
         await self.__call__()
-        """支持 async for item in result 语法"""
         if self.error:
             # 有错误则不迭代
             raise StopAsyncIteration
-        else:
-            # noinspection PyUnresolvedReferences
-            data = await self.fetch_one()
-            if data is not None:
-                return data
-            else:
-                await self.close()
-                raise StopAsyncIteration
+        rows = await self.__fetch_batch(self.__batch_size)
+        if not rows:
+            await self.close()
+            raise StopAsyncIteration
+        self.__buffer.extend(rows)
+        return self.__buffer.popleft()
 
     async def __call__(self):
         """
@@ -105,25 +224,142 @@ class Result(Generic[T]):
         # 重用 Engine 中的 execute 逻辑
         if self.__executed:
             return self
-        cursor_class = _get_cursor_class(result_class=self._result_class, stream=self.stream)
+        if self.__cache_ttl:
+            return await self.__call_cached()
+        if self.__pipeline is not None:
+            return await self.__call_pipelined()
+        cursor_class = _get_cursor_class(result_class=self._result_class, stream=self.stream, prepared=self.prepared)
+        trace = self.__trace
         try:
+            try:
+                await self.__execute(cursor_class, trace)
+            except MySQLError as err:
+                if not (self.__retry and self.__cursor is not None and is_connection_lost(err)):
+                    raise
+                # 连接已断开(如数据库故障切换)，关闭并移除失效的连接，在新连接上重试一次
+                await self.__cursor.close()
+                self.__lease.release(discard=True)
+                self.__cursor = None
+                await self.__execute(cursor_class, trace)
+        except MySQLError as err:
+            if self.__lease is not None:
+                try:
+                    if self.__cursor is not None:
+                        await self.__cursor.close()
+                finally:
+                    self.__lease.release()
+            self.__error = err
+            if trace is not None:
+                await trace.on_error(err)
+        except BaseException:
+            # 被取消或者其他异常
+            self.__discard()
+            raise
+        finally:
+            self.__executed = True
+        return self
+
+    async def __execute(self, cursor_class: type, trace: Optional[StatementTrace]):
+        """获取连接并执行语句，失败时抛出 MySQLError"""
+        if self.__pinned_conn:
+            conn = self.__pinned_conn
+        elif trace is None:
             # noinspection PyUnresolvedReferences
             conn = await self.pool.acquire()
-            self.__cursor = await conn.cursor(cursor_class)
-            if self.__execute_many:
-                await self.__cursor.executemany(self.query, self.values)
-            else:
-                await self.__cursor.execute(self.query, self.values)
-            if self.commit:
-                await self.__cursor.connection.commit()
+        else:
+            await trace.before_acquire()
+            # noinspection PyUnresolvedReferences
+            conn = await self.pool.acquire()
+        self.__lease = self.__lease_conn(conn)
+        if trace is not None and not self.__pinned_conn:
+            await trace.after_acquire(conn)
+        if trace is not None:
+            await trace.before_execute(conn)
+        self.__cursor = await conn.cursor(cursor_class)
+        if self.__execute_many:
+            await execute_bulk(
+                self.__cursor,
+                self.query,
+                self.values,
+                max_length=self.__max_stmt_length,
+                pool=self.pool,
+                concurrency=self.__concurrency,
+            )
+        elif self.__load_source is not None:
+            await load_rows(self.__cursor, self.query, self.__load_source)
+        elif self.prepared:
+            await self.__run(
+                conn,
+                self.__cursor.execute_prepared(self.__statement, self.values, cache_size=self.__prepared_cache_size),
+            )
+        else:
+            await self.__run(conn, self.__cursor.execute(self.__statement, self.values))
+        if self.commit:
+            await self.__cursor.connection.commit()
+        if self.__cache:
+            self.__cache.invalidate(self.__cache_tags)
+        if trace is not None:
+            self.__fetching = True
+            await trace.after_execute(None if self.stream else self.__cursor.rowcount)
+
+    async def __run(self, conn: Connection, execution: Awaitable):
+        """执行语句，设置了 timeout 时超时后中断服务端的语句"""
+        if self.__timeout is None:
+            return await execution
+        return await execute_with_timeout(self.pool, conn, execution, self.__timeout)
+
+    async def __call_cached(self):
+        """从查询缓存读取结果，命中时不占用连接"""
+        row_kind = "dict" if self._result_class is dict else "tuple"
+        key = cache_key(self.query, self.values, row_kind)
+        try:
+            entry = await self.__cache.get_or_load(key, self.__cache_tags or (), self.__cache_ttl, self.__load_rows)
+            self.__cursor = CachedCursor(entry.rows, entry.description, entry.rowcount)
         except MySQLError as err:
-            await self.__cursor.close()
-            self.pool.release(self.__cursor.connection)
             self.__error = err
         finally:
             self.__executed = True
         return self
 
+    async def __call_pipelined(self):
+        """从 Pipeline 获取批量执行的结果，不占用连接"""
+        try:
+            rows, description, rowcount, lastrowid = await self.__pipeline.outcome(self)
+            if self._result_class is dict and description:
+                keys = tuple(column[0] for column in description)
+                rows = [dict(zip(keys, row)) for row in rows]
+            self.__cursor = CachedCursor(rows, description, rowcount, lastrowid)
+        except MySQLError as err:
+            self.__error = err
+        finally:
+            self.__executed = True
+        return self
+
+    async def __load_rows(self):
+        """缓存未命中时执行查询，读取全部行后立即归还连接"""
+        conn = self.__pinned_conn or await self.pool.acquire()
+        lease = self.__lease_conn(conn)
+        try:
+            cursor = await conn.cursor(DictCursor if self._result_class is dict else Cursor)
+            try:
+                await cursor.execute(self.query, self.values)
+                rows = await cursor.fetchall()
+                # 列名使用与 DictCursor 一致的名称(重名列为 "表名.列名")，缓存游标没有字段信息
+                description = tuple(
+                    (key, *column[1:]) for key, column in zip(column_keys(cursor), cursor.description or ())
+                )
+                rowcount = cursor.rowcount
+            finally:
+                await cursor.close()
+            if self.commit:
+                await conn.commit()
+        except asyncio.CancelledError:
+            lease.release(discard=True)
+            raise
+        finally:
+            lease.release()
+        return rows, description or None, rowcount
+
     def __await__(self):
         """
         支持 result = await execute(...) 用法
@@ -164,6 +400,18 @@ class Result(Generic[T]):
             return None
         return self.__cursor.rowcount
 
+    @property
+    def warning_count(self):
+        """获取语句执行产生的警告数量(如 LOAD DATA 导入时被截断或转换的字段)
+
+        如果mysql报错，则返回None
+        """
+        if self.error or not self.__cursor:
+            return None
+        # noinspection PyProtectedMember
+        result = self.__cursor._result
+        return result.warning_count if result else 0
+
     @property
     def last_rowid(self):
         """
@@ -183,6 +431,52 @@ class Result(Generic[T]):
         """
         return self.__cursor.rownumber if not self.error else None
 
+    @property
+    def columns(self) -> tuple[str, ...]:
+        """结果集的列名，与 result_class=dict 时的键相同(重名的列为 "表名.列名")
+        如果没有结果集或mysql报错，则返回空元组
+        """
+        if self.error or not self.__cursor:
+            return ()
+        return column_keys(self.__cursor)
+
+    async def __read(self, fetch: Awaitable):
+        """读取结果，被取消时关闭连接"""
+        try:
+            return await fetch
+        except asyncio.CancelledError:
+            self.__discard()
+            raise
+
+    def __check_batch_size(self, size: Optional[int]) -> int:
+        if size is None:
+            return self.__batch_size
+        if size <= 0:
+            raise ValueError("batch_size must be greater than 0")
+        return size
+
+    def __check_unbuffered(self, method: str):
+        """按列读取和导出直接使用游标返回的行，缓冲中已经转换为 result_class 的行无法使用"""
+        if self.__buffer:
+            raise RuntimeError(f"{method}() must be called before iterating the result") from None
+
+    def __pop_buffer(self, size: int = None) -> list[T]:
+        """取出缓冲中最多 size 行(为 None 时取出全部)"""
+        buffer = self.__buffer
+        if size is None or size >= len(buffer):
+            rows = list(buffer)
+            buffer.clear()
+            return rows
+        return [buffer.popleft() for _ in range(size)]
+
+    async def __fetch_batch(self, size: int) -> list[T]:
+        """从游标读取最多 size 行并批量转换为 result_class"""
+        # noinspection PyUnresolvedReferences
+        rows = await self.__read(self.__cursor.fetchmany(size))
+        if rows and self._result_class is not tuple and self._result_class is not dict:
+            return list(map(self.__get_row_factory(), rows))
+        return list(rows)
+
     async def fetch_one(self, close: bool = None):
         """获取一条记录
 
@@ -194,13 +488,17 @@ class Result(Generic[T]):
             self.__conn_autoclose = close
         if self.error:
             return None
-        # noinspection PyUnresolvedReferences
-        data = await self.__cursor.fetchone()
+        if self.__buffer:
+            _data: T = self.__buffer.popleft()
+            if self.__conn_autoclose:
+                await self.close()
+            return _data
+        data = await self.__read(self.__cursor.fetchone())
         if data is None:
             await self.close()
             return None
         if self._result_class is not tuple and self._result_class is not dict:
-            _data: T = self._result_class(**data)
+            _data: T = self.__get_row_factory()(data)
         else:
             _data: T = data
         if self.__conn_autoclose:
@@ -220,13 +518,21 @@ class Result(Generic[T]):
         _data: list[T] = []
         if self.error:
             return _data
-        # noinspection PyUnresolvedReferences
-        data: list = await self.__cursor.fetchmany(size)
+        if self.__buffer:
+            # 先取缓冲中的行，不足 size 时从游标补足
+            size = size or getattr(self.__cursor, "arraysize", 1)
+            _data = self.__pop_buffer(size)
+            if len(_data) < size:
+                _data.extend(await self.__fetch_batch(size - len(_data)))
+            if len(_data) < size or self.__conn_autoclose:
+                await self.close()
+            return _data
+        data: list = await self.__read(self.__cursor.fetchmany(size))
         if not data:
             await self.close()
             return _data
         if self._result_class is not tuple and self._result_class is not dict:
-            _data = [self._result_class(**item) for item in data]
+            _data = list(map(self.__get_row_factory(), data))
         else:
             _data = data
         if self.__conn_autoclose:
@@ -238,18 +544,25 @@ class Result(Generic[T]):
         _data: list[T] = []
         if self.error:
             return _data
-        # noinspection PyUnresolvedReferences
-        data: list = await self.__cursor.fetchall()
+        buffered = self.__pop_buffer()
+        data: list = await self.__read(self.__cursor.fetchall())
         if self._result_class is not tuple and self._result_class is not dict:
-            _data: list[T] = [self._result_class(**item) for item in data]
-            return _data
+            _data: list[T] = list(map(self.__get_row_factory(), data))
         else:
             _data: list[T] = data
+        if buffered:
+            _data = [*buffered, *_data]
         await self.close()
         return _data
 
-    async def iterate(self):
-        """异步生成器遍历所有记录"""
+    async def iterate(self, batch_size: int = None):
+        """异步生成器遍历所有记录
+
+        每次从游标读取 batch_size 行并批量转换为 result_class，再逐行返回。
+
+        :param batch_size: 每次读取的行数，默认为 Engine 的 fetch_batch_size
+        """
+        batch_size = self.__check_batch_size(batch_size)
         if self.error:
             # 有错误则不迭代
             return
@@ -257,16 +570,161 @@ class Result(Generic[T]):
             # raise StopAsyncIteration
         else:
             try:
+                rows = self.__pop_buffer()
                 while True:
-                    # noinspection PyUnresolvedReferences
-                    data = await self.__cursor.fetchone()
-                    if data:
-                        if self._result_class is not tuple and self._result_class is not dict:
-                            _data: T = self._result_class(**data)
-                        else:
-                            _data: T = data
-                        yield _data
-                    else:
+                    for row in rows:
+                        yield row
+                    rows = await self.__fetch_batch(batch_size)
+                    if not rows:
                         break
+            except asyncio.CancelledError:
+                self.__discard()
+                raise
             finally:
                 await self.close()
+
+    async def iterate_batches(self, batch_size: int = None):
+        """异步生成器按批遍历所有记录，每批为最多 batch_size 条记录的列表
+
+        使用 stream 执行时，每次只从服务端读取 batch_size 行，适合分批处理超大结果集。
+
+        :param batch_size: 每批的行数，默认为 Engine 的 fetch_batch_size
+        """
+        batch_size = self.__check_batch_size(batch_size)
+        if self.error:
+            return
+        try:
+            while self.__buffer:
+                yield self.__pop_buffer(batch_size)
+            while True:
+                rows = await self.__fetch_batch(batch_size)
+                if not rows:
+                    break
+                yield rows
+        except asyncio.CancelledError:
+            self.__discard()
+            raise
+        finally:
+            await self.close()
+
+    async def export(
+        self,
+        target,
+        format: ExportFormat = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        header: bool = True,
+        compression: str = None,
+    ) -> ExportStats:
+        """把所有记录导出到 CSV、JSON Lines 或 Parquet 文件
+
+        按批读取行，读取下一批的同时在线程中编码并写入上一批，内存中最多只有两批行，
+        使用 stream 执行时可以导出超大结果集。表头和列类型来自 cursor.description，不会创建 result_class 对象。
+        导出出错或被取消时关闭连接(不再读取剩余的结果)，目标文件的内容不完整。
+
+        :param target: 文件路径，或二进制文件对象(不会被关闭)
+        :param format: csv/jsonl/parquet，默认根据文件扩展名推断(.csv/.jsonl/.ndjson/.parquet，可以带 .gz)
+        :param batch_size: 每批的行数，Parquet 中每批为一个 row group
+        :param header: CSV 是否写入表头
+        :param compression: csv/jsonl 可以为 gzip(.gz 文件默认使用)，parquet 为 pyarrow 支持的压缩方式(默认 snappy)
+        :return: {"rows": 写入的行数, "bytes": 写入的字节数}，有错误或没有结果集时都为0且不创建文件
+        """
+        batch_size = check_batch_size(batch_size)
+        await self.__call__()
+        if self.error or not self.__cursor:
+            return ExportStats(rows=0, bytes=0)
+        self.__check_unbuffered("export")
+        description = self.__cursor.description
+        if not description:
+            await self.close()
+            return ExportStats(rows=0, bytes=0)
+        try:
+            exporter = open_exporter(target, description, format, compression=compression, header=header)
+            # noinspection PyUnresolvedReferences
+            stats = await export_rows(exporter, lambda: self.__read(self.__cursor.fetchmany(batch_size)))
+        except BaseException:
+            # 写入出错时不再读取剩余的结果(流式结果可能还有大量数据)
+            self.__discard()
+            raise
+        await self.close()
+        return stats
+
+    async def fetch_columns(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        """以列的形式获取所有记录(需要安装 numpy)
+
+        按批读取行并根据 cursor.description 中的列类型直接转换为 numpy 数组，不会创建 result_class 对象:
+        整数 -> int64，浮点数 -> float64，DATETIME/TIMESTAMP -> datetime64[us]，DATE -> datetime64[D]，
+        TIME -> timedelta64[us]，其他类型 -> object。含 NULL 的数值列返回 numpy.ma.MaskedArray。
+        使用 stream 执行时，每次只从服务端读取 batch_size 行。
+
+        :param batch_size: 每批转换的行数
+        :return: {列名: 数组}，没有结果集则返回空字典
+        """
+        batch_size = check_batch_size(batch_size)
+        if self.error or not self.__cursor:
+            return {}
+        self.__check_unbuffered("fetch_columns")
+        description = self.__cursor.description
+        if not description:
+            await self.close()
+            return {}
+        batches = []
+        try:
+            while True:
+                # noinspection PyUnresolvedReferences
+                rows = await self.__cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                batches.append(to_numpy_columns(description, rows))
+        except asyncio.CancelledError:
+            self.__discard()
+            raise
+        finally:
+            await self.close()
+        return concat_numpy_columns(description, batches)
+
+    async def fetch_arrow(self, batch_size: int = DEFAULT_BATCH_SIZE, dictionary: bool = True):
+        """以 pyarrow.Table 的形式获取所有记录(需要安装 pyarrow)
+
+        :param batch_size: 每个 RecordBatch 的行数
+        :param dictionary: 字符串列是否使用字典编码
+        :return: pyarrow.Table，没有结果集则返回None
+        """
+        batch_size = check_batch_size(batch_size)
+        if self.error or not self.__cursor:
+            return None
+        self.__check_unbuffered("fetch_arrow")
+        description = self.__cursor.description
+        if not description:
+            await self.close()
+            return None
+        batches = [batch async for batch in self.iterate_arrow(batch_size, dictionary)]
+        return concat_arrow_batches(description, batches, dictionary)
+
+    async def iterate_arrow(self, batch_size: int = DEFAULT_BATCH_SIZE, dictionary: bool = True):
+        """异步生成器按批遍历记录，每批为一个 pyarrow.RecordBatch(需要安装 pyarrow)
+
+        使用 stream 执行时，每次只从服务端读取 batch_size 行，适合处理超大结果集。
+
+        :param batch_size: 每个 RecordBatch 的行数
+        :param dictionary: 字符串列是否使用字典编码
+        """
+        batch_size = check_batch_size(batch_size)
+        if self.error or not self.__cursor:
+            return
+        self.__check_unbuffered("iterate_arrow")
+        description = self.__cursor.description
+        try:
+            if not description:
+                return
+            while True:
+                # noinspection PyUnresolvedReferences
+                rows = await self.__cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield to_arrow_batch(description, rows, dictionary)
+        except asyncio.CancelledError:
+            self.__discard()
+            raise
+        finally:
+            await self.close()
@@ -0,0 +1,164 @@
+"""
+按键分页扫描整表(keyset pagination)
+
+每页执行一条 SELECT ... WHERE key > 上一页最后的键 ORDER BY key LIMIT batch_size 查询，
+读取完一页后立即归还连接，不会像 stream(SSCursor)那样在整个扫描期间占用一个连接和服务端的读视图。
+prefetch=True 时在处理当前页的同时查询下一页。
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Final, Generic, Optional, Sequence, TypeVar, Union
+
+from .._row_factory import get_row_factory
+from ._load_data import quote_identifier
+
+if TYPE_CHECKING:
+    from ._engine import Engine
+    from ._routing import RoutingEngine
+
+T = TypeVar("T")
+
+
+class Scanner(Generic[T]):
+    """按键分页遍历一个表
+
+    用法:
+        async for user in engine.scan("users", "id", where="status = %s", values=(1,), result_class=User):
+            ...
+        async for users in engine.scan("users", "id").batches():  # 每页为一个列表
+            ...
+
+    - 键需要有索引且唯一(通常为主键)，复合键传入多个列，按 (a, b) > (%s, %s) 比较。
+    - 各页在不同的时间点查询，不是一致性快照: 扫描期间插入或修改的行可能被读取到，也可能被跳过。
+    - 查询出错时抛出对应的 MySQLError。
+    """
+
+    def __init__(
+        self,
+        engine: Union["Engine", "RoutingEngine"],
+        table: str,
+        key: Union[str, Sequence[str]],
+        *,
+        columns: Sequence[str] = None,
+        where: str = None,
+        values: Sequence = None,
+        batch_size: int = 1000,
+        result_class: type[T] = tuple,
+        prefetch: bool = False,
+    ):
+        """
+        :param engine: 执行查询的 Engine 或 RoutingEngine
+        :param table: table name, can be "db.table"
+        :param key: 分页使用的键列，复合键为多个列
+        :param columns: 查询的列，为 None 时查询所有列
+        :param where: 额外的过滤条件，使用 %s 占位符，字面的 % 写为 %%
+        :param values: where 中占位符的参数
+        :param batch_size: 每页的行数
+        :param result_class: the class to use for the result
+        :param prefetch: 是否在处理当前页的同时查询下一页
+        """
+        keys = (key,) if isinstance(key, str) else tuple(key)
+        if not keys:
+            raise ValueError("key must not be empty")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be greater than 0")
+        key_names = tuple(column.rsplit(".", 1)[-1] for column in keys)
+        if columns and not set(key_names) <= {column.rsplit(".", 1)[-1] for column in columns}:
+            raise ValueError(f"columns must include the key columns {keys!r}")
+        self.engine: Final = engine
+        self.table: Final[str] = table
+        self.keys: Final[tuple[str, ...]] = keys
+        self.where: Final[Optional[str]] = where
+        self.values: Final[tuple] = tuple(values or ())
+        self.batch_size: Final[int] = batch_size
+        self.result_class: Final[type[T]] = result_class
+        self.prefetch: Final[bool] = prefetch
+        self.__key_names: Final[tuple[str, ...]] = key_names
+        select = ", ".join(quote_identifier(column) for column in columns) if columns else "*"
+        order = ", ".join(quote_identifier(column) for column in keys)
+        if len(keys) == 1:
+            after = f"{order} > %s"
+        else:
+            after = f"({order}) > ({', '.join(['%s'] * len(keys))})"
+        prefix = f"SELECT {select} FROM {quote_identifier(table)} WHERE "
+        suffix = f" ORDER BY {order} LIMIT {batch_size}"
+        # 第一页没有键的条件
+        self.__first_query: Final[str] = (
+            f"{prefix}({where}){suffix}" if where else f"SELECT {select} FROM {quote_identifier(table)}{suffix}"
+        )
+        self.__next_query: Final[str] = (
+            f"{prefix}({where}) AND {after}{suffix}" if where else f"{prefix}{after}{suffix}"
+        )
+        # 第一页读取后根据列名确定键列的位置和行工厂
+        self.__key_index: Optional[tuple[int, ...]] = None
+        self.__row_factory: Optional[Callable[[tuple], T]] = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.table}.{','.join(self.keys)}>"
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        """支持 async for row in scanner 语法"""
+        return self.__iterate()
+
+    async def __iterate(self):
+        batches = self.batches()
+        try:
+            async for rows in batches:
+                for row in rows:
+                    yield row
+        finally:
+            await batches.aclose()
+
+    async def batches(self) -> AsyncIterator[list[T]]:
+        """异步生成器按页遍历，每页为最多 batch_size 条记录的列表"""
+        task: Optional[asyncio.Task] = None
+        try:
+            rows = await self.__fetch_page(None)
+            while rows:
+                more = len(rows) >= self.batch_size
+                last = tuple(rows[-1][i] for i in self.__key_index)
+                if more and self.prefetch:
+                    task = asyncio.ensure_future(self.__fetch_page(last))
+                yield self.__convert(rows)
+                if not more:
+                    break
+                if task is not None:
+                    rows = await task
+                    task = None
+                else:
+                    rows = await self.__fetch_page(last)
+        finally:
+            if task is not None:
+                # 提前结束遍历时取消预取的下一页
+                task.cancel()
+                await asyncio.wait((task,))
+                if not task.cancelled():
+                    task.exception()
+
+    async def __fetch_page(self, last: Optional[tuple]) -> Sequence[tuple]:
+        """查询 last 之后的一页，读取全部行后立即归还连接"""
+        # 每页都传入参数(可能为空)，where 中的 % 在每一页都按 %% 转义处理
+        if last is None:
+            query, values = self.__first_query, self.values
+        else:
+            query, values = self.__next_query, (*self.values, *last)
+        result = await self.engine.execute(query, values, stream=False, result_class=tuple)
+        if result.error:
+            raise result.error
+        if self.__key_index is None:
+            self.__prepare(result.columns)
+        return await result.fetch_all()
+
+    def __prepare(self, columns: tuple[str, ...]):
+        names = [column.rsplit(".", 1)[-1] for column in columns]
+        self.__key_index = tuple(names.index(name) for name in self.__key_names)
+        if self.result_class is dict:
+            self.__row_factory = lambda row: dict(zip(columns, row))
+        elif self.result_class is not tuple:
+            self.__row_factory = get_row_factory(self.result_class, columns)
+
+    def __convert(self, rows: Sequence[tuple]) -> list[T]:
+        """把 tuple 行转换为 result_class"""
+        if self.__row_factory is None:
+            return list(rows)
+        return list(map(self.__row_factory, rows))
@@ -0,0 +1,164 @@
+"""
+慢查询记录
+
+Engine(slow_query_threshold=秒) 时，执行时间超过阈值的语句记录到固定大小的环形缓冲区(engine.slow_queries)，
+包括语句指纹、参数结构(不保存参数值)和各阶段耗时，并在后台从连接池另取一个连接执行 EXPLAIN FORMAT=JSON，
+把执行计划保存到同一条记录中，不需要再手动复现慢查询。
+
+- EXPLAIN 有频率限制: 同一指纹在 explain_interval 秒内只执行一次，同一时间最多执行一个。
+- 只对 SELECT/INSERT/UPDATE/DELETE/REPLACE/WITH 语句执行 EXPLAIN，execute_many 和 load_rows 不执行。
+- stream 执行时，执行时间只包含读取到第一批数据之前的时间。
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Final, Optional, Sequence, TypedDict, Union
+
+from aiomysql.log import logger
+from pymysql.err import MySQLError
+
+from ._hooks import StatementTrace
+
+if TYPE_CHECKING:
+    from ._engine import Engine
+
+# 同一指纹两次 EXPLAIN 之间的最小间隔(秒)
+DEFAULT_EXPLAIN_INTERVAL: Final[float] = 60.0
+# 可以 EXPLAIN 的语句
+_EXPLAINABLE_RE = re.compile(r"\s*\(?\s*(?:SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b", re.I)
+
+
+class SlowQuery(TypedDict):
+    time: float  # 语句开始执行的时间(time.time())
+    fingerprint: str
+    query: str
+    params: str  # 参数结构，如 "(int, str)"、"{id: int}"、"100 x (int, str)"
+    acquire_time: Optional[float]  # 获取连接的等待时间(秒)，事务中的语句为 None
+    execute_time: float  # 执行时间(秒)
+    row_count: Optional[int]
+    plan: Optional[dict]  # EXPLAIN FORMAT=JSON 的结果，未执行或还没有完成时为 None
+    plan_error: Optional[str]  # EXPLAIN 失败的原因
+
+
+def params_shape(values: Union[Sequence, dict, None], many: bool = False) -> str:
+    """参数的结构(类型)，不包含参数值"""
+    if values is None:
+        return ""
+    if many:
+        count = len(values) if hasattr(values, "__len__") else "?"
+        first = next(iter(values), None) if isinstance(values, Sequence) else None
+        return f"{count} x {params_shape(first)}" if first is not None else f"{count} x ?"
+    if isinstance(values, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in values.items()) + "}"
+    if isinstance(values, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in values) + ")"
+    return type(values).__name__
+
+
+class SlowQueryLog:
+    """保存最近的慢查询，作为 after_execute 钩子注册到 Engine"""
+
+    def __init__(
+        self,
+        engine: "Engine",
+        threshold: float,
+        *,
+        size: int = 100,
+        explain: bool = True,
+        explain_interval: float = DEFAULT_EXPLAIN_INTERVAL,
+    ):
+        """
+        :param engine: 执行 EXPLAIN 的 Engine
+        :param threshold: 慢查询阈值(秒)
+        :param size: 最多保存的记录数量
+        :param explain: 是否执行 EXPLAIN FORMAT=JSON
+        :param explain_interval: 同一指纹两次 EXPLAIN 之间的最小间隔(秒)
+        """
+        self.engine: Final["Engine"] = engine
+        self.threshold: Final[float] = threshold
+        self.explain: Final[bool] = explain
+        self.explain_interval: Final[float] = explain_interval
+        self.__records: Final[deque[SlowQuery]] = deque(maxlen=max(1, size))
+        self.__explained: dict[str, float] = {}
+        self.__task: Optional[asyncio.Task] = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} threshold={self.threshold} records={len(self.__records)}>"
+
+    def __len__(self):
+        return len(self.__records)
+
+    @property
+    def records(self) -> list[SlowQuery]:
+        """最近的慢查询(按时间顺序，最新的在最后)"""
+        return list(self.__records)
+
+    def clear(self):
+        self.__records.clear()
+
+    def __call__(self, trace: StatementTrace):
+        """after_execute 钩子"""
+        execute_time = trace.execute_time
+        if execute_time is None or execute_time < self.threshold:
+            return
+        acquire_time = trace.acquire_time
+        record: SlowQuery = {
+            "time": time.time() - execute_time - (acquire_time or 0),
+            "fingerprint": trace.fingerprint,
+            "query": trace.query,
+            "params": params_shape(trace.values, trace.many),
+            "acquire_time": acquire_time,
+            "execute_time": execute_time,
+            "row_count": trace.row_count,
+            "plan": None,
+            "plan_error": None,
+        }
+        self.__records.append(record)
+        if self.explain and not trace.many and _EXPLAINABLE_RE.match(trace.query):
+            self.__schedule_explain(record, trace.values)
+
+    def __schedule_explain(self, record: SlowQuery, values: Any):
+        """频率限制: 同一指纹 explain_interval 秒内只执行一次，同一时间最多执行一个"""
+        if self.__task is not None and not self.__task.done():
+            return
+        now = time.monotonic()
+        last = self.__explained.get(record["fingerprint"])
+        if last is not None and now - last < self.explain_interval:
+            return
+        self.__explained = {key: at for key, at in self.__explained.items() if now - at < self.explain_interval}
+        self.__explained[record["fingerprint"]] = now
+        self.__task = asyncio.ensure_future(self.__explain(record, values))
+
+    async def __explain(self, record: SlowQuery, values: Any):
+        """在连接池的另一个连接上执行 EXPLAIN FORMAT=JSON"""
+        try:
+            conn = await self.engine.pool.acquire()
+        except (MySQLError, ConnectionError, RuntimeError) as err:
+            record["plan_error"] = repr(err)
+            return
+        try:
+            cursor = await conn.cursor()
+            try:
+                await cursor.execute(f"EXPLAIN FORMAT=JSON {record['query']}", values)
+                row = await cursor.fetchone()
+            finally:
+                await cursor.close()
+            record["plan"] = json.loads(row[0]) if row and row[0] else None
+        except (MySQLError, ValueError, TypeError) as err:
+            record["plan_error"] = repr(err)
+            logger.debug("EXPLAIN slow query failed: %r", err)
+        except BaseException:
+            # 被取消时可能还没有读取响应，关闭连接，不能放回连接池
+            conn.close()
+            raise
+        finally:
+            self.engine.pool.release(conn)
+
+    async def wait(self):
+        """等待正在执行的 EXPLAIN 完成"""
+        if self.__task is not None:
+            # 不取消 EXPLAIN，EXPLAIN 被取消时也不抛出异常
+            await asyncio.wait((self.__task,))
@@ -0,0 +1,91 @@
+"""
+语句执行超时
+
+asyncio.wait_for 取消正在执行的语句只是停止了客户端的读取，服务端仍然在执行，
+连接停在协议的中间状态，归还到连接池后会被下一个使用者读到上一条语句的结果。
+
+Engine.execute(timeout=秒) 超时时:
+1. 从另一个新建的连接发送 KILL QUERY <connection_id> 中断服务端正在执行的语句。
+2. 等待原连接读取完服务端的响应(通常是 1317 Query execution was interrupted)，连接状态正常，继续归还到连接池。
+3. KILL_WAIT 秒内仍然没有响应(或者 KILL QUERY 失败)时关闭原连接，归还时从连接池移除。
+4. 语句的错误为 QueryTimeoutError，Result.error_no 为 3024(ER_QUERY_TIMEOUT)，
+   与服务端 MAX_EXECUTION_TIME 超时的错误码相同。
+语句在中断之前恰好执行完成时，正常返回结果。
+
+超时只包括语句的执行阶段(stream 时到读取到第一批数据为止)，获取连接的等待时间由 acquire_timeout 控制。
+Engine(query_timeout_hint=True) 时还会给 SELECT 语句加上 /*+ MAX_EXECUTION_TIME(毫秒) */ 优化器提示，
+由服务端自己中断超时的只读语句。
+"""
+
+import asyncio
+import math
+import re
+from typing import Awaitable, Final, TypeVar
+
+from aiomysql import Connection, Pool, connect
+from aiomysql.log import logger
+from pymysql.constants import ER
+from pymysql.err import MySQLError
+
+from ._error import QueryTimeoutError
+
+T = TypeVar("T")
+
+# 发送 KILL QUERY 后等待原连接返回响应的时间（秒），超过时关闭原连接
+KILL_WAIT: Final[float] = 1.0
+_SELECT_RE = re.compile(r"(\s*\(?\s*SELECT\b)(\s*/\*\+)?", re.I)
+
+
+def add_execution_time_hint(query: str, timeout: float) -> str:
+    """给 SELECT 语句加上 MAX_EXECUTION_TIME 优化器提示，其他语句和已有优化器提示的语句不修改"""
+    match = _SELECT_RE.match(query)
+    if not match or match.group(2):
+        return query
+    milliseconds = max(1, math.ceil(timeout * 1000))
+    return f"{match.group(1)} /*+ MAX_EXECUTION_TIME({milliseconds}) */{query[match.end(1) :]}"
+
+
+async def kill_query(pool: Pool, connection_id: int) -> bool:
+    """使用新建的连接中断另一个连接上正在执行的语句(连接池可能已经没有空闲连接)，返回是否成功"""
+    try:
+        # noinspection PyProtectedMember
+        conn = await connect(**pool._conn_kwargs)
+    except (MySQLError, OSError) as err:
+        logger.warning("Connect for KILL QUERY %d failed: %r", connection_id, err)
+        return False
+    try:
+        cursor = await conn.cursor()
+        try:
+            await cursor.execute(f"KILL QUERY {int(connection_id)}")
+        finally:
+            await cursor.close()
+        return True
+    except MySQLError as err:
+        logger.warning("KILL QUERY %d failed: %r", connection_id, err)
+        return False
+    finally:
+        conn.close()
+
+
+async def execute_with_timeout(pool: Pool, conn: Connection, execution: Awaitable[T], timeout: float) -> T:
+    """在 timeout 秒内执行语句，超时时中断服务端的语句并抛出 QueryTimeoutError"""
+    task = asyncio.ensure_future(execution)
+    try:
+        done, _ = await asyncio.wait((task,), timeout=timeout)
+        if not done and await kill_query(pool, conn.thread_id()):
+            await asyncio.wait((task,), timeout=KILL_WAIT)
+    finally:
+        if not task.done():
+            # 连接停在协议的中间状态，只能关闭(归还时从连接池移除)
+            task.cancel()
+            conn.close()
+            await asyncio.wait((task,))
+    if not task.cancelled():
+        err = task.exception()
+        if err is None:
+            return task.result()
+        if not isinstance(err, MySQLError) or err.args[:1] != (ER.QUERY_INTERRUPTED,) or done:
+            raise err
+    raise QueryTimeoutError(
+        ER.QUERY_TIMEOUT, f"Query execution was interrupted, execution time exceeded {timeout} seconds"
+    ) from None
@@ -0,0 +1,325 @@
+from functools import lru_cache
+from typing import (
+    AsyncContextManager,
+    AsyncGenerator,
+    Awaitable,
+    Final,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    final,
+    overload,
+)
+
+from aiomysql import Connection, Pool
+
+from ._bulk import DEFAULT_MAX_STMT_LENGTH
+from ._cache import QueryCache, write_tables
+from ._hooks import Tracer
+from ._result import DEFAULT_FETCH_BATCH_SIZE, Result
+
+# 定义类型变量
+T = TypeVar("T")
+
+
+class Transaction:
+    """绑定单个连接的事务
+
+    用法:
+        async with engine.transaction() as tx:
+            await tx.execute(...)
+            async with tx.transaction() as sp:  # 嵌套事务使用 SAVEPOINT
+                await sp.execute(...)
+
+    - 进入时从连接池获取一个连接并开启事务，事务内所有语句都在该连接上执行，不会逐条提交。
+    - 正常退出时 COMMIT，发生异常时 ROLLBACK，连接只归还一次。
+    - 嵌套事务共用同一连接，使用 SAVEPOINT / RELEASE SAVEPOINT / ROLLBACK TO SAVEPOINT 实现。
+    - 同一事务内的语句共用一个连接，开始执行下一条语句前需要先读取完上一条语句的结果(特别是 stream 模式)。
+    """
+
+    def __init__(
+        self,
+        *,
+        pool: Pool,
+        stream: bool = False,
+        result_class: type = tuple,
+        parent: "Transaction" = None,
+        prepared: bool = False,
+        prepared_cache_size: int = 128,
+        max_stmt_length: int = DEFAULT_MAX_STMT_LENGTH,
+        cache: QueryCache = None,
+        tracer: Tracer = None,
+        batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+    ):
+        self.pool: Final[Pool] = pool
+        self.stream: Final[bool] = stream
+        self.result_class: Final[type] = result_class
+        self.prepared: Final[bool] = prepared
+        self.prepared_cache_size: Final[int] = prepared_cache_size
+        self.max_stmt_length: Final[int] = max_stmt_length
+        self.__parent: Final[Optional[Transaction]] = parent
+        self.__conn: Optional[Connection] = None
+        self.__depth: Final[int] = parent.depth + 1 if parent else 0
+        self.__active: bool = False
+        # 查询缓存，事务内执行的语句修改的表在最外层事务提交后失效
+        self.cache: Final[Optional[QueryCache]] = cache
+        self.__queries: Final[set[str]] = parent.__queries if parent else set()
+        # 创建语句执行记录(钩子和耗时统计)的函数，为 None 时不记录
+        self.tracer: Final[Optional[Tracer]] = tracer
+        # 事务内 Result 异步迭代时每次从游标读取的行数
+        self.batch_size: Final[int] = batch_size
+
+    @lru_cache
+    def __repr__(self):
+        return f"<{self.__class__.__name__} depth={self.__depth}>"
+
+    @property
+    def depth(self):
+        """事务嵌套层级，最外层事务为0"""
+        return self.__depth
+
+    @property
+    def is_active(self):
+        """事务是否进行中(未提交且未回滚)"""
+        return self.__active
+
+    @property
+    def connection(self):
+        """事务绑定的连接"""
+        if not self.__conn:
+            raise RuntimeError(
+                f"{self.__class__.__name__} is not started, use: async with engine.transaction() as tx:"
+            ) from None
+        return self.__conn
+
+    @property
+    def __savepoint(self):
+        return f"asmysql_sp_{self.__depth}"
+
+    async def __aenter__(self):
+        await self.begin()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_tb):
+        if not self.__active:
+            # 已手动提交或回滚
+            self.__finish()
+            return
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.rollback()
+
+    @final
+    async def begin(self):
+        """开启事务(async with 会自动调用)"""
+        if self.__active:
+            raise RuntimeError(f"{self!r} already started") from None
+        if self.__parent:
+            self.__conn = self.__parent.connection
+            await self.__query(f"SAVEPOINT {self.__savepoint}")
+        else:
+            self.__conn = await self.pool.acquire()
+            try:
+                await self.__conn.begin()
+            except BaseException:
+                self.pool.release(self.__conn)
+                self.__conn = None
+                raise
+        self.__active = True
+
+    @final
+    async def commit(self):
+        """提交事务，嵌套事务则释放 SAVEPOINT"""
+        if not self.__active:
+            return
+        self.__active = False
+        try:
+            if self.__parent:
+                await self.__query(f"RELEASE SAVEPOINT {self.__savepoint}")
+            else:
+                await self.__conn.commit()
+                self.__invalidate_cache()
+        finally:
+            self.__finish()
+
+    @final
+    async def rollback(self):
+        """回滚事务，嵌套事务则回滚到 SAVEPOINT"""
+        if not self.__active:
+            return
+        self.__active = False
+        try:
+            if self.__parent:
+                await self.__query(f"ROLLBACK TO SAVEPOINT {self.__savepoint}")
+            else:
+                self.__queries.clear()
+                await self.__conn.rollback()
+        finally:
+            self.__finish()
+
+    def __record_query(self, query: str):
+        if self.cache is not None:
+            self.__queries.add(query)
+
+    def __invalidate_cache(self):
+        """提交后使事务内写入的表的缓存失效，缓存为空时跳过SQL解析"""
+        queries = list(self.__queries)
+        self.__queries.clear()
+        if not self.cache:
+            return
+        tags = set()
+        for query in queries:
+            written = write_tables(query)
+            if written is None:
+                self.cache.invalidate()
+                return
+            tags.update(written)
+        self.cache.invalidate(tags)
+
+    def __finish(self):
+        """最外层事务结束时归还连接(仅一次)"""
+        if self.__parent or not self.__conn:
+            return
+        conn, self.__conn = self.__conn, None
+        self.pool.release(conn)
+
+    async def __query(self, sql: str):
+        cursor = await self.connection.cursor()
+        try:
+            await cursor.execute(sql)
+        finally:
+            await cursor.close()
+
+    @final
+    def transaction(self):
+        """开启嵌套事务(SAVEPOINT)"""
+        return Transaction(
+            pool=self.pool,
+            stream=self.stream,
+            result_class=self.result_class,
+            parent=self,
+            prepared=self.prepared,
+            prepared_cache_size=self.prepared_cache_size,
+            max_stmt_length=self.max_stmt_length,
+            cache=self.cache,
+            tracer=self.tracer,
+            batch_size=self.batch_size,
+        )
+
+    @overload
+    def execute(
+        self,
+        query: str,
+        values: Union[Sequence, dict] = None,
+        *,
+        stream: bool = None,
+        result_class: type[tuple] = tuple,
+        prepared: bool = None,
+    ) -> Union[Awaitable[Result[tuple]], AsyncContextManager[Result[tuple]], AsyncGenerator[tuple, None]]: ...
+
+    @overload
+    def execute(
+        self,
+        query: str,
+        values: Union[Sequence, dict] = None,
+        *,
+        stream: bool = None,
+        result_class: type[T],
+        prepared: bool = None,
+    ) -> Union[Awaitable[Result[T]], AsyncContextManager[Result[T]], AsyncGenerator[T, None]]: ...
+
+    @final
+    def execute(
+        self,
+        query: str,
+        values: Union[Sequence, dict] = None,
+        *,
+        stream: bool = None,
+        result_class: type[T] = None,
+        prepared: bool = None,
+    ) -> Union[Awaitable[Result[T]], AsyncContextManager[Result[T]], AsyncGenerator[T, None]]:
+        """
+        在事务连接上执行SQL语句，事务结束时统一提交或回滚
+
+        :param query: SQL statement
+        :param values: parameters, can be a tuple or dictionary
+        :param stream: whether to stream the result
+        :param result_class: the class to use for the result
+        :param prepared: whether to use a server-side prepared statement (binary protocol)
+        """
+        _stream = stream if stream is not None else self.stream
+        result_class = result_class if result_class is not None else self.result_class
+        _prepared = prepared if prepared is not None else self.prepared
+        self.__record_query(query)
+
+        return Result[type[T]](
+            pool=self.pool,
+            query=query,
+            values=values,
+            execute_many=False,
+            stream=_stream,
+            commit=False,
+            result_class=result_class,
+            conn=self.connection,
+            prepared=_prepared,
+            prepared_cache_size=self.prepared_cache_size,
+            trace=self.tracer(query, values, False) if self.tracer else None,
+            batch_size=self.batch_size,
+        )
+
+    @overload
+    def execute_many(
+        self,
+        query: str,
+        values: Sequence[Union[Sequence, dict]],
+        *,
+        stream: bool = None,
+        result_class: type[tuple] = tuple,
+    ) -> Union[Awaitable[Result[tuple]], AsyncContextManager[Result[tuple]], AsyncGenerator[tuple, None]]: ...
+
+    @overload
+    def execute_many(
+        self,
+        query: str,
+        values: Sequence[Union[Sequence, dict]],
+        *,
+        stream: bool = None,
+        result_class: type[T],
+    ) -> Union[Awaitable[Result[T]], AsyncContextManager[Result[T]], AsyncGenerator[T, None]]: ...
+
+    @final
+    def execute_many(
+        self,
+        query: str,
+        values: Sequence[Union[Sequence, dict]],
+        *,
+        stream: bool = None,
+        result_class: type[T] = None,
+    ) -> Union[Awaitable[Result[T]], AsyncContextManager[Result[T]], AsyncGenerator[T, None]]:
+        """
+        在事务连接上批量执行SQL语句，事务结束时统一提交或回滚
+
+        :param query: SQL statement
+        :param values: parameters, can be a tuple or dictionary
+        :param stream: whether to stream the result
+        :param result_class: the class to use for the result
+        """
+        _stream = stream if stream is not None else self.stream
+        result_class = result_class if result_class is not None else self.result_class
+        self.__record_query(query)
+
+        return Result[type[T]](
+            pool=self.pool,
+            query=query,
+            values=values,
+            execute_many=True,
+            stream=_stream,
+            commit=False,
+            result_class=result_class,
+            conn=self.connection,
+            max_stmt_length=self.max_stmt_length,
+            trace=self.tracer(query, values, True) if self.tracer else None,
+            batch_size=self.batch_size,
+        )
@@ -0,0 +1,137 @@
+"""
+连接预热
+
+aiomysql.create_pool 在启动时串行建立 min_pool_size 个连接，使用 TLS 和 caching_sha2_password 认证时，
+建立几十个连接需要数秒，推迟了服务就绪。WarmupPool 启动时并发握手(同时最多 concurrency 个)，
+并在每个新连接上执行预热语句(如 SET SESSION ...)、预先预处理常用语句，在接收流量之前连接池已经达到 min_pool_size。
+
+- 预热失败(连接失败或语句出错)时关闭连接池并抛出异常，配置错误在启动时就能发现。
+- 运行中按需新建的连接在第一次被获取时执行同样的预热语句，所有连接的会话设置保持一致。
+"""
+
+import asyncio
+from typing import Final, Optional, Sequence
+
+from aiomysql import Connection, Pool, connect
+
+from ._prepared import prime_statements
+
+
+class WarmupPool(Pool):
+    """启动时并发建立连接、并在新连接上执行预热语句的 aiomysql 连接池"""
+
+    def __init__(
+        self,
+        minsize,
+        maxsize,
+        echo,
+        pool_recycle,
+        loop,
+        *,
+        statements: Sequence[str] = (),
+        prepare: Sequence[str] = (),
+        prepared_cache_size: int = 128,
+        **kwargs,
+    ):
+        super().__init__(minsize, maxsize, echo, pool_recycle, loop, **kwargs)
+        self.statements: Final[tuple[str, ...]] = tuple(statements)
+        self.prepare: Final[tuple[str, ...]] = tuple(prepare)
+        self.__prepared_cache_size: Final[int] = prepared_cache_size
+
+    def start(self):
+        """预热完成后启动后台任务，由子类实现"""
+
+    async def _acquire(self):
+        conn = await super()._acquire()
+        if (self.statements or self.prepare) and not getattr(conn, "_asmysql_warmed", False):
+            try:
+                await self.init_connection(conn)
+            except BaseException:
+                conn.close()
+                self.release(conn)
+                raise
+        return conn
+
+    async def init_connection(self, conn: Connection):
+        """在新连接上执行预热语句并预处理语句"""
+        if self.statements:
+            cursor = await conn.cursor()
+            try:
+                for statement in self.statements:
+                    await cursor.execute(statement)
+            finally:
+                await cursor.close()
+        if self.prepare:
+            await prime_statements(conn, self.prepare, cache_size=self.__prepared_cache_size)
+        conn._asmysql_warmed = True
+
+    async def open_idle(self) -> Optional[Connection]:
+        """在锁外新建一个连接，预热后放入空闲队列，连接池已满或关闭时返回None"""
+        if self._closing or (self.maxsize and self.size >= self.maxsize):
+            return None
+        self._acquiring += 1
+        try:
+            conn = await connect(echo=self._echo, loop=self._loop, **self._conn_kwargs)
+            try:
+                await self.init_connection(conn)
+            except BaseException:
+                conn.close()
+                raise
+        finally:
+            self._acquiring -= 1
+        async with self._cond:
+            if self._closing:
+                conn.close()
+                # 唤醒 wait_closed
+                self._cond.notify_all()
+                return None
+            self._free.append(conn)
+            self._cond.notify()
+        return conn
+
+    async def warm_up(self, count: int, concurrency: int = 10):
+        """并发建立 count 个空闲连接，同时最多 concurrency 个握手，任何一个失败时取消其余的并抛出异常"""
+        count -= self.size
+        if count <= 0:
+            return
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _open():
+            async with semaphore:
+                await self.open_idle()
+
+        tasks = [asyncio.ensure_future(_open()) for _ in range(count)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+
+async def create_warmup_pool(
+    minsize: int = 1,
+    maxsize: int = 10,
+    echo: bool = False,
+    pool_recycle: float = -1,
+    *,
+    concurrency: int = 10,
+    pool_class: type[WarmupPool] = WarmupPool,
+    **kwargs,
+) -> WarmupPool:
+    """创建连接池并并发建立 minsize 个连接，参数与 aiomysql.create_pool 一致
+
+    :param concurrency: 启动时同时握手的最大连接数
+    :param pool_class: WarmupPool 或其子类
+    :param kwargs: statements/prepare/prepared_cache_size 及连接参数
+    """
+    pool = pool_class(minsize, maxsize, echo, pool_recycle, asyncio.get_running_loop(), **kwargs)
+    try:
+        await pool.warm_up(minsize, concurrency)
+    except BaseException:
+        pool.close()
+        await pool.wait_closed()
+        raise
+    pool.start()
+    return pool
@@ -152,6 +152,9 @@ class Engine:
             "pool_size": self.__pool.size if self.__pool else None,
             "pool_free": self.__pool.freesize if self.__pool else None,
             "pool_used": self.__pool.size - self.__pool.freesize if self.__pool else None,
+            # aiomysql 连接池不统计失效的连接
+            "pool_evicted": None,
+            "pool_leaked": None,
         }
         return _status
 
@@ -0,0 +1,45 @@
+"""
+连接健康检查
+
+MySQL 故障切换或者连接被服务端断开后，连接池中的空闲连接已经失效，直到下一次使用时才会发现。
+Pool(validation=...) 配置交出连接之前的检查策略:
+- never: 不检查(默认)，只丢弃 socket 已经关闭的连接
+- idle: 取出空闲超过 validation_idle 秒的连接时先发送 COM_PING，失败时关闭连接并取下一个
+- background: 后台清理线程每 validation_idle 秒对空闲超过 validation_idle 秒的空闲连接发送 COM_PING
+
+Engine(retry_reads=True) 时，只读语句(SELECT/SHOW/DESCRIBE/EXPLAIN)因为连接断开而执行失败时，在新连接上重试一次。
+"""
+
+import re
+from functools import lru_cache
+from typing import Final, Literal, get_args
+
+from pymysql.constants import CR
+from pymysql.err import InterfaceError, OperationalError
+
+ValidationPolicy = Literal["never", "idle", "background"]
+VALIDATION_POLICIES: Final[tuple[str, ...]] = get_args(ValidationPolicy)
+# 表示连接已经断开的错误码
+CONNECTION_LOST_ERRORS: Final[frozenset[int]] = frozenset(
+    (CR.CR_SERVER_GONE_ERROR, CR.CR_SERVER_LOST, CR.CR_SERVER_LOST_EXTENDED)
+)
+_LEADING_RE = re.compile(r"(?:\s+|/\*.*?\*/|(?:--|#)[^\n]*\n?|\()*(\w+)", re.S)
+_READ_KEYWORDS = frozenset(("SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "WITH"))
+# 有副作用的只读语句: SELECT ... INTO、用户锁
+_SIDE_EFFECT_RE = re.compile(r"\b(?:INTO|GET_LOCK|RELEASE_LOCK|RELEASE_ALL_LOCKS|INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+
+
+@lru_cache(maxsize=1024)
+def is_idempotent_read(query: str) -> bool:
+    """语句是否为可以安全重试的只读语句"""
+    match = _LEADING_RE.match(query)
+    if not match or match.group(1).upper() not in _READ_KEYWORDS:
+        return False
+    return not _SIDE_EFFECT_RE.search(query)
+
+
+def is_connection_lost(err: Exception) -> bool:
+    """错误是否由连接断开引起"""
+    if isinstance(err, InterfaceError):
+        return True
+    return isinstance(err, OperationalError) and bool(err.args) and err.args[0] in CONNECTION_LOST_ERRORS
@@ -0,0 +1,131 @@
+"""
+连接租约和泄漏检测
+
+Result 从连接池获取的连接由一个 ConnectionLease 持有，连接只通过租约归还，并且只归还一次:
+- 正常读取完毕或 close() 时归还到连接池，close() 可以重复调用。
+- 执行或读取过程中被中断(KeyboardInterrupt 等非 Exception 异常)时，连接可能停在协议的中间状态，关闭连接后再归还。
+- Result 没有关闭就被垃圾回收时，通过 weakref.finalize 关闭并归还连接，不依赖 __del__ 的调用时机，
+  同时发出 ResourceWarning 并计入 LeakDetector.leaked(Engine.status 中的 pool_leaked)。
+
+Engine(leak_trace_rate=0~1) 时按比例采样记录创建 Result 的调用栈，ResourceWarning 中输出创建位置。
+"""
+
+import random
+import threading
+import traceback
+import warnings
+import weakref
+from typing import Final, Optional
+
+from pymysql.connections import Connection
+from pymysql.cursors import Cursor
+
+from ._sync_pool import Pool
+
+# 采样记录的调用栈最多保留的层数
+STACK_LIMIT: Final[int] = 16
+
+
+class LeakDetector:
+    """统计没有关闭就被回收的 Result，按比例采样记录它们的创建位置"""
+
+    def __init__(self, sample_rate: float = 0.0):
+        """
+        :param sample_rate: 记录创建调用栈的比例(0~1)
+        """
+        self.sample_rate: Final[float] = min(max(sample_rate, 0.0), 1.0)
+        self.__lock: Final[threading.Lock] = threading.Lock()
+        self.__leaked: int = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} leaked={self.__leaked}>"
+
+    @property
+    def leaked(self) -> int:
+        """泄漏(被回收时仍然持有连接)的数量"""
+        return self.__leaked
+
+    def capture(self) -> Optional[traceback.StackSummary]:
+        """按采样比例记录当前调用栈(不包括 Result 内部的调用)，没有采样时返回 None"""
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        return traceback.StackSummary.from_list(traceback.extract_stack(limit=STACK_LIMIT + 2)[:-2])
+
+    def record(self):
+        with self.__lock:
+            self.__leaked += 1
+
+
+def report_leak(owner: str, stack: Optional[traceback.StackSummary]):
+    """对没有关闭就被回收的 Result 发出 ResourceWarning"""
+    message = f"{owner} was garbage collected without close(), its connection is discarded"
+    if stack is not None:
+        message += ", created at:\n" + "".join(stack.format())
+    warnings.warn(message, ResourceWarning, stacklevel=2)
+
+
+class ConnectionLease:
+    """Result 持有的一个连接，保证只归还一次"""
+
+    __slots__ = ("pool", "connection", "cursor", "released", "__lock", "__finalizer")
+
+    def __init__(
+        self,
+        pool: Pool,
+        conn: Connection,
+        *,
+        owner: object = None,
+        name: str = "",
+        detector: Optional[LeakDetector] = None,
+        stack: Optional[traceback.StackSummary] = None,
+    ):
+        self.pool: Final[Pool] = pool
+        self.connection: Final[Connection] = conn
+        # 在连接上执行语句的游标，由 Result 在创建游标后设置
+        self.cursor: Optional[Cursor] = None
+        self.released: bool = False
+        self.__lock: Final[threading.Lock] = threading.Lock()
+        # owner 被回收时仍然没有释放的连接由 finalizer 关闭并归还，finalizer 不能引用 owner
+        self.__finalizer: Optional[weakref.finalize] = (
+            weakref.finalize(owner, self.__leaked, name or type(owner).__name__, detector, stack)
+            if owner is not None
+            else None
+        )
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.connection!r} released={self.released}>"
+
+    def release(self, discard: bool = False):
+        """归还连接，重复调用时忽略(垃圾回收可能在任意线程中触发)
+
+        :param discard: 连接状态未知(如被中断时)，关闭连接后再归还，连接池会移除关闭的连接
+        """
+        with self.__lock:
+            if self.released:
+                return
+            self.released = True
+        if self.__finalizer is not None:
+            self.__finalizer.detach()
+        if discard:
+            self.__detach()
+            # noinspection PyProtectedMember
+            self.pool._close_connections((self.connection,))
+        self.pool.release(self.connection)
+
+    def __detach(self):
+        """放弃没有读取完的流式结果，连接关闭后 SSCursor.close() 和 MySQLResult.__del__ 不再从 socket 读取剩余的行"""
+        # noinspection PyProtectedMember
+        result = self.connection._result
+        if result is not None:
+            result.unbuffered_active = False
+        if self.cursor is not None:
+            # noinspection PyProtectedMember
+            self.cursor._result = None
+
+    def __leaked(self, owner: str, detector: Optional[LeakDetector], stack: Optional[traceback.StackSummary]):
+        if self.released:
+            return
+        if detector is not None:
+            detector.record()
+        report_leak(owner, stack)
+        self.release(discard=True)
@@ -0,0 +1,111 @@
+"""
+连接池大小的调整策略(与 v2 的 PoolSizer 相同)
+
+Pool(adaptive=True) 时，后台线程每 interval 秒根据上一周期的统计调整目标连接数:
+- 增长: 超过 5% 的获取等待时间大于 target_wait 时，目标连接数增加，并在后台提前建立连接。
+- 收缩: 连续 shrink_after 个周期的峰值利用率低于 50% 时，每个周期关闭一个最久未使用的空闲连接。
+- 限速: 新建连接(包括获取连接时按需新建)使用令牌桶限制为每秒 connect_rate 个，避免连接风暴。
+"""
+
+import math
+from typing import Final, Optional
+
+# 等待时间超过 target_wait 的获取次数比例超过该值时增加连接
+SLOW_ACQUIRE_RATIO: Final[float] = 0.05
+# 峰值利用率低于该值时认为连接过多
+LOW_UTILIZATION: Final[float] = 0.5
+
+
+class PoolSizer:
+    """连接池大小的调整策略(不做任何IO，由连接池在每个周期调用 plan)"""
+
+    def __init__(
+        self,
+        min_size: int,
+        max_size: int,
+        *,
+        target_wait: float = 0.005,
+        connect_rate: float = 10.0,
+        interval: float = 1.0,
+        shrink_after: int = 30,
+    ):
+        """
+        :param min_size: 最小连接数
+        :param max_size: 最大连接数，0表示不限制
+        :param target_wait: 获取连接的目标等待时间（秒）
+        :param connect_rate: 每秒最多新建的连接数
+        :param interval: 调整周期（秒）
+        :param shrink_after: 利用率连续低于 50% 多少个周期后开始收缩
+        """
+        self.min_size: Final[int] = min_size
+        self.max_size: Final[int] = max_size
+        self.target_wait: Final[float] = target_wait
+        self.connect_rate: Final[float] = max(connect_rate, 0.01)
+        self.interval: Final[float] = interval
+        self.shrink_after: Final[int] = max(shrink_after, 1)
+        # 目标连接数
+        self.target: int = min_size
+        # 令牌桶: 最多累积1秒(至少1个)的令牌
+        self.__burst: Final[float] = max(self.connect_rate, 1.0)
+        self.__tokens: float = self.__burst
+        self.__refilled: Optional[float] = None
+        # 本周期的统计
+        self.__acquires: int = 0
+        self.__slow: int = 0
+        self.__peak_used: int = 0
+        self.__low_periods: int = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} target={self.target}>"
+
+    def __refill(self, now: float):
+        if self.__refilled is not None:
+            self.__tokens = min(self.__burst, self.__tokens + (now - self.__refilled) * self.connect_rate)
+        self.__refilled = now
+
+    def allow_connect(self, now: float) -> bool:
+        """是否允许新建一个连接(允许时消耗一个令牌)"""
+        self.__refill(now)
+        if self.__tokens < 1:
+            return False
+        self.__tokens -= 1
+        return True
+
+    def connect_delay(self, now: float) -> float:
+        """距离下一个令牌可用的时间（秒）"""
+        self.__refill(now)
+        return max(0.0, (1 - self.__tokens) / self.connect_rate)
+
+    def record_acquire(self, wait: float, used: int):
+        """记录一次获取连接的等待时间和获取后使用中的连接数"""
+        self.__acquires += 1
+        if wait > self.target_wait:
+            self.__slow += 1
+        if used > self.__peak_used:
+            self.__peak_used = used
+
+    def plan(self, size: int, free: int, now: float) -> tuple[int, int]:
+        """结束一个周期，更新目标连接数，返回 (需要新建的连接数, 需要关闭的空闲连接数)"""
+        used = size - free
+        peak = max(self.__peak_used, used)
+        slow = self.__acquires and self.__slow / self.__acquires > SLOW_ACQUIRE_RATIO
+        limit = self.max_size or math.inf
+        if slow:
+            step = max(1, math.ceil(self.connect_rate * self.interval))
+            self.target = int(min(limit, max(self.target, size) + step))
+            self.__low_periods = 0
+        elif size and peak / size < LOW_UTILIZATION:
+            self.__low_periods += 1
+            if self.__low_periods >= self.shrink_after:
+                self.target = max(self.min_size, min(self.target, size) - 1, peak)
+        else:
+            # 按需新建的连接计入目标，避免刚建立就被收缩
+            self.__low_periods = 0
+            self.target = int(min(limit, max(self.target, size)))
+        self.__acquires = self.__slow = self.__peak_used = 0
+
+        opens = 0
+        while size + opens < self.target and self.allow_connect(now):
+            opens += 1
+        closes = 1 if size > self.target and free > 0 else 0
+        return opens, closes
@@ -1,11 +1,16 @@
+import logging
 import time
 from collections import deque
-from threading import Condition, Lock
-from typing import Deque, Set
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from threading import Condition, Event, Lock, Thread
+from typing import Deque, Optional, Sequence, Set
 
 import pymysql
 from pymysql.connections import Connection
 
+from ._health import VALIDATION_POLICIES, ValidationPolicy
+from ._pool_sizer import PoolSizer
+
 """
 开发中，请勿使用
 ai_prompt:
@@ -13,11 +18,28 @@ _sync_pool.py中的Pool的实现,想要跟　aiomysql中的Pool功能一样，
 因为aiomysql中的Pool是异步实现，现在根据这个功能实现 _sync_pool.py 中Pool的同步版本，依赖pymysql。
 """
 
+logger = logging.getLogger("asmysql")
+
+# 后台清理线程的默认检查间隔（秒）
+DEFAULT_REAP_INTERVAL = 30.0
+# SERVER_STATUS_IN_TRANS
+_SERVER_STATUS_IN_TRANS = 0x0001
+
 
 # noinspection SpellCheckingInspection
 class Pool:
     """
     基于 pymysql 实现的同步 MySQL 连接池，功能仿照 aiomysql.Pool
+
+    - 获取/归还连接只在锁内做 O(1) 的出栈/入栈操作，空闲连接后进先出，最近使用的连接优先复用。
+    - 新连接在锁外建立，锁内只记录预留数量(_acquiring)，慢的TCP连接不会阻塞其他线程。
+    - 空闲连接的回收(pool_recycle)、已断开连接的清理和 minsize 补充由后台线程定期执行。
+    - acquire 支持超时，连接池已满且在超时时间内没有连接归还时抛出 TimeoutError。
+    - adaptive=True 时由 PoolSizer 根据获取等待时间和利用率提前建立或逐步关闭空闲连接，并限制新建连接的速率。
+    - 初始化时使用最多 warmup_concurrency 个线程并发握手建立 min_pool_size 个连接，
+      每个新连接建立后执行 warmup_statements(如 SET SESSION ...)。
+    - validation 为 idle 时取出空闲较久的连接前发送 COM_PING，为 background 时由后台线程检查空闲连接，
+      失效的连接计入 evicted。
     """
 
     def __init__(
@@ -33,6 +55,16 @@ class Pool:
         connect_timeout: int = 5,
         auto_commit: bool = True,
         echo_sql_log: bool = False,
+        acquire_timeout: float = None,
+        reap_interval: float = None,
+        adaptive: bool = False,
+        target_wait: float = 0.005,
+        connect_rate: float = 10.0,
+        adjust_interval: float = 1.0,
+        warmup_concurrency: int = 10,
+        warmup_statements: Sequence[str] = (),
+        validation: ValidationPolicy = "never",
+        validation_idle: float = 30.0,
         **kwargs,
     ):
         """
@@ -49,14 +81,27 @@ class Pool:
         :param connect_timeout: 连接超时时间（秒）
         :param auto_commit: 是否自动提交事务
         :param echo_sql_log: 是否打印SQL语句日志
+        :param acquire_timeout: 获取连接的默认超时时间（秒），None表示一直等待
+        :param reap_interval: 后台清理线程的检查间隔（秒），默认为 pool_recycle 的一半，最多30秒
+        :param adaptive: 是否根据获取连接的等待时间和利用率自动调整连接数
+        :param target_wait: 自动调整时获取连接的目标等待时间（秒）
+        :param connect_rate: 自动调整时每秒最多新建的连接数
+        :param adjust_interval: 自动调整的周期（秒）
+        :param warmup_concurrency: 初始化时同时握手的最大连接数
+        :param warmup_statements: 每个新连接建立后执行的语句
+        :param validation: 连接检查策略，never/idle/background
+        :param validation_idle: 空闲超过该时间（秒）的连接才需要检查
         :param kwargs: 其他传递给连接的参数
         """
         if min_pool_size < 0:
             raise ValueError("minsize should be zero or greater")
         if max_pool_size < min_pool_size and max_pool_size != 0:
             raise ValueError("maxsize should be not less than minsize")
+        if validation not in VALIDATION_POLICIES:
+            raise ValueError(f"validation should be one of {VALIDATION_POLICIES}")
 
         self._minsize = min_pool_size
+        self._maxsize = max_pool_size
         self._conn_kwargs = {
             "host": host,
             "port": port,
@@ -69,23 +114,53 @@ class Pool:
         }
 
         # 连接池相关属性
-        self._free: Deque[Connection] = deque(maxlen=max_pool_size or None)
+        self._free: Deque[Connection] = deque()
         self._used: Set[Connection] = set()
         self._terminated: Set[Connection] = set()
+        # 已预留、正在锁外建立的连接数量
         self._acquiring = 0
+        # 正在等待连接的线程数量，没有等待者时归还连接不需要 notify
+        self._waiters = 0
         self._closing = False
         self._closed = False
         self._echo = echo_sql_log
         self._recycle = pool_recycle
+        self._acquire_timeout = acquire_timeout
+        self._warmup_statements = tuple(warmup_statements)
+        self._validation = validation
+        self._validation_idle = max(validation_idle, 0.0)
+        # 因为失效被移除的连接数量
+        self._evicted = 0
+        if reap_interval is None:
+            reap_interval = min(pool_recycle / 2, DEFAULT_REAP_INTERVAL) if pool_recycle > 0 else DEFAULT_REAP_INTERVAL
+        self._reap_interval = max(reap_interval, 0.01)
+        # 连接池大小的调整策略，调整在后台清理线程中执行
+        self._sizer: Optional[PoolSizer] = None
+        if adaptive:
+            self._sizer = PoolSizer(
+                min_pool_size,
+                max_pool_size,
+                target_wait=target_wait,
+                connect_rate=connect_rate,
+                interval=adjust_interval,
+            )
+            self._reap_interval = min(self._reap_interval, max(adjust_interval, 0.01))
+        if validation == "background":
+            self._reap_interval = min(self._reap_interval, max(self._validation_idle, 0.01))
 
         # 线程同步相关
         self._lock = Lock()
         self._cond = Condition(self._lock)
+        self._stop = Event()
 
         # 填充初始连接池
-        if min_pool_size > 0:
-            with self._cond:
-                self._fill_free_pool(False)
+        try:
+            self._fill_min_size(warmup_concurrency)
+        except BaseException:
+            self.clear()
+            raise
+        self._reaper = Thread(target=self._reap_loop, name=f"asmysql-pool-reaper-{host}:{port}", daemon=True)
+        self._reaper.start()
 
     @property
     def echo(self):
@@ -97,7 +172,7 @@ class Pool:
 
     @property
     def maxsize(self):
-        return self._free.maxlen
+        return self._maxsize
 
     @property
     def size(self):
@@ -107,13 +182,19 @@ class Pool:
     def freesize(self):
         return len(self._free)
 
+    @property
+    def evicted(self):
+        """因为失效被移除的连接数量"""
+        return self._evicted
+
     def clear(self):
         """Close all free connections in pool."""
         with self._cond:
-            while self._free:
-                conn = self._free.popleft()
-                conn.close()
-            self._cond.notify()
+            conns = list(self._free)
+            self._free.clear()
+            if self._waiters:
+                self._cond.notify(len(conns))
+        self._close_connections(conns)
 
     @property
     def closed(self):
@@ -130,7 +211,11 @@ class Pool:
         """
         if self._closed:
             return
-        self._closing = True
+        with self._cond:
+            self._closing = True
+            # 唤醒等待中的线程，让它们抛出异常
+            self._cond.notify_all()
+        self._stop.set()
 
     def terminate(self):
         """Terminate pool.
@@ -139,11 +224,12 @@ class Pool:
         """
         self.close()
 
-        for conn in list(self._used):
-            conn.close()
-            self._terminated.add(conn)
-
-        self._used.clear()
+        with self._cond:
+            used = list(self._used)
+            self._terminated.update(used)
+            self._used.clear()
+            self._cond.notify_all()
+        self._close_connections(used)
 
     def wait_closed(self):
         """Wait for closing all pool's connections."""
@@ -152,129 +238,293 @@ class Pool:
         if not self._closing:
             raise RuntimeError(".wait_closed() should be called after .close()")
 
-        while self._free:
-            conn = self._free.popleft()
-            conn.close()
-
+        self.clear()
         with self._cond:
-            while self.size > self.freesize:
+            while self._used or self._acquiring:
                 self._cond.wait()
+        if self._reaper.is_alive():
+            self._reaper.join()
 
         self._closed = True
 
-    def acquire(self):
-        """Acquire free connection from the pool."""
-        return self._acquire()
+    def acquire(self, timeout: float = None):
+        """Acquire free connection from the pool.
 
-    def _acquire(self):
-        if self._closing:
-            raise RuntimeError("Cannot acquire connection after closing pool")
-        with self._cond:
-            while True:
-                self._fill_free_pool(True)
-                if self._free:
-                    conn = self._free.popleft()
-                    # noinspection PyUnresolvedReferences,PyProtectedMember
-                    assert not conn._closed, conn
-                    assert conn not in self._used, (conn, self._used)
-                    self._used.add(conn)
-                    return conn
-                else:
-                    self._cond.wait()
-
-    def _fill_free_pool(self, override_min):
-        # iterate over free connections and remove timed out ones
-        free_size = len(self._free)
-        n = 0
-        while n < free_size:
-            conn = self._free[-1]
+        :param timeout: 等待连接的超时时间（秒），默认使用连接池的 acquire_timeout
+        """
+        timeout = self._acquire_timeout if timeout is None else timeout
+        while True:
+            conn = self._acquire(timeout)
+            if self._validation != "idle":
+                return conn
+            now = time.monotonic()
+            if now - getattr(conn, "_last_used", now) < self._validation_idle or self._ping(conn):
+                return conn
+            # 连接已失效，release 时计入 evicted，继续取下一个(没有空闲连接时新建)
+            self.release(conn)
+
+    def _acquire(self, timeout: Optional[float]):
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        stale = []
+        try:
+            with self._cond:
+                while True:
+                    if self._closing:
+                        raise RuntimeError("Cannot acquire connection after closing pool")
+                    while self._free:
+                        conn = self._free.pop()
+                        if self._is_stale(conn, time.monotonic()):
+                            # noinspection PyProtectedMember
+                            self._evicted += conn._sock is None
+                            stale.append(conn)
+                            continue
+                        self._used.add(conn)
+                        if self._sizer is not None:
+                            self._sizer.record_acquire(time.monotonic() - started, len(self._used))
+                        return conn
+                    now = time.monotonic()
+                    remaining = None if deadline is None else deadline - now
+                    wait = remaining
+                    if not self._maxsize or self.size < self._maxsize:
+                        if self._sizer is None or self._sizer.allow_connect(now):
+                            # 预留一个连接名额，在锁外建立连接
+                            self._acquiring += 1
+                            break
+                        # 新建连接超过限速，等待连接归还或下一个令牌
+                        delay = self._sizer.connect_delay(now)
+                        wait = delay if remaining is None else min(remaining, delay)
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"Timed out waiting for a free connection after {timeout}s")
+                    self._waiters += 1
+                    try:
+                        self._cond.wait(wait)
+                    finally:
+                        self._waiters -= 1
+        finally:
+            self._close_connections(stale)
+        conn = self._open_reserved(used=True)
+        if self._sizer is not None:
+            with self._cond:
+                self._sizer.record_acquire(time.monotonic() - started, len(self._used))
+        return conn
 
-            # 检查连接是否已经关闭
-            # noinspection PyUnresolvedReferences,PyProtectedMember
-            if conn._sock is None:
-                self._free.pop()
-                conn.close()
-            # 检查连接是否超时
-            elif self._recycle > -1 and hasattr(conn, "_last_used") and (time.time() - conn._last_used > self._recycle):
-                self._free.pop()
+    def _open_reserved(self, used: bool):
+        """建立已预留名额的连接，used=True 时直接标记为使用中，否则放入空闲队列"""
+        try:
+            conn = self._new_connection()
+        except BaseException:
+            with self._cond:
+                self._acquiring -= 1
+                # 名额释放，唤醒一个等待者自行建立连接
+                if self._waiters:
+                    self._cond.notify()
+            raise
+        with self._cond:
+            self._acquiring -= 1
+            if self._closing and not used:
+                self._cond.notify_all()
                 conn.close()
+                return None
+            if used:
+                self._used.add(conn)
             else:
-                self._free.rotate()
-            n += 1
-
-        while self.size < self.minsize:
-            self._acquiring += 1
-            try:
-                conn = self._new_connection()
-                # raise exception if pool is closing
-                if self._closing:
-                    conn.close()
-                    return
-                self._free.append(conn)
-                self._cond.notify()
-            except (pymysql.Error, OSError) as e:
-                # 发生异常时减少_acquiring计数
-                raise Exception(f"Failed to create new connection: {str(e)}") from e
-            finally:
-                self._acquiring -= 1
-        if self._free:
-            return
-
-        if override_min and (not self.maxsize or self.size < self.maxsize):
-            self._acquiring += 1
-            try:
-                conn = self._new_connection()
-                # raise exception if pool is closing
-                if self._closing:
-                    conn.close()
-                    return
+                conn._last_used = time.monotonic()
                 self._free.append(conn)
-                self._cond.notify()
-            except (pymysql.Error, OSError) as e:
-                # 发生异常时减少_acquiring计数
-                raise Exception(f"Failed to create new connection: {str(e)}") from e
-            finally:
-                self._acquiring -= 1
+                if self._waiters:
+                    self._cond.notify()
+        return conn
+
+    def _ping(self, conn: Connection):
+        """发送 COM_PING 检查连接，不重连，超时(connect_timeout)或失败时关闭连接并返回 False"""
+        # noinspection PyProtectedMember
+        sock = conn._sock
+        try:
+            if sock is None:
+                raise pymysql.err.InterfaceError("Not connected")
+            sock.settimeout(self._conn_kwargs["connect_timeout"])
+            conn.ping(reconnect=False)
+            # noinspection PyProtectedMember
+            sock.settimeout(conn._read_timeout)
+        except (pymysql.Error, OSError):
+            self._close_connections((conn,))
+            return False
+        return True
+
+    def _is_stale(self, conn: Connection, now: float):
+        # noinspection PyUnresolvedReferences,PyProtectedMember
+        if conn._sock is None:
+            return True
+        return self._recycle > -1 and now - getattr(conn, "_last_used", now) > self._recycle
 
-    def _wakeup(self):
+    def _fill_min_size(self, concurrency: int = 1):
+        """补充连接到 minsize，连接在锁外建立"""
         with self._cond:
-            self._cond.notify()
+            if self._closing or self.size >= self._minsize:
+                return
+            count = self._minsize - self.size
+            self._acquiring += count
+        self._open_reserved_many(count, concurrency)
 
-    def release(self, conn: Connection):
-        """Release free connection back to the connection pool."""
-        if conn in self._terminated:
-            # noinspection PyUnresolvedReferences,PyProtectedMember
-            assert conn._closed, conn
-            self._terminated.remove(conn)
+    def _open_reserved_many(self, count: int, concurrency: int = 1):
+        """建立 count 个已预留名额的空闲连接，concurrency 大于1时在多个线程中并发握手
+
+        失败时释放还没有开始建立的预留名额，并抛出第一个异常
+        """
+        if concurrency <= 1 or count <= 1:
+            for i in range(count):
+                try:
+                    self._open_reserved(used=False)
+                except BaseException:
+                    self._release_reserved(count - i - 1)
+                    raise
             return
-        assert conn in self._used, (conn, self._used)
-        self._used.remove(conn)
-        # noinspection PyUnresolvedReferences,PyProtectedMember
-        if not conn._closed:
-            try:
-                # 检查是否有活动的事务
-                # noinspection PyUnresolvedReferences
-                in_trans = not conn.get_autocommit() and (conn.server_status & 0x0001)  # SERVER_STATUS_IN_TRANS
-                if in_trans:
-                    conn.close()
-                    return
-            except (pymysql.Error, AttributeError):
-                # 如果无法确定事务状态，安全起见关闭连接
-                conn.close()
+        with ThreadPoolExecutor(min(concurrency, count), thread_name_prefix="asmysql-pool-warmup") as executor:
+            futures = [executor.submit(self._open_reserved, False) for _ in range(count)]
+            wait(futures, return_when=FIRST_EXCEPTION)
+            self._release_reserved(sum(future.cancel() for future in futures))
+        for future in futures:
+            if not future.cancelled() and future.exception() is not None:
+                raise future.exception()
+
+    def _release_reserved(self, count: int):
+        """释放预留的连接名额"""
+        if count > 0:
+            with self._cond:
+                self._acquiring -= count
+                self._cond.notify_all()
+
+    def _reap(self):
+        """清理已断开或超过 pool_recycle 的空闲连接，并补充到 minsize"""
+        now = time.monotonic()
+        with self._cond:
+            # 最久未使用的连接在队列左侧
+            stale = [conn for conn in self._free if self._is_stale(conn, now)]
+            # noinspection PyProtectedMember
+            self._evicted += sum(conn._sock is None for conn in stale)
+            if stale:
+                stale_ids = set(map(id, stale))
+                keep = [conn for conn in self._free if id(conn) not in stale_ids]
+                self._free.clear()
+                self._free.extend(keep)
+        self._close_connections(stale)
+        if self._validation == "background":
+            self._validate_idle()
+        self._fill_min_size()
+        if self._sizer is not None:
+            self._adjust()
+
+    def _validate_idle(self):
+        """检查空闲超过 validation_idle 秒的空闲连接，移除失效的连接"""
+        now = time.monotonic()
+        with self._cond:
+            idle = [conn for conn in self._free if now - getattr(conn, "_last_used", now) >= self._validation_idle]
+            if not idle:
                 return
+            idle_ids = set(map(id, idle))
+            keep = [conn for conn in self._free if id(conn) not in idle_ids]
+            self._free.clear()
+            self._free.extend(keep)
+            # 检查期间计入正在建立的连接，连接池大小不变
+            self._acquiring += len(idle)
+        alive = [self._ping(conn) for conn in idle]
+        close = []
+        with self._cond:
+            self._acquiring -= len(idle)
+            # 检查通过的连接仍然是最久未使用的，放回队列左侧
+            for conn, ok in zip(reversed(idle), reversed(alive)):
+                if ok and not self._closing:
+                    self._free.appendleft(conn)
+                elif ok:
+                    close.append(conn)
+                else:
+                    self._evicted += 1
+            self._cond.notify_all()
+        self._close_connections(close)
 
+    def _adjust(self):
+        """执行一个调整周期: 关闭最久未使用的空闲连接，或在锁外提前建立连接"""
+        with self._cond:
             if self._closing:
+                return
+            opens, closes = self._sizer.plan(self.size, len(self._free), time.monotonic())
+            idle = []
+            # 空闲连接后进先出，最久未使用的连接在队列左侧
+            while closes > 0 and self._free and self.size > self._minsize:
+                idle.append(self._free.popleft())
+                closes -= 1
+            if self._maxsize:
+                opens = max(min(opens, self._maxsize - self.size), 0)
+            self._acquiring += opens
+        self._close_connections(idle)
+        self._open_reserved_many(opens)
+
+    def _reap_loop(self):
+        while not self._stop.wait(self._reap_interval):
+            try:
+                self._reap()
+            except (pymysql.Error, OSError):
+                # 补充连接失败时等待下一轮重试
+                pass
+            except Exception as err:
+                # 其他错误也不能结束线程，否则之后不再回收空闲连接和补充连接
+                logger.warning("Pool reaper failed: %r", err)
+
+    @staticmethod
+    def _close_connections(conns):
+        for conn in conns:
+            try:
                 conn.close()
+            except (pymysql.Error, OSError):
+                pass
+
+    def release(self, conn: Connection):
+        """Release free connection back to the connection pool."""
+        close = False
+        with self._cond:
+            if conn in self._terminated:
+                # noinspection PyUnresolvedReferences,PyProtectedMember
+                assert conn._closed, conn
+                self._terminated.remove(conn)
+                return
+            assert conn in self._used, (conn, self._used)
+            self._used.remove(conn)
+            # noinspection PyUnresolvedReferences,PyProtectedMember
+            if conn._closed or not conn.open:
+                # 已关闭或 socket 已被强制关闭(如连接断开、LOAD DATA 中止)
+                self._evicted += 1
+            elif self._closing or self._in_transaction(conn):
+                # 关闭中或有未结束的事务，关闭连接
+                close = True
             else:
                 # 记录最后使用时间
-                conn._last_used = time.time()
+                conn._last_used = time.monotonic()
                 self._free.append(conn)
-        self._wakeup()
+            if self._closing:
+                self._cond.notify_all()
+            elif self._waiters:
+                self._cond.notify()
+        if close:
+            self._close_connections((conn,))
+
+    @staticmethod
+    def _in_transaction(conn: Connection):
+        try:
+            # noinspection PyUnresolvedReferences
+            return not conn.get_autocommit() and bool(conn.server_status & _SERVER_STATUS_IN_TRANS)
+        except (pymysql.Error, AttributeError):
+            # 如果无法确定事务状态，安全起见关闭连接
+            return True
 
     def _new_connection(self):
         """Create a new connection and return it"""
-        try:
-            return pymysql.connect(**self._conn_kwargs)
-        except Exception as e:
-            # 捕获连接异常并重新抛出，提供更明确的错误信息
-            raise Exception(f"Failed to create new connection: {str(e)}") from e
+        conn = pymysql.connect(**self._conn_kwargs)
+        if self._warmup_statements:
+            try:
+                with conn.cursor() as cursor:
+                    for statement in self._warmup_statements:
+                        cursor.execute(statement)
+            except BaseException:
+                self._close_connections((conn,))
+                raise
+        return conn
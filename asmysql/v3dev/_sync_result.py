@@ -1,16 +1,30 @@
 from functools import lru_cache
-from typing import Final, Generic, Iterator, Optional, Sequence, TypeVar, Union
+from typing import Callable, Final, Generic, Iterator, Optional, Sequence, TypeVar, Union
 
 from pymysql.cursors import Cursor, DictCursor, SSCursor, SSDictCursor
 from pymysql.err import MySQLError
 
+from .._columnar import (
+    DEFAULT_BATCH_SIZE,
+    check_batch_size,
+    concat_arrow_batches,
+    concat_numpy_columns,
+    to_arrow_batch,
+    to_numpy_columns,
+)
+from .._row_factory import column_keys, get_row_factory
+from ._health import is_connection_lost
+from ._lease import ConnectionLease, LeakDetector
+from ._load_data import RowSource, load_rows
 from ._sync_pool import Pool
+from ._timeout import add_execution_time_hint, execute_with_timeout
 
 T = TypeVar("T", bound=type)
 
 
 def _get_cursor_class(*, result_class: type, stream: bool):
-    if result_class is tuple:
+    # 自定义的 result_class 也使用返回 tuple 的游标，由行工厂直接从 tuple 创建对象
+    if result_class is not dict:
         if stream:
             return SSCursor
         return Cursor
@@ -31,6 +45,11 @@ class Result(Generic[T]):
         stream: bool = False,
         commit: bool = True,
         result_class: T = tuple,
+        load_source: RowSource = None,
+        retry: bool = False,
+        timeout: float = None,
+        timeout_hint: bool = False,
+        leak_detector: LeakDetector = None,
     ):
         self.pool: Final[Pool] = pool
         self.query: Final[str] = query
@@ -43,6 +62,25 @@ class Result(Generic[T]):
         self.__executed: bool = False
         self.__error: Optional[MySQLError] = None
         self.__conn_autoclose: bool = True
+        # LOAD DATA LOCAL INFILE 的数据来源
+        self.__load_source: Final[Optional[RowSource]] = load_source
+        # 从 tuple 行创建 result_class 对象的函数，第一次获取数据时根据列名编译
+        self.__row_factory: Optional[Callable[[tuple], T]] = None
+        # 连接断开导致执行失败时是否在新连接上重试一次(只用于只读语句)
+        self.__retry: Final[bool] = retry
+        # 语句执行超时（秒），超时时使用 KILL QUERY 中断，不用于 execute_many 和 load_rows
+        self.__timeout: Final[Optional[float]] = (
+            timeout if timeout and timeout > 0 and not execute_many and load_source is None else None
+        )
+        # 发送到服务端的语句，timeout_hint 时 SELECT 语句加上 MAX_EXECUTION_TIME 优化器提示
+        self.__statement: Final[str] = (
+            add_execution_time_hint(query, self.__timeout) if timeout_hint and self.__timeout else query
+        )
+        # 持有的连接，只通过租约归还(只归还一次)，没有关闭就被回收时由租约关闭连接并记录泄漏
+        self.__lease: Optional[ConnectionLease] = None
+        self.__leak_detector: Final[Optional[LeakDetector]] = leak_detector
+        # 采样记录的创建位置，泄漏时输出到 ResourceWarning
+        self.__stack = leak_detector.capture() if leak_detector is not None else None
 
     # @property
     # def cursor(self):
@@ -56,19 +94,28 @@ class Result(Generic[T]):
     def __repr__(self):
         return f"<{self.__class__.__name__}: {self.query}>"
 
-    def __del__(self):
-        if self.error:
-            return
-        if self.__cursor:
-            conn = self.__cursor.connection
-            if conn:
-                self.pool.release(conn)
+    def __get_row_factory(self) -> Callable[[tuple], T]:
+        if self.__row_factory is None:
+            self.__row_factory = get_row_factory(self._result_class, column_keys(self.__cursor))
+        return self.__row_factory
+
+    def __discard(self):
+        """被中断时不再读取剩余的结果，连接可能停在协议的中间状态，关闭后归还"""
+        if self.__lease is not None:
+            self.__lease.release(discard=True)
 
     def close(self):
-        conn = self.__cursor.connection
-        self.__cursor.close()
-        if conn:
-            self.pool.release(conn)
+        """关闭游标并归还连接，可以重复调用"""
+        lease = self.__lease
+        if lease is None or lease.released:
+            return
+        try:
+            self.__cursor.close()
+        except BaseException:
+            # 读取剩余的结果时出错或被中断
+            lease.release(discard=True)
+            raise
+        lease.release()
 
     def __enter__(self):
         self.__conn_autoclose = False
@@ -76,7 +123,9 @@ class Result(Generic[T]):
         return self
 
     def __exit__(self, exc_type, exc_value, exc_tb):
-        if self.error:
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            # KeyboardInterrupt 等中断
+            self.__discard()
             return
         self.close()
 
@@ -109,23 +158,58 @@ class Result(Generic[T]):
             return self
         cursor_class = _get_cursor_class(result_class=self._result_class, stream=self.stream)
         try:
-            # 从连接池获取连接
-            conn = self.pool.acquire()
-            self.__cursor = conn.cursor(cursor_class)
-            if self.__execute_many:
-                self.__cursor.executemany(self.query, self.values)
-            else:
-                self.__cursor.execute(self.query, self.values)
-            if self.commit:
-                self.__cursor.connection.commit()
+            try:
+                self.__execute(cursor_class)
+            except MySQLError as err:
+                if not (self.__retry and self.__cursor is not None and is_connection_lost(err)):
+                    raise
+                # 连接已断开(如数据库故障切换)，关闭并移除失效的连接，在新连接上重试一次
+                self.__cursor.close()
+                self.__lease.release(discard=True)
+                self.__cursor = None
+                self.__execute(cursor_class)
         except MySQLError as err:
-            self.__cursor.close()
-            self.pool.release(self.__cursor.connection)
+            if self.__lease is not None:
+                try:
+                    if self.__cursor is not None:
+                        self.__cursor.close()
+                finally:
+                    self.__lease.release()
             self.__error = err
+        except BaseException:
+            # 被中断或者其他异常
+            self.__discard()
+            raise
         finally:
             self.__executed = True
         return self
 
+    def __execute(self, cursor_class: type):
+        """从连接池获取连接并执行语句，失败时抛出 MySQLError"""
+        conn = self.pool.acquire()
+        self.__lease = ConnectionLease(
+            self.pool,
+            conn,
+            owner=self,
+            name=f"<{self.__class__.__name__}: {self.query}>",
+            detector=self.__leak_detector,
+            stack=self.__stack,
+        )
+        self.__cursor = conn.cursor(cursor_class)
+        self.__lease.cursor = self.__cursor
+        if self.__execute_many:
+            self.__cursor.executemany(self.query, self.values)
+        elif self.__load_source is not None:
+            load_rows(self.__cursor, self.query, self.__load_source)
+        elif self.__timeout is None:
+            self.__cursor.execute(self.__statement, self.values)
+        else:
+            execute_with_timeout(
+                self.pool, conn, lambda: self.__cursor.execute(self.__statement, self.values), self.__timeout
+            )
+        if self.commit:
+            self.__cursor.connection.commit()
+
     @property
     @lru_cache
     def error_no(self):
@@ -160,6 +244,16 @@ class Result(Generic[T]):
             return None
         return self.__cursor.rowcount
 
+    @property
+    def warning_count(self):
+        """获取语句执行产生的警告数量(如 LOAD DATA 导入时被截断或转换的字段)
+
+        如果mysql报错，则返回None
+        """
+        if self.error or not self.__cursor:
+            return None
+        return self.__cursor.warning_count
+
     @property
     def last_rowid(self):
         """
@@ -200,7 +294,7 @@ class Result(Generic[T]):
             self.close()
             return None
         if self._result_class is not tuple and self._result_class is not dict:
-            _data: T = self._result_class(**data)
+            _data: T = self.__get_row_factory()(data)
         else:
             _data: T = data
         if self.__conn_autoclose:
@@ -221,7 +315,7 @@ class Result(Generic[T]):
             self.close()
             return _data
         if self._result_class is not tuple and self._result_class is not dict:
-            _data = [self._result_class(**item) for item in data]
+            _data = list(map(self.__get_row_factory(), data))
         else:
             _data = data
         if self.__conn_autoclose:
@@ -236,8 +330,7 @@ class Result(Generic[T]):
         # noinspection PyUnresolvedReferences
         data = self.__cursor.fetchall()
         if self._result_class is not tuple and self._result_class is not dict:
-            _data: list[T] = [self._result_class(**item) for item in data]
-            return _data
+            _data: list[T] = list(map(self.__get_row_factory(), data))
         else:
             _data: list[T] = data
         self.close()
@@ -257,7 +350,7 @@ class Result(Generic[T]):
                     data = self.__cursor.fetchone()
                     if data:
                         if self._result_class is not tuple and self._result_class is not dict:
-                            _data: T = self._result_class(**data)
+                            _data: T = self.__get_row_factory()(data)
                         else:
                             _data: T = data
                         yield _data
@@ -265,3 +358,75 @@ class Result(Generic[T]):
                         break
             finally:
                 self.close()
+
+    def fetch_columns(self, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+        """以列的形式获取所有记录(需要安装 numpy)
+
+        按批读取行并根据 cursor.description 中的列类型直接转换为 numpy 数组，不会创建 result_class 对象:
+        整数 -> int64，浮点数 -> float64，DATETIME/TIMESTAMP -> datetime64[us]，DATE -> datetime64[D]，
+        TIME -> timedelta64[us]，其他类型 -> object。含 NULL 的数值列返回 numpy.ma.MaskedArray。
+        使用 stream 执行时，每次只从服务端读取 batch_size 行。
+
+        :param batch_size: 每批转换的行数
+        :return: {列名: 数组}，没有结果集则返回空字典
+        """
+        batch_size = check_batch_size(batch_size)
+        self.__call__()
+        if self.error or not self.__cursor:
+            return {}
+        description = self.__cursor.description
+        if not description:
+            self.close()
+            return {}
+        batches = []
+        try:
+            while True:
+                rows = self.__cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                batches.append(to_numpy_columns(description, rows))
+        finally:
+            self.close()
+        return concat_numpy_columns(description, batches)
+
+    def fetch_arrow(self, batch_size: int = DEFAULT_BATCH_SIZE, dictionary: bool = True):
+        """以 pyarrow.Table 的形式获取所有记录(需要安装 pyarrow)
+
+        :param batch_size: 每个 RecordBatch 的行数
+        :param dictionary: 字符串列是否使用字典编码
+        :return: pyarrow.Table，没有结果集则返回None
+        """
+        batch_size = check_batch_size(batch_size)
+        self.__call__()
+        if self.error or not self.__cursor:
+            return None
+        description = self.__cursor.description
+        if not description:
+            self.close()
+            return None
+        batches = list(self.iterate_arrow(batch_size, dictionary))
+        return concat_arrow_batches(description, batches, dictionary)
+
+    def iterate_arrow(self, batch_size: int = DEFAULT_BATCH_SIZE, dictionary: bool = True):
+        """生成器按批遍历记录，每批为一个 pyarrow.RecordBatch(需要安装 pyarrow)
+
+        使用 stream 执行时，每次只从服务端读取 batch_size 行，适合处理超大结果集。
+
+        :param batch_size: 每个 RecordBatch 的行数
+        :param dictionary: 字符串列是否使用字典编码
+        """
+        batch_size = check_batch_size(batch_size)
+        self.__call__()
+        if self.error or not self.__cursor:
+            return
+        description = self.__cursor.description
+        try:
+            if not description:
+                return
+            while True:
+                rows = self.__cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield to_arrow_batch(description, rows, dictionary)
+        finally:
+            self.close()
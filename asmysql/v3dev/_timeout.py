@@ -0,0 +1,86 @@
+"""
+语句执行超时
+
+Engine.execute(timeout=秒) 时启动一个定时器，超时后从另一个新建的连接发送 KILL QUERY <connection_id>，
+服务端中断语句后原连接收到 1317 Query execution was interrupted，连接状态正常，继续归还到连接池，
+语句的错误为 QueryTimeoutError，Result.error_no 为 3024(ER_QUERY_TIMEOUT)。
+语句在中断之前恰好执行完成时，正常返回结果。
+
+同步连接不能在另一个线程中安全地中断读取，服务端没有响应 KILL QUERY 时仍然会一直等待，
+需要时可以配合连接的 read_timeout 使用。
+Engine(query_timeout_hint=True) 时还会给 SELECT 语句加上 /*+ MAX_EXECUTION_TIME(毫秒) */ 优化器提示。
+"""
+
+import math
+import re
+import threading
+from typing import Callable, TypeVar
+
+import pymysql
+from pymysql.connections import Connection
+from pymysql.constants import ER
+from pymysql.err import MySQLError
+
+from ._error import QueryTimeoutError
+from ._sync_pool import Pool
+
+T = TypeVar("T")
+_SELECT_RE = re.compile(r"(\s*\(?\s*SELECT\b)(\s*/\*\+)?", re.I)
+
+
+def add_execution_time_hint(query: str, timeout: float) -> str:
+    """给 SELECT 语句加上 MAX_EXECUTION_TIME 优化器提示，其他语句和已有优化器提示的语句不修改"""
+    match = _SELECT_RE.match(query)
+    if not match or match.group(2):
+        return query
+    milliseconds = max(1, math.ceil(timeout * 1000))
+    return f"{match.group(1)} /*+ MAX_EXECUTION_TIME({milliseconds}) */{query[match.end(1) :]}"
+
+
+def kill_query(pool: Pool, connection_id: int) -> bool:
+    """使用新建的连接中断另一个连接上正在执行的语句(连接池可能已经没有空闲连接)，返回是否成功"""
+    try:
+        # noinspection PyProtectedMember
+        conn = pymysql.connect(**pool._conn_kwargs)
+    except (MySQLError, OSError):
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"KILL QUERY {int(connection_id)}")
+        return True
+    except MySQLError:
+        return False
+    finally:
+        conn.close()
+
+
+def execute_with_timeout(pool: Pool, conn: Connection, execution: Callable[[], T], timeout: float) -> T:
+    """在 timeout 秒内执行语句，超时时中断服务端的语句并抛出 QueryTimeoutError"""
+    lock = threading.Lock()
+    finished = False
+    killed = False
+
+    def kill():
+        nonlocal killed
+        with lock:
+            # 语句已经执行完成时不再发送 KILL QUERY，避免中断同一连接上的下一条语句
+            if finished:
+                return
+            killed = True
+            kill_query(pool, conn.thread_id())
+
+    timer = threading.Timer(timeout, kill)
+    timer.daemon = True
+    timer.start()
+    try:
+        return execution()
+    except MySQLError as err:
+        if killed and err.args[:1] == (ER.QUERY_INTERRUPTED,):
+            raise QueryTimeoutError(
+                ER.QUERY_TIMEOUT, f"Query execution was interrupted, execution time exceeded {timeout} seconds"
+            ) from None
+        raise
+    finally:
+        timer.cancel()
+        with lock:
+            finished = True
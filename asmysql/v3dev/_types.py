@@ -9,3 +9,5 @@ class EngineStatus(TypedDict):
     pool_size: Optional[int]
     pool_free: Optional[int]
     pool_used: Optional[int]
+    pool_evicted: Optional[int]  # 因为失效被移除的连接数量
+    pool_leaked: Optional[int]  # 没有关闭就被回收的 Result 持有(已关闭)的连接数量
@@ -0,0 +1,111 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from asmysql.testing import FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+from asmysql.v2._adaptive_pool import AdaptivePool, PoolSizer, create_adaptive_pool
+
+
+class TestPoolSizer(TestCase):
+    def test_grow_when_acquire_slow(self):
+        sizer = PoolSizer(1, 10, target_wait=0.01, connect_rate=4, interval=1.0)
+        for _ in range(10):
+            sizer.record_acquire(0.0, 1)
+        self.assertEqual(sizer.plan(2, 1, 0.0), (0, 0))
+        self.assertEqual(sizer.target, 2)
+
+        sizer.record_acquire(0.1, 2)
+        self.assertEqual(sizer.plan(2, 0, 1.0), (4, 0))
+        self.assertEqual(sizer.target, 6)
+
+    def test_grow_capped_by_max_size(self):
+        sizer = PoolSizer(1, 3, target_wait=0.01, connect_rate=100)
+        sizer.record_acquire(0.1, 1)
+        self.assertEqual(sizer.plan(1, 0, 0.0), (2, 0))
+        self.assertEqual(sizer.target, 3)
+
+    def test_connect_rate_limit(self):
+        sizer = PoolSizer(0, 0, connect_rate=2)
+        self.assertTrue(sizer.allow_connect(0.0))
+        self.assertTrue(sizer.allow_connect(0.0))
+        self.assertFalse(sizer.allow_connect(0.0))
+        self.assertAlmostEqual(sizer.connect_delay(0.0), 0.5)
+        self.assertFalse(sizer.allow_connect(0.25))
+        self.assertTrue(sizer.allow_connect(0.5))
+
+    def test_shrink_after_low_utilization(self):
+        sizer = PoolSizer(1, 10, shrink_after=3)
+        sizer.target = 4
+        self.assertEqual(sizer.plan(4, 4, 0.0), (0, 0))
+        self.assertEqual(sizer.plan(4, 4, 1.0), (0, 0))
+        self.assertEqual(sizer.plan(4, 4, 2.0), (0, 1))
+        self.assertEqual(sizer.target, 3)
+        self.assertEqual(sizer.plan(3, 3, 3.0), (0, 1))
+        self.assertEqual(sizer.plan(2, 2, 4.0), (0, 1))
+        self.assertEqual(sizer.plan(1, 1, 5.0), (0, 0))
+        self.assertEqual(sizer.target, 1)
+
+    def test_busy_period_resets_shrink(self):
+        sizer = PoolSizer(1, 10, shrink_after=2)
+        sizer.target = 4
+        self.assertEqual(sizer.plan(4, 4, 0.0), (0, 0))
+        sizer.record_acquire(0.0, 3)
+        self.assertEqual(sizer.plan(4, 4, 1.0), (0, 0))
+        self.assertEqual(sizer.plan(4, 4, 2.0), (0, 0))
+        self.assertEqual(sizer.target, 4)
+
+
+class TestAdaptivePool(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试连接池自动调整"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"^SELECT", ResultSet(["id"], [(1,)]))
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def _pool(self, **kwargs) -> AdaptivePool:
+        pool = await create_adaptive_pool(
+            host=self.server.host, port=self.server.port, user="fake", password="fake", **kwargs
+        )
+        self.addAsyncCleanup(pool.wait_closed)
+        self.addCleanup(pool.close)
+        return pool
+
+    async def test_grow_and_shrink(self):
+        pool = await self._pool(minsize=1, maxsize=10, target_wait=0, connect_rate=100, interval=0.02, shrink_after=2)
+        conns = [await pool.acquire() for _ in range(3)]
+        for conn in conns:
+            pool.release(conn)
+        await pool.adjust()
+        self.assertGreater(pool.size, 3)
+        self.assertEqual(pool.freesize, pool.size)
+
+        for _ in range(100):
+            if pool.size == 1:
+                break
+            await asyncio.sleep(0.02)
+        self.assertEqual(pool.size, 1)
+
+    async def test_connect_rate_limit(self):
+        pool = await self._pool(minsize=0, maxsize=10, connect_rate=1, interval=10)
+        conn = await pool.acquire()
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.acquire(), 0.1)
+        self.assertEqual(pool.size, 1)
+        pool.release(conn)
+        async with pool.acquire() as conn2:
+            self.assertIs(conn2, conn)
+
+    async def test_engine_adaptive_pool(self):
+        engine = Engine(self.server.url + "?adaptive_pool=true&pool_connect_rate=5", min_pool_size=1)
+        await engine.connect()
+        try:
+            self.assertIsInstance(engine.pool, AdaptivePool)
+            self.assertEqual(engine.pool.sizer.connect_rate, 5)
+            result = await engine.execute("SELECT 1")
+            self.assertEqual(await result.fetch_one(), (1,))
+        finally:
+            await engine.disconnect()
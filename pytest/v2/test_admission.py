@@ -0,0 +1,166 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from asmysql.testing import FakeMySQLServer, ResultSet
+from asmysql.v2 import AcquireTimeoutError, CircuitOpenError, Engine, PoolQueueFullError
+from asmysql.v2._admission import AdmissionController
+
+
+class TestAdmissionController(IsolatedAsyncioTestCase):
+    async def test_max_queue(self):
+        controller = AdmissionController(max_queue=2)
+        release = asyncio.Event()
+
+        async def acquire():
+            await release.wait()
+            return "conn"
+
+        tasks = [asyncio.ensure_future(controller.run(acquire)) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.assertEqual(controller.waiting, 2)
+        with self.assertRaises(PoolQueueFullError):
+            await controller.run(acquire)
+        self.assertEqual(controller.rejected, 1)
+        release.set()
+        self.assertEqual(await asyncio.gather(*tasks), ["conn", "conn"])
+        self.assertEqual(controller.waiting, 0)
+
+    async def test_acquire_timeout(self):
+        controller = AdmissionController(acquire_timeout=0.02)
+        with self.assertRaises(AcquireTimeoutError):
+            await controller.run(asyncio.Event().wait)
+        self.assertEqual(controller.waiting, 0)
+        self.assertEqual(controller.state, "closed")
+
+    async def test_release_acquired_after_cancel(self):
+        released = []
+
+        async def acquire():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                # 超时或取消时连接恰好已经获取到
+                pass
+            return "conn"
+
+        controller = AdmissionController(acquire_timeout=0.02)
+        with self.assertRaises(AcquireTimeoutError):
+            await controller.run(acquire, released.append)
+        await asyncio.sleep(0.01)
+        self.assertEqual(released, ["conn"])
+
+        controller = AdmissionController(acquire_timeout=1)
+        task = asyncio.ensure_future(controller.run(acquire, released.append))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)
+        self.assertEqual(released, ["conn", "conn"])
+        self.assertEqual(controller.waiting, 0)
+
+    async def test_circuit_breaker(self):
+        controller = AdmissionController(failure_threshold=2, reset_timeout=0.05)
+        calls = []
+
+        async def fail():
+            calls.append("fail")
+            raise OSError("connection refused")
+
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                await controller.run(fail)
+        self.assertEqual(controller.state, "open")
+
+        # 熔断期间直接拒绝，不调用 acquire
+        with self.assertRaises(CircuitOpenError):
+            await controller.run(fail)
+        self.assertEqual(len(calls), 2)
+
+        # 半开状态只放行一个探测请求，探测失败继续熔断
+        await asyncio.sleep(0.06)
+        with self.assertRaises(OSError):
+            await controller.run(fail)
+        self.assertEqual(controller.state, "open")
+        self.assertEqual(len(calls), 3)
+
+        await asyncio.sleep(0.06)
+        release = asyncio.Event()
+
+        async def probe():
+            await release.wait()
+            return "conn"
+
+        task = asyncio.ensure_future(controller.run(probe))
+        await asyncio.sleep(0)
+        self.assertEqual(controller.state, "half_open")
+        with self.assertRaises(CircuitOpenError):
+            await controller.run(probe)
+        release.set()
+        self.assertEqual(await task, "conn")
+        self.assertEqual(controller.state, "closed")
+
+    async def test_cancelled_probe(self):
+        controller = AdmissionController(failure_threshold=1, reset_timeout=0)
+
+        async def fail():
+            raise OSError("connection refused")
+
+        with self.assertRaises(OSError):
+            await controller.run(fail)
+        task = asyncio.ensure_future(controller.run(asyncio.Event().wait))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        # 取消的探测请求不占用名额
+        result = await controller.run(lambda: asyncio.sleep(0, "conn"))
+        self.assertEqual(result, "conn")
+        self.assertEqual(controller.state, "closed")
+
+
+class TestEngineAdmission(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试 Engine 的准入控制"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"FROM users", ResultSet(["id"], [(1,)]))
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_timeout_opens_circuit(self):
+        engine = Engine(
+            self.server.url + "?acquire_timeout=0.02&circuit_failures=2&circuit_reset=0.05",
+            min_pool_size=1,
+            max_pool_size=1,
+        )
+        await engine.connect()
+        try:
+            self.assertEqual(engine.status["circuit_state"], "closed")
+            conn = await engine.pool.acquire()
+            for _ in range(2):
+                with self.assertRaises(AcquireTimeoutError):
+                    await engine.execute("SELECT id FROM users")
+            self.assertEqual(engine.status["circuit_state"], "open")
+            with self.assertRaises(CircuitOpenError):
+                await engine.execute("SELECT id FROM users")
+            engine.pool.release(conn)
+
+            await asyncio.sleep(0.06)
+            result = await engine.execute("SELECT id FROM users")
+            self.assertEqual(await result.fetch_all(), ((1,),))
+            self.assertEqual(engine.status["circuit_state"], "closed")
+            self.assertEqual(engine.status["pool_waiting"], 0)
+        finally:
+            await engine.disconnect()
+
+    async def test_no_admission_by_default(self):
+        engine = Engine(self.server.url)
+        await engine.connect()
+        try:
+            self.assertIsNone(engine.status["pool_waiting"])
+            self.assertIsNone(engine.status["circuit_state"])
+        finally:
+            await engine.disconnect()
@@ -0,0 +1,101 @@
+import dataclasses
+from unittest import IsolatedAsyncioTestCase
+
+from asmysql.testing import FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+
+
+@dataclasses.dataclass
+class UserData:
+    id: int
+    name: str
+
+
+class TestBatchIterate(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试按批读取的异步迭代"""
+
+    def setUp(self):
+        self.rows = [(i, f"user{i}") for i in range(25)]
+        self.server = FakeMySQLServer()
+        self.server.on(r"FROM users", ResultSet(["id", "name"], self.rows))
+        self.server.on(r"FROM empty", ResultSet(["id", "name"], []))
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_async_for(self):
+        async with Engine(self.server.url, fetch_batch_size=10) as engine:
+            for stream in (False, True):
+                rows = [row async for row in engine.execute("SELECT id, name FROM users", stream=stream)]
+                self.assertEqual(rows, self.rows)
+                self.assertEqual(engine.status["pool_used"], 0)
+
+    async def test_iterate_result_class(self):
+        async with Engine(self.server.url + "?fetch_batch_size=7") as engine:
+            result = await engine.execute("SELECT id, name FROM users", stream=True, result_class=UserData)
+            users = [user async for user in result.iterate()]
+            self.assertEqual(users, [UserData(*row) for row in self.rows])
+            self.assertEqual(engine.status["pool_used"], 0)
+
+    async def test_iterate_batches(self):
+        async with Engine(self.server.url) as engine:
+            result = await engine.execute("SELECT id, name FROM users", stream=True, result_class=dict)
+            self.assertEqual(result.columns, ("id", "name"))
+            batches = [batch async for batch in result.iterate_batches(10)]
+            self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+            self.assertEqual(batches[2][-1], {"id": 24, "name": "user24"})
+            self.assertEqual(engine.status["pool_used"], 0)
+
+            result = await engine.execute("SELECT id, name FROM empty", stream=True)
+            self.assertEqual([batch async for batch in result.iterate_batches()], [])
+            with self.assertRaises(ValueError):
+                async for _ in result.iterate_batches(0):
+                    pass
+
+    async def test_fetch_after_partial_iteration(self):
+        async with Engine(self.server.url, fetch_batch_size=10) as engine:
+            async with engine.execute("SELECT id, name FROM users", stream=True) as result:
+                async for row in result:
+                    if row[0] == 2:
+                        break
+                # 缓冲中剩余的行先于游标中的行返回
+                self.assertEqual(await result.fetch_one(), self.rows[3])
+                self.assertEqual(await result.fetch_many(2), self.rows[4:6])
+                self.assertEqual(await result.fetch_all(), self.rows[6:])
+            self.assertEqual(engine.status["pool_used"], 0)
+
+    async def test_fetch_many_beyond_buffer(self):
+        async with Engine(self.server.url, fetch_batch_size=10) as engine:
+            async with engine.execute("SELECT id, name FROM users", stream=True) as result:
+                async for row in result:
+                    if row[0] == 2:
+                        break
+                # 缓冲中只剩7行，不足的行从游标读取
+                self.assertEqual(await result.fetch_many(10), self.rows[3:13])
+                self.assertEqual(await result.fetch_all(), self.rows[13:])
+            async with engine.execute("SELECT id, name FROM users", stream=True) as result:
+                async for _ in result:
+                    break
+                self.assertEqual(await result.fetch_many(100), self.rows[1:])
+            self.assertEqual(engine.status["pool_used"], 0)
+
+    async def test_columnar_after_partial_iteration(self):
+        async with Engine(self.server.url, fetch_batch_size=10) as engine:
+            async with engine.execute("SELECT id, name FROM users", stream=True) as result:
+                async for _ in result:
+                    break
+                # 不能丢弃缓冲中的行
+                with self.assertRaises(RuntimeError):
+                    await result.fetch_columns()
+                with self.assertRaises(RuntimeError):
+                    await result.fetch_arrow()
+                with self.assertRaises(RuntimeError):
+                    async for _ in result.iterate_arrow():
+                        pass
+                self.assertEqual(await result.fetch_all(), self.rows[1:])
+            self.assertEqual(engine.status["pool_used"], 0)
+
+    async def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            Engine(self.server.url, fetch_batch_size=0)
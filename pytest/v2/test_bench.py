@@ -0,0 +1,50 @@
+import json
+from unittest import TestCase
+
+from asmysql.bench import BenchConfig, run
+from asmysql.bench._runner import percentile, summarize
+
+
+class TestBenchRunner(TestCase):
+    """测试基准测试的统计"""
+
+    def test_percentile(self):
+        latencies = [i * 1_000_000 for i in range(1, 101)]
+        self.assertEqual(percentile(latencies, 0.5), 50.0)
+        self.assertEqual(percentile(latencies, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_summarize(self):
+        result = summarize("v2", "fetch_all", {"rows": 10}, [2_000_000, 1_000_000], 0.5, 1, rows_per_op=10)
+        self.assertEqual(result["iterations"], 2)
+        self.assertEqual(result["ops_per_sec"], 4.0)
+        self.assertEqual(result["rows_per_sec"], 40.0)
+        self.assertEqual(result["p50_ms"], 1.0)
+        self.assertEqual(result["max_ms"], 2.0)
+
+
+class TestBenchFakeServer(TestCase):
+    """使用内置的 MySQL 协议服务端运行一轮小规模基准测试"""
+
+    def test_run(self):
+        config = BenchConfig(
+            rows=[50], result_classes=["tuple", "dataclass"], iterations=20, concurrency=2, batch_size=10
+        )
+        report = run(config=config, engines=["v2"], log=lambda result: None)
+        json.dumps(report)
+        self.assertEqual(report["server"], "fake")
+        cases = [(result["case"], result["params"].get("result_class")) for result in report["results"]]
+        self.assertEqual(
+            cases,
+            [
+                ("acquire_release", None),
+                ("point_select", None),
+                ("fetch_all", "tuple"),
+                ("fetch_all", "dataclass"),
+                ("execute_many", None),
+                ("stream", None),
+            ],
+        )
+        for result in report["results"]:
+            self.assertGreater(result["ops_per_sec"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
@@ -0,0 +1,156 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock
+
+from pymysql.converters import escape_item
+from pymysql.err import OperationalError
+
+from asmysql.v2._bulk import execute_bulk, max_stmt_length, plan_bulk_write
+
+
+async def _execute(*_):
+    # 模拟网络IO，让出事件循环
+    await asyncio.sleep(0)
+    return 2
+
+
+def _mock_conn():
+    conn = Mock()
+    conn.encoding = "utf8"
+    conn.escape = lambda value: escape_item(value, "utf8")
+    return conn
+
+
+class TestPlanBulkWrite(TestCase):
+    """测试批量写入语句的解析"""
+
+    def test_insert(self):
+        """测试普通 INSERT 语句"""
+        plan = plan_bulk_write("INSERT INTO t (id, name) VALUES (%s, %s)")
+        self.assertEqual(plan.prefix, "INSERT INTO t (id, name) VALUES ")
+        self.assertEqual(plan.row, "(%s, %s)")
+        self.assertEqual(plan.postfix, "")
+
+    def test_insert_with_expression_and_upsert(self):
+        """测试行模板中有表达式以及 ON DUPLICATE KEY UPDATE"""
+        plan = plan_bulk_write(
+            "insert ignore into t (id, name, ts) values (%(id)s, CONCAT(%(name)s, ')'), NOW()) "
+            "ON DUPLICATE KEY UPDATE name = VALUES(name);"
+        )
+        self.assertEqual(plan.row, "(%(id)s, CONCAT(%(name)s, ')'), NOW())")
+        self.assertEqual(plan.postfix, " ON DUPLICATE KEY UPDATE name = VALUES(name)")
+
+    def test_replace_and_percent(self):
+        """测试 REPLACE 语句以及前缀中的 %% 转义"""
+        plan = plan_bulk_write("REPLACE INTO `values` (a, b) VALUE ('100%%', %s)")
+        self.assertEqual(plan.prefix, "REPLACE INTO `values` (a, b) VALUE ")
+        self.assertEqual(plan.row, "('100%%', %s)")
+
+    def test_not_rewritable(self):
+        """测试无法改写的语句"""
+        self.assertIsNone(plan_bulk_write("UPDATE t SET a = %s WHERE id = %s"))
+        self.assertIsNone(plan_bulk_write("INSERT INTO t (a) SELECT a FROM s WHERE b = %s"))
+        self.assertIsNone(plan_bulk_write("INSERT INTO t (a) VALUES (%s), (%s)"))
+        self.assertIsNone(plan_bulk_write("INSERT INTO t (a) VALUES (%s) ON DUPLICATE KEY UPDATE a = %s"))
+        self.assertIsNone(plan_bulk_write("INSERT INTO t (a) VALUES (1)"))
+
+    def test_max_stmt_length(self):
+        """测试根据 max_allowed_packet 计算语句最大长度"""
+        self.assertEqual(max_stmt_length(None), 1024000)
+        self.assertEqual(max_stmt_length(64 * 1024 * 1024), 64 * 1024 * 1024 - 1024)
+
+
+class TestBulkStatements(TestCase):
+    """测试多行语句的生成和切分"""
+
+    def test_statements_split_by_length(self):
+        """测试按最大长度切分语句"""
+        plan = plan_bulk_write("INSERT INTO t (id, name) VALUES (%s, %s) ON DUPLICATE KEY UPDATE name = VALUES(name)")
+        rows = [(i, "张三'") for i in range(100)]
+        statements = list(plan.statements(_mock_conn(), rows, 200))
+        self.assertGreater(len(statements), 1)
+        for stmt in statements:
+            self.assertLessEqual(len(stmt), 200)
+            self.assertTrue(stmt.startswith(b"INSERT INTO t (id, name) VALUES ("))
+            self.assertTrue(stmt.endswith(b" ON DUPLICATE KEY UPDATE name = VALUES(name)"))
+        self.assertEqual(sum(stmt.count(b"'),(") + 1 for stmt in statements), 100)
+        self.assertIn("(0, '张三\\'')".encode(), statements[0])
+
+    def test_statements_dict_rows(self):
+        """测试字典参数"""
+        plan = plan_bulk_write("INSERT INTO t (id, name) VALUES (%(id)s, %(name)s)")
+        statements = list(plan.statements(_mock_conn(), [{"id": 1, "name": None}, {"id": 2, "name": "a"}]))
+        self.assertEqual(statements, [b"INSERT INTO t (id, name) VALUES (1, NULL),(2, 'a')"])
+
+
+class TestExecuteBulk(IsolatedAsyncioTestCase):
+    """测试批量执行"""
+
+    def setUp(self):
+        self.mock_cursor = Mock()
+        self.mock_cursor.connection = _mock_conn()
+        self.mock_cursor.execute = AsyncMock(return_value=2)
+        self.mock_cursor.executemany = AsyncMock(return_value=2)
+
+    async def test_execute_rewritten(self):
+        """测试改写后的语句在同一个游标上执行"""
+        rows = [(i,) for i in range(10)]
+        count = await execute_bulk(self.mock_cursor, "INSERT INTO t (id) VALUES (%s)", rows, max_length=60)
+        self.assertEqual(count, 2 * self.mock_cursor.execute.await_count)
+        self.assertGreater(self.mock_cursor.execute.await_count, 1)
+        self.assertEqual(self.mock_cursor._rowcount, count)
+        self.mock_cursor.executemany.assert_not_awaited()
+
+    async def test_execute_fallback(self):
+        """测试无法改写时回退到 executemany"""
+        await execute_bulk(self.mock_cursor, "UPDATE t SET a = %s", [(1,), (2,)])
+        self.mock_cursor.executemany.assert_awaited_once_with("UPDATE t SET a = %s", [(1,), (2,)])
+        self.mock_cursor.execute.assert_not_awaited()
+
+    async def test_execute_concurrency(self):
+        """测试分散到多个连接执行"""
+        other_cursor = Mock()
+        other_cursor.execute = AsyncMock(side_effect=_execute)
+        other_cursor.close = AsyncMock()
+        other_conn = Mock()
+        other_conn.cursor = AsyncMock(return_value=other_cursor)
+        other_conn.commit = AsyncMock()
+        pool = Mock()
+        pool.acquire = AsyncMock(return_value=other_conn)
+        pool.release = Mock()
+
+        self.mock_cursor.execute = AsyncMock(side_effect=_execute)
+        rows = [(i,) for i in range(50)]
+        count = await execute_bulk(
+            self.mock_cursor, "INSERT INTO t (id) VALUES (%s)", rows, max_length=60, pool=pool, concurrency=3
+        )
+        executed = self.mock_cursor.execute.await_count + other_cursor.execute.await_count
+        self.assertEqual(count, 2 * executed)
+        self.assertGreater(other_cursor.execute.await_count, 0)
+        self.assertEqual(pool.acquire.await_count, pool.release.call_count)
+        self.assertEqual(other_conn.commit.await_count, pool.acquire.await_count)
+
+    async def test_execute_concurrency_error(self):
+        """测试一个连接出错时取消其他连接，不再继续写入"""
+        other_cursor = Mock()
+        other_cursor.execute = AsyncMock(side_effect=OperationalError(1213, "Deadlock found"))
+        other_cursor.close = AsyncMock()
+        other_conn = Mock()
+        other_conn.cursor = AsyncMock(return_value=other_cursor)
+        other_conn.commit = AsyncMock()
+        pool = Mock()
+        pool.acquire = AsyncMock(return_value=other_conn)
+        pool.release = Mock()
+
+        self.mock_cursor.execute = AsyncMock(side_effect=_execute)
+        rows = [(i,) for i in range(500)]
+        with self.assertRaises(OperationalError):
+            await execute_bulk(
+                self.mock_cursor, "INSERT INTO t (id) VALUES (%s)", rows, max_length=60, pool=pool, concurrency=3
+            )
+        # 其余的语句没有执行，出错和被中断的连接都被关闭
+        self.assertLess(self.mock_cursor.execute.await_count, 5)
+        self.mock_cursor.connection.close.assert_called_once_with()
+        other_conn.commit.assert_not_awaited()
+        self.assertEqual(other_conn.close.call_count, pool.acquire.await_count)
+        self.assertEqual(pool.release.call_count, pool.acquire.await_count)
@@ -0,0 +1,182 @@
+import asyncio
+from dataclasses import dataclass
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock
+
+from pymysql.err import ProgrammingError
+
+from asmysql.v2 import Engine
+from asmysql.v2._cache import CacheEntry, QueryCache, cache_key, normalize_query, read_tables, write_tables
+
+
+@dataclass
+class Row:
+    id: int
+    name: str
+
+
+class TestCacheHelpers(TestCase):
+    """测试缓存 key 和表标签解析"""
+
+    def test_normalize_query(self):
+        self.assertEqual(
+            normalize_query("  SELECT *\n  FROM t\tWHERE a = 'x  y' ; "), "SELECT * FROM t WHERE a = 'x  y'"
+        )
+        self.assertEqual(
+            cache_key("SELECT 1", {"b": 2, "a": 1}, "tuple"), cache_key("SELECT  1", {"a": 1, "b": 2}, "tuple")
+        )
+        self.assertNotEqual(cache_key("SELECT 1", [1], "tuple"), cache_key("SELECT 1", [1], "dict"))
+        self.assertNotEqual(cache_key("SELECT 1", [1], "tuple"), cache_key("SELECT 1", [2], "tuple"))
+
+    def test_read_tables(self):
+        self.assertEqual(read_tables("SELECT * FROM users u JOIN `db`.`Orders` o ON u.id = o.uid"), {"users", "orders"})
+        self.assertEqual(read_tables("SELECT * FROM a, b WHERE a.id = b.id"), {"a", "b"})
+        self.assertEqual(read_tables("SELECT 1"), set())
+
+    def test_write_tables(self):
+        self.assertEqual(write_tables("INSERT INTO users (id) VALUES (1)"), {"users"})
+        self.assertEqual(write_tables("UPDATE LOW_PRIORITY db.users SET a = 1"), {"users"})
+        self.assertEqual(write_tables("DELETE FROM users WHERE id = 1"), {"users"})
+        self.assertEqual(write_tables("TRUNCATE TABLE logs"), {"logs"})
+        self.assertEqual(write_tables("SELECT * FROM users"), set())
+        self.assertEqual(write_tables("SET NAMES utf8mb4"), set())
+        self.assertIsNone(write_tables("CALL refresh()"))
+
+
+class TestQueryCache(IsolatedAsyncioTestCase):
+    """测试查询缓存"""
+
+    async def test_lru_by_bytes(self):
+        """测试按内存占用淘汰最久未使用的结果"""
+        entry = CacheEntry([(1, "a" * 100)], None, 1, frozenset(), 60)
+        cache = QueryCache(entry.size * 2)
+        cache.put("a", entry)
+        cache.put("b", CacheEntry([(1, "a" * 100)], None, 1, frozenset(), 60))
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", CacheEntry([(1, "a" * 100)], None, 1, frozenset(), 60))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertLessEqual(cache.size, cache.max_bytes)
+        # 超过最大占用的结果不缓存
+        cache.put("d", CacheEntry([(1, "a" * 10000)], None, 1, frozenset(), 60))
+        self.assertIsNone(cache.get("d"))
+
+    async def test_ttl(self):
+        cache = QueryCache(1 << 20)
+        cache.put("a", CacheEntry([(1,)], None, 1, frozenset(), 0))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size, 0)
+
+    async def test_single_flight(self):
+        """测试并发未命中只执行一次查询"""
+        cache = QueryCache(1 << 20)
+        load = AsyncMock()
+
+        async def _load():
+            await asyncio.sleep(0.01)
+            return [(1,)], None, 1
+
+        load.side_effect = _load
+        entries = await asyncio.gather(*(cache.get_or_load("k", (), 60, load) for _ in range(5)))
+        self.assertEqual(load.await_count, 1)
+        self.assertTrue(all(entry is entries[0] for entry in entries))
+        await cache.get_or_load("k", (), 60, load)
+        self.assertEqual(load.await_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (5, 1))
+
+    async def test_error_not_cached(self):
+        cache = QueryCache(1 << 20)
+        load = AsyncMock(side_effect=ProgrammingError(1146, "Table 't' doesn't exist"))
+        for _ in range(2):
+            with self.assertRaises(ProgrammingError):
+                await cache.get_or_load("k", (), 60, load)
+        self.assertEqual(load.await_count, 2)
+        self.assertEqual(len(cache), 0)
+
+    async def test_invalidate_during_load(self):
+        """测试加载期间写入的表，加载结果不写入缓存"""
+        cache = QueryCache(1 << 20)
+
+        async def _load():
+            cache.invalidate({"users"})
+            return [(1,)], None, 1
+
+        await cache.get_or_load("k", ("users",), 60, _load)
+        self.assertEqual(len(cache), 0)
+        await cache.get_or_load("k", ("orders",), 60, AsyncMock(return_value=([(1,)], None, 1)))
+        self.assertEqual(len(cache), 1)
+        cache.invalidate({"orders"})
+        self.assertEqual(len(cache), 0)
+
+
+class TestEngineCache(IsolatedAsyncioTestCase):
+    """使用mock连接池测试 Engine.execute(cache_ttl=...)"""
+
+    def setUp(self):
+        self.engine = Engine("mysql://localhost:3306/")
+        self.cursor = Mock()
+        self.cursor.description = (("id", 3), ("name", 253))
+        self.cursor._result = None
+        self.cursor.rowcount = 2
+        self.cursor.execute = AsyncMock()
+        self.cursor.fetchall = AsyncMock(return_value=((1, "a"), (2, "b")))
+        self.cursor.close = AsyncMock()
+        self.conn = Mock()
+        self.conn.cursor = AsyncMock(return_value=self.cursor)
+        self.conn.commit = AsyncMock()
+        self.cursor.connection = self.conn
+        self.pool = Mock()
+        self.pool.acquire = AsyncMock(return_value=self.conn)
+        self.engine._Engine__pool = self.pool
+
+    async def test_cached_result(self):
+        """测试命中缓存返回普通的 Result，不再访问数据库"""
+        result = await self.engine.execute("SELECT id, name FROM users", cache_ttl=60)
+        self.assertEqual(list(await result.fetch_all()), [(1, "a"), (2, "b")])
+        self.pool.release.assert_called_once_with(self.conn)
+        result = await self.engine.execute("SELECT id,  name FROM users", cache_ttl=60, result_class=Row)
+        self.assertEqual(result.row_count, 2)
+        self.assertEqual(await result.fetch_one(), Row(1, "a"))
+        rows = [row async for row in self.engine.execute("SELECT id, name FROM users", cache_ttl=60)]
+        self.assertEqual(rows, [(1, "a"), (2, "b")])
+        self.assertEqual(self.cursor.execute.await_count, 1)
+        self.assertEqual(self.pool.acquire.await_count, 1)
+
+    async def test_write_invalidates(self):
+        """测试通过同一个 Engine 写入表后缓存失效"""
+        await self.engine.execute("SELECT * FROM users", cache_ttl=60)
+        await self.engine.execute("SELECT * FROM orders", cache_ttl=60)
+        self.assertEqual(len(self.engine.cache), 2)
+        await self.engine.execute("UPDATE users SET name = %s WHERE id = %s", ("c", 1))
+        self.assertEqual(len(self.engine.cache), 1)
+        await self.engine.execute("SELECT * FROM users", cache_ttl=60)
+        self.assertEqual(self.cursor.execute.await_count, 4)
+        self.engine.invalidate_cache("db.Orders")
+        self.assertEqual(len(self.engine.cache), 1)
+        self.engine.invalidate_cache()
+        self.assertEqual(len(self.engine.cache), 0)
+
+    async def test_write_created_before_cache_filled(self):
+        """测试缓存为空时创建、之后才执行的写语句仍然使缓存失效"""
+        write = self.engine.execute("UPDATE users SET name = %s WHERE id = %s", ("c", 1))
+        await self.engine.execute("SELECT * FROM users", cache_ttl=60)
+        self.assertEqual(len(self.engine.cache), 1)
+        await write
+        self.assertEqual(len(self.engine.cache), 0)
+
+    async def test_transaction_invalidates_on_commit(self):
+        """测试事务内写入的表在提交后失效"""
+        self.conn.begin = AsyncMock()
+        await self.engine.execute("SELECT * FROM users", cache_ttl=60)
+        async with self.engine.transaction() as tx:
+            await tx.execute("DELETE FROM users WHERE id = 1")
+            self.assertEqual(len(self.engine.cache), 1)
+        self.assertEqual(len(self.engine.cache), 0)
+
+    async def test_error(self):
+        self.cursor.execute.side_effect = ProgrammingError(1146, "Table 'users' doesn't exist")
+        result = await self.engine.execute("SELECT * FROM users", cache_ttl=60)
+        self.assertEqual(result.error_no, 1146)
+        self.assertEqual(len(self.engine.cache), 0)
+        self.pool.release.assert_called_once_with(self.conn)
@@ -0,0 +1,128 @@
+import datetime
+import importlib.util
+from decimal import Decimal
+from unittest import IsolatedAsyncioTestCase, TestCase, skipUnless
+from unittest.mock import AsyncMock, Mock
+
+from pymysql.constants import FIELD_TYPE
+
+from asmysql._columnar import concat_arrow_batches, to_arrow_batch, to_numpy_columns
+from asmysql.v2 import Result
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+DESCRIPTION = (
+    ("id", FIELD_TYPE.LONGLONG, None, 20, 20, 0, False),
+    ("score", FIELD_TYPE.DOUBLE, None, 22, 22, 31, True),
+    ("name", FIELD_TYPE.VAR_STRING, None, 255, 255, 0, True),
+    ("created", FIELD_TYPE.DATETIME, None, 19, 19, 0, True),
+    ("amount", FIELD_TYPE.NEWDECIMAL, None, 10, 10, 2, True),
+)
+ROWS = [
+    (1, 1.5, "a", datetime.datetime(2024, 1, 2, 3, 4, 5), Decimal("1.20")),
+    (2, None, "b", None, None),
+    (3, 2.5, "a", datetime.datetime(2024, 1, 3), Decimal("3.40")),
+]
+
+
+@skipUnless(HAS_NUMPY, "numpy is not installed")
+class TestNumpyColumns(TestCase):
+    """测试按列转换为 numpy 数组"""
+
+    def test_typed_columns(self):
+        """测试根据列类型生成数组"""
+        import numpy
+
+        columns = to_numpy_columns(DESCRIPTION, ROWS)
+        self.assertEqual(list(columns), ["id", "score", "name", "created", "amount"])
+        self.assertEqual(columns["id"].dtype, numpy.int64)
+        self.assertEqual(columns["id"].tolist(), [1, 2, 3])
+        self.assertIsInstance(columns["score"], numpy.ma.MaskedArray)
+        self.assertEqual(columns["score"].dtype, numpy.float64)
+        self.assertEqual(columns["score"].mask.tolist(), [False, True, False])
+        self.assertEqual(columns["name"].dtype, object)
+        self.assertEqual(columns["created"].dtype, numpy.dtype("datetime64[us]"))
+        self.assertTrue(numpy.isnat(columns["created"][1]))
+        self.assertEqual(columns["amount"][0], Decimal("1.20"))
+
+    def test_dict_rows_and_fallback(self):
+        """测试 dict 行以及无法转换时回退到 object"""
+        description = (("d", FIELD_TYPE.DATE, None, 10, 10, 0, True),)
+        columns = to_numpy_columns(description, [{"d": "0000-00-00"}, {"d": datetime.date(2024, 1, 1)}])
+        self.assertEqual(columns["d"].dtype, object)
+
+    def test_empty(self):
+        """测试没有数据时返回空数组"""
+        import numpy
+
+        columns = to_numpy_columns(DESCRIPTION, [])
+        self.assertEqual(len(columns["id"]), 0)
+        self.assertEqual(columns["id"].dtype, numpy.int64)
+
+
+@skipUnless(HAS_PYARROW, "pyarrow is not installed")
+class TestArrowBatches(TestCase):
+    """测试转换为 Arrow RecordBatch"""
+
+    def test_typed_batch(self):
+        """测试列类型以及字符串字典编码"""
+        import pyarrow
+
+        batch = to_arrow_batch(DESCRIPTION, ROWS)
+        self.assertEqual(batch.schema.field("id").type, pyarrow.int64())
+        self.assertEqual(batch.schema.field("score").type, pyarrow.float64())
+        self.assertTrue(pyarrow.types.is_dictionary(batch.schema.field("name").type))
+        self.assertEqual(batch.schema.field("created").type, pyarrow.timestamp("us"))
+        self.assertTrue(pyarrow.types.is_decimal(batch.schema.field("amount").type))
+        self.assertEqual(batch.column("score").null_count, 1)
+        self.assertEqual(batch.column("name").dictionary.to_pylist(), ["a", "b"])
+
+    def test_concat_batches(self):
+        """测试合并批次时提升全为 NULL 的批次类型"""
+        batches = [to_arrow_batch(DESCRIPTION, ROWS[:1]), to_arrow_batch(DESCRIPTION, ROWS[1:2])]
+        table = concat_arrow_batches(DESCRIPTION, batches)
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.column("id").to_pylist(), [1, 2])
+        self.assertEqual(concat_arrow_batches(DESCRIPTION, []).num_rows, 0)
+
+
+@skipUnless(HAS_NUMPY and HAS_PYARROW, "numpy or pyarrow is not installed")
+class TestResultColumnar(IsolatedAsyncioTestCase):
+    """使用mock测试 Result 的列式获取"""
+
+    def setUp(self):
+        self.mock_cursor = Mock()
+        self.mock_cursor.description = DESCRIPTION
+        self.mock_cursor.execute = AsyncMock()
+        self.mock_cursor.close = AsyncMock()
+        self.mock_cursor.fetchmany = AsyncMock(side_effect=[ROWS[:2], ROWS[2:], []])
+        self.mock_conn = Mock()
+        self.mock_conn.cursor = AsyncMock(return_value=self.mock_cursor)
+        self.mock_cursor.connection = self.mock_conn
+        self.mock_pool = Mock()
+        self.mock_pool.acquire = AsyncMock(return_value=self.mock_conn)
+        self.mock_pool.release = Mock()
+
+    async def test_fetch_columns(self):
+        """测试按批读取并合并为列"""
+        result = await Result(pool=self.mock_pool, query="SELECT ...", commit=False)
+        columns = await result.fetch_columns(batch_size=2)
+        self.assertEqual(columns["id"].tolist(), [1, 2, 3])
+        self.assertEqual(columns["score"].mask.tolist(), [False, True, False])
+        self.mock_cursor.fetchmany.assert_awaited_with(2)
+        self.mock_pool.release.assert_called_once_with(self.mock_conn)
+
+    async def test_iterate_arrow(self):
+        """测试按批返回 RecordBatch"""
+        result = await Result(pool=self.mock_pool, query="SELECT ...", stream=True, commit=False)
+        sizes = [batch.num_rows async for batch in result.iterate_arrow(batch_size=2)]
+        self.assertEqual(sizes, [2, 1])
+        self.mock_pool.release.assert_called_once_with(self.mock_conn)
+
+    async def test_fetch_arrow(self):
+        """测试获取 pyarrow.Table"""
+        result = await Result(pool=self.mock_pool, query="SELECT ...", commit=False)
+        table = await result.fetch_arrow(batch_size=2)
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column("name").to_pylist(), ["a", "b", "a"])
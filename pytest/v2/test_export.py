@@ -0,0 +1,115 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from asmysql.testing import FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+from asmysql.v2._export import CountingWriter, Exporter, TextExporter, export_format
+
+
+class TestExportFormat(TestCase):
+    def test_export_format(self):
+        self.assertEqual(export_format("users.csv", None, None), ("csv", None))
+        self.assertEqual(export_format("/tmp/users.JSONL.gz", None, None), ("jsonl", "gzip"))
+        self.assertEqual(export_format("users.parquet", None, "zstd"), ("parquet", "zstd"))
+        self.assertEqual(export_format(io.BytesIO(), "csv", None), ("csv", None))
+        with self.assertRaises(ValueError):
+            export_format("users.txt", None, None)
+        with self.assertRaises(ValueError):
+            export_format("users.csv", "xml", None)
+        with self.assertRaises(ValueError):
+            export_format("users.csv", None, "zstd")
+
+    def test_abstract_exporter(self):
+        out = CountingWriter(io.BytesIO())
+        with self.assertRaises(TypeError):
+            Exporter(out, [])
+        with self.assertRaises(TypeError):
+            TextExporter(out, [], None)
+
+
+class _BrokenWriter(io.RawIOBase):
+    def writable(self):
+        return True
+
+    def write(self, data):
+        raise OSError("No space left on device")
+
+
+class TestExport(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试结果导出"""
+
+    def setUp(self):
+        self.rows = [
+            (i, f"user,{i}", Decimal(f"{i}.50"), datetime.datetime(2024, 1, 1, 12, i % 60), None) for i in range(250)
+        ]
+        self.server = FakeMySQLServer()
+        self.server.on(r"FROM users", ResultSet(["id", "name", "balance", "created", "note"], self.rows))
+        self.server.on(r"^UPDATE", ResultSet([], []))
+        self.server.start()
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmpdir.cleanup()
+
+    def path(self, name: str):
+        return os.path.join(self.tmpdir.name, name)
+
+    async def test_csv(self):
+        async with Engine(self.server.url) as engine:
+            path = self.path("users.csv")
+            stats = await engine.execute("SELECT * FROM users", stream=True).export(path, batch_size=100)
+            self.assertEqual(stats, {"rows": 250, "bytes": os.path.getsize(path)})
+            self.assertEqual(engine.status["pool_used"], 0)
+        with open(path, newline="") as file:
+            lines = list(csv.reader(file))
+        self.assertEqual(lines[0], ["id", "name", "balance", "created", "note"])
+        self.assertEqual(lines[1], ["0", "user,0", "0.50", "2024-01-01 12:00:00", ""])
+        self.assertEqual(len(lines), 251)
+
+    async def test_jsonl_gzip(self):
+        async with Engine(self.server.url) as engine:
+            path = self.path("users.jsonl.gz")
+            result = await engine.execute("SELECT * FROM users", result_class=dict)
+            stats = await result.export(path, batch_size=64)
+            self.assertEqual(stats, {"rows": 250, "bytes": os.path.getsize(path)})
+        with gzip.open(path, "rt") as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(len(records), 250)
+        self.assertEqual(
+            records[1], {"id": 1, "name": "user,1", "balance": "1.50", "created": "2024-01-01T12:01:00", "note": None}
+        )
+
+    async def test_parquet_writer(self):
+        import pyarrow.parquet
+
+        async with Engine(self.server.url) as engine:
+            buffer = io.BytesIO()
+            stats = await engine.execute("SELECT * FROM users", stream=True).export(buffer, "parquet", batch_size=100)
+            self.assertEqual(stats, {"rows": 250, "bytes": len(buffer.getvalue())})
+        table = pyarrow.parquet.read_table(io.BytesIO(buffer.getvalue()))
+        self.assertEqual(table.num_rows, 250)
+        self.assertEqual(table.column("id").to_pylist(), list(range(250)))
+        self.assertEqual(table.column("name")[249].as_py(), "user,249")
+
+    async def test_no_result_set(self):
+        async with Engine(self.server.url) as engine:
+            path = self.path("empty.csv")
+            stats = await engine.execute("UPDATE users SET note = NULL").export(path)
+            self.assertEqual(stats, {"rows": 0, "bytes": 0})
+            self.assertFalse(os.path.exists(path))
+
+    async def test_write_error(self):
+        async with Engine(self.server.url, min_pool_size=1, max_pool_size=1) as engine:
+            with self.assertRaises(OSError):
+                await engine.execute("SELECT * FROM users", stream=True).export(_BrokenWriter(), "csv", batch_size=10)
+            # 没有读取完的流式结果所在的连接被关闭
+            self.assertEqual(engine.status["pool_used"], 0)
+            self.assertEqual(len(await (await engine.execute("SELECT * FROM users")).fetch_all()), 250)
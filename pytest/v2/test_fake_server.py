@@ -0,0 +1,156 @@
+import asyncio
+import datetime
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from pymysql.constants import FIELD_TYPE, FLAG
+
+from asmysql.testing import Column, ErrorResponse, FakeMySQLServer, OkResponse, ResultSet
+from asmysql.testing._protocol import PacketReader, binary_row, decode_execute_params, text_row
+from asmysql.testing._server import _count_placeholders, _split_statements
+from asmysql.v2 import Engine
+from asmysql.v2._prepared import _encode_execute
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    created: datetime.datetime
+
+
+def _users():
+    for i in range(1, 1001):
+        yield i, f"user{i}", datetime.datetime(2024, 1, 1, 0, 0, i % 60)
+
+
+class TestProtocol(TestCase):
+    """测试服务端的编码与解码"""
+
+    def test_text_row(self):
+        row = text_row((1, None, "张三", datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.timedelta(hours=-1)))
+        self.assertEqual(row, b"\x011\xfb\x06" + "张三".encode() + b"\x132024-01-02 03:04:05\x09-01:00:00")
+
+    def test_binary_row(self):
+        columns = (Column("a", FIELD_TYPE.LONGLONG), Column("b"), Column("c", FIELD_TYPE.LONG, FLAG.UNSIGNED))
+        self.assertEqual(binary_row(columns, (1, None, 2)), b"\x00\x08" + b"\x01" + b"\x00" * 7 + b"\x02\x00\x00\x00")
+
+    def test_decode_execute_params(self):
+        params = (1, None, "张三", 1.5, Decimal("1.10"), b"\x00", datetime.datetime(2024, 1, 2, 3, 4, 5, 6))
+        packet = _encode_execute(7, params, "utf8")
+        reader = PacketReader(packet, 9)
+        decoded, types = decode_execute_params(reader, len(params), None)
+        self.assertEqual(decoded, params)
+        self.assertEqual(len(types), len(params))
+
+    def test_count_placeholders(self):
+        self.assertEqual(_count_placeholders('SELECT ? FROM t WHERE a = \'?\' AND b = ? AND `c?` = "\\"?"'), 2)
+
+    def test_split_statements(self):
+        self.assertEqual(
+            _split_statements("SELECT 1; SELECT ';'\n;UPDATE t SET a = 1;"),
+            ["SELECT 1", "SELECT ';'", "UPDATE t SET a = 1"],
+        )
+        # 空语句保留，注释中的 ; 不拆分
+        self.assertEqual(_split_statements("SELECT 1;;SELECT 2"), ["SELECT 1", "", "SELECT 2"])
+        self.assertEqual(
+            _split_statements("SELECT 1 -- a;b\n;SELECT 2 # c;\n;SELECT '#;'"),
+            ["SELECT 1 -- a;b", "SELECT 2 # c;", "SELECT '#;'"],
+        )
+
+
+class TestFakeMySQLServer(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试 Engine 实际的执行和读取流程"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"^DELETE", ErrorResponse(1142, "DELETE command denied"))
+        self.server.on(
+            r"FROM users WHERE id = (\?|\d+)",
+            lambda match, params: ResultSet(
+                ["id", "name", "created"],
+                [(params[0] if params else int(match[1]), "alice", datetime.datetime(2024, 1, 2, 3, 4, 5))],
+            ),
+        )
+        self.server.on(r"FROM users", ResultSet(["id", "name", "created"], _users))
+        self.server.on(r"^UPDATE", OkResponse(affected_rows=3))
+        self.server.start()
+        self.engine = Engine(self.server.url, min_pool_size=1, max_pool_size=4)
+
+    async def asyncSetUp(self):
+        await self.engine.connect()
+
+    async def asyncTearDown(self):
+        await self.engine.disconnect()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_fetch(self):
+        result = await self.engine.execute("SELECT id, name, created FROM users")
+        rows = await result.fetch_all()
+        self.assertEqual(len(rows), 1000)
+        self.assertEqual(rows[0], (1, "user1", datetime.datetime(2024, 1, 1, 0, 0, 1)))
+        result = await self.engine.execute("SELECT id, name, created FROM users WHERE id = %s", (5,), result_class=User)
+        self.assertEqual(await result.fetch_one(), User(5, "alice", datetime.datetime(2024, 1, 2, 3, 4, 5)))
+
+    async def test_prepared(self):
+        result = await self.engine.execute(
+            "SELECT id, name, created FROM users WHERE id = %s", (7,), prepared=True, result_class=dict
+        )
+        self.assertIsNone(result.error)
+        self.assertEqual(
+            await result.fetch_all(), [{"id": 7, "name": "alice", "created": datetime.datetime(2024, 1, 2, 3, 4, 5)}]
+        )
+        self.assertIn("SELECT id, name, created FROM users WHERE id = ?", self.server.queries)
+
+    async def test_prepared_without_cache(self):
+        async with Engine(self.server.url + "?prepared=true&prepared_cache_size=0", max_pool_size=1) as engine:
+            self.assertEqual(engine.prepared_cache_size, 0)
+            for user_id in (7, 8):
+                result = await engine.execute("SELECT id, name, created FROM users WHERE id = %s", (user_id,))
+                self.assertEqual((await result.fetch_one())[0], user_id)
+            # 每次执行都重新预处理，之前的语句句柄已关闭
+            # noinspection PyProtectedMember
+            self.assertLessEqual(len(engine.pool._free[0]._asmysql_stmt_cache), 1)
+
+    async def test_stream(self):
+        count = 0
+        async for row in self.engine.execute("SELECT id, name, created FROM users", stream=True, result_class=User):
+            count += 1
+            self.assertEqual(row.id, count)
+        self.assertEqual(count, 1000)
+
+    async def test_ok_and_error(self):
+        async with self.engine.execute("UPDATE users SET name = 'x'") as result:
+            self.assertEqual(result.row_count, 3)
+        result = await self.engine.execute("DELETE FROM users")
+        self.assertEqual(result.error_no, 1142)
+        self.assertEqual(result.error_msg, "DELETE command denied")
+        result = await self.engine.execute("SELECT * FROM missing")
+        self.assertEqual(result.error_no, 1146)
+
+    async def test_execute_many(self):
+        rows = [(i, f"user{i}") for i in range(100)]
+        async with self.engine.execute_many("INSERT INTO users (id, name) VALUES (%s, %s)", rows) as result:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.row_count, 100)
+
+    async def test_transaction(self):
+        async with self.engine.transaction() as tx:
+            async with tx.execute("UPDATE users SET name = 'x'") as result:
+                self.assertEqual(result.row_count, 3)
+        self.assertIn("COMMIT", self.server.queries)
+
+    async def test_latency(self):
+        self.server.on(r"^SELECT SLEEP", ResultSet(["s"], [(0,)]), latency=0.1)
+        started = time.monotonic()
+        results = await asyncio.gather(*(self.engine.execute("SELECT SLEEP(0.1)") for _ in range(4)))
+        for result in results:
+            await result.fetch_all()
+        elapsed = time.monotonic() - started
+        # 延迟不阻塞其他连接
+        self.assertGreaterEqual(elapsed, 0.1)
+        self.assertLess(elapsed, 0.35)
@@ -0,0 +1,162 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock
+
+from pymysql.err import InterfaceError, MySQLError, OperationalError, ProgrammingError
+
+from asmysql.testing import DisconnectResponse, FakeMySQLServer, OkResponse, ResultSet
+from asmysql.v2 import Engine
+from asmysql.v2._health import ValidatingPool, is_connection_lost, is_idempotent_read
+
+
+class TestHealthHelpers(TestCase):
+    def test_is_idempotent_read(self):
+        self.assertTrue(is_idempotent_read("SELECT id FROM users"))
+        self.assertTrue(is_idempotent_read("  /* hint */ (SELECT 1)"))
+        self.assertTrue(is_idempotent_read("show tables"))
+        self.assertTrue(is_idempotent_read("WITH t AS (SELECT 1) SELECT * FROM t"))
+        self.assertFalse(is_idempotent_read("SELECT id INTO @id FROM users"))
+        self.assertFalse(is_idempotent_read("SELECT GET_LOCK('a', 1)"))
+        self.assertFalse(is_idempotent_read("WITH t AS (SELECT 1) DELETE FROM users"))
+        self.assertFalse(is_idempotent_read("UPDATE users SET name = 'a'"))
+
+    def test_is_connection_lost(self):
+        self.assertTrue(is_connection_lost(OperationalError(2013, "Lost connection to MySQL server during query")))
+        self.assertTrue(is_connection_lost(OperationalError(2006, "MySQL server has gone away")))
+        self.assertTrue(is_connection_lost(InterfaceError("(0, 'Not connected')")))
+        self.assertFalse(is_connection_lost(OperationalError(1205, "Lock wait timeout exceeded")))
+        self.assertFalse(is_connection_lost(ProgrammingError(1064, "syntax error")))
+
+
+class TestValidation(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试连接检查、失效连接移除和只读语句重试"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.drops = 0
+
+        def users(match, params):
+            if self.drops:
+                self.drops -= 1
+                return DisconnectResponse()
+            return ResultSet(["id"], [(1,), (2,)])
+
+        self.server.on(r"FROM users", users)
+        self.server.on(r"^UPDATE", lambda match, params: DisconnectResponse() if self.drops else OkResponse(1))
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def _engine(self, **kwargs):
+        engine = Engine(self.server.url, **kwargs)
+        await engine.connect()
+        self.addAsyncCleanup(engine.disconnect)
+        return engine
+
+    async def test_retry_read_on_lost_connection(self):
+        engine = await self._engine(min_pool_size=1)
+        self.drops = 1
+        result = await engine.execute("SELECT id FROM users")
+        self.assertIsNone(result.error)
+        self.assertEqual(await result.fetch_all(), ((1,), (2,)))
+        self.assertEqual(self.server.queries.count("SELECT id FROM users"), 2)
+        self.assertEqual(engine.status["pool_evicted"], 1)
+
+        # 只重试一次
+        self.drops = 2
+        result = await engine.execute("SELECT id FROM users")
+        self.assertEqual(result.error_no, 2013)
+        self.assertEqual(engine.status["pool_evicted"], 3)
+
+    async def test_no_retry_for_writes_and_disabled(self):
+        engine = await self._engine(min_pool_size=1)
+        self.drops = 1
+        result = await engine.execute("UPDATE users SET name = 'a'")
+        self.assertEqual(result.error_no, 2013)
+        self.assertEqual(self.server.queries.count("UPDATE users SET name = 'a'"), 1)
+
+        engine = await self._engine(min_pool_size=1, retry_reads=False)
+        self.drops = 1
+        result = await engine.execute("SELECT id FROM users")
+        self.assertEqual(result.error_no, 2013)
+
+    async def test_no_retry_in_transaction(self):
+        engine = await self._engine(min_pool_size=1)
+        self.drops = 1
+        with self.assertRaises(MySQLError):
+            async with engine.transaction() as tx:
+                result = await tx.execute("SELECT id FROM users")
+                self.assertEqual(result.error_no, 2013)
+                raise result.error
+        self.assertEqual(self.server.queries.count("SELECT id FROM users"), 1)
+
+    async def test_validate_on_borrow(self):
+        engine = await self._engine(min_pool_size=1, validation="idle", validation_idle=10)
+        pool: ValidatingPool = engine.pool
+        conn = await pool.acquire()
+        pool.release(conn)
+
+        # 空闲时间未超过 validation_idle，不检查
+        conn.ping = AsyncMock()
+        self.assertIs(await pool.acquire(), conn)
+        conn.ping.assert_not_called()
+        pool.release(conn)
+
+        # 空闲超过 validation_idle 且 COM_PING 成功，最后使用时间不变
+        conn._last_usage -= 20
+        last_usage = conn.last_usage
+        self.assertIs(await pool.acquire(), conn)
+        conn.ping.assert_awaited_once_with(reconnect=False)
+        self.assertEqual(conn.last_usage, last_usage)
+        pool.release(conn)
+
+        # COM_PING 失败时关闭连接，取新的连接
+        conn.ping = AsyncMock(side_effect=OperationalError(2013, "Lost connection"))
+        other = await pool.acquire()
+        self.assertIsNot(other, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(engine.status["pool_evicted"], 1)
+        pool.release(other)
+
+    async def test_cancel_during_ping(self):
+        engine = await self._engine(min_pool_size=1, max_pool_size=1, validation="idle", validation_idle=10)
+        pool: ValidatingPool = engine.pool
+        conn = await pool.acquire()
+        pool.release(conn)
+        conn._last_usage -= 20
+        pinging = asyncio.Event()
+
+        async def slow_ping(reconnect=False):
+            pinging.set()
+            await asyncio.sleep(10)
+
+        conn.ping = slow_ping
+        task = asyncio.ensure_future(pool.acquire())
+        await pinging.wait()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        # 检查中被取消的连接关闭并归还，不会一直占用连接池
+        self.assertTrue(conn.closed)
+        self.assertEqual(engine.status["pool_used"], 0)
+        other = await asyncio.wait_for(pool.acquire(), 1)
+        self.assertIsNot(other, conn)
+        pool.release(other)
+
+    async def test_validate_in_background(self):
+        engine = await self._engine(min_pool_size=2, validation="background", validation_idle=10)
+        pool: ValidatingPool = engine.pool
+        dead, alive = list(pool._free)
+        for conn in (dead, alive):
+            conn._last_usage -= 20
+        dead.ping = AsyncMock(side_effect=OperationalError(2013, "Lost connection"))
+        await pool.validate_idle()
+        self.assertEqual(list(pool._free), [alive])
+        self.assertTrue(dead.closed)
+        self.assertEqual(pool.evicted, 1)
+        self.assertEqual(pool.size, 1)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            Engine(self.server.url, validation="always")
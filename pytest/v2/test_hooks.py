@@ -0,0 +1,77 @@
+from unittest import IsolatedAsyncioTestCase
+
+from asmysql import StatementTrace
+from asmysql.testing import ErrorResponse, FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+
+
+class TestHooks(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试语句生命周期钩子"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"FROM users", ResultSet(["id"], [(i,) for i in range(10)]), latency=0.01)
+        self.server.on(r"FROM missing", ErrorResponse(1146, "Table 'test.missing' doesn't exist", "42S02"))
+        self.server.start()
+        self.engine = Engine(self.server.url, min_pool_size=1, max_pool_size=2)
+        self.events: list[tuple[str, StatementTrace]] = []
+        for event in ("before_acquire", "after_acquire", "before_execute", "after_execute", "after_fetch", "on_error"):
+            self.engine.add_hook(event, lambda trace, event=event: self.events.append((event, trace)))
+
+    async def asyncSetUp(self):
+        await self.engine.connect()
+
+    async def asyncTearDown(self):
+        await self.engine.disconnect()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def names(self):
+        return [event for event, _ in self.events]
+
+    async def test_lifecycle(self):
+        result = await self.engine.execute("SELECT id FROM users WHERE id > %s", (1,))
+        self.assertEqual(self.names(), ["before_acquire", "after_acquire", "before_execute", "after_execute"])
+        self.assertEqual(len(await result.fetch_all()), 10)
+        self.assertEqual(self.names()[-1], "after_fetch")
+        trace = self.events[-1][1]
+        self.assertEqual(trace.values, (1,))
+        self.assertEqual(trace.fingerprint, "SELECT id FROM users WHERE id > ?")
+        self.assertEqual((trace.row_count, trace.rows), (10, 10))
+        self.assertGreaterEqual(trace.execute_time, 0.01)
+        self.assertGreaterEqual(trace.acquire_time, 0)
+        self.assertGreaterEqual(trace.fetch_time, 0)
+        self.assertIsNotNone(trace.connection)
+
+    async def test_error_and_async_hook(self):
+        errors = []
+
+        async def on_error(trace: StatementTrace):
+            errors.append(trace.error.args[0])
+
+        self.engine.add_hook("on_error", on_error)
+        result = await self.engine.execute("SELECT * FROM missing")
+        self.assertEqual(result.error_no, 1146)
+        self.assertEqual(errors, [1146])
+        self.assertEqual(self.names()[-1], "on_error")
+        self.assertNotIn("after_execute", self.names())
+
+    async def test_hook_exception_ignored(self):
+        def broken(trace):
+            raise RuntimeError("broken hook")
+
+        self.engine.add_hook("before_execute", broken)
+        with self.assertLogs("aiomysql", "ERROR"):
+            result = await self.engine.execute("SELECT id FROM users")
+        self.assertEqual(len(await result.fetch_all()), 10)
+        self.engine.remove_hook("before_execute", broken)
+        with self.assertRaises(ValueError):
+            self.engine.add_hook("before_commit", broken)
+
+    async def test_transaction(self):
+        async with self.engine.transaction() as tx:
+            async with tx.execute("SELECT id FROM users") as result:
+                await result.fetch_all()
+        # 事务中的语句使用事务连接，不调用 acquire 相关钩子
+        self.assertEqual(self.names(), ["before_execute", "after_execute", "after_fetch"])
@@ -0,0 +1,135 @@
+import asyncio
+import gc
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import MagicMock
+
+from asmysql.testing import FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+from asmysql.v2._lease import ConnectionLease, LeakDetector
+
+
+class _Owner:
+    pass
+
+
+class TestConnectionLease(TestCase):
+    def test_release_once(self):
+        pool, conn = MagicMock(), MagicMock()
+        lease = ConnectionLease(pool, conn)
+        lease.release()
+        lease.release(discard=True)
+        pool.release.assert_called_once_with(conn)
+        conn.close.assert_not_called()
+
+    def test_discard(self):
+        pool, conn = MagicMock(), MagicMock()
+        ConnectionLease(pool, conn).release(discard=True)
+        conn.close.assert_called_once_with()
+        pool.release.assert_called_once_with(conn)
+
+    def test_pinned(self):
+        pool, conn = MagicMock(), MagicMock()
+        lease = ConnectionLease(pool, conn, pinned=True, owner=_Owner())
+        lease.release(discard=True)
+        self.assertTrue(lease.released)
+        pool.release.assert_not_called()
+        conn.close.assert_not_called()
+
+    def test_leak_detection(self):
+        pool, conn = MagicMock(), MagicMock()
+        detector = LeakDetector(sample_rate=1)
+        owner = _Owner()
+
+        def create_lease(owner):
+            # 与 Engine.execute -> Result.__init__ 相同，记录的调用栈不包括最后两层
+            return ConnectionLease(
+                pool, conn, owner=owner, name="<Result: SELECT 1>", stack=detector.capture(), detector=detector
+            )
+
+        lease = create_lease(owner)
+        with self.assertLogs("aiomysql", "WARNING") as logs:
+            del owner
+            gc.collect()
+        self.assertTrue(lease.released)
+        self.assertEqual(detector.leaked, 1)
+        conn.close.assert_called_once_with()
+        pool.release.assert_called_once_with(conn)
+        self.assertIn("<Result: SELECT 1>", logs.output[0])
+        self.assertIn("created at", logs.output[0])
+        self.assertIn("test_leak_detection", logs.output[0])
+
+    def test_no_leak_after_release(self):
+        pool, conn = MagicMock(), MagicMock()
+        detector = LeakDetector()
+        owner = _Owner()
+        ConnectionLease(pool, conn, owner=owner, detector=detector).release()
+        del owner
+        gc.collect()
+        self.assertEqual(detector.leaked, 0)
+        self.assertIsNone(detector.capture())
+        pool.release.assert_called_once_with(conn)
+
+
+class TestResultLifecycle(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试 Result 的连接归还、取消和泄漏检测"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"FROM slow", ResultSet(["id"], [(1,)]), latency=5)
+        self.server.on(r"FROM users", ResultSet(["id"], [(i,) for i in range(100)]))
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_close_is_idempotent(self):
+        async with Engine(self.server.url, min_pool_size=1, max_pool_size=1) as engine:
+            result = await engine.execute("SELECT id FROM users", stream=True)
+            self.assertEqual(engine.status["pool_used"], 1)
+            await result.close()
+            await result.close()
+            self.assertEqual(await result.fetch_one(), None)
+            self.assertEqual(engine.status["pool_used"], 0)
+            self.assertEqual(engine.status["pool_free"], 1)
+
+    async def test_cancel_during_execute(self):
+        async with Engine(self.server.url, min_pool_size=1, max_pool_size=1) as engine:
+            task = asyncio.ensure_future(engine.execute("SELECT id FROM slow"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(engine.status["pool_used"], 0)
+            self.assertEqual(await (await engine.execute("SELECT id FROM users")).fetch_one(), (0,))
+
+    async def test_cancel_inside_context(self):
+        async with Engine(self.server.url, min_pool_size=1, max_pool_size=1) as engine:
+            started = asyncio.Event()
+
+            async def consume():
+                async with engine.execute("SELECT id FROM users", stream=True) as result:
+                    await result.fetch_one()
+                    started.set()
+                    await asyncio.sleep(10)
+
+            task = asyncio.ensure_future(consume())
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # 没有读取完的流式结果所在的连接被关闭
+            self.assertEqual(engine.status["pool_used"], 0)
+            self.assertEqual(engine.status["pool_size"], 0)
+            self.assertEqual(engine.status["pool_leaked"], 0)
+            self.assertEqual(len(await (await engine.execute("SELECT id FROM users")).fetch_all()), 100)
+
+    async def test_leaked_result(self):
+        async with Engine(self.server.url, min_pool_size=1, max_pool_size=1) as engine:
+            result = await engine.execute("SELECT id FROM users", stream=True)
+            await result.fetch_one(close=False)
+            with self.assertLogs("aiomysql", "WARNING"):
+                del result
+                gc.collect()
+            self.assertEqual(engine.status["pool_leaked"], 1)
+            self.assertEqual(engine.status["pool_used"], 0)
+            self.assertEqual(len(await (await engine.execute("SELECT id FROM users")).fetch_all()), 100)
@@ -0,0 +1,107 @@
+import datetime
+from decimal import Decimal
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock
+
+from pymysql.connections import MysqlPacket
+from pymysql.err import DataError
+
+from asmysql.v2._load_data import LoadRowsResult, RowSource, encode_row, encode_rows, encode_value, load_rows
+
+
+class TestEncodeRows(TestCase):
+    """测试行数据编码为 TSV 格式"""
+
+    def test_encode_value(self):
+        """测试各类型字段的编码和转义"""
+        self.assertEqual(encode_value(None, "utf8"), b"\\N")
+        self.assertEqual(encode_value("a\tb\nc\\d\re\0", "utf8"), b"a\\tb\\nc\\\\d\\re\\0")
+        self.assertEqual(encode_value("\\N", "utf8"), b"\\\\N")
+        self.assertEqual(encode_value("张三", "utf8"), "张三".encode())
+        self.assertEqual(encode_value(True, "utf8"), b"1")
+        self.assertEqual(encode_value(12, "utf8"), b"12")
+        self.assertEqual(encode_value(Decimal("1.50"), "utf8"), b"1.50")
+        self.assertEqual(encode_value(b"\x00\t\xff", "utf8"), b"\\0\\t\xff")
+        self.assertEqual(encode_value(datetime.datetime(2024, 1, 2, 3, 4, 5), "utf8"), b"2024-01-02 03:04:05")
+        self.assertEqual(encode_value(datetime.date(2024, 1, 2), "utf8"), b"2024-01-02")
+        self.assertEqual(encode_value(-datetime.timedelta(hours=26, seconds=1), "utf8"), b"-26:00:01")
+
+    def test_encode_row(self):
+        """测试一行的编码"""
+        self.assertEqual(encode_row((1, None, "x"), "utf8"), b"1\t\\N\tx\n")
+
+    def test_query(self):
+        """测试生成的 LOAD DATA 语句"""
+        source = RowSource("db.t`x", ["id", "name"], [])
+        self.assertEqual(
+            source.query("utf8mb4"),
+            "LOAD DATA LOCAL INFILE 'asmysql_rows.tsv' INTO TABLE `db`.`t``x` CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' (`id`, `name`)",
+        )
+        with self.assertRaises(ValueError):
+            RowSource("t", [], [])
+
+
+class TestLoadRows(IsolatedAsyncioTestCase):
+    """使用mock连接测试 LOCAL INFILE 协议的数据发送"""
+
+    def setUp(self):
+        self.sent = []
+        self.mock_conn = Mock()
+        self.mock_conn.encoding = "utf8"
+        self.mock_conn.write_packet = Mock(side_effect=self.sent.append)
+        self.mock_conn._writer.drain = AsyncMock()
+        self.mock_conn._execute_command = AsyncMock()
+        # 服务端先请求本地文件，再返回OK包: affected_rows=3, warnings=1
+        self.mock_conn._read_packet = AsyncMock(
+            side_effect=[
+                MysqlPacket(b"\xfbasmysql_rows.tsv", "utf8"),
+                MysqlPacket(b"\x00\x03\x00\x02\x00\x01\x00", "utf8"),
+            ]
+        )
+
+    async def test_stream_async_iterable(self):
+        """测试从异步可迭代对象流式发送数据"""
+
+        async def rows():
+            for i in range(3):
+                yield i, f"name{i}"
+
+        result = LoadRowsResult(self.mock_conn, encode_rows(rows(), "utf8", 2, chunk_size=8))
+        await result.read()
+        self.assertEqual(b"".join(self.sent), b"0\tname0\n1\tname1\n2\tname2\n")
+        self.assertGreater(len(self.sent), 2)
+        self.assertEqual(self.sent[-1], b"")
+        self.assertEqual(result.affected_rows, 3)
+        self.assertEqual(result.warning_count, 1)
+
+    async def test_column_count_mismatch(self):
+        """测试列数不匹配时关闭连接并抛出 DataError"""
+        mock_cursor = Mock()
+        mock_cursor.connection = self.mock_conn
+        mock_cursor.nextset = AsyncMock(return_value=None)
+        mock_cursor._do_get_result = AsyncMock()
+        with self.assertRaises(DataError) as ctx:
+            await load_rows(mock_cursor, "LOAD DATA ...", RowSource("t", ["a", "b"], [(1, 2), (3,)]))
+        self.assertEqual(ctx.exception.args[0], 1136)
+        self.assertEqual(self.sent, [])
+        self.mock_conn.close.assert_called_once_with()
+        self.assertEqual(self.mock_conn._read_packet.await_count, 1)
+        mock_cursor._do_get_result.assert_not_awaited()
+
+    async def test_error_after_flush(self):
+        """测试已经发送部分数据后出错: 不发送文件结束的空包，关闭连接使服务端回滚，已发送的数据都不会导入"""
+
+        def rows():
+            for i in range(10):
+                yield i, f"name{i}"
+            raise ValueError("source failed")
+
+        result = LoadRowsResult(self.mock_conn, encode_rows(rows(), "utf8", 2, chunk_size=8))
+        with self.assertRaises(ValueError):
+            await result.read()
+        self.assertGreater(len(self.sent), 1)
+        self.assertNotIn(b"", self.sent)
+        self.mock_conn.close.assert_called_once_with()
+        self.assertEqual(self.mock_conn._read_packet.await_count, 1)
+        self.assertIsNone(result.affected_rows)
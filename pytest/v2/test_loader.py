@@ -0,0 +1,116 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from unittest import IsolatedAsyncioTestCase
+
+from pymysql.err import ProgrammingError
+
+from asmysql.testing import ErrorResponse, FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+
+
+@dataclass
+class Order:
+    user_id: int
+    amount: int
+
+
+def _users(match, params):
+    ids = [int(key) for key in re.findall(r"\d+", match[1])]
+    return ResultSet(["id", "name"], [(i, f"user{i}") for i in ids if i < 100])
+
+
+def _orders(match, params):
+    ids = [int(key) for key in re.findall(r"\d+", match[1])]
+    return ResultSet(["user_id", "amount"], [(i, amount) for i in ids for amount in range(i)])
+
+
+class TestLoader(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试按键批量查找"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"FROM `users` WHERE `id` IN \((.*)\)", _users)
+        self.server.on(r"FROM `orders` WHERE `user_id` IN \((.*)\)", _orders)
+        self.server.on(r"FROM `missing`", ErrorResponse(1146, "Table 'test.missing' doesn't exist", "42S02"))
+        self.server.start()
+        self.engine = Engine(self.server.url, min_pool_size=1, max_pool_size=4)
+
+    async def asyncSetUp(self):
+        await self.engine.connect()
+
+    async def asyncTearDown(self):
+        await self.engine.disconnect()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def queries(self, table: str):
+        return [query for query in self.server.queries if f"FROM `{table}`" in query]
+
+    async def test_coalesce(self):
+        loader = self.engine.loader("users", "id", result_class=dict)
+
+        async def handler(user_id):
+            await asyncio.sleep(0)
+            return await loader.load(user_id)
+
+        users = await asyncio.gather(*(handler(i) for i in (3, 1, 2, 1, 500)))
+        self.assertEqual(
+            users,
+            [
+                {"id": 3, "name": "user3"},
+                {"id": 1, "name": "user1"},
+                {"id": 2, "name": "user2"},
+                {"id": 1, "name": "user1"},
+                None,
+            ],
+        )
+        self.assertEqual(self.queries("users"), ["SELECT * FROM `users` WHERE `id` IN (3, 1, 2, 500)"])
+        # 已查找的键使用缓存
+        self.assertEqual(await loader.load(2), {"id": 2, "name": "user2"})
+        self.assertEqual(len(self.queries("users")), 1)
+        loader.clear(2)
+        self.assertEqual(await loader.load(2), {"id": 2, "name": "user2"})
+        self.assertEqual(len(self.queries("users")), 2)
+
+    async def test_many_and_result_class(self):
+        loader = self.engine.loader("orders", "user_id", columns=["user_id", "amount"], result_class=Order, many=True)
+        orders = await loader.load_many([2, 0])
+        self.assertEqual(orders, [[Order(2, 0), Order(2, 1)], []])
+        with self.assertRaises(ValueError):
+            self.engine.loader("orders", "user_id", columns=["amount"])
+
+    async def test_max_batch_size(self):
+        loader = self.engine.loader("users", "id", max_batch_size=2)
+        users = await loader.load_many(range(5))
+        self.assertEqual(users, [(i, f"user{i}") for i in range(5)])
+        self.assertEqual(len(self.queries("users")), 3)
+
+    async def test_window(self):
+        loader = self.engine.loader("users", "id", window=0.05)
+        first = loader.load(1)
+        await asyncio.sleep(0.01)
+        second = loader.load(2)
+        self.assertEqual(await asyncio.gather(first, second), [(1, "user1"), (2, "user2")])
+        self.assertEqual(len(self.queries("users")), 1)
+
+    async def test_error(self):
+        loader = self.engine.loader("missing", "id")
+        with self.assertRaises(ProgrammingError):
+            await loader.load(1)
+        # 出错的键不缓存
+        with self.assertRaises(ProgrammingError):
+            await loader.load(1)
+        self.assertEqual(len(self.queries("missing")), 2)
+
+    async def test_cancel_one_waiter(self):
+        loader = self.engine.loader("users", "id", window=0.05)
+        other = loader.load(1)
+        # 一个调用者超时取消，不影响同一个键的其他等待者
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(loader.load(1), 0.01)
+        self.assertEqual(await other, (1, "user1"))
+        # 取消也不会使缓存失效，之后的查找直接返回缓存的结果
+        self.assertEqual(await loader.load(1), (1, "user1"))
+        self.assertEqual(len(self.queries("users")), 1)
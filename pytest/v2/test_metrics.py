@@ -0,0 +1,111 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from asmysql.testing import ErrorResponse, FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+from asmysql.v2._metrics import EngineMetrics, Histogram, bucket_bounds, bucket_index, fingerprint
+
+
+class TestHistogram(TestCase):
+    """测试对数线性分桶和语句指纹"""
+
+    def test_bucket_bounds(self):
+        for value in (*range(200), 1000, 12345, 10**9, 2**40 + 1):
+            low, high = bucket_bounds(bucket_index(value))
+            self.assertLessEqual(low, value)
+            self.assertLessEqual(value, high)
+            self.assertLessEqual(high - low, max(1, value // 16))
+
+    def test_percentile(self):
+        histogram = Histogram(1000)
+        for value in range(1, 10001):
+            histogram.record(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 10000)
+        self.assertEqual(snapshot["min"], 0.001)
+        self.assertEqual(snapshot["max"], 10.0)
+        self.assertAlmostEqual(snapshot["p50"], 5.0, delta=5.0 / 16)
+        self.assertAlmostEqual(snapshot["p99"], 9.9, delta=9.9 / 16)
+        below, total = histogram.cumulative((1.0, 10.0))
+        self.assertAlmostEqual(below, 1000, delta=1000 / 16)
+        self.assertEqual(total, 10000)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM `t1`\n WHERE id IN (1, 2, 3) AND name = 'a''b' AND x > -1.5;"),
+            "SELECT * FROM `t1` WHERE id IN (...) AND name = ? AND x > ?",
+        )
+        self.assertEqual(
+            fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"), "INSERT INTO t (a, b) VALUES (...)"
+        )
+        self.assertEqual(fingerprint("SELECT a FROM t WHERE b = %(b)s"), "SELECT a FROM t WHERE b = ?")
+
+    def test_max_statements(self):
+        metrics = EngineMetrics(max_statements=2)
+        for table in ("a", "b", "c", "d"):
+            metrics.statement(f"SELECT * FROM {table}").record_execute(1)
+        self.assertEqual(list(metrics.snapshot()["statements"]), ["SELECT * FROM a", "SELECT * FROM b", "<other>"])
+        self.assertEqual(metrics.snapshot()["statements"]["<other>"]["calls"], 2)
+
+
+class TestEngineMetrics(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试 Engine 记录的统计"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"FROM users WHERE id = (\d+)", lambda m, params: ResultSet(["id"], [(int(m[1]),)]))
+        self.server.on(r"FROM users", ResultSet(["id"], [(i,) for i in range(100)]), latency=0.02)
+        self.server.on(r"FROM missing", ErrorResponse(1146, "Table 'test.missing' doesn't exist", "42S02"))
+        self.server.start()
+        self.engine = Engine(self.server.url + "?collect_metrics=1", min_pool_size=1, max_pool_size=2)
+
+    async def asyncSetUp(self):
+        await self.engine.connect()
+
+    async def asyncTearDown(self):
+        await self.engine.disconnect()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_statements(self):
+        for i in range(3):
+            result = await self.engine.execute("SELECT id FROM users WHERE id = %s", (i,))
+            self.assertEqual(list(await result.fetch_all()), [(i,)])
+        result = await self.engine.execute("SELECT id FROM users")
+        self.assertEqual(len(await result.fetch_all()), 100)
+        result = await self.engine.execute("SELECT * FROM missing")
+        self.assertEqual(result.error_no, 1146)
+
+        snapshot = self.engine.metrics.snapshot()
+        self.assertEqual(snapshot["pool"]["acquire"]["count"], 5)
+        lookup = snapshot["statements"]["SELECT id FROM users WHERE id = ?"]
+        self.assertEqual(lookup["calls"], 3)
+        self.assertEqual(lookup["rows"]["max"], 1)
+        scan = snapshot["statements"]["SELECT id FROM users"]
+        self.assertGreaterEqual(scan["execute"]["min"], 0.02)
+        self.assertEqual(scan["rows"]["sum"], 100)
+        self.assertEqual(scan["fetch"]["count"], 1)
+        missing = snapshot["statements"]["SELECT * FROM missing"]
+        self.assertEqual((missing["calls"], missing["errors"]), (1, 1))
+
+        text = self.engine.metrics.openmetrics()
+        self.assertIn("# TYPE asmysql_statement_execute_seconds histogram", text)
+        self.assertIn('asmysql_statement_calls_total{statement="SELECT id FROM users WHERE id = ?"} 3', text)
+        self.assertIn('asmysql_statement_rows_bucket{statement="SELECT id FROM users",le="+Inf"} 1', text)
+        self.assertTrue(text.endswith("# EOF\n"))
+
+    async def test_transaction(self):
+        async with self.engine.transaction() as tx:
+            result = await tx.execute("SELECT id FROM users WHERE id = 1")
+            await result.fetch_all()
+        statement = self.engine.metrics.snapshot()["statements"]["SELECT id FROM users WHERE id = ?"]
+        # 事务中的语句不从连接池获取连接
+        self.assertEqual(statement["calls"], 1)
+        self.assertEqual(statement["acquire"]["count"], 0)
+
+    async def test_disabled(self):
+        engine = Engine(self.server.url, min_pool_size=1)
+        async with engine:
+            result = await engine.execute("SELECT id FROM users WHERE id = 1")
+            await result.fetch_all()
+        self.assertEqual(len(engine.metrics), 0)
@@ -0,0 +1,100 @@
+import time
+from dataclasses import dataclass
+from unittest import IsolatedAsyncioTestCase
+
+from asmysql.testing import ErrorResponse, FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine, Pipeline
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+
+
+class TestPipeline(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试多语句批量执行"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer(latency=0.05)
+        self.server.on(r"FROM missing", ErrorResponse(1146, "Table 'test.missing' doesn't exist", "42S02"))
+        self.server.on(
+            r"FROM users WHERE id = (\d+)", lambda m, params: ResultSet(["id", "name"], [(int(m[1]), f"u{m[1]}")])
+        )
+        self.server.start()
+        self.engine = Engine(self.server.url, min_pool_size=1, max_pool_size=2)
+
+    async def asyncSetUp(self):
+        await self.engine.connect()
+
+    async def asyncTearDown(self):
+        await self.engine.disconnect()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_one_round_trip(self):
+        started = time.monotonic()
+        async with self.engine.pipeline(result_class=User) as pipe:
+            pending = [pipe.execute("SELECT id, name FROM users WHERE id = %s", (i,)) for i in range(20)]
+            self.assertEqual(len(pipe), 20)
+        elapsed = time.monotonic() - started
+        # 20条语句逐条执行至少需要 20 * 50ms
+        self.assertLess(elapsed, 0.5)
+        users = [await (await result).fetch_one() for result in pending]
+        self.assertEqual(users, [User(i, f"u{i}") for i in range(20)])
+
+    async def test_await_sends_pending(self):
+        pipe = self.engine.pipeline(result_class=dict)
+        first = pipe.execute("SELECT id, name FROM users WHERE id = 1")
+        second = pipe.execute("SELECT id, name FROM users WHERE id = 2")
+        self.assertEqual(await (await second).fetch_all(), [{"id": 2, "name": "u2"}])
+        self.assertEqual(len(pipe), 0)
+        self.assertEqual(await (await first).fetch_all(), [{"id": 1, "name": "u1"}])
+
+    async def test_error_stops_remaining(self):
+        async with self.engine.pipeline() as pipe:
+            ok = pipe.execute("UPDATE users SET name = 'x' WHERE id = 1")
+            failed = pipe.execute("SELECT * FROM missing")
+            skipped = pipe.execute("SELECT id, name FROM users WHERE id = 3")
+        self.assertIsNone((await ok).error)
+        self.assertEqual((await failed).error_no, 1146)
+        self.assertEqual((await skipped).error_no, 1146)
+        self.assertEqual(await skipped.fetch_all(), [])
+        # 连接归还时已关闭多语句
+        result = await self.engine.execute("SELECT 1 FROM users WHERE id = 1; SELECT 2")
+        self.assertEqual(result.error_no, 1064)
+
+    async def test_trailing_semicolon(self):
+        async with self.engine.pipeline(result_class=dict) as pipe:
+            first = pipe.execute("SELECT id, name FROM users WHERE id = 1;")
+            second = pipe.execute("SELECT id, name FROM users WHERE id = %s ; \n", (2,))
+        self.assertIsNone((await first).error)
+        self.assertEqual(await first.fetch_all(), [{"id": 1, "name": "u1"}])
+        self.assertIsNone((await second).error)
+        self.assertEqual(await second.fetch_all(), [{"id": 2, "name": "u2"}])
+
+    async def test_trailing_comment(self):
+        async with self.engine.pipeline(result_class=dict) as pipe:
+            first = pipe.execute("SELECT id, name FROM users WHERE id = 1 -- first")
+            second = pipe.execute("SELECT id, name FROM users WHERE id = 2 # second")
+            third = pipe.execute("SELECT id, name FROM users WHERE id = 3")
+        # 注释没有吞掉后面语句的分隔符
+        self.assertEqual(await (await first).fetch_all(), [{"id": 1, "name": "u1"}])
+        self.assertEqual(await (await second).fetch_all(), [{"id": 2, "name": "u2"}])
+        self.assertEqual(await (await third).fetch_all(), [{"id": 3, "name": "u3"}])
+
+    async def test_chunks(self):
+        pipe = Pipeline(pool=self.engine.pool, max_stmt_length=100)
+        pending = [pipe.execute("SELECT id, name FROM users WHERE id = %s", (i,)) for i in range(10)]
+        await pipe.run()
+        self.assertEqual([(await result).row_count for result in pending], [1] * 10)
+
+    async def test_invalidate_cache(self):
+        self.server.on(r"FROM cached", ResultSet(["id"], [(1,)]))
+        result = await self.engine.execute("SELECT id FROM cached", cache_ttl=60)
+        await result.fetch_all()
+        self.assertEqual(len(self.engine.cache), 1)
+        async with self.engine.pipeline() as pipe:
+            pipe.execute("UPDATE cached SET id = 2")
+        self.assertEqual(len(self.engine.cache), 0)
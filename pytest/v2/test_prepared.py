@@ -0,0 +1,122 @@
+import datetime
+import struct
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import Mock
+
+from pymysql.constants import FIELD_TYPE
+
+from asmysql.v2._prepared import (
+    PreparedStatement,
+    StatementCache,
+    _encode_execute,
+    _encode_param,
+    convert_query,
+)
+
+
+class TestConvertQuery(TestCase):
+    """测试pymysql风格SQL到预处理语句的转换"""
+
+    def test_positional_values(self):
+        """测试 %s 占位符转换"""
+        sql, params = convert_query("SELECT * FROM t WHERE id = %s AND name = %s", (1, "张三"))
+        self.assertEqual(sql, "SELECT * FROM t WHERE id = ? AND name = ?")
+        self.assertEqual(params, (1, "张三"))
+
+    def test_named_values(self):
+        """测试 %(name)s 占位符转换"""
+        sql, params = convert_query("SELECT * FROM t WHERE a = %(a)s OR b = %(b)s OR c = %(a)s", {"a": 1, "b": 2})
+        self.assertEqual(sql, "SELECT * FROM t WHERE a = ? OR b = ? OR c = ?")
+        self.assertEqual(params, (1, 2, 1))
+
+    def test_escaped_percent(self):
+        """测试 %% 转义"""
+        sql, params = convert_query("SELECT * FROM t WHERE name LIKE 'a%%' AND id = %s", [1])
+        self.assertEqual(sql, "SELECT * FROM t WHERE name LIKE 'a%' AND id = ?")
+        self.assertEqual(params, (1,))
+
+    def test_no_values(self):
+        """测试没有参数时SQL原样保留"""
+        sql, params = convert_query("SELECT '100%%'", None)
+        self.assertEqual(sql, "SELECT '100%%'")
+        self.assertEqual(params, ())
+
+    def test_fallback(self):
+        """测试无法使用预处理语句时返回None"""
+        # IN 语句的 tuple 参数
+        self.assertIsNone(convert_query("SELECT * FROM t WHERE id IN %s", ((1, 2),)))
+        # 参数数量不匹配
+        self.assertIsNone(convert_query("SELECT %s, %s", (1,)))
+        # 命名参数缺失
+        self.assertIsNone(convert_query("SELECT %(a)s", {"b": 1}))
+
+
+class TestEncodeParams(TestCase):
+    """测试二进制协议的参数编码"""
+
+    def test_encode_scalar(self):
+        """测试基础类型编码"""
+        self.assertEqual(_encode_param(True, "utf8"), (FIELD_TYPE.TINY, False, b"\x01"))
+        self.assertEqual(_encode_param(-2, "utf8"), (FIELD_TYPE.LONGLONG, False, struct.pack("<q", -2)))
+        self.assertEqual(_encode_param(1 << 63, "utf8"), (FIELD_TYPE.LONGLONG, True, struct.pack("<Q", 1 << 63)))
+        self.assertEqual(_encode_param(1.5, "utf8"), (FIELD_TYPE.DOUBLE, False, struct.pack("<d", 1.5)))
+        self.assertEqual(_encode_param(Decimal("1.20"), "utf8"), (FIELD_TYPE.NEWDECIMAL, False, b"\x041.20"))
+        self.assertEqual(_encode_param("张", "utf8"), (FIELD_TYPE.VAR_STRING, False, b"\x03" + "张".encode()))
+        self.assertEqual(_encode_param(b"\x00\x01", "utf8"), (FIELD_TYPE.BLOB, False, b"\x02\x00\x01"))
+
+    def test_encode_temporal(self):
+        """测试日期时间类型编码"""
+        self.assertEqual(
+            _encode_param(datetime.date(2024, 1, 2), "utf8"),
+            (FIELD_TYPE.DATE, False, b"\x04" + struct.pack("<HBB", 2024, 1, 2)),
+        )
+        field_type, _, data = _encode_param(datetime.datetime(2024, 1, 2, 3, 4, 5, 6), "utf8")
+        self.assertEqual(field_type, FIELD_TYPE.DATETIME)
+        self.assertEqual(data, b"\x0b" + struct.pack("<HBBBBBI", 2024, 1, 2, 3, 4, 5, 6))
+        field_type, _, data = _encode_param(-datetime.timedelta(days=1, hours=2), "utf8")
+        self.assertEqual(field_type, FIELD_TYPE.TIME)
+        self.assertEqual(data, b"\x08" + struct.pack("<BIBBB", 1, 1, 2, 0, 0))
+
+    def test_encode_execute_null_bitmap(self):
+        """测试执行包中的NULL位图和参数类型"""
+        data = _encode_execute(7, (None, 1), "utf8")
+        stmt_id, flags, iterations = struct.unpack_from("<IBI", data)
+        self.assertEqual((stmt_id, flags, iterations), (7, 0, 1))
+        self.assertEqual(
+            data[9:], b"\x01" + b"\x01" + bytes([FIELD_TYPE.NULL, 0, FIELD_TYPE.LONGLONG, 0]) + struct.pack("<q", 1)
+        )
+
+
+class TestStatementCache(TestCase):
+    """测试每个连接上的预处理语句LRU缓存"""
+
+    def test_lru_eviction(self):
+        """测试按最近使用顺序淘汰"""
+        cache = StatementCache(2, thread_id=1)
+        cache.put(PreparedStatement(1, "a", 0, 0))
+        cache.put(PreparedStatement(2, "b", 0, 0))
+        self.assertIsNotNone(cache.get("a"))
+        cache.put(PreparedStatement(3, "c", 0, 0))
+        evicted = cache.evict()
+        self.assertEqual([stmt.sql for stmt in evicted], ["b"])
+        self.assertEqual(list(cache.statements), ["a", "c"])
+
+    def test_cache_reset_after_reconnect(self):
+        """测试连接重连后缓存失效"""
+        conn = Mock()
+        conn.server_thread_id = (1,)
+        conn._asmysql_stmt_cache = None
+        cache = StatementCache.of(conn, 8)
+        cache.put(PreparedStatement(1, "a", 0, 0))
+        self.assertIs(StatementCache.of(conn, 8), cache)
+        conn.server_thread_id = (2,)
+        self.assertEqual(len(StatementCache.of(conn, 8)), 0)
+
+    def test_no_cache(self):
+        """测试 max_size 为0时不复用语句，上一个句柄在下一次预处理前关闭"""
+        cache = StatementCache(0, thread_id=1)
+        cache.put(PreparedStatement(1, "a", 0, 0))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual([stmt.sql for stmt in cache.evict(len(cache) - cache.max_size + 1)], ["a"])
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,110 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock
+
+from asmysql.v2 import Engine, RoutingEngine
+from asmysql.v2._routing import is_read_query
+
+
+def _mock_engine(url: str, used: int = 0):
+    """创建连接池为mock的Engine"""
+    engine = Engine(url)
+    pool = Mock()
+    pool.size = used + 1
+    pool.freesize = 1
+    pool.minsize = 1
+    pool.maxsize = 10
+    engine._Engine__pool = pool
+    engine.execute = Mock(return_value=Mock(name=f"result:{url}"))
+    engine.execute_many = Mock()
+    return engine
+
+
+class TestIsReadQuery(TestCase):
+    """测试只读语句判断"""
+
+    def test_read_queries(self):
+        self.assertTrue(is_read_query("SELECT * FROM t"))
+        self.assertTrue(is_read_query("  /* hint */ select 1"))
+        self.assertTrue(is_read_query("(SELECT 1) UNION (SELECT 2)"))
+        self.assertTrue(is_read_query("SHOW TABLES"))
+        self.assertTrue(is_read_query("-- comment\nEXPLAIN SELECT 1"))
+
+    def test_write_queries(self):
+        self.assertFalse(is_read_query("UPDATE t SET a = 1"))
+        self.assertFalse(is_read_query("INSERT INTO t SELECT * FROM s"))
+        self.assertFalse(is_read_query("SELECT * FROM t WHERE id = 1 FOR UPDATE"))
+        self.assertFalse(is_read_query("SELECT * FROM t LOCK IN SHARE MODE"))
+        self.assertFalse(is_read_query("SELECT a INTO @a FROM t"))
+        self.assertFalse(is_read_query("SELECTED"))
+
+
+class TestRoutingEngine(IsolatedAsyncioTestCase):
+    """使用mock测试读写分离路由"""
+
+    def setUp(self):
+        self.primary = _mock_engine("mysql://primary:3306/")
+        self.replica1 = _mock_engine("mysql://replica1:3306/", used=3)
+        self.replica2 = _mock_engine("mysql://replica2:3306/", used=1)
+        self.engine = RoutingEngine(self.primary, [self.replica1, self.replica2])
+
+    def test_read_to_least_used_replica(self):
+        """测试读语句发到正在使用连接数最少的从库"""
+        self.assertIs(self.engine.choose_engine("SELECT 1"), self.replica2)
+        self.engine.execute("SELECT * FROM t WHERE id = %s", (1,))
+        self.replica2.execute.assert_called_once_with(
+            "SELECT * FROM t WHERE id = %s",
+            (1,),
+            stream=None,
+            result_class=None,
+            commit=None,
+            prepared=None,
+            cache_ttl=None,
+            cache_tags=None,
+            timeout=None,
+        )
+
+    def test_write_and_read_only_flag(self):
+        """测试写语句发到主库，read_only 可以覆盖自动判断"""
+        self.assertIs(self.engine.choose_engine("DELETE FROM t"), self.primary)
+        self.assertIs(self.engine.choose_engine("CALL report()", read_only=True), self.replica2)
+        self.assertIs(self.engine.choose_engine("SELECT 1", read_only=False), self.primary)
+        self.engine.execute_many("INSERT INTO t VALUES (%s)", [(1,)])
+        self.primary.execute_many.assert_called_once()
+
+    async def test_sticky_after_write(self):
+        """测试写入后 sticky_seconds 内读语句发到主库，且只影响当前上下文"""
+        engine = RoutingEngine(self.primary, [self.replica1], sticky_seconds=60)
+        written = asyncio.Event()
+
+        async def other_session():
+            await written.wait()
+            return engine.choose_engine("SELECT 1")
+
+        # 写入前创建的任务有自己的上下文，不受写入影响
+        other = asyncio.create_task(other_session())
+        self.assertIs(engine.choose_engine("SELECT 1"), self.replica1)
+        engine.choose_engine("UPDATE t SET a = 1")
+        written.set()
+        self.assertTrue(engine.is_sticky)
+        self.assertIs(engine.choose_engine("SELECT 1"), self.primary)
+        self.assertIs(await other, self.replica1)
+
+    async def test_replica_lag(self):
+        """测试复制延迟超过阈值的从库不参与路由"""
+        engine = RoutingEngine(self.primary, [self.replica1, self.replica2], max_replica_lag=5)
+        rows = {self.replica1: {"Seconds_Behind_Source": 1}, self.replica2: {"Seconds_Behind_Source": 30}}
+        for replica, row in rows.items():
+            result = Mock(error=None)
+            result.fetch_one = AsyncMock(return_value=row)
+            replica.execute = AsyncMock(return_value=result)
+        self.assertEqual(await engine.check_replica_lag(), [1.0, 30.0])
+        self.assertIs(engine.choose_engine("SELECT 1"), self.replica1)
+        self.assertEqual(engine.status["replica_lag"], [1.0, 30.0])
+        self.assertEqual(len(engine.status["replicas"]), 2)
+        self.assertEqual(engine.status["replicas"][0]["pool_used"], 3)
+
+    def test_no_replicas(self):
+        """测试没有从库时都发到主库"""
+        engine = RoutingEngine(self.primary)
+        self.assertIs(engine.choose_engine("SELECT 1"), self.primary)
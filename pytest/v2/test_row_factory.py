@@ -0,0 +1,101 @@
+import dataclasses
+import importlib.util
+from typing import NamedTuple
+from unittest import TestCase, skipUnless
+from unittest.mock import Mock
+
+from pydantic import BaseModel
+
+from asmysql._row_factory import column_keys, get_row_factory
+
+
+@dataclasses.dataclass
+class UserData:
+    id: int
+    name: str
+    email: str = ""
+
+
+class UserTuple(NamedTuple):
+    id: int
+    name: str
+
+
+class UserModel(BaseModel):
+    id: int
+    name: str
+
+
+class UserSlots:
+    __slots__ = ("id", "name")
+
+    def __init__(self, *, id: int, name: str):
+        self.id = id
+        self.name = name
+
+
+class TestRowFactory(TestCase):
+    """测试根据列名编译的行工厂"""
+
+    def test_dataclass_positional(self):
+        """测试 dataclass 按位置创建(缺省字段使用默认值)"""
+        factory = get_row_factory(UserData, ("id", "name"))
+        self.assertEqual(factory((1, "张三")), UserData(1, "张三"))
+        # 编译结果被缓存
+        self.assertIs(get_row_factory(UserData, ("id", "name")), factory)
+
+    def test_dataclass_reordered_columns(self):
+        """测试列顺序与字段顺序不一致时按关键字创建"""
+        factory = get_row_factory(UserData, ("name", "id"))
+        self.assertEqual(factory(("张三", 1)), UserData(1, "张三"))
+
+    def test_namedtuple(self):
+        """测试 NamedTuple"""
+        factory = get_row_factory(UserTuple, ("id", "name"))
+        self.assertEqual(factory, UserTuple._make)
+        self.assertEqual(factory((1, "a")), UserTuple(1, "a"))
+
+    def test_pydantic_keeps_validation(self):
+        """测试 pydantic 模型保留校验和类型转换"""
+        factory = get_row_factory(UserModel, ("id", "name"))
+        self.assertEqual(factory(("1", "a")), UserModel(id=1, name="a"))
+        with self.assertRaises(ValueError):
+            factory(("x", "a"))
+
+    def test_slots_keyword_only(self):
+        """测试只接受关键字参数的 __slots__ 类"""
+        user = get_row_factory(UserSlots, ("id", "name"))((1, "a"))
+        self.assertEqual((user.id, user.name), (1, "a"))
+
+    def test_non_identifier_columns(self):
+        """测试列名不是合法标识符时回退到 **kwargs"""
+        factory = get_row_factory(lambda **kwargs: kwargs, ("count(*)", "class"))
+        self.assertEqual(factory((3, "a")), {"count(*)": 3, "class": "a"})
+
+    def test_extra_columns_raise(self):
+        """测试多余的列与 cls(**data) 一样报错"""
+        with self.assertRaises(TypeError):
+            get_row_factory(UserData, ("id", "name", "unknown"))((1, "a", 2))
+
+    @skipUnless(importlib.util.find_spec("attrs"), "attrs is not installed")
+    def test_attrs(self):
+        """测试 attrs 类"""
+        import attrs
+
+        @attrs.define
+        class Item:
+            id: int
+            title: str = ""
+
+        self.assertEqual(get_row_factory(Item, ("id", "title"))((1, "a")), Item(1, "a"))
+
+    def test_column_keys_duplicate(self):
+        """测试重名的列与 DictCursor 一样使用 表名.列名"""
+        cursor = Mock()
+        cursor._result.fields = [Mock(table_name="a"), Mock(table_name="b")]
+        cursor._result.fields[0].name = "id"
+        cursor._result.fields[1].name = "id"
+        self.assertEqual(column_keys(cursor), ("id", "b.id"))
+        cursor._result = None
+        cursor.description = (("x",), ("y",))
+        self.assertEqual(column_keys(cursor), ("x", "y"))
@@ -0,0 +1,131 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from unittest import IsolatedAsyncioTestCase
+
+from pymysql.err import ProgrammingError
+
+from asmysql.testing import ErrorResponse, FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+
+_ROWS = [(i, f"user{i}", i % 3) for i in range(1, 26)]
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    status: int
+
+
+def _users(match, params):
+    """模拟 WHERE [(status = n) AND] id > last ORDER BY id LIMIT n"""
+    sql = match[1]
+    status = re.search(r"\(status = (\d+)\)", sql)
+    last = re.search(r"`id` > (\d+)", sql)
+    like = re.search(r"name LIKE '(\w+)%'", sql)
+    limit = int(re.search(r"LIMIT (\d+)", sql)[1])
+    rows = [
+        row
+        for row in _ROWS
+        if (status is None or row[2] == int(status[1]))
+        and (last is None or row[0] > int(last[1]))
+        and (like is None or row[1].startswith(like[1]))
+    ]
+    return ResultSet(["id", "name", "status"], rows[:limit])
+
+
+def _orders(match, params):
+    """复合键 (user_id, seq)"""
+    last = re.search(r"\(`user_id`, `seq`\) > \((\d+), (\d+)\)", match[1])
+    rows = [(user_id, seq) for user_id in range(1, 4) for seq in range(1, 4)]
+    if last:
+        rows = [row for row in rows if row > (int(last[1]), int(last[2]))]
+    return ResultSet(["user_id", "seq"], rows[: int(re.search(r"LIMIT (\d+)", match[1])[1])])
+
+
+class TestScan(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试按键分页扫描"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"FROM `users`(.*)", _users)
+        self.server.on(r"FROM `orders`(.*)", _orders)
+        self.server.on(r"FROM `missing`", ErrorResponse(1146, "Table 'test.missing' doesn't exist", "42S02"))
+        self.server.start()
+        self.engine = Engine(self.server.url, min_pool_size=1, max_pool_size=2, stream=True)
+
+    async def asyncSetUp(self):
+        await self.engine.connect()
+
+    async def asyncTearDown(self):
+        await self.engine.disconnect()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def queries(self, table: str):
+        return [query for query in self.server.queries if f"FROM `{table}`" in query]
+
+    async def test_scan(self):
+        rows = [row async for row in self.engine.scan("users", "id", batch_size=10)]
+        self.assertEqual(rows, _ROWS)
+        self.assertEqual(
+            self.queries("users"),
+            [
+                "SELECT * FROM `users` ORDER BY `id` LIMIT 10",
+                "SELECT * FROM `users` WHERE `id` > 10 ORDER BY `id` LIMIT 10",
+                "SELECT * FROM `users` WHERE `id` > 20 ORDER BY `id` LIMIT 10",
+            ],
+        )
+        # 每页读取完后归还连接
+        self.assertEqual(self.engine.status["pool_used"], 0)
+
+    async def test_where_and_result_class(self):
+        scanner = self.engine.scan("users", "id", where="status = %s", values=(1,), batch_size=4, result_class=User)
+        batches = [batch async for batch in scanner.batches()]
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 1])
+        self.assertEqual(batches[0][0], User(1, "user1", 1))
+        self.assertIn(
+            "SELECT * FROM `users` WHERE (status = 1) AND `id` > 10 ORDER BY `id` LIMIT 4", self.server.queries
+        )
+
+    async def test_literal_percent(self):
+        # 第一页和后面的页使用相同的参数格式化
+        rows = [row async for row in self.engine.scan("users", "id", where="name LIKE 'user1%%'", batch_size=3)]
+        self.assertEqual([row[0] for row in rows], [1, *range(10, 20)])
+        self.assertEqual(len(self.queries("users")), 4)
+        self.assertTrue(all("LIKE 'user1%')" in query for query in self.queries("users")))
+
+    async def test_composite_key(self):
+        scanner = self.engine.scan("orders", ("user_id", "seq"), batch_size=4, result_class=dict)
+        rows = [row async for row in scanner]
+        self.assertEqual(
+            [(row["user_id"], row["seq"]) for row in rows], [(u, s) for u in range(1, 4) for s in range(1, 4)]
+        )
+        self.assertIn(
+            "SELECT * FROM `orders` WHERE (`user_id`, `seq`) > (2, 1) ORDER BY `user_id`, `seq` LIMIT 4",
+            self.server.queries,
+        )
+
+    async def test_prefetch(self):
+        scanner = self.engine.scan("users", "id", batch_size=10, prefetch=True)
+        async for batch in scanner.batches():
+            # 处理当前页时下一页已经在查询
+            await asyncio.sleep(0.05)
+            if batch[0][0] == 1:
+                self.assertIn("SELECT * FROM `users` WHERE `id` > 10 ORDER BY `id` LIMIT 10", self.server.queries)
+        self.assertEqual(len(self.queries("users")), 3)
+
+        # 提前结束时取消预取
+        async for _ in self.engine.scan("users", "id", batch_size=5, prefetch=True):
+            break
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.engine.status["pool_used"], 0)
+
+    async def test_error(self):
+        with self.assertRaises(ProgrammingError):
+            async for _ in self.engine.scan("missing", "id"):
+                pass
+        with self.assertRaises(ValueError):
+            self.engine.scan("users", "id", columns=["name"])
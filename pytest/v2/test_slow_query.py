@@ -0,0 +1,99 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from asmysql.testing import FakeMySQLServer, ResultSet
+from asmysql.v2 import Engine
+from asmysql.v2._slow_query import params_shape
+
+PLAN = {"query_block": {"select_id": 1, "table": {"table_name": "users", "access_type": "ALL"}}}
+
+
+class TestParamsShape(TestCase):
+    def test_params_shape(self):
+        self.assertEqual(params_shape(None), "")
+        self.assertEqual(params_shape((1, "a", None)), "(int, str, NoneType)")
+        self.assertEqual(params_shape({"id": 1}), "{id: int}")
+        self.assertEqual(params_shape([(1, "a"), (2, "b")], many=True), "2 x (int, str)")
+
+
+class TestSlowQuery(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试慢查询记录和 EXPLAIN"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"^EXPLAIN FORMAT=JSON", ResultSet(["EXPLAIN"], [(json.dumps(PLAN),)]))
+        self.server.on(r"FROM users WHERE id", ResultSet(["id"], [(1,)]))
+        self.server.on(r"FROM users", ResultSet(["id"], [(i,) for i in range(10)]), latency=0.05)
+        self.server.start()
+        self.engine = Engine(
+            self.server.url + "?slow_query_threshold=0.03", min_pool_size=1, max_pool_size=2, slow_query_log_size=3
+        )
+
+    async def asyncSetUp(self):
+        await self.engine.connect()
+
+    async def asyncTearDown(self):
+        await self.engine.disconnect()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def explains(self):
+        return [query for query in self.server.queries if query.startswith("EXPLAIN")]
+
+    async def test_record_and_explain(self):
+        result = await self.engine.execute("SELECT id FROM users WHERE id = %s", (1,))
+        await result.fetch_all()
+        self.assertEqual(self.engine.slow_queries, [])
+
+        result = await self.engine.execute("SELECT id FROM users WHERE name = %s", ("a",))
+        self.assertEqual(len(await result.fetch_all()), 10)
+        await self.engine.slow_query_log.wait()
+        (record,) = self.engine.slow_queries
+        self.assertEqual(record["fingerprint"], "SELECT id FROM users WHERE name = ?")
+        self.assertEqual(record["params"], "(str)")
+        self.assertGreaterEqual(record["execute_time"], 0.03)
+        self.assertEqual(record["row_count"], 10)
+        self.assertEqual(record["plan"], PLAN)
+        self.assertEqual(self.explains(), ["EXPLAIN FORMAT=JSON SELECT id FROM users WHERE name = 'a'"])
+
+    async def test_rate_limit_and_ring_buffer(self):
+        for i in range(5):
+            result = await self.engine.execute(f"SELECT id FROM users WHERE name = 'u{i}'")
+            await result.fetch_all()
+            await self.engine.slow_query_log.wait()
+        # 同一指纹只 EXPLAIN 一次，只保留最近的3条记录
+        self.assertEqual(len(self.explains()), 1)
+        self.assertEqual(
+            [record["query"] for record in self.engine.slow_queries],
+            [f"SELECT id FROM users WHERE name = 'u{i}'" for i in range(2, 5)],
+        )
+
+    async def test_execute_many_not_explained(self):
+        self.server.on(r"^INSERT", lambda match, params: ResultSet(["x"], [(1,)]), latency=0.05)
+        async with self.engine.execute_many("INSERT INTO users (id) VALUES (%s)", [(1,), (2,)]) as result:
+            self.assertIsNone(result.error)
+        await self.engine.slow_query_log.wait()
+        (record,) = self.engine.slow_queries
+        self.assertEqual(record["params"], "2 x (int)")
+        self.assertIsNone(record["plan"])
+        self.assertEqual(self.explains(), [])
+
+    async def test_cancelled_explain(self):
+        self.server.reset()
+        self.server.on(r"^EXPLAIN FORMAT=JSON", ResultSet(["EXPLAIN"], [(json.dumps(PLAN),)]), latency=0.2)
+        self.server.on(r"FROM users WHERE id", ResultSet(["id"], [(1,)]))
+        self.server.on(r"FROM users", ResultSet(["id"], [(i,) for i in range(10)]), latency=0.05)
+        result = await self.engine.execute("SELECT id FROM users WHERE name = %s", ("a",))
+        await result.fetch_all()
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(self.explains()), 1)
+        # 断开连接或事件循环关闭时 EXPLAIN 被取消，没有读取响应的连接被关闭，不会放回连接池
+        # noinspection PyProtectedMember
+        self.engine.slow_query_log._SlowQueryLog__task.cancel()
+        await self.engine.slow_query_log.wait()
+        self.assertEqual(self.engine.status["pool_used"], 0)
+        for _ in range(3):
+            result = await self.engine.execute("SELECT id FROM users WHERE id = 1")
+            self.assertEqual(await result.fetch_all(), ((1,),))
@@ -20,6 +20,126 @@ def suite():
     test_suite.addTests(loader.loadTestsFromModule(
         __import__("pytest.v2.test_asmysql_mock", fromlist=[""])
     ))
+
+    # 添加v2事务mock测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_transaction_mock", fromlist=[""])
+    ))
+
+    # 添加v2预处理语句测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_prepared", fromlist=[""])
+    ))
+
+    # 添加v2批量写入测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_bulk", fromlist=[""])
+    ))
+
+    # 添加v2 LOAD DATA 导入测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_load_data", fromlist=[""])
+    ))
+
+    # 添加v2列式结果测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_columnar", fromlist=[""])
+    ))
+
+    # 添加v2行工厂测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_row_factory", fromlist=[""])
+    ))
+
+    # 添加v2读写分离测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_routing", fromlist=[""])
+    ))
+
+    # 添加v2查询缓存测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_cache", fromlist=[""])
+    ))
+
+    # 添加v2基准测试工具测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_bench", fromlist=[""])
+    ))
+
+    # 添加v2 FakeMySQLServer 端到端测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_fake_server", fromlist=[""])
+    ))
+
+    # 添加v2多语句批量执行测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_pipeline", fromlist=[""])
+    ))
+
+    # 添加v2按键批量查找测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_loader", fromlist=[""])
+    ))
+
+    # 添加v2语句耗时统计测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_metrics", fromlist=[""])
+    ))
+
+    # 添加v2语句生命周期钩子测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_hooks", fromlist=[""])
+    ))
+
+    # 添加v2慢查询记录测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_slow_query", fromlist=[""])
+    ))
+
+    # 添加v2连接池自动调整测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_adaptive_pool", fromlist=[""])
+    ))
+
+    # 添加v2连接预热测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_warmup", fromlist=[""])
+    ))
+
+    # 添加v2连接检查和只读语句重试测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_health", fromlist=[""])
+    ))
+
+    # 添加v2连接池准入控制测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_admission", fromlist=[""])
+    ))
+
+    # 添加v2语句执行超时测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_timeout", fromlist=[""])
+    ))
+
+    # 添加v2结果连接租约和泄漏检测测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_lease", fromlist=[""])
+    ))
+
+    # 添加v2按批读取的异步迭代测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_batch_iterate", fromlist=[""])
+    ))
+
+    # 添加v2结果导出测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_export", fromlist=[""])
+    ))
+
+    # 添加v2按键分页扫描测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v2.test_scan", fromlist=[""])
+    ))
     
     return test_suite
 
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from pymysql.constants import ER
+
+from asmysql.testing import ErrorResponse, FakeMySQLServer, OkResponse, ResultSet
+from asmysql.v2 import Engine, QueryTimeoutError
+from asmysql.v2._timeout import add_execution_time_hint
+
+
+class TestExecutionTimeHint(TestCase):
+    def test_add_execution_time_hint(self):
+        self.assertEqual(
+            add_execution_time_hint("SELECT id FROM users", 1.5),
+            "SELECT /*+ MAX_EXECUTION_TIME(1500) */ id FROM users",
+        )
+        self.assertEqual(
+            add_execution_time_hint(" (select id FROM users)", 0.0001),
+            " (select /*+ MAX_EXECUTION_TIME(1) */ id FROM users)",
+        )
+        # 已有优化器提示和非 SELECT 语句不修改
+        self.assertEqual(add_execution_time_hint("SELECT /*+ BKA(t) */ 1", 1), "SELECT /*+ BKA(t) */ 1")
+        self.assertEqual(add_execution_time_hint("UPDATE users SET a = 1", 1), "UPDATE users SET a = 1")
+
+
+class TestQueryTimeout(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试语句超时和 KILL QUERY"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.killed = threading.Event()
+        self.interruptible = True
+
+        def kill(match, params):
+            if self.interruptible:
+                self.killed.set()
+            return OkResponse()
+
+        async def wait_killed():
+            for _ in range(300):
+                if self.killed.is_set():
+                    return ErrorResponse(ER.QUERY_INTERRUPTED, "Query execution was interrupted")
+                await asyncio.sleep(0.01)
+            return ResultSet(["id"], [(1,)])
+
+        self.server.on(r"^KILL QUERY (\d+)", kill)
+        self.server.on(r"FROM slow", lambda match, params: wait_killed())
+        self.server.on(r"FROM users", ResultSet(["id"], [(1,)]))
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_kill_query(self):
+        async with Engine(self.server.url, min_pool_size=1, max_pool_size=1) as engine:
+            result = await engine.execute("SELECT id FROM slow", timeout=0.05)
+            self.assertIsInstance(result.error, QueryTimeoutError)
+            self.assertEqual(result.error_no, ER.QUERY_TIMEOUT)
+            kills = [query for query in self.server.queries if query.startswith("KILL QUERY")]
+            self.assertEqual(len(kills), 1)
+            # 中断后连接状态正常，继续使用
+            self.assertEqual(engine.status["pool_size"], 1)
+            self.assertEqual(engine.status["pool_free"], 1)
+            self.assertEqual(await (await engine.execute("SELECT id FROM users")).fetch_all(), ((1,),))
+            self.assertEqual(engine.status["pool_evicted"], 0)
+
+    async def test_close_unresponsive_connection(self):
+        self.interruptible = False
+        async with Engine(self.server.url, min_pool_size=1, max_pool_size=1) as engine:
+            result = await engine.execute("SELECT id FROM slow", timeout=0.05)
+            self.assertEqual(result.error_no, ER.QUERY_TIMEOUT)
+            # 没有响应的连接被关闭并从连接池移除
+            self.assertEqual(engine.status["pool_size"], 0)
+            self.assertEqual(engine.status["pool_evicted"], 1)
+            self.assertEqual(await (await engine.execute("SELECT id FROM users")).fetch_all(), ((1,),))
+
+    async def test_no_timeout(self):
+        async with Engine(self.server.url + "?query_timeout=5") as engine:
+            result = await engine.execute("SELECT id FROM users")
+            self.assertIsNone(result.error)
+            self.assertEqual(await result.fetch_all(), ((1,),))
+            self.assertFalse([query for query in self.server.queries if query.startswith("KILL")])
+
+    async def test_execution_time_hint(self):
+        async with Engine(self.server.url, query_timeout=2, query_timeout_hint=True) as engine:
+            result = await engine.execute("SELECT id FROM users")
+            self.assertEqual(await result.fetch_all(), ((1,),))
+            self.assertIn("SELECT /*+ MAX_EXECUTION_TIME(2000) */ id FROM users", self.server.queries)
+            self.assertEqual(result.query, "SELECT id FROM users")
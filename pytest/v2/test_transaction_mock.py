@@ -0,0 +1,108 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, Mock
+
+from asmysql.v2 import Result, Transaction
+
+
+class TestTransactionWithMock(IsolatedAsyncioTestCase):
+    """使用mock测试Transaction类，避免需要实际数据库连接"""
+
+    def setUp(self):
+        """测试前准备"""
+        # 创建mock的连接和游标
+        self.mock_conn = Mock()
+        self.mock_conn.begin = AsyncMock()
+        self.mock_conn.commit = AsyncMock()
+        self.mock_conn.rollback = AsyncMock()
+        self.mock_conn.encoding = "utf8"
+        self.mock_conn.escape = Mock(side_effect=repr)
+
+        self.mock_cursor = Mock()
+        self.mock_cursor.connection = self.mock_conn
+        self.mock_cursor.execute = AsyncMock()
+        self.mock_cursor.executemany = AsyncMock()
+        self.mock_cursor.close = AsyncMock()
+        self.mock_conn.cursor = AsyncMock(return_value=self.mock_cursor)
+
+        # 创建mock的连接池
+        self.mock_pool = Mock()
+        self.mock_pool.acquire = AsyncMock(return_value=self.mock_conn)
+        self.mock_pool.release = Mock()
+
+    async def test_transaction_commit(self):
+        """测试事务正常退出时提交并只归还一次连接"""
+        async with Transaction(pool=self.mock_pool) as tx:
+            self.assertTrue(tx.is_active)
+            self.assertEqual(tx.connection, self.mock_conn)
+
+        self.mock_pool.acquire.assert_awaited_once()
+        self.mock_conn.begin.assert_awaited_once()
+        self.mock_conn.commit.assert_awaited_once()
+        self.mock_conn.rollback.assert_not_awaited()
+        self.mock_pool.release.assert_called_once_with(self.mock_conn)
+        self.assertFalse(tx.is_active)
+
+    async def test_transaction_rollback_on_exception(self):
+        """测试事务发生异常时回滚"""
+        with self.assertRaises(ValueError):
+            async with Transaction(pool=self.mock_pool):
+                raise ValueError("test")
+
+        self.mock_conn.rollback.assert_awaited_once()
+        self.mock_conn.commit.assert_not_awaited()
+        self.mock_pool.release.assert_called_once_with(self.mock_conn)
+
+    async def test_transaction_manual_rollback(self):
+        """测试手动回滚后退出不再提交"""
+        async with Transaction(pool=self.mock_pool) as tx:
+            await tx.rollback()
+            self.assertFalse(tx.is_active)
+
+        self.mock_conn.rollback.assert_awaited_once()
+        self.mock_conn.commit.assert_not_awaited()
+        self.mock_pool.release.assert_called_once_with(self.mock_conn)
+
+    async def test_nested_transaction_savepoint(self):
+        """测试嵌套事务使用SAVEPOINT"""
+        async with Transaction(pool=self.mock_pool) as tx:
+            async with tx.transaction() as sp:
+                self.assertEqual(sp.depth, 1)
+                self.assertEqual(sp.connection, self.mock_conn)
+            with self.assertRaises(ValueError):
+                async with tx.transaction():
+                    raise ValueError("test")
+
+        executed = [call.args[0] for call in self.mock_cursor.execute.await_args_list]
+        self.assertEqual(self.mock_cursor.close.await_count, 4)
+        self.assertEqual(
+            executed,
+            [
+                "SAVEPOINT asmysql_sp_1",
+                "RELEASE SAVEPOINT asmysql_sp_1",
+                "SAVEPOINT asmysql_sp_1",
+                "ROLLBACK TO SAVEPOINT asmysql_sp_1",
+            ],
+        )
+        self.mock_pool.acquire.assert_awaited_once()
+        self.mock_conn.commit.assert_awaited_once()
+        self.mock_pool.release.assert_called_once_with(self.mock_conn)
+
+    async def test_transaction_execute_on_pinned_connection(self):
+        """测试事务内执行语句使用绑定的连接且不单独提交"""
+        async with Transaction(pool=self.mock_pool) as tx:
+            result = tx.execute("UPDATE test_users SET name = %s", ("张三",))
+            self.assertIsInstance(result, Result)
+            self.assertFalse(result.commit)
+            await result
+            result = tx.execute_many("INSERT INTO test_users (name) VALUES (%s)", [("李四",), ("王五",)])
+            await result
+
+        self.mock_pool.acquire.assert_awaited_once()
+        self.mock_conn.commit.assert_awaited_once()
+        self.mock_pool.release.assert_called_once_with(self.mock_conn)
+
+    def test_transaction_not_started(self):
+        """测试事务未开始时不能执行语句"""
+        tx = Transaction(pool=self.mock_pool)
+        with self.assertRaises(RuntimeError):
+            tx.execute("SELECT 1")
@@ -0,0 +1,84 @@
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from asmysql.testing import ErrorResponse, FakeMySQLServer, OkResponse, ResultSet
+from asmysql.v2 import Engine
+from asmysql.v2._prepared import StatementCache
+from asmysql.v2._warmup import WarmupPool
+
+
+class TestWarmup(IsolatedAsyncioTestCase):
+    """使用 FakeMySQLServer 测试启动时并发建立连接和预热语句"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.server.on(r"^SET SESSION bad", ErrorResponse(1193, "Unknown system variable 'bad'"))
+        self.server.on(r"^SET SESSION", OkResponse(), latency=0.1)
+        self.server.on(r"FROM users", ResultSet(["id"], [(1,)]))
+        self.server.on(r"^SELECT @@max_allowed_packet", ResultSet(["@@max_allowed_packet"], [(67108864,)]))
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def statements(self):
+        return [query for query in self.server.queries if query.startswith("SET SESSION")]
+
+    async def test_parallel_warmup(self):
+        engine = Engine(
+            self.server.url,
+            min_pool_size=5,
+            max_pool_size=6,
+            warmup_statements=["SET SESSION sql_mode = 'STRICT_ALL_TABLES'"],
+        )
+        started = time.monotonic()
+        await engine.connect()
+        try:
+            # 5个连接的预热语句各需要0.1秒，并发执行
+            self.assertLess(time.monotonic() - started, 0.4)
+            self.assertIsInstance(engine.pool, WarmupPool)
+            self.assertEqual(engine.pool.freesize, 5)
+            self.assertEqual(len(self.statements()), 5)
+
+            # 连接池已满后按需新建的连接同样执行预热语句
+            conns = [await engine.pool.acquire() for _ in range(6)]
+            self.assertEqual(len(self.statements()), 6)
+            for conn in conns:
+                engine.pool.release(conn)
+        finally:
+            await engine.disconnect()
+
+    async def test_serial_warmup(self):
+        engine = Engine(
+            self.server.url + "?warmup_concurrency=1&warmup_statement=SET+SESSION+a=1&warmup_statement=SET+SESSION+b=2",
+            min_pool_size=2,
+        )
+        self.assertEqual(engine.warmup_statements, ("SET SESSION a=1", "SET SESSION b=2"))
+        started = time.monotonic()
+        await engine.connect()
+        try:
+            self.assertGreaterEqual(time.monotonic() - started, 0.4)
+            self.assertEqual(self.statements(), ["SET SESSION a=1", "SET SESSION b=2"] * 2)
+        finally:
+            await engine.disconnect()
+
+    async def test_warmup_error(self):
+        engine = Engine(self.server.url, min_pool_size=3, warmup_statements=["SET SESSION bad = 1"])
+        with self.assertRaises(ConnectionError):
+            await engine.connect()
+        self.assertFalse(engine.is_connected)
+
+    async def test_warmup_prepare(self):
+        query = "SELECT id FROM users WHERE id = %s"
+        engine = Engine(self.server.url, min_pool_size=2, prepared=True, warmup_prepare=[query])
+        await engine.connect()
+        try:
+            conn = await engine.pool.acquire()
+            try:
+                self.assertIsNotNone(StatementCache.of(conn, 128).get("SELECT id FROM users WHERE id = ?"))
+            finally:
+                engine.pool.release(conn)
+            result = await engine.execute(query, (1,))
+            self.assertEqual(await result.fetch_all(), ((1,),))
+        finally:
+            await engine.disconnect()
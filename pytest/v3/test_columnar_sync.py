@@ -0,0 +1,44 @@
+import importlib.util
+import unittest
+from unittest.mock import Mock
+
+from pymysql.constants import FIELD_TYPE
+
+from asmysql.v3dev import SyncResult
+
+HAS_COLUMNAR = importlib.util.find_spec("numpy") is not None and importlib.util.find_spec("pyarrow") is not None
+
+DESCRIPTION = (
+    ("id", FIELD_TYPE.LONG, None, 11, 11, 0, False),
+    ("name", FIELD_TYPE.VAR_STRING, None, 255, 255, 0, True),
+)
+
+
+@unittest.skipUnless(HAS_COLUMNAR, "numpy or pyarrow is not installed")
+class TestSyncResultColumnar(unittest.TestCase):
+    """使用mock测试同步 Result 的列式获取"""
+
+    def setUp(self):
+        self.mock_cursor = Mock()
+        self.mock_cursor.description = DESCRIPTION
+        self.mock_cursor.fetchmany = Mock(side_effect=[[(1, "a"), (2, None)], [(3, "a")], []])
+        self.mock_conn = Mock()
+        self.mock_conn.cursor = Mock(return_value=self.mock_cursor)
+        self.mock_cursor.connection = self.mock_conn
+        self.mock_pool = Mock()
+        self.mock_pool.acquire = Mock(return_value=self.mock_conn)
+
+    def test_fetch_columns(self):
+        """测试按批读取并合并为列"""
+        result = SyncResult(pool=self.mock_pool, query="SELECT ...", commit=False)
+        columns = result.fetch_columns(batch_size=2)
+        self.assertEqual(columns["id"].tolist(), [1, 2, 3])
+        self.assertEqual(columns["name"].tolist(), ["a", None, "a"])
+        self.mock_pool.release.assert_called_once_with(self.mock_conn)
+
+    def test_fetch_arrow(self):
+        """测试获取 pyarrow.Table"""
+        result = SyncResult(pool=self.mock_pool, query="SELECT ...", stream=True, commit=False)
+        table = result.fetch_arrow(batch_size=2)
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column("name").to_pylist(), ["a", None, "a"])
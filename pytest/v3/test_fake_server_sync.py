@@ -0,0 +1,124 @@
+import asyncio
+import gc
+import threading
+import unittest
+from unittest import mock
+
+from pymysql.constants import ER
+
+from asmysql.testing import DisconnectResponse, ErrorResponse, FakeMySQLServer, OkResponse, ResultSet
+from asmysql.v3dev import SyncEngine
+
+
+class TestSyncEngineFakeServer(unittest.TestCase):
+    """使用 FakeMySQLServer 测试同步 Engine 实际的执行和读取流程"""
+
+    def setUp(self):
+        self.server = FakeMySQLServer()
+        self.drops = 0
+        self.server.on(r"^DELETE", ErrorResponse(1142, "DELETE command denied"))
+        self.server.on(r"FROM flaky", self._flaky)
+        self.server.on(r"FROM users", ResultSet(["id", "name"], lambda: ((i, f"user{i}") for i in range(1, 501))))
+        self.server.start()
+        self.engine = SyncEngine(self.server.url, min_pool_size=1, max_pool_size=4)
+        self.engine.connect()
+
+    def tearDown(self):
+        self.engine.disconnect()
+        self.server.stop()
+
+    def test_fetch_and_stream(self):
+        with self.engine.execute("SELECT id, name FROM users", result_class=dict) as result:
+            rows = result.fetch_all()
+        self.assertEqual(len(rows), 500)
+        self.assertEqual(rows[0], {"id": 1, "name": "user1"})
+        self.assertEqual(sum(1 for _ in self.engine.execute("SELECT id, name FROM users", stream=True)), 500)
+
+    def test_error(self):
+        with self.engine.execute("DELETE FROM users") as result:
+            self.assertEqual(result.error_no, 1142)
+
+    def test_concurrent(self):
+        errors = []
+
+        def worker():
+            for _ in range(20):
+                with self.engine.execute("SELECT id, name FROM users") as result:
+                    if len(result.fetch_all()) != 500:
+                        errors.append(result)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(self.server.total_connections, 4)
+
+    def _flaky(self, match, params):
+        if self.drops:
+            self.drops -= 1
+            return DisconnectResponse()
+        return ResultSet(["id"], [(1,)])
+
+    def test_retry_read_on_lost_connection(self):
+        """测试只读语句因为连接断开失败时在新连接上重试一次"""
+        self.drops = 1
+        with self.engine.execute("SELECT id FROM flaky") as result:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.fetch_all(), ((1,),))
+        self.assertEqual(self.server.queries.count("SELECT id FROM flaky"), 2)
+        self.assertEqual(self.engine.status["pool_evicted"], 1)
+
+        self.drops = 2
+        with self.engine.execute("SELECT id FROM flaky") as result:
+            self.assertEqual(result.error_no, 2013)
+
+    def test_query_timeout(self):
+        """测试语句超时后使用 KILL QUERY 中断，连接继续使用"""
+        killed = threading.Event()
+
+        def kill(match, params):
+            killed.set()
+            return OkResponse()
+
+        async def wait_killed():
+            for _ in range(300):
+                if killed.is_set():
+                    return ErrorResponse(ER.QUERY_INTERRUPTED, "Query execution was interrupted")
+                await asyncio.sleep(0.01)
+            return ResultSet(["id"], [(1,)])
+
+        self.server.on(r"^KILL QUERY (\d+)", kill)
+        self.server.on(r"FROM slow", lambda match, params: wait_killed())
+        with self.engine.execute("SELECT id FROM slow", timeout=0.05) as result:
+            self.assertEqual(result.error_no, ER.QUERY_TIMEOUT)
+        self.assertTrue(killed.is_set())
+        self.assertEqual(self.engine.status["pool_evicted"], 0)
+        with self.engine.execute("SELECT id FROM flaky", timeout=1) as result:
+            self.assertEqual(result.fetch_all(), ((1,),))
+        self.assertEqual(sum(query.startswith("KILL QUERY") for query in self.server.queries), 1)
+
+    def test_close_is_idempotent(self):
+        """测试重复关闭只归还一次连接"""
+        result = self.engine.execute("SELECT id, name FROM users", stream=True)
+        result()
+        self.assertEqual(self.engine.status["pool_used"], 1)
+        result.close()
+        result.close()
+        self.assertEqual(self.engine.status["pool_used"], 0)
+
+    def test_leaked_result(self):
+        """测试没有关闭就被回收的 Result 关闭连接并发出 ResourceWarning"""
+        result = self.engine.execute("SELECT id, name FROM users", stream=True)()
+        result.fetch_one(close=False)
+        # 关闭连接时游标和 MySQLResult 的回收不再读取已关闭的 socket
+        unraisable = []
+        with mock.patch("sys.unraisablehook", unraisable.append), self.assertWarns(ResourceWarning):
+            del result
+            gc.collect()
+        self.assertEqual([args.exc_value for args in unraisable], [])
+        self.assertEqual(self.engine.status["pool_leaked"], 1)
+        self.assertEqual(self.engine.status["pool_used"], 0)
+        with self.engine.execute("SELECT id, name FROM users") as result:
+            self.assertEqual(len(result.fetch_all()), 500)
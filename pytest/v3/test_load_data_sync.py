@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import Mock
+
+from pymysql.connections import MysqlPacket
+from pymysql.err import DataError
+
+from asmysql.v3dev._load_data import RowSource, load_rows
+
+
+class TestSyncLoadRows(unittest.TestCase):
+    """使用mock连接测试同步版本的 LOCAL INFILE 数据发送"""
+
+    def test_stream_generator(self):
+        """测试从生成器流式发送数据，并通过游标读取导入行数"""
+        sent = []
+        mock_conn = Mock()
+        mock_conn.encoding = "utf8"
+        mock_conn.write_packet = Mock(side_effect=sent.append)
+        mock_conn._read_packet = Mock(
+            side_effect=[
+                MysqlPacket(b"\xfbasmysql_rows.tsv", "utf8"),
+                MysqlPacket(b"\x00\x02\x00\x02\x00\x00\x00", "utf8"),
+            ]
+        )
+        mock_cursor = Mock()
+        mock_cursor.connection = mock_conn
+        mock_cursor.nextset = Mock(return_value=None)
+        mock_cursor._do_get_result = Mock(side_effect=lambda: setattr(mock_cursor, "rowcount", 2))
+
+        source = RowSource("users", ["id", "name"], ((i, f"用户{i}") for i in range(2)))
+        self.assertEqual(load_rows(mock_cursor, source.query("utf8mb4"), source), 2)
+        mock_conn._execute_command.assert_called_once()
+        self.assertEqual(b"".join(sent), "0\t用户0\n1\t用户1\n".encode())
+        self.assertEqual(sent[-1], b"")
+        self.assertEqual(mock_conn._result.affected_rows, 2)
+
+    def test_error_after_flush(self):
+        """测试已经发送部分数据后出错: 不发送文件结束的空包，强制关闭连接使服务端回滚，已发送的数据都不会导入"""
+        sent = []
+        mock_conn = Mock()
+        mock_conn.encoding = "utf8"
+        mock_conn.write_packet = Mock(side_effect=sent.append)
+        mock_conn._read_packet = Mock(side_effect=[MysqlPacket(b"\xfbasmysql_rows.tsv", "utf8")])
+        mock_cursor = Mock()
+        mock_cursor.connection = mock_conn
+        mock_cursor.nextset = Mock(return_value=None)
+
+        rows = [(i, f"用户{i}") for i in range(5000)] + [(5000,)]
+        source = RowSource("users", ["id", "name"], rows)
+        with self.assertRaises(DataError):
+            load_rows(mock_cursor, source.query("utf8mb4"), source)
+        self.assertGreater(len(sent), 0)
+        self.assertNotIn(b"", sent)
+        mock_conn._force_close.assert_called_once_with()
+        mock_conn.close.assert_not_called()
+        mock_cursor._do_get_result.assert_not_called()
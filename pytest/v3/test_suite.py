@@ -29,6 +29,26 @@ def suite():
     test_suite.addTests(loader.loadTestsFromModule(
         __import__("pytest.v3.test_asmysql_sync_mock", fromlist=[""])
     ))
+
+    # 添加v3同步 LOAD DATA 导入测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v3.test_load_data_sync", fromlist=[""])
+    ))
+
+    # 添加v3同步列式结果测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v3.test_columnar_sync", fromlist=[""])
+    ))
+
+    # 添加v3同步连接池测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v3.test_sync_pool", fromlist=[""])
+    ))
+
+    # 添加v3 FakeMySQLServer 同步Engine端到端测试
+    test_suite.addTests(loader.loadTestsFromModule(
+        __import__("pytest.v3.test_fake_server_sync", fromlist=[""])
+    ))
     
     return test_suite
 
@@ -0,0 +1,248 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+import pymysql
+
+from asmysql.v3dev._sync_pool import Pool
+
+
+def _mock_connect(delay: float = 0):
+    def connect(**kwargs):
+        if delay:
+            time.sleep(delay)
+        conn = Mock()
+        conn._sock = object()
+        conn._closed = False
+        conn.get_autocommit = Mock(return_value=True)
+        conn.server_status = 0
+        conn._last_used = time.monotonic()
+
+        def close():
+            conn._sock = None
+            conn._closed = True
+
+        conn.close = Mock(side_effect=close)
+        return conn
+
+    return connect
+
+
+class TestSyncPool(unittest.TestCase):
+    """使用mock连接测试同步连接池"""
+
+    def setUp(self):
+        patcher = patch("asmysql.v3dev._sync_pool.pymysql.connect", side_effect=_mock_connect())
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _pool(self, **kwargs):
+        pool = Pool("127.0.0.1", 3306, "root", "", "utf8mb4", **kwargs)
+        self.addCleanup(lambda: (pool.terminate(), pool.wait_closed()))
+        return pool
+
+    def test_acquire_release_reuse(self):
+        """测试归还的连接被优先复用(后进先出)"""
+        pool = self._pool(min_pool_size=2, max_pool_size=4)
+        self.assertEqual((pool.size, pool.freesize), (2, 2))
+        conn1 = pool.acquire()
+        conn2 = pool.acquire()
+        conn3 = pool.acquire()
+        self.assertEqual((pool.size, pool.freesize), (3, 0))
+        pool.release(conn2)
+        self.assertIs(pool.acquire(), conn2)
+        for conn in (conn1, conn2, conn3):
+            pool.release(conn)
+        self.assertEqual((pool.size, pool.freesize), (3, 3))
+        self.assertEqual(self.connect.call_count, 3)
+
+    def test_acquire_timeout(self):
+        """测试连接池已满时获取连接超时"""
+        pool = self._pool(min_pool_size=0, max_pool_size=1, acquire_timeout=0.05)
+        conn = pool.acquire()
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            pool.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        threading.Timer(0.02, pool.release, (conn,)).start()
+        self.assertIs(pool.acquire(timeout=1), conn)
+
+    def test_connect_outside_lock(self):
+        """测试建立连接时不持有锁，其他线程可以同时归还和获取空闲连接"""
+        pool = self._pool(min_pool_size=1, max_pool_size=2)
+        self.connect.side_effect = _mock_connect(delay=0.3)
+        conn = pool.acquire()
+        opener = threading.Thread(target=pool.acquire)
+        opener.start()
+        time.sleep(0.05)
+        self.assertEqual(pool.size, 2)
+        started = time.monotonic()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        self.assertLess(time.monotonic() - started, 0.1)
+        opener.join()
+        self.assertEqual((pool.size, pool.freesize), (2, 0))
+
+    def test_reaper_recycles_idle(self):
+        """测试后台线程回收超过 pool_recycle 的空闲连接并补充到 minsize"""
+        pool = self._pool(min_pool_size=1, max_pool_size=2, pool_recycle=0.05, reap_interval=0.02)
+        conn = pool.acquire()
+        pool.release(conn)
+        time.sleep(0.2)
+        conn.close.assert_called()
+        self.assertEqual(pool.size, 1)
+        self.assertIsNot(pool.acquire(), conn)
+
+    def test_reaper_survives_errors(self):
+        """测试清理出错时记录日志，线程继续运行"""
+        pool = self._pool(min_pool_size=1, max_pool_size=2, pool_recycle=0.05, reap_interval=0.02)
+        with self.assertLogs("asmysql", "WARNING") as logs:
+            with patch.object(pool, "_reap", side_effect=ValueError("bad plan")):
+                time.sleep(0.05)
+        self.assertIn("bad plan", logs.output[0])
+        self.assertTrue(pool._reaper.is_alive())
+        conn = pool.acquire()
+        pool.release(conn)
+        time.sleep(0.2)
+        conn.close.assert_called()
+
+    def test_connect_error_releases_reservation(self):
+        """测试建立连接失败时释放预留名额"""
+        pool = self._pool(min_pool_size=0, max_pool_size=1)
+        self.connect.side_effect = OSError("connection refused")
+        with self.assertRaises(OSError):
+            pool.acquire()
+        self.assertEqual(pool.size, 0)
+        self.connect.side_effect = _mock_connect()
+        pool.release(pool.acquire())
+        self.assertEqual(pool.size, 1)
+
+    def test_close_wakes_waiters(self):
+        """测试关闭连接池时唤醒等待中的线程"""
+        pool = self._pool(min_pool_size=0, max_pool_size=1)
+        conn = pool.acquire()
+        errors = []
+
+        def waiter():
+            try:
+                pool.acquire()
+            except RuntimeError as err:
+                errors.append(err)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.02)
+        pool.close()
+        thread.join(1)
+        self.assertEqual(len(errors), 1)
+        pool.release(conn)
+        pool.wait_closed()
+        self.assertTrue(pool.closed)
+        conn.close.assert_called()
+
+    def test_adaptive_grow_and_shrink(self):
+        """测试自动调整: 获取等待变慢时提前建立连接，利用率持续较低时逐步关闭空闲连接"""
+        self.connect.side_effect = _mock_connect(0.01)
+        pool = self._pool(min_pool_size=1, max_pool_size=10, adaptive=True, target_wait=0.001, adjust_interval=0.01)
+        conns = [pool.acquire() for _ in range(3)]
+        for conn in conns:
+            pool.release(conn)
+        pool._adjust()
+        self.assertGreater(pool.size, 3)
+
+        deadline = time.monotonic() + 3
+        while pool.size > 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(pool.size, 1)
+
+    def test_adaptive_connect_rate_limit(self):
+        """测试自动调整时新建连接的速率限制"""
+        pool = self._pool(min_pool_size=0, max_pool_size=10, adaptive=True, connect_rate=1, adjust_interval=10)
+        conn = pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire(timeout=0.1)
+        self.assertEqual(pool.size, 1)
+        self.assertEqual(self.connect.call_count, 1)
+        pool.release(conn)
+        self.assertIs(pool.acquire(timeout=0.1), conn)
+
+    def test_parallel_warmup(self):
+        """测试初始化时并发建立 min_pool_size 个连接"""
+        self.connect.side_effect = _mock_connect(0.1)
+        started = time.monotonic()
+        pool = self._pool(min_pool_size=5, max_pool_size=5, warmup_concurrency=5)
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(pool.freesize, 5)
+
+    def test_warmup_statements(self):
+        """测试每个新连接建立后执行预热语句，失败时关闭连接并抛出异常"""
+        connect = _mock_connect()
+        conns = []
+
+        def connect_with_cursor(**kwargs):
+            conn = connect(**kwargs)
+            conn.cursor = MagicMock()
+            conns.append(conn)
+            return conn
+
+        self.connect.side_effect = connect_with_cursor
+        pool = self._pool(min_pool_size=2, max_pool_size=3, warmup_statements=["SET SESSION a=1", "SET SESSION b=2"])
+        for _ in range(3):
+            pool.acquire()
+        self.assertEqual(len(conns), 3)
+        for conn in conns:
+            cursor = conn.cursor.return_value.__enter__.return_value
+            self.assertEqual(
+                [c.args for c in cursor.execute.call_args_list], [("SET SESSION a=1",), ("SET SESSION b=2",)]
+            )
+
+        def connect_with_error(**kwargs):
+            conn = connect_with_cursor(**kwargs)
+            conn.cursor.return_value.__enter__.return_value.execute.side_effect = OSError("bad")
+            return conn
+
+        conns.clear()
+        self.connect.side_effect = connect_with_error
+        with self.assertRaises(OSError):
+            self._pool(min_pool_size=3, warmup_statements=["SET SESSION bad=1"])
+        self.assertEqual(len(conns), 3)
+        for conn in conns:
+            conn.close.assert_called()
+
+    def _idle(self, pool, conn, ping_error=None):
+        """让连接看起来空闲了很久，并模拟 COM_PING 的结果"""
+        conn._sock = Mock()
+        conn._read_timeout = None
+        conn._last_used -= 100
+        conn.ping = Mock(side_effect=ping_error)
+
+    def test_validate_on_borrow(self):
+        """测试 validation=idle 时取出空闲较久的连接前发送 COM_PING，失败时关闭并取新的连接"""
+        pool = self._pool(min_pool_size=1, max_pool_size=2, validation="idle", validation_idle=10)
+        conn = pool.acquire()
+        pool.release(conn)
+        self._idle(pool, conn)
+        self.assertIs(pool.acquire(), conn)
+        conn.ping.assert_called_once_with(reconnect=False)
+        pool.release(conn)
+
+        self._idle(pool, conn, pymysql.err.OperationalError(2013, "Lost connection"))
+        other = pool.acquire()
+        self.assertIsNot(other, conn)
+        conn.close.assert_called()
+        self.assertEqual(pool.evicted, 1)
+
+    def test_validate_in_background(self):
+        """测试 validation=background 时后台线程检查空闲连接并移除失效的连接"""
+        pool = self._pool(min_pool_size=2, max_pool_size=2, validation="background", validation_idle=10)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self._idle(pool, first, OSError("connection reset"))
+        self._idle(pool, second)
+        pool._validate_idle()
+        self.assertEqual(list(pool._free), [second])
+        first.close.assert_called()
+        self.assertEqual(pool.evicted, 1)
+        self.assertEqual(pool.size, 1)